@@ -266,7 +266,7 @@ class QuoteSummaryViewTest(TestCase):
         
         post_data = {
             'action': 'finalize_quotes',
-            'selection_strategy': 'lowest_cost',
+            'selection_strategy': 'lowest_price',
             'priority_factor': 'cost_focused'
         }
         
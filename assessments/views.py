@@ -1444,6 +1444,7 @@ def quote_summary(request, assessment_id):
     )
     from insurance_app.recommendation_engine import QuoteRecommendationEngine
     from insurance_app.market_analysis import MarketAverageCalculator
+    from insurance_app.provider_mix_solver import ProviderMixConstraints, ProviderMixSolver
     
     # Get or create quote summary
     quote_summary, created = AssessmentQuoteSummary.objects.get_or_create(
@@ -1461,7 +1462,6 @@ def quote_summary(request, assessment_id):
         if action == 'finalize_quotes':
             try:
                 selection_strategy = request.POST.get('selection_strategy', 'recommended')
-                priority_factor = request.POST.get('priority_factor', 'balanced')
                 
                 # Process quote selections based on strategy
                 if selection_strategy == 'custom':
@@ -1486,14 +1486,35 @@ def quote_summary(request, assessment_id):
                         'strategy': 'custom',
                         'selections': selected_quotes
                     }
+                elif selection_strategy == 'optimal':
+                    # Cheapest provider mix within the insurer's constraints
+                    constraints = ProviderMixConstraints.from_request_data(request.POST)
+                    result = ProviderMixSolver(constraints).solve_for_assessment(assessment)
+                    
+                    if not result.feasible:
+                        return JsonResponse({
+                            'success': False,
+                            'error': 'No quote combination satisfies the selected constraints'
+                        })
+                    
+                    quote_summary.recommended_provider_mix = result.to_dict()
+                    quote_summary.recommended_total = result.total_cost
+                    quote_summary.potential_savings = result.savings
+                    quote_summary.recommendation_reasoning = (
+                        f"Optimal mix across {len(result.providers)} provider(s), "
+                        f"saving £{result.savings:.2f} against the market average."
+                    )
                 else:
                     # Apply automatic selection strategy
+                    strategy = 'best_value' if selection_strategy == 'recommended' else selection_strategy
+                    if strategy not in QuoteRecommendationEngine.STRATEGIES:
+                        return JsonResponse({
+                            'success': False,
+                            'error': f'Unknown selection strategy: {selection_strategy}'
+                        }, status=400)
+                    
                     engine = QuoteRecommendationEngine()
-                    recommendation = engine.generate_recommendation(
-                        assessment, 
-                        strategy=selection_strategy,
-                        priority_factor=priority_factor
-                    )
+                    recommendation = engine.generate_assessment_recommendations(assessment, strategy)
                     
                     quote_summary.recommended_provider_mix = recommendation
                     quote_summary.recommended_total = recommendation.get('total_cost')
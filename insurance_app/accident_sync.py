@@ -0,0 +1,207 @@
+"""
+Bulk synchronisation of insurance accidents with vehicle history.
+
+AccidentHistorySyncManager links accidents and VehicleHistory records one
+vehicle and one accident at a time. AccidentHistoryBulkSync covers the
+whole fleet a batch at a time:
+
+1. Unlinked accidents are read in id order together with the id of an
+   unlinked ACCIDENT history of the same vehicle and day, if there is one.
+   Matched pairs are linked; with create_history, accidents without a
+   match get a new VehicleHistory, created with one bulk_create. The links
+   of the batch are set with one bulk_update.
+2. With import_history, unlinked ACCIDENT histories left over are read in
+   id order and an Accident is created for each with one bulk_create. The
+   history must belong to an insured vehicle; histories of uninsured
+   vehicles are skipped.
+
+Each batch commits together with a SyncCheckpoint holding the last id it
+processed, so an interrupted run resumes with the next batch. The
+checkpoints are removed when a run completes.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, time, timezone as dt_timezone
+from typing import Callable, Dict, List
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from vehicles.models import VehicleHistory
+from .models import Accident, SyncCheckpoint, Vehicle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+ACCIDENT_CHECKPOINT = 'accident_history:accidents'
+HISTORY_CHECKPOINT = 'accident_history:histories'
+
+# Same mappings as AccidentHistorySyncManager and Accident.create_from_vehicle_history
+HISTORY_SEVERITIES = {'minor': 'MINOR', 'moderate': 'MAJOR', 'major': 'MAJOR', 'total_loss': 'TOTAL_LOSS'}
+ACCIDENT_SEVERITIES = {'MINOR': 'minor', 'MAJOR': 'major', 'TOTAL_LOSS': 'total_loss'}
+
+
+@dataclass
+class AccidentSyncResult:
+    linked: int = 0
+    histories_created: int = 0
+    accidents_created: int = 0
+    skipped: int = 0
+
+
+def unlinked_accident_histories():
+    """ACCIDENT vehicle history records without an insurance accident"""
+    return VehicleHistory.objects.filter(event_type='ACCIDENT', insurance_accident__isnull=True)
+
+
+class AccidentHistoryBulkSync:
+    """
+    Links and creates accident and vehicle history records for the whole
+    fleet in batches.
+
+    Args:
+        batch_size: Source rows read, created and linked per transaction
+        create_history: Create VehicleHistory for unmatched accidents
+        import_history: Create Accidents for unmatched ACCIDENT histories
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, create_history: bool = True,
+                 import_history: bool = True):
+        self.batch_size = max(1, batch_size)
+        self.create_history = create_history
+        self.import_history = import_history
+
+    def run(self, restart: bool = False, progress: Callable[[str, SyncCheckpoint], None] = None) -> AccidentSyncResult:
+        """
+        Sync every unlinked accident and history, resuming from the
+        checkpoints of an interrupted run unless restart is set.
+
+        Args:
+            restart: Discard checkpoints and start from the lowest ids
+            progress: Called with the phase name and checkpoint after each batch
+
+        Returns:
+            AccidentSyncResult of this run
+        """
+        if restart:
+            SyncCheckpoint.objects.filter(name__in=[ACCIDENT_CHECKPOINT, HISTORY_CHECKPOINT]).delete()
+
+        result = AccidentSyncResult()
+        self._run_phase(ACCIDENT_CHECKPOINT, self._sync_accidents, result, progress)
+        if self.import_history:
+            self._run_phase(HISTORY_CHECKPOINT, self._import_histories, result, progress)
+        SyncCheckpoint.objects.filter(name__in=[ACCIDENT_CHECKPOINT, HISTORY_CHECKPOINT]).delete()
+
+        logger.info(
+            f"Accident history sync: {result.linked} linked, {result.histories_created} histories and "
+            f"{result.accidents_created} accidents created, {result.skipped} skipped"
+        )
+        return result
+
+    def _run_phase(self, name: str, sync_batch, result: AccidentSyncResult, progress):
+        checkpoint, _ = SyncCheckpoint.objects.get_or_create(name=name)
+        while True:
+            with transaction.atomic():
+                last_id, processed = sync_batch(checkpoint.last_id, result)
+                if not processed:
+                    return
+                checkpoint.last_id = last_id
+                checkpoint.processed += processed
+                checkpoint.save(update_fields=['last_id', 'processed', 'updated_at'])
+            if progress:
+                progress(name, checkpoint)
+
+    def _sync_accidents(self, after_id: int, result: AccidentSyncResult):
+        matching_history = unlinked_accident_histories().filter(
+            vehicle_id=OuterRef('vehicle__vehicle_id'),
+            event_date=OuterRef('accident_day'),
+        ).order_by('pk').values('pk')[:1]
+        accidents = list(
+            Accident.objects.filter(pk__gt=after_id, vehicle_history__isnull=True).annotate(
+                # The UTC date, as accident_date.date() gives for stored datetimes
+                accident_day=TruncDate('accident_date', tzinfo=dt_timezone.utc),
+                matching_history_id=Subquery(matching_history),
+            ).select_related('vehicle').order_by('pk')[:self.batch_size]
+        )
+        if not accidents:
+            return after_id, 0
+
+        linked, unmatched, claimed = [], [], set()
+        for accident in accidents:
+            # Two accidents of a vehicle on one day can match the same history
+            if accident.matching_history_id and accident.matching_history_id not in claimed:
+                claimed.add(accident.matching_history_id)
+                accident.vehicle_history_id = accident.matching_history_id
+                linked.append(accident)
+            else:
+                unmatched.append(accident)
+        result.linked += len(linked)
+
+        if self.create_history and unmatched:
+            histories = self._create_histories(unmatched)
+            for accident, history in zip(unmatched, histories):
+                accident.vehicle_history_id = history.pk
+            linked.extend(unmatched)
+            result.histories_created += len(histories)
+        else:
+            result.skipped += len(unmatched)
+
+        if linked:
+            Accident.objects.bulk_update(linked, ['vehicle_history'], batch_size=self.batch_size)
+        return accidents[-1].pk, len(accidents)
+
+    def _create_histories(self, accidents: List[Accident]) -> List[VehicleHistory]:
+        histories = [
+            VehicleHistory(
+                vehicle_id=accident.vehicle.vehicle_id,
+                event_type='ACCIDENT',
+                event_date=accident.accident_date.date(),
+                description=accident.description,
+                accident_severity=HISTORY_SEVERITIES.get(accident.severity, 'MAJOR'),
+                accident_location=accident.location,
+                notes=f"Insurance claim amount: ${accident.claim_amount}. "
+                      f"Weather conditions: {accident.weather_conditions}. "
+                      f"Fault determination: {accident.fault_determination}.",
+            )
+            for accident in accidents
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            return VehicleHistory.objects.bulk_create(histories, batch_size=self.batch_size)
+        # Without RETURNING the new ids are unknown after a bulk insert
+        for history in histories:
+            history.save()
+        return histories
+
+    def _import_histories(self, after_id: int, result: AccidentSyncResult):
+        insured_vehicle = Vehicle.objects.filter(vehicle_id=OuterRef('vehicle_id')).order_by('-pk').values('pk')[:1]
+        histories = list(
+            unlinked_accident_histories().filter(pk__gt=after_id).annotate(
+                insured_vehicle_id=Subquery(insured_vehicle),
+            ).order_by('pk').values(
+                'pk', 'insured_vehicle_id', 'event_date', 'accident_severity', 'description', 'accident_location',
+            )[:self.batch_size]
+        )
+        if not histories:
+            return after_id, 0
+
+        accidents = [self._accident_from_history(history) for history in histories if history['insured_vehicle_id']]
+        Accident.objects.bulk_create(accidents, batch_size=self.batch_size)
+        result.accidents_created += len(accidents)
+        result.skipped += len(histories) - len(accidents)
+        return histories[-1]['pk'], len(histories)
+
+    @staticmethod
+    def _accident_from_history(history: Dict) -> Accident:
+        return Accident(
+            vehicle_id=history['insured_vehicle_id'],
+            accident_date=timezone.make_aware(datetime.combine(history['event_date'], time.min)),
+            severity=ACCIDENT_SEVERITIES.get(history['accident_severity'], 'moderate'),
+            claim_amount=0,
+            description=history['description'] or 'Accident imported from vehicle history',
+            location=history['accident_location'] or 'Unknown',
+            vehicle_history_id=history['pk'],
+        )
@@ -21,6 +21,7 @@ from .serializers import (
 from .quote_managers import PartQuoteRequestManager
 from .market_analysis import MarketAverageCalculator
 from .recommendation_engine import QuoteRecommendationEngine
+from .provider_mix_solver import ProviderMixConstraints, ProviderMixSolver
 
 
 class DamagedPartViewSet(viewsets.ModelViewSet):
@@ -597,6 +598,15 @@ class QuoteRecommendationViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if strategy not in QuoteRecommendationEngine.STRATEGIES:
+            return Response(
+                {
+                    'error': f'Unknown strategy: {strategy}',
+                    'valid_strategies': list(QuoteRecommendationEngine.STRATEGIES)
+                }, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         try:
             from assessments.models import VehicleAssessment
             assessment = VehicleAssessment.objects.get(
@@ -666,6 +676,51 @@ class QuoteRecommendationViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def optimal_mix(self, request):
+        """Solve for the cheapest provider mix under insurer constraints"""
+        assessment_id = request.data.get('assessment_id')
+        
+        if not assessment_id:
+            return Response(
+                {'error': 'assessment_id is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            constraints = ProviderMixConstraints.from_request_data(request.data)
+        except (TypeError, ValueError) as e:
+            return Response(
+                {'error': f'Invalid constraints: {str(e)}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            from assessments.models import VehicleAssessment
+            assessment = VehicleAssessment.objects.get(
+                assessment_id=assessment_id,
+                user=request.user
+            )
+            
+            result = ProviderMixSolver(constraints).solve_for_assessment(assessment)
+            
+            return Response({
+                'status': 'Optimal mix calculated' if result.feasible else 'No feasible mix',
+                'assessment_id': assessment_id,
+                'optimal_mix': result.to_dict()
+            })
+            
+        except VehicleAssessment.DoesNotExist:
+            return Response(
+                {'error': 'Assessment not found or access denied'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Optimal mix calculation failed: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=False, methods=['get'])
     def available_strategies(self, request):
         """Get list of available recommendation strategies"""
@@ -689,6 +744,11 @@ class QuoteRecommendationViewSet(viewsets.ViewSet):
                 'key': 'highest_quality',
                 'name': 'Highest Quality',
                 'description': 'Focus on OEM parts and premium providers'
+            },
+            {
+                'key': 'optimal',
+                'name': 'Optimal Mix',
+                'description': 'Cheapest provider mix within provider, deadline, warranty and OEM constraints'
             }
         ]
         
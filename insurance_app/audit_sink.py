@@ -0,0 +1,337 @@
+"""
+Buffered writer for QuoteSystemAuditLog entries.
+
+QuoteSystemAuditLog.log_action used to INSERT every entry in the calling
+path. AuditLogSink keeps entries in a per-process buffer and writes them
+with one bulk_create when the buffer reaches QUOTE_AUDIT_BUFFER_SIZE
+entries or its oldest entry is QUOTE_AUDIT_FLUSH_SECONDS old. The age is
+checked as entries are added and when a request finishes. The buffer is
+flushed after every Celery task, when a Celery worker process shuts down
+(prefork children leave through os._exit, so atexit does not run there)
+and, in other processes, at exit.
+
+Entries are lost only if a process is killed without a chance to flush,
+for example by SIGKILL, the OOM killer or a task's hard time limit. At
+most the entries buffered at that moment are lost: fewer than
+QUOTE_AUDIT_BUFFER_SIZE, logged within the last QUOTE_AUDIT_FLUSH_SECONDS
+or by the running task.
+
+A forked child starts with an empty buffer: the entries buffered when it
+was forked belong to the parent, which writes them.
+
+Entries logged inside a transaction join the buffer through
+transaction.on_commit, so, as with the INSERT they replace, entries of a
+rolled back transaction are never written.
+
+When the database cannot be reached the entries are appended to a local
+JSON-lines spool file (QUOTE_AUDIT_SPOOL_PATH) and replayed by the next
+successful flush. A batch the database rejects, say for a user that no
+longer exists, is split in halves until the rejected entries are found;
+those go to a dead-letter file (QUOTE_AUDIT_DEAD_LETTER_PATH) instead of
+the spool, so they cannot block the entries spooled with them. Spool lines
+that cannot be read go to the dead-letter file as well.
+
+prune_audit_logs deletes old entries one time window and bounded chunk at
+a time instead of in one large DELETE.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from functools import partial
+from typing import List
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import InterfaceError, OperationalError, connection, transaction
+from django.db.models import Min
+from django.utils.dateparse import parse_datetime
+
+from .models import QuoteSystemAuditLog
+
+logger = logging.getLogger('quote_system')
+
+DEFAULT_BUFFER_SIZE = 200
+DEFAULT_FLUSH_SECONDS = 5
+DEFAULT_PRUNE_CHUNK_SIZE = 5000
+
+SPOOLED_FIELDS = [
+    field.attname for field in QuoteSystemAuditLog._meta.concrete_fields if not field.primary_key
+]
+
+# Errors meaning the database cannot be reached, as opposed to rejecting
+# the entries written
+UNAVAILABLE_ERRORS = (OperationalError, InterfaceError)
+
+
+def default_spool_path() -> str:
+    return os.path.join(getattr(settings, 'LOG_DIR', 'logs'), 'quote_audit_spool.jsonl')
+
+
+def default_dead_letter_path() -> str:
+    return os.path.join(getattr(settings, 'LOG_DIR', 'logs'), 'quote_audit_dead_letter.jsonl')
+
+
+class DeadLetterEncoder(DjangoJSONEncoder):
+    """Encodes what DjangoJSONEncoder cannot as its repr, so no entry is lost"""
+
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            return repr(o)
+
+
+class AuditLogSink:
+    """
+    Per-process buffer of QuoteSystemAuditLog entries.
+
+    Args:
+        max_entries: Buffered entries that trigger a flush
+        max_age_seconds: Age of the oldest buffered entry that triggers a flush
+        spool_path: File entries are appended to when the database is unavailable
+        dead_letter_path: File entries the database rejects are appended to
+    """
+
+    def __init__(self, max_entries: int = None, max_age_seconds: float = None, spool_path: str = None,
+                 dead_letter_path: str = None):
+        if max_entries is None:
+            max_entries = getattr(settings, 'QUOTE_AUDIT_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+        if max_age_seconds is None:
+            max_age_seconds = getattr(settings, 'QUOTE_AUDIT_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        self.max_entries = max(1, max_entries)
+        self.max_age_seconds = max_age_seconds
+        self.spool_path = spool_path or getattr(settings, 'QUOTE_AUDIT_SPOOL_PATH', None) or default_spool_path()
+        self.dead_letter_path = (
+            dead_letter_path or getattr(settings, 'QUOTE_AUDIT_DEAD_LETTER_PATH', None) or default_dead_letter_path()
+        )
+        self._entries: List[QuoteSystemAuditLog] = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _reset_after_fork(self):
+        """Drop the parent's entries and locks in a forked child"""
+        self._entries = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def add(self, entry: QuoteSystemAuditLog):
+        """Buffer an unsaved entry, after the current transaction commits if there is one"""
+        if connection.in_atomic_block:
+            transaction.on_commit(partial(self._buffer, entry))
+        else:
+            self._buffer(entry)
+
+    def _buffer(self, entry: QuoteSystemAuditLog):
+        with self._lock:
+            self._entries.append(entry)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = self._due()
+        if due:
+            self.flush()
+
+    def _due(self) -> bool:
+        return len(self._entries) >= self.max_entries or (
+            self._oldest is not None and time.monotonic() - self._oldest >= self.max_age_seconds
+        )
+
+    def flush_if_due(self) -> int:
+        """Flush if the buffer has reached its size or age limit"""
+        with self._lock:
+            due = self._due()
+        return self.flush() if due else 0
+
+    def pending(self) -> int:
+        """Number of buffered entries"""
+        return len(self._entries)
+
+    def flush(self) -> int:
+        """
+        Write the buffered entries with one bulk_create, then replay the
+        spool file. Entries are spooled to disk if the database cannot be
+        reached; nothing raised while writing reaches the caller.
+
+        Returns:
+            Number of entries written to the database, spooled entries
+            replayed included
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries, self._entries, self._oldest = self._entries, [], None
+            if not entries:
+                return 0
+            try:
+                rejected = self._write(entries)
+            except Exception as e:
+                logger.error(f"Audit log write failed, spooling {len(entries)} entries to {self.spool_path}: {e}")
+                try:
+                    self.spool(entries)
+                except (OSError, TypeError, ValueError) as spool_error:
+                    logger.error(f"Dropped {len(entries)} audit log entries, spooling failed: {spool_error}")
+                return 0
+            written = len(entries) - len(rejected)
+            try:
+                self.dead_letter(rejected)
+                written += self.replay_spool()
+            except Exception as e:
+                logger.error(f"Replaying the audit log spool {self.spool_path} failed: {e}")
+            return written
+
+    def _write(self, entries: List[QuoteSystemAuditLog]) -> List[QuoteSystemAuditLog]:
+        """
+        Write entries, splitting a batch the database rejects in halves
+        until the rejected entries are isolated.
+
+        Returns:
+            The entries that could not be written
+
+        Raises:
+            OperationalError, InterfaceError: If the database cannot be reached
+        """
+        try:
+            with transaction.atomic():
+                QuoteSystemAuditLog.objects.bulk_create(entries, batch_size=1000)
+            return []
+        except UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            # Not only IntegrityError: an unserialisable details payload
+            # must not hold back the rest of the batch
+            if len(entries) == 1:
+                logger.error(f"Audit log entry rejected: {e}")
+                return entries
+            middle = len(entries) // 2
+            return self._write(entries[:middle]) + self._write(entries[middle:])
+
+    def spool(self, entries: List[QuoteSystemAuditLog]):
+        """Append entries to the spool file, one JSON object per line"""
+        self._append(self.spool_path, [
+            json.dumps(self._values(entry), cls=DjangoJSONEncoder) + '\n' for entry in entries
+        ])
+
+    def dead_letter(self, entries: List[QuoteSystemAuditLog]):
+        """Append entries the database rejected to the dead-letter file"""
+        if entries:
+            logger.error(f"Moved {len(entries)} rejected audit log entries to {self.dead_letter_path}")
+            self._append(self.dead_letter_path, [
+                json.dumps(self._values(entry), cls=DeadLetterEncoder) + '\n' for entry in entries
+            ])
+
+    @staticmethod
+    def _values(entry: QuoteSystemAuditLog) -> dict:
+        return {name: getattr(entry, name) for name in SPOOLED_FIELDS}
+
+    @staticmethod
+    def _append(path: str, lines: List[str]):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as output:
+            output.write(''.join(lines))
+
+    def replay_spool(self) -> int:
+        """
+        Write spooled entries to the database.
+
+        The spool file is renamed before it is read, so entries spooled by
+        other processes meanwhile go to a new file. Entries are spooled
+        again if the database cannot be reached; lines that cannot be read
+        and entries the database rejects go to the dead-letter file.
+
+        Returns:
+            Number of entries written
+        """
+        if not os.path.exists(self.spool_path):
+            return 0
+        claimed = f'{self.spool_path}.{os.getpid()}.replay'
+        try:
+            os.replace(self.spool_path, claimed)
+        except FileNotFoundError:
+            return 0
+
+        entries, unreadable = [], []
+        with open(claimed, encoding='utf-8') as spool:
+            for line in spool:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(self._entry_from_line(line))
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.error(f"Unreadable spooled audit log entry moved to {self.dead_letter_path}: {e}")
+                    unreadable.append(line if line.endswith('\n') else line + '\n')
+        if unreadable:
+            self._append(self.dead_letter_path, unreadable)
+
+        try:
+            rejected = self._write(entries)
+        except UNAVAILABLE_ERRORS as e:
+            logger.error(f"Replaying {len(entries)} spooled audit log entries failed: {e}")
+            self.spool(entries)
+            entries, rejected = [], []
+        self.dead_letter(rejected)
+        os.remove(claimed)
+        written = len(entries) - len(rejected)
+        if written:
+            logger.info(f"Replayed {written} spooled audit log entries")
+        return written
+
+    @staticmethod
+    def _entry_from_line(line: str) -> QuoteSystemAuditLog:
+        values = json.loads(line)
+        values['timestamp'] = parse_datetime(values['timestamp'])
+        if values['timestamp'] is None:
+            raise ValueError("Invalid timestamp")
+        return QuoteSystemAuditLog(**values)
+
+
+def prune_audit_logs(older_than, chunk_size: int = DEFAULT_PRUNE_CHUNK_SIZE,
+                     window: timedelta = timedelta(days=1)) -> int:
+    """
+    Delete audit log entries older than a cutoff in bounded chunks.
+
+    Entries are deleted one time window at a time, oldest first, and at
+    most chunk_size rows per DELETE; empty stretches are skipped. Every
+    DELETE is bounded by the window's timestamps, so it stays within one
+    partition of a table partitioned by time and within the timestamp
+    index otherwise.
+
+    Args:
+        older_than: Entries with an earlier timestamp are deleted
+        chunk_size: Maximum rows per DELETE
+        window: Time span handled per pass
+
+    Returns:
+        Number of entries deleted
+    """
+    chunk_size = max(1, chunk_size)
+    logs = QuoteSystemAuditLog.objects.filter(timestamp__lt=older_than)
+    start = logs.aggregate(oldest=Min('timestamp'))['oldest']
+    deleted = 0
+    while start is not None and start < older_than:
+        end = min(start + window, older_than)
+        in_window = logs.filter(timestamp__gte=start, timestamp__lt=end)
+        while True:
+            ids = list(in_window.order_by().values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            count, _ = in_window.filter(pk__in=ids).delete()
+            deleted += count
+            if len(ids) < chunk_size:
+                break
+        # Skip straight to the next window that has entries
+        start = logs.filter(timestamp__gte=end).aggregate(oldest=Min('timestamp'))['oldest']
+    return deleted
+
+
+audit_sink = AuditLogSink()
+
+atexit.register(audit_sink.flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=audit_sink._reset_after_fork)
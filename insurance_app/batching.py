@@ -0,0 +1,76 @@
+"""
+Batching helpers for the set-based jobs.
+
+keyset_iterator replaces QuerySet.iterator(chunk_size=...) for long reads.
+iterator() holds a server-side cursor open on PostgreSQL for as long as
+the rows are consumed, which a transaction-mode connection pooler such as
+PgBouncer (the production -pooler endpoint) cannot keep between
+statements. Here every chunk is its own query that starts after the key
+of the last row read, so nothing outlives a statement and memory stays at
+one chunk.
+
+batches groups any iterable into lists of a fixed size for bulk writes.
+"""
+
+from typing import Iterable, Iterator, List, Sequence
+
+from django.db.models import Q, QuerySet
+
+
+def keyset_iterator(queryset: QuerySet, chunk_size: int, key: Sequence[str] = ('pk',)) -> Iterator[dict]:
+    """
+    Yield the rows of a values() queryset, chunk_size rows per query.
+
+    Rows come in key order. The key fields must be unique together and
+    be among the values() fields. Filtering on the key happens before
+    window functions are evaluated, so windows partitioned by a prefix of
+    the key see whole partitions.
+
+    Args:
+        queryset: values() queryset to read
+        chunk_size: Rows fetched per query
+        key: Fields ordering the rows
+
+    Returns:
+        Iterator of row dicts
+    """
+    queryset = queryset.order_by(*key)
+    chunk_size = max(1, chunk_size)
+    after = None
+    while True:
+        page = queryset if after is None else queryset.filter(_after(key, after))
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        after = [rows[-1][field] for field in key]
+
+
+def _after(key: Sequence[str], values: Sequence) -> Q:
+    """Condition for rows whose key sorts after values"""
+    # (a, b) > (x, y) is a > x or (a = x and b > y)
+    condition = Q(**{f'{key[-1]}__gt': values[-1]})
+    for field, value in zip(reversed(key[:-1]), reversed(values[:-1])):
+        condition = Q(**{f'{field}__gt': value}) | (Q(**{field: value}) & condition)
+    return condition
+
+
+def batches(items: Iterable, size: int) -> Iterator[List]:
+    """
+    Group items into lists of size items; the last list may be shorter.
+
+    Args:
+        items: Iterable to group, consumed lazily
+        size: Items per list
+
+    Returns:
+        Iterator of lists
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,187 @@
+"""
+Bulk maintenance compliance calculation.
+
+MaintenanceCompliance.calculate_compliance used to run five COUNT queries
+per vehicle, and update_compliance_scores called it for every vehicle.
+ComplianceEngine computes the counts of a whole batch of vehicles in one
+grouped query over MaintenanceSchedule with conditional Count(filter=...)
+aggregates and writes them back with a single upsert per batch.
+
+In incremental mode only vehicles listed in ComplianceDirtyVehicle are
+recalculated, plus vehicles with a schedule that has become overdue since
+their compliance was last calculated. Schedules are marked dirty by the
+MaintenanceSchedule save and delete signals; changes made with
+QuerySet.update() or bulk_create() bypass the signals and need a full run
+or mark_compliance_dirty().
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+from django.db.models import Count, F, Min, Q, QuerySet
+from django.utils import timezone
+
+from .batching import batches
+from .models import ComplianceDirtyVehicle, MaintenanceCompliance, MaintenanceSchedule, Vehicle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+COMPLIANCE_FIELDS = [
+    'overall_compliance_rate',
+    'critical_maintenance_compliance',
+    'overdue_count',
+    'completed_on_time_count',
+    'total_scheduled_count',
+    'last_calculated',
+]
+
+
+def compliance_counts(schedules: QuerySet, today=None) -> Dict[int, Dict[str, int]]:
+    """
+    Count a set of schedules per vehicle in one grouped query.
+
+    Args:
+        schedules: MaintenanceSchedule queryset
+        today: Date schedules become overdue after, defaults to today
+
+    Returns:
+        Dict of vehicle id to total, on_time, critical_total,
+        critical_on_time and overdue counts; vehicles without schedules
+        are absent
+    """
+    today = today or timezone.now().date()
+    on_time = Q(is_completed=True, completed_date__lte=F('scheduled_date'))
+    critical = Q(priority_level='critical')
+    rows = schedules.order_by().values('vehicle_id').annotate(
+        total=Count('pk'),
+        on_time=Count('pk', filter=on_time),
+        critical_total=Count('pk', filter=critical),
+        critical_on_time=Count('pk', filter=critical & on_time),
+        overdue=Count('pk', filter=Q(is_completed=False, scheduled_date__lt=today)),
+    )
+    return {row.pop('vehicle_id'): row for row in rows}
+
+
+def compliance_rates(counts: Dict[str, int]) -> Dict[str, float]:
+    """
+    Turn a vehicle's schedule counts into MaintenanceCompliance values.
+
+    Rates are 100 when there is nothing scheduled, as before.
+    """
+    total = counts.get('total', 0)
+    on_time = counts.get('on_time', 0)
+    critical_total = counts.get('critical_total', 0)
+    critical_on_time = counts.get('critical_on_time', 0)
+    return {
+        'total_scheduled_count': total,
+        'completed_on_time_count': on_time,
+        'overdue_count': counts.get('overdue', 0),
+        'overall_compliance_rate': (on_time / total * 100) if total > 0 else 100,
+        'critical_maintenance_compliance': (critical_on_time / critical_total * 100) if critical_total > 0 else 100,
+    }
+
+
+def mark_compliance_dirty(vehicle_ids: Iterable[int]):
+    """
+    Queue vehicles for the next incremental compliance run.
+
+    Args:
+        vehicle_ids: Insurance Vehicle ids whose schedules changed
+    """
+    now = timezone.now()
+    ComplianceDirtyVehicle.objects.bulk_create(
+        [ComplianceDirtyVehicle(vehicle_id=vehicle_id, marked_at=now) for vehicle_id in set(vehicle_ids)],
+        update_conflicts=True,
+        unique_fields=['vehicle'],
+        update_fields=['marked_at'],
+    )
+
+
+@dataclass
+class ComplianceRunResult:
+    """Outcome of a compliance run"""
+    vehicles: int = 0
+    batches: int = 0
+
+
+class ComplianceEngine:
+    """
+    Recalculates MaintenanceCompliance rows in bulk.
+
+    Args:
+        batch_size: Vehicles counted and upserted per query
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+
+    def recalculate_all(self) -> ComplianceRunResult:
+        """
+        Recalculate compliance for every vehicle.
+
+        Vehicles are handled in primary key ranges of batch_size, so each
+        batch is one grouped query over its schedules and one upsert.
+        Dirty marks made before the run started are cleared.
+        """
+        started = timezone.now()
+        result = ComplianceRunResult()
+        for vehicle_ids in batches(Vehicle.objects.order_by('pk').values_list('pk', flat=True), self.batch_size):
+            schedules = MaintenanceSchedule.objects.filter(
+                vehicle_id__gte=vehicle_ids[0], vehicle_id__lte=vehicle_ids[-1]
+            )
+            self._write(vehicle_ids, compliance_counts(schedules), result)
+        ComplianceDirtyVehicle.objects.filter(marked_at__lte=started).delete()
+        return result
+
+    def recalculate_dirty(self) -> ComplianceRunResult:
+        """
+        Recalculate compliance for vehicles whose schedules changed.
+
+        Also picks up vehicles with a schedule that has become overdue since
+        their last calculation, since overdue counts change with the date
+        alone. Marks made while the run is in progress are kept for the
+        next run.
+        """
+        started = timezone.now()
+        today = started.date()
+        dirty = set(ComplianceDirtyVehicle.objects.filter(
+            marked_at__lte=started
+        ).values_list('vehicle_id', flat=True))
+        newly_overdue = set()
+        # Schedules dated before the oldest calculation were counted as overdue
+        # then; the lower bound lets the scheduled_date index narrow the scan
+        since = MaintenanceCompliance.objects.aggregate(since=Min('last_calculated'))['since']
+        if since is not None:
+            newly_overdue = set(MaintenanceSchedule.objects.filter(
+                is_completed=False,
+                scheduled_date__lt=today,
+                scheduled_date__gte=since.date(),
+            ).filter(
+                scheduled_date__gte=F('vehicle__compliance__last_calculated__date'),
+            ).values_list('vehicle_id', flat=True).distinct())
+
+        result = ComplianceRunResult()
+        for vehicle_ids in batches(sorted(dirty | newly_overdue), self.batch_size):
+            schedules = MaintenanceSchedule.objects.filter(vehicle_id__in=vehicle_ids)
+            self._write(vehicle_ids, compliance_counts(schedules, today), result)
+            ComplianceDirtyVehicle.objects.filter(
+                vehicle_id__in=vehicle_ids, marked_at__lte=started
+            ).delete()
+        return result
+
+    def _write(self, vehicle_ids: List[int], counts: Dict[int, Dict[str, int]], result: ComplianceRunResult):
+        MaintenanceCompliance.objects.bulk_create(
+            [
+                MaintenanceCompliance(vehicle_id=vehicle_id, **compliance_rates(counts.get(vehicle_id, {})))
+                for vehicle_id in vehicle_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['vehicle'],
+            update_fields=COMPLIANCE_FIELDS,
+        )
+        result.vehicles += len(vehicle_ids)
+        result.batches += 1
+        logger.debug(f"Recalculated compliance for {len(vehicle_ids)} vehicles")
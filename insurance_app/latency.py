@@ -0,0 +1,242 @@
+"""
+In-process latency histograms for the quote pipeline stages.
+
+Timed calls are recorded into fixed-bucket, log-linear histograms held per
+process (the HDR histogram layout): durations under 64 microseconds get a
+bucket each, and every doubling above that is split into 32 buckets, so a
+bucket is never more than about 3% wider than the values it holds. Recording
+is an integer bucket calculation and a few increments under a lock, with no
+allocation and no database access.
+
+The histograms are flushed to QuoteStageLatencyRollup, one row per stage
+and hour, at most once per QUOTE_LATENCY_FLUSH_SECONDS. The flush is
+started by the timed call that finds it due and runs once the surrounding
+transaction commits, so a rolled back request never writes anything.
+Counts recorded since the last flush are lost when the process exits.
+"""
+
+import functools
+import logging
+import threading
+from time import perf_counter_ns
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QuoteStageLatencyRollup
+
+logger = logging.getLogger('quote_system')
+
+# Each stage times one entry point, so its percentiles describe one kind
+# of call: parts identification per assessment
+# (PartsIdentificationEngine.identify_damaged_parts), market calculation
+# and recommendation per damaged part
+# (MarketAverageCalculator.calculate_market_average,
+# QuoteRecommendationEngine.generate_recommendation)
+STAGES = ('parts_identification', 'market_calculation', 'recommendation')
+
+LINEAR_LIMIT = 64  # microseconds recorded exactly
+SUB_BUCKETS = 32  # buckets per doubling above LINEAR_LIMIT
+MAX_MICROSECONDS = 3600 * 1000 * 1000  # longer calls are counted as an hour
+BUCKET_COUNT = (MAX_MICROSECONDS.bit_length() - 6) * SUB_BUCKETS + LINEAR_LIMIT
+
+DEFAULT_FLUSH_SECONDS = 60
+
+
+def bucket_index(microseconds: int) -> int:
+    """Histogram bucket holding a duration"""
+    if microseconds < LINEAR_LIMIT:
+        return max(0, microseconds)
+    if microseconds > MAX_MICROSECONDS:
+        microseconds = MAX_MICROSECONDS
+    shift = microseconds.bit_length() - 6
+    return shift * SUB_BUCKETS + (microseconds >> shift)
+
+
+def bucket_upper_bound(index: int) -> int:
+    """Largest duration in microseconds that falls in a bucket"""
+    if index < LINEAR_LIMIT:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS + 1) << shift) - 1
+
+
+def percentiles(counts: Dict[int, int], quantiles: List[float], maximum: int = None) -> List[int]:
+    """
+    Durations at the given quantiles of a histogram.
+
+    Each value is the upper bound of the bucket the quantile falls in,
+    capped at the largest recorded duration.
+
+    Args:
+        counts: Bucket index to count, only non-empty buckets needed
+        quantiles: Quantiles between 0 and 1, e.g. [0.5, 0.95]
+        maximum: Largest duration recorded, in microseconds
+
+    Returns:
+        Durations in microseconds, 0 for an empty histogram
+    """
+    total = sum(counts.values())
+    if not total:
+        return [0 for _ in quantiles]
+
+    results = []
+    buckets = sorted(counts.items())
+    for quantile in quantiles:
+        target = max(1, -(-total * quantile // 1))  # rank of the quantile, rounded up
+        seen = 0
+        for index, count in buckets:
+            seen += count
+            if seen >= target:
+                break
+        value = bucket_upper_bound(index)
+        results.append(min(value, maximum) if maximum is not None else value)
+    return results
+
+
+class StageHistogram:
+    """Counts of one stage since the last flush"""
+    __slots__ = ('counts', 'count', 'total', 'maximum')
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+    def sparse_counts(self) -> Dict[str, int]:
+        return {str(index): count for index, count in enumerate(self.counts) if count}
+
+
+class LatencyRecorder:
+    """
+    Per-process latency histograms for the quote pipeline stages.
+
+    Args:
+        flush_seconds: Minimum time between flushes, 0 to only flush when
+            flush() is called
+    """
+
+    def __init__(self, flush_seconds: Optional[int] = None):
+        if flush_seconds is None:
+            flush_seconds = getattr(settings, 'QUOTE_LATENCY_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        self.flush_interval_ns = int(flush_seconds * 1_000_000_000)
+        self._lock = threading.Lock()
+        self._histograms = {stage: StageHistogram() for stage in STAGES}
+        self._next_flush = perf_counter_ns() + self.flush_interval_ns
+
+    def record(self, stage: str, elapsed_ns: int):
+        """Add one call of a stage that took elapsed_ns nanoseconds"""
+        microseconds = elapsed_ns // 1000
+        # bucket_index() inlined, this runs on every timed call
+        if microseconds < LINEAR_LIMIT:
+            index = microseconds
+        else:
+            value = microseconds if microseconds < MAX_MICROSECONDS else MAX_MICROSECONDS
+            shift = value.bit_length() - 6
+            index = shift * SUB_BUCKETS + (value >> shift)
+        with self._lock:
+            histogram = self._histograms[stage]
+            histogram.counts[index] += 1
+            histogram.count += 1
+            histogram.total += microseconds
+            if microseconds > histogram.maximum:
+                histogram.maximum = microseconds
+            due = False
+            if self.flush_interval_ns:
+                now = perf_counter_ns()
+                if now >= self._next_flush:
+                    # Not retried before the next interval, even if the flush
+                    # is dropped with a rolled back transaction
+                    self._next_flush = now + self.flush_interval_ns
+                    due = True
+        if due:
+            transaction.on_commit(self.flush)
+
+    def snapshot(self) -> Dict[str, StageHistogram]:
+        """Take the counts recorded so far and start new histograms"""
+        with self._lock:
+            taken = self._histograms
+            self._histograms = {stage: StageHistogram() for stage in STAGES}
+            self._next_flush = perf_counter_ns() + self.flush_interval_ns
+        return {stage: histogram for stage, histogram in taken.items() if histogram.count}
+
+    def restore(self, histograms: Dict[str, StageHistogram]):
+        """Put counts back after a failed flush"""
+        with self._lock:
+            for stage, histogram in histograms.items():
+                current = self._histograms[stage]
+                for index, count in enumerate(histogram.counts):
+                    if count:
+                        current.counts[index] += count
+                current.count += histogram.count
+                current.total += histogram.total
+                current.maximum = max(current.maximum, histogram.maximum)
+
+    def flush(self) -> int:
+        """
+        Merge the counts recorded since the last flush into the current
+        hour's rollup rows.
+
+        Returns:
+            Number of stages written
+        """
+        histograms = self.snapshot()
+        if not histograms:
+            return 0
+        try:
+            merge_into_rollup(histograms, timezone.now())
+        except Exception as e:
+            logger.warning(f"Failed to flush quote stage latencies: {e}")
+            self.restore(histograms)
+            return 0
+        return len(histograms)
+
+
+def merge_into_rollup(histograms: Dict[str, StageHistogram], now):
+    """Add histograms to the rollup rows of the hour now falls in"""
+    bucket_start = now.replace(minute=0, second=0, microsecond=0)
+    with transaction.atomic():
+        QuoteStageLatencyRollup.objects.bulk_create(
+            [QuoteStageLatencyRollup(stage=stage, bucket_start=bucket_start) for stage in histograms],
+            ignore_conflicts=True,
+        )
+        rows = list(QuoteStageLatencyRollup.objects.select_for_update().filter(
+            bucket_start=bucket_start, stage__in=list(histograms)
+        ))
+        for row in rows:
+            histogram = histograms[row.stage]
+            counts = dict(row.bucket_counts)
+            for index, count in histogram.sparse_counts().items():
+                counts[index] = counts.get(index, 0) + count
+            row.bucket_counts = counts
+            row.call_count += histogram.count
+            row.total_microseconds += histogram.total
+            row.max_microseconds = max(row.max_microseconds, histogram.maximum)
+        QuoteStageLatencyRollup.objects.bulk_update(
+            rows, ['bucket_counts', 'call_count', 'total_microseconds', 'max_microseconds']
+        )
+
+
+recorder = LatencyRecorder()
+
+
+def timed(stage: str):
+    """
+    Decorator recording how long each successful call takes into the
+    stage's histogram. Calls that raise are not recorded.
+    """
+    if stage not in STAGES:
+        raise ValueError(f"Unknown latency stage: {stage}")
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = perf_counter_ns()
+            result = func(*args, **kwargs)
+            recorder.record(stage, perf_counter_ns() - started)
+            return result
+        return wrapper
+    return decorator
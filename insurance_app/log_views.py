@@ -17,6 +17,7 @@ from django.db.models import Q
 from django.utils import timezone
 from django.db import models
 
+from .audit_sink import prune_audit_logs
 from .models import QuoteSystemAuditLog
 
 
@@ -171,9 +172,7 @@ def clear_logs_api(request):
             cutoff_days = 7
         
         cutoff_date = timezone.now() - timedelta(days=cutoff_days)
-        deleted_count, _ = QuoteSystemAuditLog.objects.filter(
-            timestamp__lt=cutoff_date
-        ).delete()
+        deleted_count = prune_audit_logs(cutoff_date)
         
         return JsonResponse({
             'success': True,
@@ -8,8 +8,11 @@ import json
 import os
 from datetime import datetime
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
+from notifications.logging_pipeline import get_logging_pipeline
+from .audit_sink import audit_sink
 from .models import QuoteSystemAuditLog, QuoteSystemConfiguration
 
 
@@ -77,6 +80,11 @@ def configure_quote_system_logging():
         except Exception:
             pass
     
+    # Hand file writes to the shared logging pipeline when it is running
+    pipeline = get_logging_pipeline()
+    if pipeline is not None:
+        pipeline.install(['quote_system'])
+    
     return logger
 
 
@@ -355,19 +363,20 @@ class QuoteSystemLogger:
                          ip_address=None, user_agent=None):
         """Create audit log entry"""
         try:
-            QuoteSystemAuditLog.objects.create(
+            details = dict(additional_data or {})
+            if object_type and object_id:
+                details.update(object_type=object_type, object_id=object_id)
+            audit_sink.add(QuoteSystemAuditLog(
                 action_type=action_type,
                 severity=severity,
                 user=user,
-                session_key=session_key,
+                session_key=session_key or '',
                 ip_address=ip_address,
-                user_agent=user_agent,
-                object_type=object_type,
-                object_id=object_id,
-                object_repr=f"{object_type} #{object_id}" if object_type and object_id else None,
-                description=description,
-                additional_data=additional_data or {}
-            )
+                user_agent=user_agent or '',
+                message=description,
+                # Round trip so Decimals and datetimes are stored as strings
+                details=json.loads(json.dumps(details, cls=DjangoJSONEncoder)),
+            ))
         except Exception as e:
             # If audit logging fails, log to standard logger but don't raise
             self.logger.error(f"Failed to create audit log entry: {str(e)}")
@@ -0,0 +1,119 @@
+# management/commands/benchmark_compliance.py
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from insurance_app.compliance import ComplianceEngine, mark_compliance_dirty
+from insurance_app.models import InsurancePolicy, MaintenanceCompliance, MaintenanceSchedule
+from insurance_app.models import Vehicle as InsuranceVehicle
+from vehicles.models import Vehicle
+
+VIN_PREFIX = 'BENCHCOMP'
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-vehicle compliance loop with the bulk compliance engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=50000, help='Vehicles to create (default: 50000)')
+        parser.add_argument('--schedules', type=int, default=4, help='Schedules per vehicle (default: 4)')
+        parser.add_argument('--legacy-sample', type=int, default=1000, help='Vehicles timed with the old loop (default: 1000)')
+        parser.add_argument('--dirty', type=float, default=0.01, help='Share of vehicles changed before the incremental run (default: 0.01)')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        user = User.objects.create_user(username='benchmark_compliance_holder')
+        policy = InsurancePolicy.objects.create(
+            policy_number='BENCH-COMP',
+            policy_holder=user,
+            start_date=today,
+            end_date=today + timedelta(days=365),
+            premium_amount=1000,
+        )
+        try:
+            vehicles = self.create_fleet(policy, today, options)
+            self.report(vehicles, options)
+        finally:
+            Vehicle.objects.filter(vin__startswith=VIN_PREFIX).delete()
+            policy.delete()
+            user.delete()
+
+    def create_fleet(self, policy, today, options):
+        rng = random.Random(11)
+        started = time.perf_counter()
+        Vehicle.objects.bulk_create([
+            Vehicle(vin=f'{VIN_PREFIX}{i:08d}', make='Toyota', model='Camry', manufacture_year=2018)
+            for i in range(options['vehicles'])
+        ], batch_size=5000)
+        vehicles = InsuranceVehicle.objects.bulk_create([
+            InsuranceVehicle(policy=policy, vehicle_id=vehicle_id, purchase_date=today)
+            for vehicle_id in Vehicle.objects.filter(vin__startswith=VIN_PREFIX).values_list('pk', flat=True)
+        ], batch_size=5000)
+
+        schedules = []
+        for vehicle in vehicles:
+            for _ in range(options['schedules']):
+                scheduled = today + timedelta(days=rng.randint(-120, 60))
+                completed = scheduled + timedelta(days=rng.randint(-5, 10)) if rng.random() < 0.6 else None
+                schedules.append(MaintenanceSchedule(
+                    vehicle=vehicle,
+                    maintenance_type='oil_change',
+                    priority_level=rng.choice(['low', 'medium', 'high', 'critical']),
+                    scheduled_date=scheduled,
+                    is_completed=completed is not None,
+                    completed_date=completed,
+                ))
+        MaintenanceSchedule.objects.bulk_create(schedules, batch_size=5000)
+        self.stdout.write(
+            f'{len(vehicles)} vehicles, {len(schedules)} schedules created in {time.perf_counter() - started:.1f}s'
+        )
+        return vehicles
+
+    def report(self, vehicles, options):
+        sample = vehicles[:options['legacy_sample']]
+        started = time.perf_counter()
+        for vehicle in sample:
+            self.legacy_calculate(vehicle)
+        legacy = time.perf_counter() - started
+        self.stdout.write(
+            f'  per-vehicle loop: {legacy:.2f}s for {len(sample)} vehicles, '
+            f'~{legacy / max(1, len(sample)) * len(vehicles):.0f}s for all'
+        )
+
+        started = time.perf_counter()
+        result = ComplianceEngine().recalculate_all()
+        self.stdout.write(
+            f'  bulk engine: {time.perf_counter() - started:.2f}s for {result.vehicles} vehicles '
+            f'in {result.batches} batches'
+        )
+
+        changed = random.Random(3).sample(vehicles, int(len(vehicles) * options['dirty']))
+        mark_compliance_dirty(vehicle.pk for vehicle in changed)
+        started = time.perf_counter()
+        result = ComplianceEngine().recalculate_dirty()
+        self.stdout.write(
+            f'  incremental run: {time.perf_counter() - started:.2f}s for {result.vehicles} changed vehicles'
+        )
+
+    def legacy_calculate(self, vehicle):
+        """The five-count calculation update_compliance_scores ran per vehicle"""
+        compliance, _ = MaintenanceCompliance.objects.get_or_create(vehicle=vehicle)
+        schedules = vehicle.maintenance_schedules.all()
+        total = schedules.count()
+        on_time = schedules.filter(is_completed=True, completed_date__lte=F('scheduled_date')).count()
+        critical = schedules.filter(priority_level='critical')
+        critical_total = critical.count()
+        critical_on_time = critical.filter(is_completed=True, completed_date__lte=F('scheduled_date')).count()
+        compliance.total_scheduled_count = total
+        compliance.completed_on_time_count = on_time
+        compliance.overdue_count = schedules.filter(
+            is_completed=False, scheduled_date__lt=timezone.now().date()
+        ).count()
+        compliance.overall_compliance_rate = (on_time / total * 100) if total > 0 else 100
+        compliance.critical_maintenance_compliance = (critical_on_time / critical_total * 100) if critical_total > 0 else 100
+        compliance.save()
@@ -0,0 +1,123 @@
+# management/commands/benchmark_provider_mix.py
+import random
+import statistics
+import time
+from itertools import combinations
+
+from django.core.management.base import BaseCommand
+
+from insurance_app.provider_mix_solver import ProviderMixConstraints, ProviderMixSolver
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the provider mix solver on synthetic claims'
+
+    PART_CATEGORIES = ['body', 'mechanical', 'electrical', 'glass', 'safety', 'trim']
+    PART_TYPES = ['oem', 'oem_equivalent', 'aftermarket_standard']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parts', type=int, default=50, help='Parts per claim (default: 50)')
+        parser.add_argument('--providers', type=int, default=4, help='Providers per claim (default: 4)')
+        parser.add_argument('--claims', type=int, default=100, help='Synthetic claims to solve (default: 100)')
+        parser.add_argument('--max-providers', type=int, default=2, help='Provider limit (default: 2)')
+        parser.add_argument('--deadline-days', type=int, default=None, help='Completion deadline')
+        parser.add_argument('--min-warranty-months', type=int, default=None, help='Minimum part warranty')
+        parser.add_argument('--oem-only-safety', action='store_true', help='Require OEM parts for safety parts')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Check every result against exhaustive search over provider subsets',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        constraints = ProviderMixConstraints(
+            max_providers=options['max_providers'],
+            deadline_days=options['deadline_days'],
+            min_warranty_months=options['min_warranty_months'],
+            oem_only_categories=ProviderMixConstraints.SAFETY_CATEGORIES if options['oem_only_safety'] else (),
+        )
+        solver = ProviderMixSolver(constraints)
+
+        timings = []
+        nodes = []
+        feasible = 0
+        mismatches = 0
+
+        for _ in range(options['claims']):
+            quotes = self.synthetic_claim(rng, options['parts'], options['providers'])
+
+            started = time.perf_counter()
+            result = solver.solve(quotes)
+            timings.append((time.perf_counter() - started) * 1000)
+            nodes.append(result.nodes_explored)
+            feasible += result.feasible
+
+            if options['verify']:
+                expected = self.exhaustive_cost(quotes, constraints)
+                actual = float(result.total_cost) if result.feasible else None
+                if (expected is None) != (actual is None) or (
+                    expected is not None and abs(expected - actual) > 0.005
+                ):
+                    mismatches += 1
+
+        timings.sort()
+        self.stdout.write(
+            f"{options['claims']} claims, {options['parts']} parts x {options['providers']} providers, "
+            f"max {options['max_providers']} providers"
+        )
+        self.stdout.write(
+            f"  mean {statistics.mean(timings):.2f} ms, p50 {timings[len(timings) // 2]:.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, max {timings[-1]:.2f} ms"
+        )
+        self.stdout.write(f"  mean nodes explored {statistics.mean(nodes):.1f}, feasible {feasible}")
+
+        if options['verify']:
+            style = self.style.SUCCESS if mismatches == 0 else self.style.ERROR
+            self.stdout.write(style(f'  {mismatches} results differ from exhaustive search'))
+
+    def synthetic_claim(self, rng, part_count, provider_count):
+        """Generate quote dictionaries for one synthetic claim"""
+        providers = [
+            (f'Provider {i}', rng.choice(['dealer', 'independent', 'network', 'assessor']), rng.uniform(0.8, 1.3))
+            for i in range(provider_count)
+        ]
+        quotes = []
+        for part_id in range(1, part_count + 1):
+            category = rng.choice(self.PART_CATEGORIES)
+            base_cost = rng.uniform(80, 2500)
+            for name, provider_type, price_factor in providers:
+                quotes.append({
+                    'id': len(quotes) + 1,
+                    'damaged_part_id': part_id,
+                    'damaged_part__part_category': category,
+                    'provider_name': name,
+                    'provider_type': provider_type,
+                    'total_cost': round(base_cost * price_factor * rng.uniform(0.85, 1.15), 2),
+                    'estimated_completion_days': rng.randint(2, 21),
+                    'part_warranty_months': rng.choice([6, 12, 24]),
+                    'part_type': rng.choice(self.PART_TYPES),
+                })
+        return quotes
+
+    def exhaustive_cost(self, quotes, constraints):
+        """Cheapest feasible total by trying every provider subset"""
+        allowed = [quote for quote in quotes if constraints.allows(quote)]
+        part_ids = {quote['damaged_part_id'] for quote in quotes}
+        providers = sorted({quote['provider_name'] for quote in allowed})
+        limit = constraints.max_providers or len(providers)
+
+        best = None
+        for size in range(1, min(limit, len(providers)) + 1):
+            for subset in combinations(providers, size):
+                cheapest = {}
+                for quote in allowed:
+                    if quote['provider_name'] in subset:
+                        part_id = quote['damaged_part_id']
+                        cheapest[part_id] = min(cheapest.get(part_id, float('inf')), float(quote['total_cost']))
+                if len(cheapest) == len(part_ids):
+                    total = sum(cheapest.values())
+                    if best is None or total < best:
+                        best = total
+        return best
@@ -0,0 +1,49 @@
+# management/commands/benchmark_stage_latency.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from insurance_app.latency import recorder, timed
+
+
+def stage_call():
+    return None
+
+
+timed_stage_call = timed('recommendation')(stage_call)
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-call overhead of the quote stage latency instrumentation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=1000000, help='Calls timed per run (default: 1000000)')
+        parser.add_argument('--runs', type=int, default=5, help='Runs, the fastest is reported (default: 5)')
+
+    def handle(self, *args, **options):
+        calls = max(1, options['calls'])
+        # Keep the benchmark's timings out of the rollup table
+        flush_interval = recorder.flush_interval_ns
+        recorder.flush_interval_ns = 0
+        try:
+            plain = self.fastest(stage_call, calls, options['runs'])
+            instrumented = self.fastest(timed_stage_call, calls, options['runs'])
+        finally:
+            recorder.snapshot()
+            recorder.flush_interval_ns = flush_interval
+
+        self.stdout.write(f'  plain call: {plain * 1e6 / calls:.3f}us')
+        self.stdout.write(f'  timed call: {instrumented * 1e6 / calls:.3f}us')
+        self.stdout.write(self.style.SUCCESS(
+            f'Instrumentation overhead: {(instrumented - plain) * 1e6 / calls:.3f}us per call'
+        ))
+
+    def fastest(self, func, calls, runs):
+        best = None
+        for _ in range(max(1, runs)):
+            started = time.perf_counter()
+            for _ in range(calls):
+                func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
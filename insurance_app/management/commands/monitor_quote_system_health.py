@@ -5,14 +5,14 @@ This command collects system metrics, logs performance data, and generates healt
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db.models import Count, Avg, Q
 from datetime import timedelta
 import logging
 
 from insurance_app.models import (
-    QuoteSystemHealthMetrics, QuoteSystemAuditLog, PartQuoteRequest, 
-    PartQuote, DamagedPart, PartMarketAverage, QuoteSystemConfiguration
+    QuoteSystemHealthMetrics, QuoteSystemAuditLog, QuoteSystemConfiguration
 )
+from insurance_app.audit_sink import audit_sink, prune_audit_logs
+from insurance_app.quote_health import QuoteHealthCollector
 
 logger = logging.getLogger('quote_system')
 
@@ -36,12 +36,17 @@ class Command(BaseCommand):
             default=80,
             help='Success rate threshold for alerts (default: 80%)'
         )
+        parser.add_argument(
+            '--rebuild-rollup',
+            action='store_true',
+            help='Recompute the hourly quote health rollup for the last 24 hours'
+        )
     
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting quote system health monitoring...'))
         
         # Collect current metrics
-        metrics = self.collect_health_metrics()
+        metrics = self.collect_health_metrics(options['rebuild_rollup'])
         
         # Save metrics to database
         health_record = QuoteSystemHealthMetrics.objects.create(**metrics)
@@ -57,168 +62,25 @@ class Command(BaseCommand):
         if options['generate_report']:
             self.generate_health_report(health_record)
         
+        # Write the alerts logged above
+        audit_sink.flush()
+        
         self.stdout.write(
             self.style.SUCCESS(
                 f'Health monitoring completed. Overall success rate: {health_record.get_overall_success_rate():.1f}%'
             )
         )
     
-    def collect_health_metrics(self):
+    def collect_health_metrics(self, rebuild_rollup=False):
         """Collect comprehensive system health metrics"""
-        now = timezone.now()
-        yesterday = now - timedelta(days=1)
-        
-        # Quote request metrics
-        total_requests = PartQuoteRequest.objects.filter(
-            request_date__gte=yesterday
-        ).count()
-        
-        successful_requests = PartQuoteRequest.objects.filter(
-            request_date__gte=yesterday,
-            status__in=['sent', 'received']
-        ).count()
-        
-        failed_requests = PartQuoteRequest.objects.filter(
-            request_date__gte=yesterday,
-            status__in=['expired', 'cancelled']
-        ).count()
-        
-        # Quote response metrics
-        quotes_received = PartQuote.objects.filter(
-            quote_date__gte=yesterday
-        ).count()
-        
-        # Calculate average response time
-        avg_response_time = self.calculate_average_response_time(yesterday)
-        
-        # Provider success rates
-        provider_rates = self.calculate_provider_success_rates(yesterday)
-        
-        # System performance metrics
-        performance_metrics = self.calculate_performance_metrics()
-        
-        # Error tracking
-        error_metrics = self.calculate_error_metrics(yesterday)
-        
-        # Data quality metrics
-        quality_metrics = self.calculate_data_quality_metrics()
-        
-        return {
-            'total_quote_requests_24h': total_requests,
-            'successful_quote_requests_24h': successful_requests,
-            'failed_quote_requests_24h': failed_requests,
-            'total_quotes_received_24h': quotes_received,
-            'average_response_time_hours': avg_response_time,
-            'assessor_success_rate': provider_rates.get('assessor', 0),
-            'dealer_success_rate': provider_rates.get('dealer', 0),
-            'independent_success_rate': provider_rates.get('independent', 0),
-            'network_success_rate': provider_rates.get('network', 0),
-            **performance_metrics,
-            **error_metrics,
-            **quality_metrics
-        }
-    
-    def calculate_average_response_time(self, since_date):
-        """Calculate average response time for quotes"""
-        quotes_with_requests = PartQuote.objects.filter(
-            quote_date__gte=since_date,
-            quote_request__dispatched_at__isnull=False
-        ).select_related('quote_request')
-        
-        if not quotes_with_requests.exists():
-            return 0
-        
-        total_hours = 0
-        count = 0
-        
-        for quote in quotes_with_requests:
-            if quote.quote_request.dispatched_at:
-                time_diff = quote.quote_date - quote.quote_request.dispatched_at
-                total_hours += time_diff.total_seconds() / 3600
-                count += 1
-        
-        return total_hours / count if count > 0 else 0
-    
-    def calculate_provider_success_rates(self, since_date):
-        """Calculate success rates for each provider type"""
-        provider_types = ['assessor', 'dealer', 'independent', 'network']
-        rates = {}
-        
-        for provider_type in provider_types:
-            total_requests = PartQuoteRequest.objects.filter(
-                request_date__gte=since_date,
-                **{f'include_{provider_type}': True}
-            ).count()
-            
-            successful_quotes = PartQuote.objects.filter(
-                quote_date__gte=since_date,
-                provider_type=provider_type
-            ).count()
-            
-            if total_requests > 0:
-                rates[provider_type] = (successful_quotes / total_requests) * 100
-            else:
-                rates[provider_type] = 0
-        
-        return rates
-    
-    def calculate_performance_metrics(self):
-        """Calculate system performance metrics"""
-        # These would typically be collected from application logs or monitoring
-        # For now, return default values - in production, integrate with APM tools
-        return {
-            'average_parts_identification_time_seconds': 2.5,
-            'average_market_calculation_time_seconds': 1.8,
-            'average_recommendation_time_seconds': 0.9
-        }
-    
-    def calculate_error_metrics(self, since_date):
-        """Calculate error metrics from audit logs"""
-        api_errors = QuoteSystemAuditLog.objects.filter(
-            timestamp__gte=since_date,
-            severity='error',
-            action_type__in=['quote_request_dispatched', 'quote_received']
-        ).count()
-        
-        database_errors = QuoteSystemAuditLog.objects.filter(
-            timestamp__gte=since_date,
-            severity='error',
-            description__icontains='database'
-        ).count()
-        
-        validation_errors = QuoteSystemAuditLog.objects.filter(
-            timestamp__gte=since_date,
-            severity='error',
-            action_type='quote_rejected'
-        ).count()
-        
-        return {
-            'api_errors_24h': api_errors,
-            'database_errors_24h': database_errors,
-            'validation_errors_24h': validation_errors
-        }
-    
-    def calculate_data_quality_metrics(self):
-        """Calculate data quality metrics"""
-        high_confidence = PartMarketAverage.objects.filter(
-            confidence_level__gte=70
-        ).count()
-        
-        low_confidence = PartMarketAverage.objects.filter(
-            confidence_level__lt=70
-        ).count()
-        
-        # Count outliers from market averages
-        outlier_count = 0
-        for market_avg in PartMarketAverage.objects.all():
-            if market_avg.outlier_quotes:
-                outlier_count += len(market_avg.outlier_quotes)
-        
-        return {
-            'high_confidence_market_averages': high_confidence,
-            'low_confidence_market_averages': low_confidence,
-            'outlier_quotes_detected': outlier_count
-        }
+        collector = QuoteHealthCollector()
+        if rebuild_rollup:
+            hours = collector.update_rollup(rebuild=True)
+            self.stdout.write(f'Rebuilt quote health rollup for {hours} hour(s)')
+
+        # Request, response, provider, error, data quality and stage timing
+        # metrics come from the hourly rollups and a few aggregate queries
+        return collector.collect()
     
     def check_system_alerts(self, health_record, threshold):
         """Check for system alerts and log warnings"""
@@ -285,9 +147,7 @@ class Command(BaseCommand):
         
         cutoff_date = timezone.now() - timedelta(days=retention_days)
         
-        deleted_count, _ = QuoteSystemAuditLog.objects.filter(
-            timestamp__lt=cutoff_date
-        ).delete()
+        deleted_count = prune_audit_logs(cutoff_date)
         
         if deleted_count > 0:
             self.stdout.write(
@@ -322,9 +182,17 @@ class Command(BaseCommand):
         self.stdout.write(f'Network: {health_record.network_success_rate:.1f}%')
         
         self.stdout.write('\n--- System Performance ---')
-        self.stdout.write(f'Parts Identification: {health_record.average_parts_identification_time_seconds:.2f}s')
-        self.stdout.write(f'Market Calculation: {health_record.average_market_calculation_time_seconds:.2f}s')
-        self.stdout.write(f'Recommendation: {health_record.average_recommendation_time_seconds:.2f}s')
+        for label, stage in (
+            ('Parts Identification', 'parts_identification'),
+            ('Market Calculation', 'market_calculation'),
+            ('Recommendation', 'recommendation'),
+        ):
+            self.stdout.write(
+                f"{label}: avg {getattr(health_record, f'average_{stage}_time_seconds'):.2f}s, "
+                f"p50 {getattr(health_record, f'{stage}_p50_seconds'):.3f}s, "
+                f"p95 {getattr(health_record, f'{stage}_p95_seconds'):.3f}s, "
+                f"p99 {getattr(health_record, f'{stage}_p99_seconds'):.3f}s"
+            )
         
         self.stdout.write('\n--- Error Summary (24h) ---')
         self.stdout.write(f'API Errors: {health_record.api_errors_24h}')
@@ -340,11 +208,9 @@ class Command(BaseCommand):
     
     def log_audit_event(self, action_type, severity, description, additional_data=None):
         """Log an audit event"""
-        QuoteSystemAuditLog.objects.create(
-            action_type=action_type,
+        QuoteSystemAuditLog.log_action(
+            action_type,
+            description,
             severity=severity,
-            description=description,
-            additional_data=additional_data or {},
-            object_type='system',
-            object_id='health_monitor'
-        )
\ No newline at end of file
+            details={'source': 'health_monitor', **(additional_data or {})}
+        )
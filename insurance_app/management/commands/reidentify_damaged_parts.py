@@ -0,0 +1,123 @@
+# management/commands/reidentify_damaged_parts.py
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from assessments.models import VehicleAssessment
+from insurance_app.parts_identification import PartsIdentificationEngine
+
+
+class Command(BaseCommand):
+    help = 'Re-identify damaged parts for completed assessments in a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            required=True,
+            help='First completion date to include (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            required=True,
+            help='Last completion date to include (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Assessments loaded per query (default: 100)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of chunks processed in parallel (default: 4)',
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Delete and re-create parts for assessments that already have them',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format')
+
+        if start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date')
+
+        chunk_size = max(1, options['chunk_size'])
+        workers = max(1, options['workers'])
+        replace = options['replace']
+
+        assessments = VehicleAssessment.objects.filter(
+            status='completed',
+            completed_date__date__range=(start_date, end_date),
+        )
+        if not replace:
+            assessments = assessments.filter(damaged_parts__isnull=True)
+
+        assessment_ids = list(assessments.order_by('pk').values_list('pk', flat=True).distinct())
+        if not assessment_ids:
+            self.stdout.write(self.style.WARNING('No matching assessments found'))
+            return
+
+        chunks = [
+            assessment_ids[i:i + chunk_size]
+            for i in range(0, len(assessment_ids), chunk_size)
+        ]
+        self.stdout.write(
+            f'Re-identifying parts for {len(assessment_ids)} assessments '
+            f'in {len(chunks)} chunks with {workers} workers...'
+        )
+
+        processed_count = 0
+        parts_count = 0
+        error_count = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.process_chunk, chunk, replace) for chunk in chunks]
+            for future in as_completed(futures):
+                processed, parts, errors = future.result()
+                processed_count += processed
+                parts_count += parts
+                error_count += len(errors)
+                for assessment_id, error in errors:
+                    self.stdout.write(
+                        self.style.ERROR(f'Error processing assessment {assessment_id}: {error}')
+                    )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Re-identified {parts_count} parts across {processed_count} assessments '
+                f'({error_count} errors)'
+            )
+        )
+
+    def process_chunk(self, assessment_ids, replace):
+        """Identify parts for one chunk of assessments on a worker thread"""
+        engine = PartsIdentificationEngine()
+        processed = 0
+        parts = 0
+        errors = []
+
+        try:
+            assessments = engine.assessments_with_sections().filter(pk__in=assessment_ids)
+            for assessment in assessments:
+                try:
+                    parts += len(engine.identify_damaged_parts_bulk(assessment, replace=replace))
+                    processed += 1
+                except Exception as e:
+                    errors.append((assessment.assessment_id, e))
+        finally:
+            # Each worker thread holds its own connection
+            connection.close()
+
+        return processed, parts, errors
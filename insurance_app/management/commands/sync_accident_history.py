@@ -1,6 +1,7 @@
 # management/commands/sync_accident_history.py
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from insurance_app.accident_sync import DEFAULT_BATCH_SIZE, AccidentHistoryBulkSync
 from insurance_app.models import Accident
 from insurance_app.utils import AccidentHistorySyncManager
 from vehicles.models import Vehicle, VehicleHistory
@@ -29,6 +30,23 @@ class Command(BaseCommand):
             action='store_true',
             help='Sync existing linked records',
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Link matching accidents and histories across the fleet, then create the missing records '
+                 'requested with --create-history and --import-history, in resumable batches',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Records per batch with --bulk (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='With --bulk, ignore the checkpoint of an interrupted run and start over',
+        )
 
     def handle(self, *args, **options):
         vehicle_id = options.get('vehicle_id')
@@ -36,6 +54,14 @@ class Command(BaseCommand):
         create_history = options.get('create_history', False)
         sync_existing = options.get('sync_existing', False)
 
+        if options['bulk']:
+            if vehicle_id or sync_existing:
+                raise CommandError(
+                    '--bulk covers the whole fleet and cannot be combined with --vehicle-id or --sync-existing'
+                )
+            self.bulk_sync(options)
+            return
+
         if vehicle_id:
             vehicles = Vehicle.objects.filter(id=vehicle_id)
             self.stdout.write(f'Processing accidents for vehicle {vehicle_id}...')
@@ -111,4 +137,23 @@ class Command(BaseCommand):
             for data in comprehensive_data:
                 self.stdout.write(
                     f"- {data['type']}: {data['date']} - {data['severity']} - {data['description'][:50]}..."
-                )
\ No newline at end of file
+                )
+
+    def bulk_sync(self, options):
+        self.stdout.write('Synchronizing accidents for all vehicles in bulk...')
+
+        def progress(phase, checkpoint):
+            self.stdout.write(f'{phase}: {checkpoint.processed} records processed, up to id {checkpoint.last_id}')
+
+        result = AccidentHistoryBulkSync(
+            batch_size=options['batch_size'],
+            create_history=options['create_history'],
+            import_history=options['import_history'],
+        ).run(restart=options['restart'], progress=progress)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Bulk sync completed: {result.linked} linked, {result.accidents_created} imported, '
+                f'{result.histories_created} created, {result.skipped} skipped'
+            )
+        )
@@ -1,21 +1,30 @@
 # management/commands/update_compliance_scores.py
 from django.core.management.base import BaseCommand
-from insurance.models import *
+from insurance_app.compliance import DEFAULT_BATCH_SIZE, ComplianceEngine
 
 class Command(BaseCommand):
     help = 'Update maintenance compliance scores for all vehicles'
 
-    def handle(self, *args, **options):
-        vehicles = Vehicle.objects.all()
-        updated_count = 0
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only update vehicles whose schedules changed or became overdue since the last run',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Vehicles counted and saved per query (default: {DEFAULT_BATCH_SIZE})',
+        )
 
-        for vehicle in vehicles:
-            compliance, created = MaintenanceCompliance.objects.get_or_create(
-                vehicle=vehicle
-            )
-            compliance.calculate_compliance()
-            updated_count += 1
+    def handle(self, *args, **options):
+        engine = ComplianceEngine(batch_size=options['batch_size'])
+        if options['incremental']:
+            result = engine.recalculate_dirty()
+        else:
+            result = engine.recalculate_all()
 
         self.stdout.write(
-            self.style.SUCCESS(f'Updated compliance scores for {updated_count} vehicles')
-        )
\ No newline at end of file
+            self.style.SUCCESS(f'Updated compliance scores for {result.vehicles} vehicles')
+        )
@@ -12,6 +12,7 @@ from typing import List, Dict, Optional, Tuple
 from django.db import transaction
 from django.utils import timezone
 from django.db.models import Avg, Min, Max, Count, Q
+from .latency import timed
 from .models import (
     DamagedPart, 
     PartQuote, 
@@ -44,6 +45,7 @@ class MarketAverageCalculator:
         self.high_confidence_threshold = 70
         self.minimum_high_confidence_quotes = 3
     
+    @timed('market_calculation')
     def calculate_market_average(self, damaged_part: DamagedPart) -> PartMarketAverage:
         """
         Calculate comprehensive market statistics for a damaged part.
@@ -0,0 +1,130 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:45
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('insurance_app', '0009_delete_vehicleassessmentquoteextension'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderConfiguration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider_type', models.CharField(choices=[('assessor', 'Assessor Estimates'), ('dealer', 'Authorized Dealers'), ('independent', 'Independent Garages'), ('network', 'Insurance Networks')], max_length=20, unique=True)),
+                ('is_enabled', models.BooleanField(default=True)),
+                ('api_endpoint', models.URLField(blank=True, help_text='API endpoint for provider integration', null=True)),
+                ('api_key', models.CharField(blank=True, help_text='API key for authentication', max_length=255)),
+                ('api_timeout_seconds', models.IntegerField(default=30, help_text='API request timeout in seconds')),
+                ('email_enabled', models.BooleanField(default=False, help_text='Enable email-based quote requests')),
+                ('email_template', models.TextField(blank=True, help_text='Email template for quote requests')),
+                ('max_concurrent_requests', models.IntegerField(default=5, help_text='Maximum concurrent requests to this provider')),
+                ('retry_attempts', models.IntegerField(default=3, help_text='Number of retry attempts for failed requests')),
+                ('retry_delay_seconds', models.IntegerField(default=60, help_text='Delay between retry attempts')),
+                ('reliability_score', models.IntegerField(default=50, help_text='Provider reliability score (0-100)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('average_response_time_hours', models.DecimalField(decimal_places=2, default=24.0, help_text='Average response time in hours', max_digits=5)),
+                ('cost_multiplier', models.DecimalField(decimal_places=3, default=1.0, help_text='Multiplier applied to provider quotes (e.g., 1.1 for 10% markup)', max_digits=4)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Provider Configuration',
+                'verbose_name_plural': 'Provider Configurations',
+                'ordering': ['provider_type'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuoteSystemHealthMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('total_quote_requests_24h', models.IntegerField(default=0)),
+                ('successful_quote_requests_24h', models.IntegerField(default=0)),
+                ('failed_quote_requests_24h', models.IntegerField(default=0)),
+                ('total_quotes_received_24h', models.IntegerField(default=0)),
+                ('average_response_time_hours', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('assessor_success_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('dealer_success_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('independent_success_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('network_success_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('average_parts_identification_time_seconds', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('average_market_calculation_time_seconds', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('average_recommendation_time_seconds', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('api_errors_24h', models.IntegerField(default=0)),
+                ('database_errors_24h', models.IntegerField(default=0)),
+                ('validation_errors_24h', models.IntegerField(default=0)),
+                ('high_confidence_market_averages', models.IntegerField(default=0)),
+                ('low_confidence_market_averages', models.IntegerField(default=0)),
+                ('outlier_quotes_detected', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Quote System Health Metrics',
+                'verbose_name_plural': 'Quote System Health Metrics',
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['recorded_at'], name='insurance_a_recorde_9de4d3_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuoteSystemConfiguration',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('default_labor_rate', models.DecimalField(decimal_places=2, default=45.0, help_text='Default hourly labor rate in GBP', max_digits=6)),
+                ('paint_cost_percentage', models.DecimalField(decimal_places=2, default=15.0, help_text='Paint cost as percentage of part cost for body panels', max_digits=5)),
+                ('additional_cost_percentage', models.DecimalField(decimal_places=2, default=5.0, help_text='Additional costs percentage (consumables, shop supplies)', max_digits=5)),
+                ('default_quote_expiry_days', models.IntegerField(default=7, help_text='Default number of days before quote requests expire')),
+                ('minimum_quotes_required', models.IntegerField(default=2, help_text='Minimum number of quotes required for market analysis')),
+                ('confidence_threshold', models.IntegerField(default=70, help_text='Minimum confidence level for market averages (0-100)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('enable_assessor_estimates', models.BooleanField(default=True, help_text='Enable internal assessor estimates')),
+                ('enable_dealer_quotes', models.BooleanField(default=True, help_text='Enable authorized dealer quote requests')),
+                ('enable_independent_quotes', models.BooleanField(default=True, help_text='Enable independent garage quote requests')),
+                ('enable_network_quotes', models.BooleanField(default=True, help_text='Enable insurance network quote requests')),
+                ('price_weight', models.DecimalField(decimal_places=2, default=0.4, help_text='Weight for price in recommendation scoring (0.0-1.0)', max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('quality_weight', models.DecimalField(decimal_places=2, default=0.25, help_text='Weight for quality in recommendation scoring (0.0-1.0)', max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('timeline_weight', models.DecimalField(decimal_places=2, default=0.15, help_text='Weight for timeline in recommendation scoring (0.0-1.0)', max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('warranty_weight', models.DecimalField(decimal_places=2, default=0.1, help_text='Weight for warranty in recommendation scoring (0.0-1.0)', max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('reliability_weight', models.DecimalField(decimal_places=2, default=0.1, help_text='Weight for reliability in recommendation scoring (0.0-1.0)', max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('enable_performance_logging', models.BooleanField(default=True, help_text='Enable detailed performance logging for quote operations')),
+                ('log_retention_days', models.IntegerField(default=90, help_text='Number of days to retain detailed logs')),
+                ('enable_health_monitoring', models.BooleanField(default=True, help_text='Enable system health monitoring and alerts')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('updated_by', models.ForeignKey(blank=True, help_text='User who last updated the configuration', null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Quote System Configuration',
+                'verbose_name_plural': 'Quote System Configuration',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuoteSystemAuditLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('action_type', models.CharField(choices=[('parts_identification', 'Parts Identification'), ('quote_request_created', 'Quote Request Created'), ('quote_request_dispatched', 'Quote Request Dispatched'), ('quote_received', 'Quote Received'), ('quote_validated', 'Quote Validated'), ('quote_rejected', 'Quote Rejected'), ('market_average_calculated', 'Market Average Calculated'), ('recommendation_generated', 'Recommendation Generated'), ('configuration_updated', 'Configuration Updated'), ('provider_enabled', 'Provider Enabled'), ('provider_disabled', 'Provider Disabled'), ('system_error', 'System Error'), ('user_action', 'User Action')], max_length=30)),
+                ('severity', models.CharField(choices=[('info', 'Information'), ('warning', 'Warning'), ('error', 'Error'), ('critical', 'Critical')], default='info', max_length=10)),
+                ('session_key', models.CharField(blank=True, max_length=40)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.TextField(blank=True)),
+                ('assessment_id', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('quote_request_id', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('quote_id', models.PositiveIntegerField(blank=True, db_index=True, null=True)),
+                ('message', models.TextField()),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('execution_time_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Quote System Audit Log',
+                'verbose_name_plural': 'Quote System Audit Logs',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['timestamp', 'action_type'], name='insurance_a_timesta_707769_idx'), models.Index(fields=['user', 'timestamp'], name='insurance_a_user_id_1fdc55_idx'), models.Index(fields=['assessment_id', 'timestamp'], name='insurance_a_assessm_55d6a4_idx'), models.Index(fields=['severity', 'timestamp'], name='insurance_a_severit_76fd4b_idx')],
+            },
+        ),
+    ]
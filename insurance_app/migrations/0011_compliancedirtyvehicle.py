@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_app', '0010_providerconfiguration_quotesystemhealthmetrics_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceDirtyVehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='compliance_dirty', to='insurance_app.vehicle')),
+            ],
+        ),
+    ]
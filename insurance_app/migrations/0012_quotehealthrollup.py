@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_app', '0011_compliancedirtyvehicle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuoteHealthRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField(unique=True)),
+                ('quote_requests', models.IntegerField(default=0)),
+                ('assessor_requests', models.IntegerField(default=0)),
+                ('dealer_requests', models.IntegerField(default=0)),
+                ('independent_requests', models.IntegerField(default=0)),
+                ('network_requests', models.IntegerField(default=0)),
+                ('quotes_received', models.IntegerField(default=0)),
+                ('assessor_quotes', models.IntegerField(default=0)),
+                ('dealer_quotes', models.IntegerField(default=0)),
+                ('independent_quotes', models.IntegerField(default=0)),
+                ('network_quotes', models.IntegerField(default=0)),
+                ('response_hours_total', models.FloatField(default=0)),
+                ('responses_timed', models.IntegerField(default=0)),
+                ('api_errors', models.IntegerField(default=0)),
+                ('database_errors', models.IntegerField(default=0)),
+                ('validation_errors', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Quote Health Rollup',
+                'verbose_name_plural': 'Quote Health Rollups',
+                'ordering': ['-bucket_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='partquoterequest',
+            index=models.Index(fields=['request_date', 'status'], name='insurance_a_request_8dfa09_idx'),
+        ),
+    ]
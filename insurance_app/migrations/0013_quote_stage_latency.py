@@ -0,0 +1,76 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_app', '0012_quotehealthrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='market_calculation_p50_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='market_calculation_p95_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='market_calculation_p99_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='parts_identification_p50_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='parts_identification_p95_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='parts_identification_p99_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='recommendation_p50_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='recommendation_p95_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='quotesystemhealthmetrics',
+            name='recommendation_p99_seconds',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='QuoteStageLatencyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('parts_identification', 'Parts Identification'), ('market_calculation', 'Market Calculation'), ('recommendation', 'Recommendation')], max_length=30)),
+                ('bucket_start', models.DateTimeField()),
+                ('call_count', models.BigIntegerField(default=0)),
+                ('total_microseconds', models.BigIntegerField(default=0)),
+                ('max_microseconds', models.BigIntegerField(default=0)),
+                ('bucket_counts', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'verbose_name': 'Quote Stage Latency Rollup',
+                'verbose_name_plural': 'Quote Stage Latency Rollups',
+                'ordering': ['-bucket_start', 'stage'],
+                'unique_together': {('stage', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:21
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_app', '0013_quote_stage_latency'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quotesystemauditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
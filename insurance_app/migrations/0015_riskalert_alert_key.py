@@ -0,0 +1,44 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:33
+
+from django.db import migrations, models
+
+
+def key_open_maintenance_alerts(apps, schema_editor):
+    """Key the newest open maintenance_overdue alert of each vehicle and maintenance type"""
+    RiskAlert = apps.get_model('insurance_app', 'RiskAlert')
+    MaintenanceSchedule = apps.get_model('insurance_app', 'MaintenanceSchedule')
+    types_by_title = {
+        f'Overdue Maintenance: {name}': value
+        for value, name in MaintenanceSchedule._meta.get_field('maintenance_type').choices
+    }
+
+    keyed, seen = [], set()
+    open_alerts = RiskAlert.objects.filter(
+        alert_type='maintenance_overdue', is_resolved=False, title__in=types_by_title
+    ).order_by('vehicle_id', '-created_at').only('id', 'vehicle_id', 'title')
+    for alert in open_alerts.iterator(chunk_size=2000):
+        alert.alert_key = f'maintenance_overdue:{types_by_title[alert.title]}'
+        if (alert.vehicle_id, alert.alert_key) not in seen:
+            seen.add((alert.vehicle_id, alert.alert_key))
+            keyed.append(alert)
+    RiskAlert.objects.bulk_update(keyed, ['alert_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_app', '0014_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskalert',
+            name='alert_key',
+            field=models.CharField(blank=True, default='', max_length=60),
+        ),
+        migrations.RunPython(key_open_maintenance_alerts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='riskalert',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_resolved', False), models.Q(('alert_key', ''), _negated=True)), fields=('vehicle', 'alert_key'), name='unique_open_risk_alert_key'),
+        ),
+    ]
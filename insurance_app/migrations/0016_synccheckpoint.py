@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_app', '0015_riskalert_alert_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('processed', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -177,31 +177,48 @@ class MaintenanceCompliance(models.Model):
     last_calculated = models.DateTimeField(auto_now=True)
 
     def calculate_compliance(self):
-        schedules = self.vehicle.maintenance_schedules.all()
-        total = schedules.count()
-        completed_on_time = schedules.filter(
-            is_completed=True,
-            completed_date__lte=models.F('scheduled_date')
-        ).count()
-        
-        critical_schedules = schedules.filter(priority_level='critical')
-        critical_total = critical_schedules.count()
-        critical_on_time = critical_schedules.filter(
-            is_completed=True,
-            completed_date__lte=models.F('scheduled_date')
-        ).count()
-        
-        self.total_scheduled_count = total
-        self.completed_on_time_count = completed_on_time
-        self.overdue_count = schedules.filter(
-            is_completed=False,
-            scheduled_date__lt=timezone.now().date()
-        ).count()
-        
-        self.overall_compliance_rate = (completed_on_time / total * 100) if total > 0 else 100
-        self.critical_maintenance_compliance = (critical_on_time / critical_total * 100) if critical_total > 0 else 100
+        from .compliance import compliance_counts, compliance_rates
+
+        counts = compliance_counts(
+            MaintenanceSchedule.objects.filter(vehicle=self.vehicle)
+        ).get(self.vehicle_id, {})
+        rates = compliance_rates(counts)
+
+        self.total_scheduled_count = rates['total_scheduled_count']
+        self.completed_on_time_count = rates['completed_on_time_count']
+        self.overdue_count = rates['overdue_count']
+        self.overall_compliance_rate = rates['overall_compliance_rate']
+        self.critical_maintenance_compliance = rates['critical_maintenance_compliance']
         self.save()
 
+
+class ComplianceDirtyVehicle(models.Model):
+    """
+    Vehicle whose maintenance schedules changed since its compliance was
+    last calculated. Rows are added when a schedule is saved or deleted and
+    removed by the incremental compliance run that recalculates them.
+    """
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, related_name='compliance_dirty')
+    marked_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Compliance pending for vehicle {self.vehicle_id}"
+
+
+class SyncCheckpoint(models.Model):
+    """
+    Progress of a resumable bulk sync: the id of the last source row it
+    processed. Saved in the transaction of each batch, so an interrupted
+    run resumes after the last committed batch.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    processed = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at id {self.last_id}"
+
 class Accident(models.Model):
     SEVERITY_CHOICES = [
         ('minor', 'Minor'),
@@ -356,10 +373,20 @@ class RiskAlert(models.Model):
     is_resolved = models.BooleanField(default=False)
     resolved_date = models.DateTimeField(null=True, blank=True)
     resolution_notes = models.TextField(blank=True)
+    # Identifies what an alert is about, e.g. 'maintenance_overdue:oil_change';
+    # a vehicle has at most one open alert per non-empty key
+    alert_key = models.CharField(max_length=60, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vehicle', 'alert_key'],
+                condition=models.Q(is_resolved=False) & ~models.Q(alert_key=''),
+                name='unique_open_risk_alert_key',
+            ),
+        ]
 
 class RiskAssessmentMetrics(models.Model):
     """Aggregated metrics for dashboard reporting"""
@@ -705,6 +732,7 @@ class PartQuoteRequest(models.Model):
             models.Index(fields=['assessment', 'status']),
             models.Index(fields=['expiry_date', 'status']),
             models.Index(fields=['dispatched_by', 'request_date']),
+            models.Index(fields=['request_date', 'status']),
         ]
     
     def __str__(self):
@@ -1338,6 +1366,15 @@ class QuoteSystemHealthMetrics(models.Model):
     average_parts_identification_time_seconds = models.DecimalField(max_digits=8, decimal_places=2, default=0)
     average_market_calculation_time_seconds = models.DecimalField(max_digits=8, decimal_places=2, default=0)
     average_recommendation_time_seconds = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    parts_identification_p50_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    parts_identification_p95_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    parts_identification_p99_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    market_calculation_p50_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    market_calculation_p95_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    market_calculation_p99_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    recommendation_p50_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    recommendation_p95_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    recommendation_p99_seconds = models.DecimalField(max_digits=10, decimal_places=4, default=0)
     
     # Error tracking
     api_errors_24h = models.IntegerField(default=0)
@@ -1381,6 +1418,77 @@ class QuoteSystemHealthMetrics(models.Model):
             return 'poor'
 
 
+class QuoteHealthRollup(models.Model):
+    """
+    Hourly totals behind QuoteSystemHealthMetrics.
+
+    Each row holds the quote request, quote and audit log error counts of
+    one hour, so a health check sums the last 24 rows instead of scanning
+    the source tables. Response times are kept as a total and a count so
+    that hours can be combined into an average.
+    """
+    
+    bucket_start = models.DateTimeField(unique=True)
+    
+    # Quote requests created in the hour, by provider type included
+    quote_requests = models.IntegerField(default=0)
+    assessor_requests = models.IntegerField(default=0)
+    dealer_requests = models.IntegerField(default=0)
+    independent_requests = models.IntegerField(default=0)
+    network_requests = models.IntegerField(default=0)
+    
+    # Quotes received in the hour, by provider type
+    quotes_received = models.IntegerField(default=0)
+    assessor_quotes = models.IntegerField(default=0)
+    dealer_quotes = models.IntegerField(default=0)
+    independent_quotes = models.IntegerField(default=0)
+    network_quotes = models.IntegerField(default=0)
+    response_hours_total = models.FloatField(default=0)
+    responses_timed = models.IntegerField(default=0)
+    
+    # Audit log errors in the hour
+    api_errors = models.IntegerField(default=0)
+    database_errors = models.IntegerField(default=0)
+    validation_errors = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Quote Health Rollup"
+        verbose_name_plural = "Quote Health Rollups"
+        ordering = ['-bucket_start']
+    
+    def __str__(self):
+        return f"Quote health {self.bucket_start.strftime('%Y-%m-%d %H:00')}"
+
+
+class QuoteStageLatencyRollup(models.Model):
+    """Hourly latency histogram of a quote pipeline stage, merged from every process"""
+    
+    STAGES = [
+        ('parts_identification', 'Parts Identification'),
+        ('market_calculation', 'Market Calculation'),
+        ('recommendation', 'Recommendation'),
+    ]
+    
+    stage = models.CharField(max_length=30, choices=STAGES)
+    bucket_start = models.DateTimeField()
+    call_count = models.BigIntegerField(default=0)
+    total_microseconds = models.BigIntegerField(default=0)
+    max_microseconds = models.BigIntegerField(default=0)
+    # Histogram bucket index (see insurance_app.latency) to call count, non-empty buckets only
+    bucket_counts = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        verbose_name = "Quote Stage Latency Rollup"
+        verbose_name_plural = "Quote Stage Latency Rollups"
+        ordering = ['-bucket_start', 'stage']
+        unique_together = ['stage', 'bucket_start']
+    
+    def __str__(self):
+        return f"{self.get_stage_display()} latency {self.bucket_start.strftime('%Y-%m-%d %H:00')}"
+
+
 class QuoteSystemAuditLog(models.Model):
     """Audit log for all quote system operations"""
     
@@ -1408,7 +1516,8 @@ class QuoteSystemAuditLog(models.Model):
     ]
     
     # Core fields
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the entry is logged, not when the buffered entry is written
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     action_type = models.CharField(max_length=30, choices=ACTION_TYPES)
     severity = models.CharField(max_length=10, choices=SEVERITY_LEVELS, default='info')
     
@@ -1448,13 +1557,21 @@ class QuoteSystemAuditLog(models.Model):
     def log_action(cls, action_type, message, user=None, assessment_id=None, 
                    quote_request_id=None, quote_id=None, severity='info', 
                    details=None, execution_time_ms=None, request=None):
-        """Convenience method to create audit log entries"""
+        """
+        Convenience method to create audit log entries.
+        
+        The entry is buffered and written in bulk by the audit sink (see
+        insurance_app.audit_sink), so it has no primary key yet when
+        returned.
+        """
+        from .audit_sink import audit_sink
+        
         log_entry = cls(
             action_type=action_type,
             severity=severity,
             user=user,
-            assessment_id=assessment_id,
-            quote_request_id=quote_request_id,
+            assessment_id=assessment_id or '',
+            quote_request_id=quote_request_id or '',
             quote_id=quote_id,
             message=message,
             details=details or {},
@@ -1466,5 +1583,5 @@ class QuoteSystemAuditLog(models.Model):
             log_entry.ip_address = request.META.get('REMOTE_ADDR')
             log_entry.user_agent = request.META.get('HTTP_USER_AGENT', '')
         
-        log_entry.save()
+        audit_sink.add(log_entry)
         return log_entry
@@ -12,10 +12,123 @@ from typing import List, Dict, Tuple, Optional
 from django.db import transaction
 from django.utils import timezone
 
+from .latency import timed
 from .models import DamagedPart
 from assessments.models import VehicleAssessment, AssessmentPhoto
 
 
+# DamagedPart.section_type -> VehicleAssessment one-to-one related name.
+# These double as AssessmentPhoto.section_reference values.
+SECTION_RELATIONS = {
+    'exterior': 'exterior_damage',
+    'wheels': 'wheels_tires',
+    'interior': 'interior_damage',
+    'mechanical': 'mechanical_systems',
+    'electrical': 'electrical_systems',
+    'safety': 'safety_systems',
+    'structural': 'frame_structural',
+    'fluids': 'fluid_systems',
+}
+
+
+class DamagePhotoIndex:
+    """
+    Inverted index over the photos of a single assessment.
+    
+    Built once per assessment so that matching photos to damaged parts is a
+    handful of dictionary lookups and set operations instead of a scan of
+    every photo for every part. Photos pinned to a ``damage_point_id`` only
+    match that damage point; photos filed under a part section only match
+    parts of that section; everything else, including photos filed under
+    ``documentation`` or ``overall``, falls back to keyword matching on the
+    description and image filename.
+    """
+    
+    # DamagedPart.section_type -> AssessmentPhoto.section_reference
+    SECTION_REFERENCES = SECTION_RELATIONS
+    PART_SECTIONS = frozenset(SECTION_RELATIONS.values())
+    
+    TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+    
+    def __init__(self, photos):
+        self.by_token: Dict[str, set] = {}
+        self.by_damage_point: Dict[str, set] = {}
+        self.by_section: Dict[str, set] = {}
+        self.unpinned = set()
+        self.unsectioned = set()
+        
+        for photo in photos:
+            photo_id = photo.pk
+            
+            damage_point = getattr(photo, 'damage_point_id', None)
+            if damage_point:
+                self.by_damage_point.setdefault(damage_point, set()).add(photo_id)
+            else:
+                self.unpinned.add(photo_id)
+            
+            section_reference = getattr(photo, 'section_reference', None)
+            if section_reference in self.PART_SECTIONS:
+                self.by_section.setdefault(section_reference, set()).add(photo_id)
+            else:
+                self.unsectioned.add(photo_id)
+            
+            for token in self.tokenize(self._photo_text(photo)):
+                self.by_token.setdefault(token, set()).add(photo_id)
+    
+    @classmethod
+    def for_assessment(cls, assessment: VehicleAssessment) -> 'DamagePhotoIndex':
+        """Build the index for an assessment with a single query."""
+        photos = AssessmentPhoto.objects.filter(assessment=assessment)
+        return cls(photos)
+    
+    @classmethod
+    def tokenize(cls, text: str) -> set:
+        """Split text into lowercase tokens, adding naive singular forms."""
+        tokens = set(cls.TOKEN_PATTERN.findall(text.lower()))
+        tokens.update(token[:-1] for token in list(tokens) if len(token) > 3 and token.endswith('s'))
+        return tokens
+    
+    @staticmethod
+    def _photo_text(photo) -> str:
+        text = ''
+        if getattr(photo, 'description', None):
+            text += f"{photo.description} "
+        if getattr(photo, 'image', None):
+            text += str(photo.image)
+        return text
+    
+    def match(self, field_names: List[str], section_types: List[str],
+              keywords: List[str]) -> set:
+        """
+        Return the ids of photos related to a damaged part.
+        
+        Args:
+            field_names: Assessment field names the part was identified from
+            section_types: DamagedPart section types the part belongs to
+            keywords: Part keywords from ``get_part_keywords``
+            
+        Returns:
+            Set of AssessmentPhoto primary keys
+        """
+        matched = set()
+        for field_name in field_names:
+            matched |= self.by_damage_point.get(field_name, set())
+        
+        keyword_hits = set()
+        for keyword in keywords:
+            keyword_hits |= self.by_token.get(keyword, set())
+        
+        candidates = set(self.unsectioned)
+        section_hits = set()
+        for section_type in section_types:
+            candidates |= self.by_section.get(self.SECTION_REFERENCES.get(section_type), set())
+            section_hits |= self.by_token.get(section_type, set())
+        
+        matched |= keyword_hits & candidates & self.unpinned
+        matched |= section_hits & self.unsectioned & self.unpinned
+        return matched
+
+
 class PartsIdentificationEngine:
     """
     Engine for identifying damaged parts from completed vehicle assessments.
@@ -174,6 +287,18 @@ class PartsIdentificationEngine:
         }
     }
     
+    # PART_MAPPINGS flattened to (field, notes_field, name, category) tuples
+    COMPILED_PART_MAPPINGS = {
+        section_name: tuple(
+            (field_name, f"{field_name}_notes", part_info['name'], part_info['category'])
+            for field_name, part_info in section_mappings.items()
+        )
+        for section_name, section_mappings in PART_MAPPINGS.items()
+    }
+    
+    # Assessment values that never indicate damage
+    UNDAMAGED_VALUES = frozenset(['none', 'working', 'excellent', 'good'])
+    
     # Labor hour estimates by damage severity and part category
     LABOR_ESTIMATES = {
         'body': {
@@ -242,6 +367,7 @@ class PartsIdentificationEngine:
         """Initialize the parts identification engine."""
         pass
     
+    @timed('parts_identification')
     def identify_damaged_parts(self, assessment: VehicleAssessment) -> List[DamagedPart]:
         """
         Scan assessment sections and create DamagedPart records.
@@ -276,11 +402,74 @@ class PartsIdentificationEngine:
         
         # Create DamagedPart records
         created_parts = []
+        created_pairs = []
         with transaction.atomic():
             for part_data in consolidated_parts:
-                damaged_part = self.create_damaged_part_record(assessment, part_data)
+                damaged_part = self.create_damaged_part_record(
+                    assessment, part_data, link_images=False
+                )
                 if damaged_part:
                     created_parts.append(damaged_part)
+                    created_pairs.append((damaged_part, part_data))
+            
+            # Link photos for every part against one index and one insert
+            self.link_all_damage_images(assessment, created_pairs)
+            
+            # Mark parts identification as complete
+            assessment.parts_identification_complete = True
+            assessment.save(update_fields=['parts_identification_complete'])
+        
+        return created_parts
+    
+    @staticmethod
+    def assessments_with_sections():
+        """Queryset loading assessments together with all eight sections."""
+        return VehicleAssessment.objects.select_related(*SECTION_RELATIONS.values())
+    
+    def identify_damaged_parts_bulk(self, assessment, replace: bool = False) -> List[DamagedPart]:
+        """
+        Bulk variant of ``identify_damaged_parts``.
+        
+        Sections come from a single ``select_related`` query, DamagedParts are
+        inserted with one ``bulk_create`` and photo links with one insert.
+        
+        Args:
+            assessment: VehicleAssessment instance loaded through
+                ``assessments_with_sections``, or an assessment primary key
+            replace: Delete previously identified parts first
+            
+        Returns:
+            List of created DamagedPart instances
+            
+        Raises:
+            ValueError: If assessment is not completed or invalid
+        """
+        if assessment is None:
+            raise ValueError("Assessment cannot be None")
+        
+        if not isinstance(assessment, VehicleAssessment):
+            assessment = self.assessments_with_sections().get(pk=assessment)
+        
+        if assessment.status not in ['completed', 'under_review']:
+            raise ValueError(f"Assessment must be completed or under review, got: {assessment.status}")
+        
+        all_parts = []
+        for section_name, section_obj in self.get_assessment_sections(assessment).items():
+            if section_obj:
+                all_parts.extend(self.extract_parts_from_section(section_obj, section_name))
+        
+        consolidated_parts = self.consolidate_duplicate_parts(all_parts)
+        
+        with transaction.atomic():
+            if replace:
+                DamagedPart.objects.filter(assessment=assessment).delete()
+            
+            created_parts = DamagedPart.objects.bulk_create([
+                DamagedPart(**self.damaged_part_fields(assessment, part_data))
+                for part_data in consolidated_parts
+            ])
+            
+            self.link_all_damage_images(assessment, list(zip(created_parts, consolidated_parts)))
             
             # Mark parts identification as complete
             assessment.parts_identification_complete = True
@@ -359,19 +548,16 @@ class PartsIdentificationEngine:
         if not section_obj or section_name not in self.PART_MAPPINGS:
             return parts
         
-        section_mappings = self.PART_MAPPINGS[section_name]
-        
         # Iterate through all fields in the section
-        for field_name, part_info in section_mappings.items():
+        for field_name, notes_field, part_name, part_category in self.COMPILED_PART_MAPPINGS[section_name]:
             # Get damage severity value
             damage_value = getattr(section_obj, field_name, None)
             
             # Skip if no damage or field doesn't exist
-            if not damage_value or damage_value in ['none', 'working', 'excellent', 'good']:
+            if not damage_value or damage_value in self.UNDAMAGED_VALUES:
                 continue
             
             # Get notes field
-            notes_field = f"{field_name}_notes"
             notes = getattr(section_obj, notes_field, '')
             
             # Map damage values to our severity scale
@@ -381,15 +567,15 @@ class PartsIdentificationEngine:
                 part_data = {
                     'section_type': section_name,
                     'field_name': field_name,
-                    'part_name': part_info['name'],
-                    'part_category': part_info['category'],
+                    'part_name': part_name,
+                    'part_category': part_category,
                     'damage_severity': severity,
                     'damage_description': self.generate_damage_description(
-                        part_info['name'], severity, damage_value, notes
+                        part_name, severity, damage_value, notes
                     ),
                     'requires_replacement': severity == 'replace' or damage_value in ['destroyed', 'failed'],
                     'estimated_labor_hours': self.estimate_labor_hours(
-                        part_info['category'], severity
+                        part_category, severity
                     ),
                     'notes': notes,
                     'original_damage_value': damage_value,
@@ -504,6 +690,12 @@ class PartsIdentificationEngine:
                 if part['section_type'] not in existing['sections']:
                     existing['sections'].append(part['section_type'])
                 
+                # Track every source field for damage point photo matching
+                if 'field_names' not in existing:
+                    existing['field_names'] = [existing['field_name']]
+                if part['field_name'] not in existing['field_names']:
+                    existing['field_names'].append(part['field_name'])
+                
             else:
                 # Add new part
                 consolidated[key] = part.copy()
@@ -547,32 +739,28 @@ class PartsIdentificationEngine:
         return Decimal(str(hours))
     
     def create_damaged_part_record(self, assessment: VehicleAssessment, 
-                                 part_data: Dict) -> Optional[DamagedPart]:
+                                 part_data: Dict,
+                                 link_images: bool = True) -> Optional[DamagedPart]:
         """
         Create a DamagedPart record from part data.
         
         Args:
             assessment: VehicleAssessment instance
             part_data: Dictionary containing part information
+            link_images: Link matching photos immediately; callers creating
+                many parts pass False and use ``link_all_damage_images``
             
         Returns:
             Created DamagedPart instance or None if creation failed
         """
         try:
             damaged_part = DamagedPart.objects.create(
-                assessment=assessment,
-                section_type=part_data['section_type'],
-                part_name=part_data['part_name'],
-                part_category=part_data['part_category'],
-                damage_severity=part_data['damage_severity'],
-                damage_description=part_data['damage_description'],
-                requires_replacement=part_data['requires_replacement'],
-                estimated_labor_hours=part_data['estimated_labor_hours'],
-                notes=part_data['notes'],
+                **self.damaged_part_fields(assessment, part_data)
             )
             
             # Link damage images if available
-            self.link_damage_images(damaged_part, part_data)
+            if link_images:
+                self.link_damage_images(damaged_part, part_data)
             
             return damaged_part
             
@@ -581,48 +769,102 @@ class PartsIdentificationEngine:
             print(f"Error creating DamagedPart record: {e}")
             return None
     
-    def link_damage_images(self, damaged_part: DamagedPart, part_data: Dict) -> None:
+    def damaged_part_fields(self, assessment: VehicleAssessment, part_data: Dict) -> Dict:
+        """Map part data onto DamagedPart model field values."""
+        return {
+            'assessment': assessment,
+            'section_type': part_data['section_type'],
+            'part_name': part_data['part_name'],
+            'part_category': part_data['part_category'],
+            'damage_severity': part_data['damage_severity'],
+            'damage_description': part_data['damage_description'],
+            'requires_replacement': part_data['requires_replacement'],
+            'estimated_labor_hours': part_data['estimated_labor_hours'],
+            'notes': part_data['notes'],
+        }
+    
+    def link_damage_images(self, damaged_part: DamagedPart, part_data: Dict,
+                           photo_index: Optional[DamagePhotoIndex] = None) -> None:
         """
         Associate photos with specific parts based on section and keywords.
         
         Args:
             damaged_part: DamagedPart instance
             part_data: Dictionary containing part information
+            photo_index: Prebuilt index for the part's assessment, if any
         """
         try:
-            # Get all photos for the assessment
-            assessment_photos = AssessmentPhoto.objects.filter(
-                assessment=damaged_part.assessment
-            )
-            
-            # Find photos that might be related to this part
-            related_photos = []
-            
-            part_keywords = self.get_part_keywords(damaged_part.part_name)
-            section_keywords = [damaged_part.section_type]
+            if photo_index is None:
+                photo_index = DamagePhotoIndex.for_assessment(damaged_part.assessment)
             
-            for photo in assessment_photos:
-                # Check photo description/filename for keywords
-                photo_text = ''
-                if hasattr(photo, 'description') and photo.description:
-                    photo_text += photo.description.lower()
-                if hasattr(photo, 'image') and photo.image:
-                    photo_text += str(photo.image).lower()
-                
-                # Check if any keywords match
-                for keyword in part_keywords + section_keywords:
-                    if keyword.lower() in photo_text:
-                        related_photos.append(photo)
-                        break
+            photo_ids = self.match_damage_images(damaged_part, part_data, photo_index)
             
             # Link the photos
-            if related_photos:
-                damaged_part.damage_images.set(related_photos)
+            if photo_ids:
+                damaged_part.damage_images.set(photo_ids)
                 
         except Exception as e:
             # Log error but don't fail
             print(f"Error linking damage images: {e}")
     
+    def link_all_damage_images(self, assessment: VehicleAssessment,
+                               parts: List[Tuple[DamagedPart, Dict]]) -> int:
+        """
+        Link photos to many newly created parts of one assessment.
+        
+        Builds the photo index once and writes every link with a single bulk
+        insert into the M2M through table.
+        
+        Args:
+            assessment: VehicleAssessment the parts belong to
+            parts: (DamagedPart, part_data) pairs
+            
+        Returns:
+            Number of links written
+        """
+        if not parts:
+            return 0
+        
+        try:
+            photo_index = DamagePhotoIndex.for_assessment(assessment)
+            through = DamagedPart.damage_images.through
+            
+            links = [
+                through(damagedpart_id=damaged_part.pk, assessmentphoto_id=photo_id)
+                for damaged_part, part_data in parts
+                for photo_id in self.match_damage_images(damaged_part, part_data, photo_index)
+            ]
+            
+            if links:
+                through.objects.bulk_create(links, ignore_conflicts=True)
+            return len(links)
+            
+        except Exception as e:
+            # Log error but don't fail
+            print(f"Error linking damage images: {e}")
+            return 0
+    
+    def match_damage_images(self, damaged_part: DamagedPart, part_data: Dict,
+                            photo_index: DamagePhotoIndex) -> set:
+        """
+        Find the photos related to a damaged part using the photo index.
+        
+        Args:
+            damaged_part: DamagedPart instance
+            part_data: Dictionary containing part information
+            photo_index: Index built for the part's assessment
+            
+        Returns:
+            Set of AssessmentPhoto primary keys
+        """
+        field_names = part_data.get('field_names') or (
+            [part_data['field_name']] if part_data.get('field_name') else []
+        )
+        section_types = part_data.get('sections') or [damaged_part.section_type]
+        keywords = self.get_part_keywords(damaged_part.part_name)
+        
+        return photo_index.match(field_names, section_types, keywords)
+    
     def get_part_keywords(self, part_name: str) -> List[str]:
         """
         Generate keywords for photo matching based on part name.
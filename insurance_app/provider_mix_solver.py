@@ -0,0 +1,276 @@
+# provider_mix_solver.py
+"""
+Optimal provider mix solver for assessment quote selection.
+
+Given the validated quotes for every damaged part of an assessment, the
+ProviderMixSolver finds the cheapest selection of one quote per part that
+satisfies insurer constraints: a maximum number of distinct providers, a
+completion deadline, a minimum part warranty and OEM-only parts for selected
+categories (safety parts by default).
+"""
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models import PartQuote, PartMarketAverage
+
+
+@dataclass
+class ProviderMixConstraints:
+    """Constraints applied when selecting the provider mix"""
+    max_providers: Optional[int] = None
+    deadline_days: Optional[int] = None
+    min_warranty_months: Optional[int] = None
+    oem_only_categories: Tuple[str, ...] = ()
+
+    # Categories treated as safety parts by ``oem_only_safety``
+    SAFETY_CATEGORIES = ('safety',)
+
+    @classmethod
+    def from_request_data(cls, data) -> 'ProviderMixConstraints':
+        """
+        Build constraints from POST/API data.
+
+        Recognised keys: max_providers, deadline_days, min_warranty_months
+        and oem_only_safety. Blank values mean no constraint.
+
+        Raises:
+            ValueError: If a numeric constraint is not a non-negative integer
+        """
+        def non_negative_int(key):
+            value = data.get(key)
+            if value in (None, ''):
+                return None
+            value = int(value)
+            if value < 0:
+                raise ValueError(f"{key} must not be negative")
+            return value
+
+        oem_only = str(data.get('oem_only_safety', '')).lower() in ('1', 'true', 'on', 'yes')
+        return cls(
+            max_providers=non_negative_int('max_providers'),
+            deadline_days=non_negative_int('deadline_days'),
+            min_warranty_months=non_negative_int('min_warranty_months'),
+            oem_only_categories=cls.SAFETY_CATEGORIES if oem_only else (),
+        )
+
+    def allows(self, quote: Dict) -> bool:
+        """Check the per-quote constraints"""
+        if self.deadline_days is not None and quote['estimated_completion_days'] > self.deadline_days:
+            return False
+        if self.min_warranty_months is not None and quote['part_warranty_months'] < self.min_warranty_months:
+            return False
+        if quote['damaged_part__part_category'] in self.oem_only_categories and quote['part_type'] != 'oem':
+            return False
+        return True
+
+
+@dataclass
+class ProviderMixResult:
+    """Result of a provider mix optimisation"""
+    feasible: bool
+    selections: List[Dict] = field(default_factory=list)
+    providers: List[str] = field(default_factory=list)
+    total_cost: Decimal = Decimal('0')
+    market_average_total: Decimal = Decimal('0')
+    savings: Decimal = Decimal('0')
+    max_completion_days: int = 0
+    infeasible_parts: List[int] = field(default_factory=list)
+    nodes_explored: int = 0
+
+    def to_dict(self) -> Dict:
+        """JSON-serialisable representation"""
+        return {
+            'strategy': 'optimal',
+            'feasible': self.feasible,
+            'selections': self.selections,
+            'providers': self.providers,
+            'total_cost': float(self.total_cost),
+            'market_average_total': float(self.market_average_total),
+            'savings': float(self.savings),
+            'max_completion_days': self.max_completion_days,
+            'infeasible_parts': self.infeasible_parts,
+        }
+
+
+class ProviderMixSolver:
+    """
+    Branch-and-bound solver over per-part quote sets.
+
+    Quotes that break a per-quote constraint are discarded up front, which
+    leaves the provider limit as the only constraint coupling parts. Once the
+    set of providers is fixed, each part simply takes its cheapest quote from
+    those providers, so the search runs over provider subsets. Each node is
+    bounded by the cost of letting every undecided provider in, and pruned
+    when that bound cannot beat the incumbent or leaves a part uncovered.
+    Providers are identified by ``provider_name``.
+    """
+
+    QUOTE_COLUMNS = (
+        'id', 'damaged_part_id', 'damaged_part__part_category', 'provider_name',
+        'provider_type', 'total_cost', 'estimated_completion_days',
+        'part_warranty_months', 'part_type',
+    )
+
+    def __init__(self, constraints: Optional[ProviderMixConstraints] = None):
+        self.constraints = constraints or ProviderMixConstraints()
+
+    def solve_for_assessment(self, assessment) -> ProviderMixResult:
+        """
+        Load the assessment's validated quotes and market averages and solve.
+
+        Args:
+            assessment: VehicleAssessment instance
+
+        Returns:
+            ProviderMixResult
+        """
+        quotes = list(
+            PartQuote.objects.filter(
+                damaged_part__assessment=assessment, status='validated'
+            ).order_by('damaged_part_id', 'total_cost', 'id').values(*self.QUOTE_COLUMNS)
+        )
+        market_averages = dict(
+            PartMarketAverage.objects.filter(
+                damaged_part__assessment=assessment
+            ).values_list('damaged_part_id', 'average_total_cost')
+        )
+        return self.solve(quotes, market_averages)
+
+    def solve(self, quotes: Sequence[Dict],
+              market_averages: Optional[Dict[int, Decimal]] = None) -> ProviderMixResult:
+        """
+        Find the cheapest constrained mix for a set of quotes.
+
+        Args:
+            quotes: Quote value dictionaries with ``QUOTE_COLUMNS`` keys
+            market_averages: Optional damaged_part_id -> average total cost;
+                parts without one fall back to the mean of their quotes
+
+        Returns:
+            ProviderMixResult
+        """
+        market_averages = market_averages or {}
+        part_ids = sorted({quote['damaged_part_id'] for quote in quotes})
+        if not part_ids:
+            return ProviderMixResult(feasible=False)
+
+        allowed = [quote for quote in quotes if self.constraints.allows(quote)]
+        providers = sorted({quote['provider_name'] for quote in allowed})
+        part_index = {part_id: i for i, part_id in enumerate(part_ids)}
+        provider_index = {name: j for j, name in enumerate(providers)}
+
+        # Cheapest allowed quote per (part, provider)
+        cost = np.full((len(part_ids), len(providers)), np.inf)
+        choice = np.full((len(part_ids), len(providers)), -1, dtype=np.int64)
+        for q_index, quote in enumerate(allowed):
+            i = part_index[quote['damaged_part_id']]
+            j = provider_index[quote['provider_name']]
+            quote_cost = float(quote['total_cost'])
+            if quote_cost < cost[i, j]:
+                cost[i, j] = quote_cost
+                choice[i, j] = q_index
+
+        uncovered = [part_ids[i] for i in np.flatnonzero(~np.isfinite(cost.min(axis=1, initial=np.inf)))]
+        if uncovered:
+            return ProviderMixResult(feasible=False, infeasible_parts=uncovered)
+
+        chosen_providers, nodes = self._select_providers(cost)
+        if chosen_providers is None:
+            return ProviderMixResult(feasible=False, nodes_explored=nodes)
+
+        columns = np.array(chosen_providers)
+        best_columns = columns[np.argmin(cost[:, columns], axis=1)]
+        picked = [allowed[choice[i, j]] for i, j in enumerate(best_columns)]
+
+        return self._build_result(part_ids, picked, quotes, market_averages, nodes)
+
+    def _select_providers(self, cost: np.ndarray) -> Tuple[Optional[List[int]], int]:
+        """Return the provider columns of the optimal mix and nodes explored."""
+        n_providers = cost.shape[1]
+        limit = self.constraints.max_providers
+        if limit is None or limit >= n_providers:
+            return list(range(n_providers)), 1
+        if limit < 1:
+            return None, 0
+
+        # Search the most useful providers first so good incumbents appear early:
+        # widest part coverage, then lowest total of their quotes
+        coverage = np.isfinite(cost).sum(axis=0)
+        quoted_total = np.where(np.isfinite(cost), cost, 0).sum(axis=0)
+        order = np.lexsort((quoted_total, -coverage))
+        ordered = cost[:, order]
+
+        # suffix_min[k] = per-part minimum over providers order[k:]
+        suffix_min = np.full((n_providers + 1, cost.shape[0]), np.inf)
+        for k in range(n_providers - 1, -1, -1):
+            suffix_min[k] = np.minimum(suffix_min[k + 1], ordered[:, k])
+
+        best = {'cost': np.inf, 'columns': None}
+        nodes = 0
+
+        def search(k: int, included: List[int], current: np.ndarray):
+            nonlocal nodes
+            nodes += 1
+
+            current_total = current.sum()
+            if current_total < best['cost']:
+                best['cost'] = current_total
+                best['columns'] = list(included)
+
+            if len(included) == limit or k == n_providers:
+                return
+
+            bound = np.minimum(current, suffix_min[k]).sum()
+            if not np.isfinite(bound) or bound >= best['cost']:
+                return
+
+            search(k + 1, included + [k], np.minimum(current, ordered[:, k]))
+            search(k + 1, included, current)
+
+        search(0, [], np.full(cost.shape[0], np.inf))
+
+        if best['columns'] is None:
+            return None, nodes
+        return [int(order[k]) for k in best['columns']], nodes
+
+    def _build_result(self, part_ids: List[int], picked: List[Dict], quotes: Sequence[Dict],
+                      market_averages: Dict[int, Decimal], nodes: int) -> ProviderMixResult:
+        quote_costs: Dict[int, List[Decimal]] = {}
+        for quote in quotes:
+            quote_costs.setdefault(quote['damaged_part_id'], []).append(Decimal(str(quote['total_cost'])))
+
+        market_total = Decimal('0')
+        for part_id in part_ids:
+            average = market_averages.get(part_id)
+            if average is None:
+                costs = quote_costs[part_id]
+                average = sum(costs) / len(costs)
+            market_total += Decimal(str(average))
+
+        selections = [
+            {
+                'part_id': quote['damaged_part_id'],
+                'quote_id': quote['id'],
+                'provider_name': quote['provider_name'],
+                'provider_type': quote['provider_type'],
+                'total_cost': float(quote['total_cost']),
+                'estimated_completion_days': quote['estimated_completion_days'],
+            }
+            for quote in picked
+        ]
+        total_cost = sum((Decimal(str(quote['total_cost'])) for quote in picked), Decimal('0'))
+
+        return ProviderMixResult(
+            feasible=True,
+            selections=selections,
+            providers=sorted({quote['provider_name'] for quote in picked}),
+            total_cost=total_cost,
+            market_average_total=market_total.quantize(Decimal('0.01')),
+            savings=(market_total - total_cost).quantize(Decimal('0.01')),
+            max_completion_days=max(quote['estimated_completion_days'] for quote in picked),
+            nodes_explored=nodes,
+        )
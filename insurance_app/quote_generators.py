@@ -5,13 +5,110 @@ Quote generation system for creating assessor estimates and managing quote workf
 
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, timedelta
+from dataclasses import dataclass
+from functools import lru_cache
+from types import SimpleNamespace
+from threading import Lock
+import time
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from .models import DamagedPart, PartQuote, PartQuoteRequest
+from .models import DamagedPart, PartQuote, PartQuoteRequest, QuoteSystemConfiguration
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of memoized estimate component sets kept per process
+ESTIMATE_CACHE_SIZE = 256
+
+# Seconds a process keeps its pricing snapshot; saving the configuration
+# only clears the snapshot of the process that saved it
+ASSESSOR_PRICING_TTL = 30
+
+
+@dataclass(frozen=True)
+class AssessorPricing:
+    """Pricing settings used for assessor estimates"""
+    labor_rate: Decimal
+    paint_percentage: Decimal
+    enabled: bool = True
+
+
+_pricing_lock = Lock()
+_pricing = None
+_pricing_expires_at = 0.0
+
+
+def get_assessor_pricing():
+    """
+    Get the assessor pricing settings, loading QuoteSystemConfiguration at
+    most once per ASSESSOR_PRICING_TTL.
+    
+    Saving the configuration calls clear_assessor_estimate_cache() in the
+    saving process; other processes pick the change up when their
+    snapshot expires. Memoized estimate components are keyed by the
+    pricing, so they never mix old and new rates.
+    
+    Returns:
+        AssessorPricing: Current pricing settings
+    """
+    global _pricing, _pricing_expires_at
+    
+    with _pricing_lock:
+        now = time.monotonic()
+        if _pricing is None or now >= _pricing_expires_at:
+            _pricing_expires_at = now + ASSESSOR_PRICING_TTL
+            config = QuoteSystemConfiguration.objects.filter(pk=1).first()
+            if config is None:
+                _pricing = AssessorPricing(
+                    labor_rate=AssessorEstimateGenerator.STANDARD_LABOR_RATE,
+                    paint_percentage=AssessorEstimateGenerator.PAINT_COST_PERCENTAGE,
+                )
+            else:
+                _pricing = AssessorPricing(
+                    labor_rate=Decimal(str(config.default_labor_rate)),
+                    paint_percentage=Decimal(str(config.paint_cost_percentage)) / Decimal('100'),
+                    enabled=config.enable_assessor_estimates,
+                )
+        return _pricing
+
+
+def clear_assessor_estimate_cache():
+    """Drop the pricing snapshot and memoized estimate components"""
+    global _pricing
+    
+    with _pricing_lock:
+        _pricing = None
+    _estimate_components.cache_clear()
+
+
+@lru_cache(maxsize=ESTIMATE_CACHE_SIZE)
+def _estimate_components(part_category, damage_severity, requires_replacement, pricing):
+    """
+    Compute the estimate components shared by all parts with the same key.
+    
+    Labor hours and part number vary per part, so they are applied on top of
+    these components by the caller.
+    """
+    generator = AssessorEstimateGenerator(pricing=pricing)
+    part = SimpleNamespace(
+        part_category=part_category,
+        damage_severity=damage_severity,
+        requires_replacement=requires_replacement,
+        estimated_labor_hours=Decimal('0'),
+        part_number='',
+    )
+    part_cost = generator.get_base_part_cost(part)
+    
+    return {
+        'part_cost': part_cost,
+        'paint_cost': generator.calculate_paint_cost(part, part_cost),
+        'additional_costs': generator._calculate_additional_costs(part),
+        'default_labor_hours': generator._get_default_labor_hours(part),
+        'delivery_days': generator._get_estimated_delivery_days(part),
+        'completion_days': generator._get_estimated_completion_days(part),
+        'confidence_score': generator._calculate_confidence_score(part),
+    }
+
 
 class AssessorEstimateGenerator:
     """
@@ -54,10 +151,24 @@ class AssessorEstimateGenerator:
         'minimum': 60,   # Minimum confidence for any estimate
     }
     
-    def __init__(self):
-        """Initialize the assessor estimate generator."""
+    def __init__(self, pricing=None):
+        """
+        Initialize the assessor estimate generator.
+        
+        Args:
+            pricing (AssessorPricing, optional): Pricing settings; defaults to
+                the cached QuoteSystemConfiguration snapshot
+        """
         self.provider_name = "Internal Assessor Estimate"
         self.provider_type = "assessor"
+        self._pricing = pricing
+    
+    @property
+    def pricing(self):
+        """Pricing settings used by this generator"""
+        if self._pricing is None:
+            self._pricing = get_assessor_pricing()
+        return self._pricing
     
     def generate_assessor_estimate(self, damaged_part, quote_request=None):
         """
@@ -68,11 +179,16 @@ class AssessorEstimateGenerator:
             quote_request (PartQuoteRequest, optional): Associated quote request
             
         Returns:
-            PartQuote: Created assessor estimate quote
+            PartQuote: Created assessor estimate quote, or None when assessor
+                estimates are disabled
             
         Raises:
             ValidationError: If damaged part data is invalid
         """
+        if not self.pricing.enabled:
+            logger.info("Assessor estimates are disabled in the quote system configuration")
+            return None
+        
         try:
             # Validate input
             self._validate_damaged_part(damaged_part)
@@ -134,6 +250,122 @@ class AssessorEstimateGenerator:
             logger.error(f"Error generating assessor estimate for part {damaged_part.id}: {str(e)}")
             raise ValidationError(f"Failed to generate assessor estimate: {str(e)}")
     
+    def generate_assessor_estimates(self, damaged_parts, quote_requests=None):
+        """
+        Generate assessor estimates for many damaged parts in one pass.
+        
+        Pricing is loaded once and the components shared by parts with the same
+        category, severity and replacement flag are memoized, so the only
+        queries are the bulk insert of the quotes.
+        
+        Args:
+            damaged_parts (iterable): DamagedPart instances to estimate
+            quote_requests (dict): Damaged part id -> PartQuoteRequest
+            
+        Returns:
+            list: Created PartQuote instances, in the order of damaged_parts
+            
+        Raises:
+            ValidationError: If any damaged part is invalid or has no quote request
+        """
+        damaged_parts = list(damaged_parts)
+        quote_requests = quote_requests or {}
+        pricing = self.pricing
+        
+        if not pricing.enabled:
+            logger.info("Assessor estimates are disabled in the quote system configuration")
+            return []
+        
+        for damaged_part in damaged_parts:
+            try:
+                self._validate_damaged_part(damaged_part)
+                if damaged_part.id not in quote_requests:
+                    raise ValidationError("Quote request is required")
+            except ValidationError as e:
+                raise ValidationError(
+                    f"Failed to generate assessor estimate for part {damaged_part.id}: {e.messages[0]}"
+                )
+        
+        valid_until = timezone.now() + timedelta(days=30)
+        quotes = []
+        
+        for damaged_part in damaged_parts:
+            components = _estimate_components(
+                damaged_part.part_category,
+                damaged_part.damage_severity,
+                bool(damaged_part.requires_replacement),
+                pricing,
+            )
+            
+            labor_hours = damaged_part.estimated_labor_hours
+            if labor_hours <= 0:
+                labor_hours = components['default_labor_hours']
+            labor_cost = (labor_hours * pricing.labor_rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            
+            confidence_score = components['confidence_score']
+            if damaged_part.estimated_labor_hours > 0:
+                confidence_score += 5
+            if damaged_part.part_number:
+                confidence_score += 5
+            
+            quotes.append(PartQuote(
+                quote_request=quote_requests.get(damaged_part.id),
+                damaged_part=damaged_part,
+                provider_type=self.provider_type,
+                provider_name=self.provider_name,
+                provider_contact="Internal Assessment Team",
+                part_cost=components['part_cost'],
+                labor_cost=labor_cost,
+                paint_cost=components['paint_cost'],
+                additional_costs=components['additional_costs'],
+                total_cost=(
+                    components['part_cost'] + labor_cost +
+                    components['paint_cost'] + components['additional_costs']
+                ),
+                part_type='oem_equivalent',
+                part_manufacturer='Various',
+                part_number_quoted='',
+                estimated_delivery_days=components['delivery_days'],
+                estimated_completion_days=components['completion_days'],
+                part_warranty_months=12,
+                labor_warranty_months=12,
+                confidence_score=min(100, confidence_score),
+                valid_until=valid_until,
+                notes=self._generate_estimate_notes(damaged_part),
+                status='validated'
+            ))
+        
+        created = PartQuote.objects.bulk_create(quotes)
+        logger.info(f"Generated {len(created)} assessor estimates")
+        return created
+    
+    def generate_assessment_estimates(self, assessment, quote_requests=None):
+        """
+        Generate assessor estimates for every damaged part of an assessment.
+        
+        Parts are attached to their most recent quote request; parts without a
+        quote request are skipped.
+        
+        Args:
+            assessment (VehicleAssessment): Assessment whose parts to estimate
+            quote_requests (dict, optional): Damaged part id -> PartQuoteRequest;
+                loaded from the assessment's quote requests when omitted
+            
+        Returns:
+            list: Created PartQuote instances
+        """
+        if quote_requests is None:
+            quote_requests = {}
+            for quote_request in PartQuoteRequest.objects.filter(
+                assessment=assessment
+            ).order_by('damaged_part_id', '-request_date', '-id'):
+                quote_requests.setdefault(quote_request.damaged_part_id, quote_request)
+        
+        damaged_parts = DamagedPart.objects.filter(
+            assessment=assessment, id__in=list(quote_requests)
+        ).order_by('id')
+        return self.generate_assessor_estimates(damaged_parts, quote_requests)
+    
     def get_base_part_cost(self, damaged_part):
         """
         Calculate base part cost using part category and damage severity.
@@ -164,7 +396,7 @@ class AssessorEstimateGenerator:
     
     def calculate_labor_cost(self, damaged_part):
         """
-        Calculate labor cost using standard £45/hour rate.
+        Calculate labor cost using the configured hourly rate (£45/hour by default).
         
         Args:
             damaged_part (DamagedPart): The damaged part
@@ -180,14 +412,14 @@ class AssessorEstimateGenerator:
             labor_hours = self._get_default_labor_hours(damaged_part)
         
         # Calculate labor cost
-        labor_cost = labor_hours * self.STANDARD_LABOR_RATE
+        labor_cost = labor_hours * self.pricing.labor_rate
         
         # Round to 2 decimal places
         return labor_cost.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
     
     def calculate_paint_cost(self, damaged_part, part_cost):
         """
-        Calculate paint cost for body panel parts (15% of part cost).
+        Calculate paint cost for body panel parts (15% of part cost by default).
         
         Args:
             damaged_part (DamagedPart): The damaged part
@@ -203,7 +435,7 @@ class AssessorEstimateGenerator:
             return Decimal('0.00')
         
         # Calculate paint cost as percentage of part cost
-        paint_cost = part_cost * self.PAINT_COST_PERCENTAGE
+        paint_cost = part_cost * self.pricing.paint_percentage
         
         # Minimum paint cost for body panels
         min_paint_cost = Decimal('50.00')
@@ -0,0 +1,271 @@
+"""
+Database-side collection of quote system health metrics.
+
+QuoteHealthCollector fills QuoteSystemHealthMetrics from a handful of
+aggregate queries instead of Python loops over quotes and market averages:
+
+- Quotes and audit log errors are rolled up per hour into
+  QuoteHealthRollup, grouped by provider_type and action_type with
+  conditional counts. A run only rescans the hour it last rolled up and
+  anything newer; earlier hours are read back from the rollup.
+- Quote request statuses change after the request is created, so the
+  successful and failed request counts are taken live with one conditional
+  aggregate over the 24 hour window.
+- Outlier counts are summed in the database with the backend's JSON array
+  length function, with a Python fallback for backends without one.
+- Stage timings come from the hourly latency histograms the quote pipeline
+  processes flush to QuoteStageLatencyRollup (see latency.py).
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict
+
+from django.db import connection
+from django.db.models import (
+    Count, DurationField, ExpressionWrapper, F, Func, IntegerField, Q, Sum,
+)
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .latency import STAGES, percentiles
+from .models import (
+    PartMarketAverage, PartQuote, PartQuoteRequest, QuoteHealthRollup, QuoteStageLatencyRollup,
+    QuoteSystemAuditLog,
+)
+
+logger = logging.getLogger('quote_system')
+
+PROVIDER_TYPES = ('assessor', 'dealer', 'independent', 'network')
+
+API_ERROR_ACTIONS = ('quote_request_dispatched', 'quote_received')
+VALIDATION_ERROR_ACTIONS = ('quote_rejected',)
+
+ROLLUP_COUNT_FIELDS = [
+    'quote_requests', 'quotes_received', 'response_hours_total', 'responses_timed',
+    'api_errors', 'database_errors', 'validation_errors',
+] + [f'{provider}_requests' for provider in PROVIDER_TYPES] + [f'{provider}_quotes' for provider in PROVIDER_TYPES]
+
+
+class JSONArrayLength(Func):
+    """Length of a JSON array column, 0 for anything that is not an array"""
+    output_field = IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotImplementedError(f"JSON array length is not supported on {connection.vendor}")
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql_template(
+            compiler, connection,
+            "CASE WHEN jsonb_typeof(%(expressions)s) = 'array' THEN jsonb_array_length(%(expressions)s) ELSE 0 END",
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql_template(compiler, connection, "COALESCE(json_array_length(%(expressions)s), 0)")
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql_template(
+            compiler, connection,
+            "CASE WHEN JSON_TYPE(%(expressions)s) = 'ARRAY' THEN JSON_LENGTH(%(expressions)s) ELSE 0 END",
+        )
+
+    def as_sql_template(self, compiler, connection, template):
+        return Func.as_sql(self, compiler, connection, template=template)
+
+
+def supports_json_array_length() -> bool:
+    """Whether JSONArrayLength can run on the default database"""
+    return connection.vendor in ('postgresql', 'sqlite', 'mysql') and connection.features.supports_json_field
+
+
+class QuoteHealthCollector:
+    """
+    Collects QuoteSystemHealthMetrics values from aggregate queries.
+
+    Args:
+        window: Period the *_24h metrics cover
+    """
+
+    def __init__(self, window: timedelta = timedelta(hours=24)):
+        self.window = window
+
+    def collect(self, now=None) -> Dict:
+        """
+        Update the hourly rollup and return the values for a new
+        QuoteSystemHealthMetrics row.
+
+        Rollup metrics cover the hours that overlap the window, so they may
+        include up to an hour more than the window itself.
+        """
+        now = now or timezone.now()
+        self.update_rollup(now)
+        since = now - self.window
+
+        rollup = QuoteHealthRollup.objects.filter(
+            bucket_start__gte=self.bucket_start(since)
+        ).aggregate(**{field: Sum(field) for field in ROLLUP_COUNT_FIELDS})
+        rollup = {field: value or 0 for field, value in rollup.items()}
+
+        requests = PartQuoteRequest.objects.filter(request_date__gte=since).aggregate(
+            total=Count('pk'),
+            successful=Count('pk', filter=Q(status__in=['sent', 'received'])),
+            failed=Count('pk', filter=Q(status__in=['expired', 'cancelled'])),
+        )
+
+        metrics = {
+            'total_quote_requests_24h': requests['total'],
+            'successful_quote_requests_24h': requests['successful'],
+            'failed_quote_requests_24h': requests['failed'],
+            'total_quotes_received_24h': rollup['quotes_received'],
+            'average_response_time_hours': (
+                rollup['response_hours_total'] / rollup['responses_timed'] if rollup['responses_timed'] else 0
+            ),
+            'api_errors_24h': rollup['api_errors'],
+            'database_errors_24h': rollup['database_errors'],
+            'validation_errors_24h': rollup['validation_errors'],
+        }
+        for provider in PROVIDER_TYPES:
+            requested = rollup[f'{provider}_requests']
+            metrics[f'{provider}_success_rate'] = (
+                rollup[f'{provider}_quotes'] / requested * 100 if requested else 0
+            )
+        metrics.update(self.data_quality_metrics())
+        metrics.update(self.stage_latency_metrics(since))
+        return metrics
+
+    def update_rollup(self, now=None, rebuild: bool = False) -> int:
+        """
+        Roll up every hour from the last rolled up hour onwards.
+
+        The last hour is rescanned because it may have been open when it
+        was rolled up. Without a previous rollup, or with rebuild, the
+        window is rolled up from scratch.
+
+        Returns:
+            Number of hours written
+        """
+        now = now or timezone.now()
+        latest = None if rebuild else QuoteHealthRollup.objects.order_by('-bucket_start').first()
+        start = latest.bucket_start if latest else self.bucket_start(now - self.window)
+
+        buckets: Dict = {}
+
+        def bucket(start_time):
+            return buckets.setdefault(start_time, QuoteHealthRollup(bucket_start=start_time))
+
+        requests = PartQuoteRequest.objects.filter(request_date__gte=start).annotate(
+            bucket=TruncHour('request_date')
+        ).values('bucket').annotate(
+            total=Count('pk'),
+            **{provider: Count('pk', filter=Q(**{f'include_{provider}': True})) for provider in PROVIDER_TYPES}
+        ).order_by()
+        for row in requests:
+            rollup = bucket(row['bucket'])
+            rollup.quote_requests = row['total']
+            for provider in PROVIDER_TYPES:
+                setattr(rollup, f'{provider}_requests', row[provider])
+
+        response_time = ExpressionWrapper(
+            F('quote_date') - F('quote_request__dispatched_at'), output_field=DurationField()
+        )
+        quotes = PartQuote.objects.filter(quote_date__gte=start).annotate(
+            bucket=TruncHour('quote_date')
+        ).values('bucket', 'provider_type').annotate(
+            received=Count('pk'),
+            timed=Count('pk', filter=Q(quote_request__dispatched_at__isnull=False)),
+            response_total=Sum(response_time, filter=Q(quote_request__dispatched_at__isnull=False)),
+        ).order_by()
+        for row in quotes:
+            rollup = bucket(row['bucket'])
+            rollup.quotes_received += row['received']
+            rollup.responses_timed += row['timed']
+            if row['response_total'] is not None:
+                rollup.response_hours_total += row['response_total'].total_seconds() / 3600
+            if row['provider_type'] in PROVIDER_TYPES:
+                field = f"{row['provider_type']}_quotes"
+                setattr(rollup, field, getattr(rollup, field) + row['received'])
+
+        errors = QuoteSystemAuditLog.objects.filter(timestamp__gte=start, severity='error').annotate(
+            bucket=TruncHour('timestamp')
+        ).values('bucket', 'action_type').annotate(
+            errors=Count('pk'),
+            database=Count('pk', filter=Q(message__icontains='database')),
+        ).order_by()
+        for row in errors:
+            rollup = bucket(row['bucket'])
+            rollup.database_errors += row['database']
+            if row['action_type'] in API_ERROR_ACTIONS:
+                rollup.api_errors += row['errors']
+            elif row['action_type'] in VALIDATION_ERROR_ACTIONS:
+                rollup.validation_errors += row['errors']
+
+        # An hour whose rows have all gone is zeroed rather than left stale
+        for stale in QuoteHealthRollup.objects.filter(bucket_start__gte=start).values_list('bucket_start', flat=True):
+            bucket(stale)
+
+        QuoteHealthRollup.objects.bulk_create(
+            list(buckets.values()),
+            update_conflicts=True,
+            unique_fields=['bucket_start'],
+            update_fields=ROLLUP_COUNT_FIELDS + ['updated_at'],
+        )
+        logger.debug(f"Rolled up {len(buckets)} hour(s) of quote health data from {start}")
+        return len(buckets)
+
+    def data_quality_metrics(self) -> Dict:
+        """Market average confidence counts and the number of outlier quotes"""
+        totals = PartMarketAverage.objects.aggregate(
+            high=Count('pk', filter=Q(confidence_level__gte=70)),
+            low=Count('pk', filter=Q(confidence_level__lt=70)),
+            **({'outliers': Sum(JSONArrayLength('outlier_quotes'))} if supports_json_array_length() else {})
+        )
+        if 'outliers' in totals:
+            outliers = totals['outliers'] or 0
+        else:
+            outliers = sum(
+                len(value) for value in PartMarketAverage.objects.values_list('outlier_quotes', flat=True).iterator()
+                if isinstance(value, list)
+            )
+        return {
+            'high_confidence_market_averages': totals['high'],
+            'low_confidence_market_averages': totals['low'],
+            'outlier_quotes_detected': outliers,
+        }
+
+    def stage_latency_metrics(self, since) -> Dict:
+        """
+        Average, p50, p95 and p99 seconds of each pipeline stage.
+
+        The hourly histograms overlapping the window are merged, so the
+        percentiles are as precise as a histogram bucket (about 3%).
+        """
+        merged = {stage: {'counts': {}, 'calls': 0, 'total': 0, 'max': 0} for stage in STAGES}
+        rows = QuoteStageLatencyRollup.objects.filter(bucket_start__gte=self.bucket_start(since)).values_list(
+            'stage', 'bucket_counts', 'call_count', 'total_microseconds', 'max_microseconds'
+        ).order_by()
+        for stage, bucket_counts, calls, total, maximum in rows:
+            if stage not in merged:
+                continue
+            stage_totals = merged[stage]
+            for index, count in bucket_counts.items():
+                stage_totals['counts'][int(index)] = stage_totals['counts'].get(int(index), 0) + count
+            stage_totals['calls'] += calls
+            stage_totals['total'] += total
+            stage_totals['max'] = max(stage_totals['max'], maximum)
+
+        metrics = {}
+        for stage, stage_totals in merged.items():
+            p50, p95, p99 = percentiles(stage_totals['counts'], [0.5, 0.95, 0.99], stage_totals['max'])
+            average = stage_totals['total'] / stage_totals['calls'] if stage_totals['calls'] else 0
+            metrics.update({
+                f'{stage}_p50_seconds': p50 / 1_000_000,
+                f'{stage}_p95_seconds': p95 / 1_000_000,
+                f'{stage}_p99_seconds': p99 / 1_000_000,
+            })
+            metrics[f'average_{stage}_time_seconds'] = average / 1_000_000
+        return metrics
+
+    @staticmethod
+    def bucket_start(moment):
+        """Start of the hour a moment falls in"""
+        return moment.replace(minute=0, second=0, microsecond=0)
@@ -8,7 +8,9 @@ and generates recommendations with reasoning.
 
 from typing import Dict, List, Tuple, Optional
 from decimal import Decimal
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import numpy as np
+from .latency import timed
 from .models import PartQuote, DamagedPart, AssessmentQuoteSummary
 
 
@@ -35,6 +37,120 @@ class RecommendationResult:
     confidence_level: int
 
 
+@dataclass
+class QuoteScoreMatrix:
+    """
+    Scores for every validated quote of an assessment, grouped by part.
+    
+    Quotes are ordered by (damaged_part_id, total_cost, id) so that each
+    part's quotes form a contiguous slice starting at ``starts[i]``.
+    """
+    quotes: List[Dict]
+    part_ids: np.ndarray
+    starts: np.ndarray
+    counts: np.ndarray
+    group: np.ndarray
+    total_cost: np.ndarray
+    completion_days: np.ndarray
+    price: np.ndarray
+    quality: np.ndarray
+    timeline: np.ndarray
+    warranty: np.ndarray
+    reliability: np.ndarray
+    total: np.ndarray
+    
+    def __len__(self):
+        return len(self.quotes)
+    
+    def pick(self, key: np.ndarray) -> np.ndarray:
+        """Index of the quote with the lowest ``key`` within each part (stable on ties)."""
+        order = np.lexsort((key, self.group))
+        return order[self.starts]
+    
+    def group_max(self, values: np.ndarray) -> np.ndarray:
+        return np.maximum.reduceat(values, self.starts)
+    
+    def group_min(self, values: np.ndarray) -> np.ndarray:
+        return np.minimum.reduceat(values, self.starts)
+    
+    def group_mean(self, values: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(values, self.starts) / self.counts
+
+
+@dataclass
+class AssessmentRecommendation:
+    """Assessment-level recommendation built from a QuoteScoreMatrix"""
+    assessment_id: str
+    strategy: str
+    matrix: QuoteScoreMatrix
+    selections: Dict[str, np.ndarray]
+    confidence_levels: np.ndarray
+    parts_without_quotes: List[int] = field(default_factory=list)
+    
+    def reasoning_for(self, index: int, engine: 'QuoteRecommendationEngine') -> str:
+        """Build score reasoning for a single quote on demand."""
+        m = self.matrix
+        return engine._generate_score_reasoning(
+            None, m.price[index], m.quality[index], m.timeline[index],
+            m.warranty[index], m.reliability[index], m.total[index]
+        )
+    
+    def strategy_summary(self, strategy: str) -> Dict:
+        picks = self.selections[strategy]
+        return {
+            'total_cost': float(self.matrix.total_cost[picks].sum()),
+            'max_completion_days': int(self.matrix.completion_days[picks].max()),
+            'quote_ids': [self.matrix.quotes[i]['id'] for i in picks],
+        }
+    
+    def to_dict(self, engine: 'QuoteRecommendationEngine',
+                include_reasoning: bool = True) -> Dict:
+        """JSON-serialisable representation used by the API."""
+        m = self.matrix
+        picks = self.selections[self.strategy]
+        max_costs = m.group_max(m.total_cost)
+        
+        parts = []
+        provider_mix = {}
+        for group_index, quote_index in enumerate(picks):
+            quote = m.quotes[quote_index]
+            cost = float(m.total_cost[quote_index])
+            part = {
+                'part_id': quote['damaged_part_id'],
+                'part_name': quote['damaged_part__part_name'],
+                'quote_id': quote['id'],
+                'provider_name': quote['provider_name'],
+                'provider_type': quote['provider_type'],
+                'total_cost': cost,
+                'quote_count': int(m.counts[group_index]),
+                'score': round(float(m.total[quote_index]), 1),
+                'potential_savings': float(max_costs[group_index]) - cost,
+                'confidence_level': int(self.confidence_levels[group_index]),
+            }
+            if include_reasoning:
+                part['reasoning'] = self.reasoning_for(quote_index, engine)
+            parts.append(part)
+            
+            mix = provider_mix.setdefault(quote['provider_type'], {'parts': 0, 'total_cost': 0.0})
+            mix['parts'] += 1
+            mix['total_cost'] += cost
+        
+        recommended = self.strategy_summary(self.strategy)
+        return {
+            'assessment_id': self.assessment_id,
+            'strategy': self.strategy,
+            'parts': parts,
+            'provider_mix': provider_mix,
+            'total_cost': recommended['total_cost'],
+            'potential_savings': float(max_costs.sum()) - recommended['total_cost'],
+            'alternative_strategies': {
+                name: self.strategy_summary(name)
+                for name in self.selections if name != self.strategy
+            },
+            'parts_without_quotes': self.parts_without_quotes,
+        }
+
+
 class QuoteRecommendationEngine:
     """
     Intelligent quote recommendation engine that evaluates quotes based on
@@ -50,6 +166,39 @@ class QuoteRecommendationEngine:
         'reliability': 0.10 # 10% weight on reliability
     }
     
+    # Lookup tables shared by the scalar and vectorised scorers
+    PART_TYPE_QUALITY = {
+        'oem': 100,
+        'oem_equivalent': 85,
+        'aftermarket_premium': 75,
+        'aftermarket_standard': 60,
+        'used_oem': 70,
+        'refurbished': 55,
+        'generic': 40
+    }
+    PROVIDER_QUALITY = {
+        'dealer': 90,
+        'assessor': 85,
+        'network': 80,
+        'independent': 70
+    }
+    PROVIDER_RELIABILITY = {
+        'dealer': 95,
+        'assessor': 90,
+        'network': 85,
+        'independent': 75
+    }
+    
+    STRATEGIES = ('best_value', 'lowest_price', 'fastest_completion', 'highest_quality')
+    
+    # Columns loaded for assessment-level scoring
+    QUOTE_COLUMNS = (
+        'id', 'damaged_part_id', 'damaged_part__part_name', 'provider_name',
+        'provider_type', 'total_cost', 'part_type', 'estimated_delivery_days',
+        'estimated_completion_days', 'part_warranty_months', 'labor_warranty_months',
+        'confidence_score', 'part_number_quoted', 'part_manufacturer', 'notes',
+    )
+    
     def __init__(self, weights: Optional[Dict[str, float]] = None):
         """
         Initialize the recommendation engine with custom weights if provided.
@@ -172,25 +321,10 @@ class QuoteRecommendationEngine:
         base_score = 50.0
         
         # Part type scoring
-        part_type_scores = {
-            'oem': 100,
-            'oem_equivalent': 85,
-            'aftermarket_premium': 75,
-            'aftermarket_standard': 60,
-            'used_oem': 70,
-            'refurbished': 55,
-            'generic': 40
-        }
-        part_score = part_type_scores.get(quote.part_type, 50)
+        part_score = self.PART_TYPE_QUALITY.get(quote.part_type, 50)
         
         # Provider type scoring
-        provider_type_scores = {
-            'dealer': 90,
-            'assessor': 85,
-            'network': 80,
-            'independent': 70
-        }
-        provider_score = provider_type_scores.get(quote.provider_type, 60)
+        provider_score = self.PROVIDER_QUALITY.get(quote.provider_type, 60)
         
         # Confidence score (already 0-100)
         confidence_score = quote.confidence_score
@@ -284,13 +418,7 @@ class QuoteRecommendationEngine:
         base_score = 70.0
         
         # Provider type reliability
-        provider_reliability = {
-            'dealer': 95,
-            'assessor': 90,
-            'network': 85,
-            'independent': 75
-        }
-        provider_score = provider_reliability.get(quote.provider_type, 70)
+        provider_score = self.PROVIDER_RELIABILITY.get(quote.provider_type, 70)
         
         # Quote completeness bonus
         completeness_bonus = 0
@@ -308,6 +436,7 @@ class QuoteRecommendationEngine:
         
         return min(100.0, reliability_score)
     
+    @timed('recommendation')
     def generate_recommendation(self, damaged_part: DamagedPart) -> RecommendationResult:
         """
         Generate comprehensive recommendation for a damaged part.
@@ -365,6 +494,185 @@ class QuoteRecommendationEngine:
             confidence_level=confidence_level
         )
     
+    def generate_assessment_recommendations(self, assessment, strategy: str = 'best_value',
+                                            include_reasoning: bool = True) -> Dict:
+        """
+        Generate recommendations for every damaged part of an assessment.
+        
+        Args:
+            assessment: VehicleAssessment to generate recommendations for
+            strategy: One of ``STRATEGIES`` used to pick each part's quote
+            include_reasoning: Build per-part reasoning text
+            
+        Returns:
+            JSON-serialisable dictionary with the recommended provider mix,
+            totals and alternative strategies
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        
+        recommendation = self.build_assessment_recommendation(assessment, strategy)
+        if recommendation is None:
+            return {
+                'assessment_id': assessment.assessment_id,
+                'strategy': strategy,
+                'parts': [],
+                'provider_mix': {},
+                'total_cost': 0.0,
+                'potential_savings': 0.0,
+                'alternative_strategies': {},
+                'parts_without_quotes': list(
+                    assessment.damaged_parts.values_list('id', flat=True)
+                ),
+                'reasoning': "No validated quotes available for recommendation.",
+            }
+        
+        return recommendation.to_dict(self, include_reasoning=include_reasoning)
+    
+    def build_assessment_recommendation(self, assessment,
+                                        strategy: str = 'best_value') -> Optional[AssessmentRecommendation]:
+        """
+        Score all validated quotes of an assessment and pick one per part.
+        
+        Returns:
+            AssessmentRecommendation, or None when no part has validated quotes
+        """
+        quotes = list(
+            PartQuote.objects.filter(
+                damaged_part__assessment=assessment, status='validated'
+            ).order_by('damaged_part_id', 'total_cost', 'id').values(*self.QUOTE_COLUMNS)
+        )
+        if not quotes:
+            return None
+        
+        matrix = self.score_quote_matrix(quotes)
+        
+        selections = {
+            'best_value': matrix.pick(-matrix.total),
+            'lowest_price': matrix.pick(matrix.total_cost),
+            'fastest_completion': matrix.pick(matrix.completion_days),
+            'highest_quality': matrix.pick(-matrix.quality),
+        }
+        
+        quoted_part_ids = set(matrix.part_ids[matrix.starts].tolist())
+        parts_without_quotes = [
+            part_id for part_id in assessment.damaged_parts.values_list('id', flat=True)
+            if part_id not in quoted_part_ids
+        ]
+        
+        return AssessmentRecommendation(
+            assessment_id=assessment.assessment_id,
+            strategy=strategy,
+            matrix=matrix,
+            selections=selections,
+            confidence_levels=self._vector_confidence_levels(matrix, quotes),
+            parts_without_quotes=parts_without_quotes,
+        )
+    
+    def score_quote_matrix(self, quotes: List[Dict]) -> QuoteScoreMatrix:
+        """
+        Vectorised equivalent of ``calculate_provider_scores`` for many parts.
+        
+        Args:
+            quotes: Quote value dictionaries (``QUOTE_COLUMNS``) sorted by
+                damaged_part_id
+                
+        Returns:
+            QuoteScoreMatrix with per-criterion score arrays
+        """
+        n = len(quotes)
+        part_ids = np.fromiter((q['damaged_part_id'] for q in quotes), dtype=np.int64, count=n)
+        starts = np.flatnonzero(np.r_[True, part_ids[1:] != part_ids[:-1]])
+        counts = np.diff(np.r_[starts, n])
+        group = np.repeat(np.arange(len(starts)), counts)
+        
+        def column(name, dtype=np.float64):
+            return np.fromiter((q[name] for q in quotes), dtype=dtype, count=n)
+        
+        def per_group(reduce, values):
+            return reduce.reduceat(values, starts)[group]
+        
+        cost = column('total_cost')
+        delivery = column('estimated_delivery_days')
+        completion = column('estimated_completion_days')
+        confidence = column('confidence_score')
+        
+        # Price: lower cost within the part scores higher
+        min_cost = per_group(np.minimum, cost)
+        max_cost = per_group(np.maximum, cost)
+        avg_cost = (np.add.reduceat(cost, starts) / counts)[group]
+        spread = max_cost - min_cost
+        normalized = np.where(spread > 0, 1.0 - (cost - min_cost) / np.where(spread > 0, spread, 1.0), 1.0)
+        normalized = np.where(
+            (spread > 0) & (cost < avg_cost * 0.9), np.minimum(1.0, normalized * 1.1), normalized
+        )
+        price = normalized * 100
+        
+        # Quality: part type, provider type and confidence
+        part_quality = np.fromiter(
+            (self.PART_TYPE_QUALITY.get(q['part_type'], 50) for q in quotes), dtype=np.float64, count=n
+        )
+        provider_quality = np.fromiter(
+            (self.PROVIDER_QUALITY.get(q['provider_type'], 60) for q in quotes), dtype=np.float64, count=n
+        )
+        quality = np.minimum(100.0, part_quality * 0.5 + provider_quality * 0.3 + confidence * 0.2)
+        
+        # Timeline: delivery and completion relative to the part's fastest quote
+        def relative_speed(days):
+            fastest = per_group(np.minimum, days)
+            average = (np.add.reduceat(days, starts) / counts)[group]
+            gap = average - fastest
+            scaled = np.maximum(0, 100 - (days - fastest) / np.where(gap > 0, gap, 1.0) * 50)
+            return np.where(gap > 0, scaled, np.where(days == fastest, 100.0, 90.0))
+        
+        timeline = relative_speed(delivery) * 0.6 + relative_speed(completion) * 0.4
+        
+        # Warranty: 24 months part / 12 months labour earn full marks
+        warranty = (
+            np.minimum(100, column('part_warranty_months') / 12 * 50) * 0.7 +
+            np.minimum(100, column('labor_warranty_months') / 6 * 50) * 0.3
+        )
+        
+        # Reliability: provider type plus completeness, scaled by confidence
+        provider_reliability = np.fromiter(
+            (self.PROVIDER_RELIABILITY.get(q['provider_type'], 70) for q in quotes), dtype=np.float64, count=n
+        )
+        completeness = np.fromiter(
+            (5 * (bool(q['part_number_quoted']) + bool(q['part_manufacturer']) + bool(q['notes']))
+             for q in quotes),
+            dtype=np.float64, count=n
+        )
+        reliability = np.minimum(100.0, (provider_reliability + completeness) * (confidence / 100))
+        
+        total = (
+            price * self.weights['price'] +
+            quality * self.weights['quality'] +
+            timeline * self.weights['timeline'] +
+            warranty * self.weights['warranty'] +
+            reliability * self.weights['reliability']
+        )
+        
+        return QuoteScoreMatrix(
+            quotes=quotes, part_ids=part_ids, starts=starts, counts=counts, group=group,
+            total_cost=cost, completion_days=completion, price=price, quality=quality,
+            timeline=timeline, warranty=warranty, reliability=reliability, total=total,
+        )
+    
+    def _vector_confidence_levels(self, matrix: QuoteScoreMatrix, quotes: List[Dict]) -> np.ndarray:
+        """Vectorised ``_calculate_confidence_level`` for each part."""
+        counts = matrix.counts
+        score_range = matrix.group_max(matrix.total) - matrix.group_min(matrix.total)
+        avg_confidence = matrix.group_mean(
+            np.fromiter((q['confidence_score'] for q in quotes), dtype=np.float64, count=len(quotes))
+        )
+        
+        confidence = np.minimum(80, 40 + counts * 10)
+        confidence = confidence + np.where(score_range > 20, 10, np.where(score_range < 5, -10, 0))
+        confidence = confidence + np.where(avg_confidence >= 80, 5, np.where(avg_confidence < 60, -5, 0))
+        confidence = np.clip(confidence, 30, 95)
+        
+        return np.where(counts < 2, 50, confidence)
+    
     def _generate_alternative_strategies(self, quotes: List[PartQuote], 
                                        scores: Dict[int, QuoteScore]) -> Dict[str, List[PartQuote]]:
         """Generate alternative recommendation strategies"""
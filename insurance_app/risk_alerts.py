@@ -0,0 +1,224 @@
+"""
+Set-based creation of RiskAlerts.
+
+The alert tasks used to loop over every vehicle or schedule, running an
+existence query per candidate before creating each alert. The functions
+here find the candidates and exclude those with an open alert in one
+query, read it a chunk of vehicles at a time with keyset_iterator and
+bulk_create the alerts in batches, so memory stays bounded however many
+vehicles there are. The chunks are keyed on the columns the window
+functions partition by, so every chunk sees whole partitions.
+
+Alerts with an alert_key are also guarded by the partial unique constraint
+on (vehicle, alert_key) over open alerts, so overlapping runs of a task
+cannot create the same open alert twice.
+"""
+
+import logging
+from typing import Iterable
+
+from django.db.models import (
+    Case, CharField, DateField, Exists, F, Func, IntegerField, OuterRef, Q, Value, When, Window,
+)
+from django.db.models.expressions import TemporalSubtraction
+from django.db.models.functions import Cast, Concat, ExtractDay, Lag, RowNumber
+from django.utils import timezone
+
+from .batching import batches, keyset_iterator
+from .models import MaintenanceSchedule, RiskAlert, VehicleConditionScore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+DETERIORATION_THRESHOLD = 10
+OVERDUE_CRITICAL_DAYS = 30
+OVERDUE_IMPACT_PER_DAY = 0.1
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 1000000
+
+MAINTENANCE_NAMES = dict(MaintenanceSchedule.MAINTENANCE_TYPES)
+
+
+class DaysBetween(Func):
+    """Whole days from the second date expression to the first"""
+    arity = 2
+    output_field = IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # Other backends use Django's temporal subtraction, an interval where
+        # durations are native and a number of microseconds elsewhere
+        difference = TemporalSubtraction(*self.get_source_expressions())
+        if connection.features.has_native_duration_field:
+            days = ExtractDay(difference)
+        else:
+            days = Cast(difference / Value(MICROSECONDS_PER_DAY), output_field=IntegerField())
+        return compiler.compile(days)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # date - date is an integer number of days
+        return Func.as_sql(self, compiler, connection, template='(%(expressions)s)', arg_joiner=' - ')
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return Func.as_sql(
+            self, compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)', arg_joiner=') - julianday(',
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return Func.as_sql(self, compiler, connection, template='DATEDIFF(%(expressions)s)', arg_joiner=', ')
+
+
+def open_alerts(alert_type: str):
+    """Unresolved alerts of a type for the outer query's vehicle_id"""
+    return RiskAlert.objects.filter(vehicle_id=OuterRef('vehicle_id'), alert_type=alert_type, is_resolved=False)
+
+
+def deteriorated_vehicles(threshold: float = DETERIORATION_THRESHOLD):
+    """
+    Latest condition score of every vehicle whose score dropped by more
+    than threshold since the previous one, without an open
+    condition_deterioration alert.
+
+    The previous score comes from Lag over each vehicle's scores and the
+    latest score is picked with RowNumber, both in the same query. Scores
+    on the same date are ordered by id.
+
+    Returns:
+        values() queryset with vehicle_id, overall_score, previous_score,
+        year, make and model
+    """
+    by_vehicle = [F('vehicle_id')]
+    return VehicleConditionScore.objects.annotate(
+        previous_score=Window(
+            Lag('overall_score'), partition_by=by_vehicle, order_by=[F('assessment_date').asc(), F('pk').asc()]
+        ),
+        recency=Window(
+            RowNumber(), partition_by=by_vehicle, order_by=[F('assessment_date').desc(), F('pk').desc()]
+        ),
+    ).filter(
+        recency=1,
+        previous_score__gt=F('overall_score') + threshold,
+    ).exclude(
+        Exists(open_alerts('condition_deterioration'))
+    ).values(
+        'vehicle_id',
+        'overall_score',
+        'previous_score',
+        year=F('vehicle__vehicle__manufacture_year'),
+        make=F('vehicle__vehicle__make'),
+        model=F('vehicle__vehicle__model'),
+    ).order_by()
+
+
+def overdue_maintenance(today=None):
+    """
+    Overdue, uncompleted maintenance schedules without an open
+    maintenance_overdue alert for their vehicle and maintenance type.
+
+    Days overdue, severity and risk impact are computed in the query:
+    schedules more than OVERDUE_CRITICAL_DAYS overdue or of critical
+    priority are critical, the rest high. When a vehicle has several
+    overdue schedules of a type only the most overdue one is returned.
+
+    Returns:
+        values() queryset with vehicle_id, maintenance_type, alert_key,
+        days_overdue, severity and risk_score_impact
+    """
+    today = today or timezone.now().date()
+    overdue = MaintenanceSchedule.objects.filter(is_completed=False, scheduled_date__lt=today).annotate(
+        alert_key=Concat(Value('maintenance_overdue:'), 'maintenance_type', output_field=CharField()),
+        days_overdue=DaysBetween(Value(today, output_field=DateField()), F('scheduled_date')),
+        rank=Window(
+            RowNumber(),
+            partition_by=[F('vehicle_id'), F('maintenance_type')],
+            order_by=[F('scheduled_date').asc(), F('pk').asc()],
+        ),
+    )
+    return overdue.annotate(
+        severity=Case(
+            When(Q(days_overdue__gt=OVERDUE_CRITICAL_DAYS) | Q(priority_level='critical'), then=Value('critical')),
+            default=Value('high'),
+            output_field=CharField(),
+        ),
+        risk_score_impact=F('days_overdue') * Value(OVERDUE_IMPACT_PER_DAY),
+    ).filter(
+        rank=1,
+    ).exclude(
+        Exists(open_alerts('maintenance_overdue').filter(alert_key=OuterRef('alert_key')))
+    ).values(
+        'vehicle_id', 'maintenance_type', 'alert_key', 'days_overdue', 'severity', 'risk_score_impact',
+    ).order_by()
+
+
+def overdue_maintenance_alert(row) -> RiskAlert:
+    """Unsaved alert for a row of overdue_maintenance()"""
+    name = MAINTENANCE_NAMES.get(row['maintenance_type'], row['maintenance_type'])
+    return RiskAlert(
+        vehicle_id=row['vehicle_id'],
+        alert_type='maintenance_overdue',
+        alert_key=row['alert_key'],
+        severity=row['severity'],
+        title=f'Overdue Maintenance: {name}',
+        description=f"{name} overdue by {row['days_overdue']} days",
+        risk_score_impact=row['risk_score_impact'],
+    )
+
+
+def create_overdue_maintenance_alerts(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Create a maintenance_overdue alert for every vehicle and maintenance
+    type with overdue schedules and no open alert.
+
+    Alerts another run inserted meanwhile are skipped by the unique
+    constraint on open alert keys rather than duplicated.
+
+    Returns:
+        Number of alerts created
+    """
+    rows = keyset_iterator(overdue_maintenance(), batch_size, key=('vehicle_id', 'maintenance_type'))
+    return bulk_create_alerts((overdue_maintenance_alert(row) for row in rows), batch_size, ignore_conflicts=True)
+
+
+def deterioration_alert(row) -> RiskAlert:
+    """Unsaved alert for a row of deteriorated_vehicles()"""
+    previous_score, latest_score = row['previous_score'], row['overall_score']
+    return RiskAlert(
+        vehicle_id=row['vehicle_id'],
+        alert_type='condition_deterioration',
+        severity='medium',
+        title=f"Condition Deterioration: {row['year']} {row['make']} {row['model']}",
+        description=f'Vehicle health index dropped from {previous_score} to {latest_score}',
+        risk_score_impact=abs(previous_score - latest_score) * 0.05,
+    )
+
+
+def create_deterioration_alerts(threshold: float = DETERIORATION_THRESHOLD,
+                                batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Create a condition_deterioration alert for every vehicle whose latest
+    condition score dropped by more than threshold points and that has no
+    open alert of that type.
+
+    Returns:
+        Number of alerts created
+    """
+    rows = keyset_iterator(deteriorated_vehicles(threshold), batch_size, key=('vehicle_id',))
+    return bulk_create_alerts((deterioration_alert(row) for row in rows), batch_size)
+
+
+def bulk_create_alerts(alerts: Iterable[RiskAlert], batch_size: int = DEFAULT_BATCH_SIZE,
+                       ignore_conflicts: bool = False) -> int:
+    """
+    Insert alerts batch_size at a time without holding them all in memory.
+
+    With ignore_conflicts, alerts that violate a unique constraint are
+    skipped and each batch's inserted alerts are counted by primary key.
+    """
+    created = 0
+    for batch in batches(alerts, max(1, batch_size)):
+        RiskAlert.objects.bulk_create(batch, ignore_conflicts=ignore_conflicts)
+        if ignore_conflicts:
+            created += RiskAlert.objects.filter(pk__in=[alert.pk for alert in batch]).count()
+        else:
+            created += len(batch)
+    logger.debug(f"Created {created} risk alerts")
+    return created
@@ -0,0 +1,255 @@
+"""
+Streaming risk assessment report for every insured vehicle.
+
+The report used to run several COUNT queries per vehicle and build every
+row in a list before writing it. Here every column is computed in one
+query: the counts, the latest condition score and the current mileage are
+correlated subqueries annotated on the vehicle queryset. That query is
+read through keyset_iterator, a chunk of vehicles at a time, and each
+chunk is appended to the CSV or JSON file before the next is read; the
+JSON total therefore follows the vehicle list.
+
+With more than one worker the vehicles are split into contiguous id
+ranges, each written to a part file by a forked process, and the parts
+are joined into the report in id order. The logging pipeline and the
+audit sink reset themselves in forked children, and each worker flushes
+its log records before it exits.
+"""
+
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import connections
+from django.db.models import Count, F, FloatField, IntegerField, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from maintenance_history.models import InitialInspection, Inspection, MaintenanceRecord
+from notifications.logging_pipeline import get_logging_pipeline
+from .batching import keyset_iterator
+from .models import Accident, MaintenanceSchedule, RiskAlert, Vehicle, VehicleConditionScore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+RECENT_ACCIDENT_DAYS = 365
+
+REPORT_FORMATS = ('csv', 'json')
+
+REPORT_COLUMNS = (
+    'policy_number', 'vin', 'make', 'model', 'year', 'mileage', 'risk_score', 'health_index',
+    'compliance_rate', 'critical_compliance', 'overdue_maintenance', 'recent_accidents',
+    'condition_score', 'active_alerts', 'last_inspection',
+)
+
+IdRange = Tuple[int, int]
+
+
+def _count(queryset):
+    """Number of rows of queryset for the outer vehicle, 0 when there are none"""
+    counts = queryset.filter(vehicle_id=OuterRef('pk')).order_by().values('vehicle_id').annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _latest(queryset, column: str, *ordering: str):
+    """column of the newest row of queryset for the outer vehicle"""
+    return Subquery(queryset.order_by(*ordering).values(column)[:1])
+
+
+def current_mileage():
+    """
+    Expression for vehicles.Vehicle.current_mileage of the outer insured
+    vehicle: the latest maintenance record's mileage, else the latest
+    inspection form's, else the latest initial inspection's.
+    """
+    vehicle = OuterRef('vehicle_id')
+    return Coalesce(
+        NullIf(_latest(MaintenanceRecord.objects.filter(vehicle_id=vehicle), 'mileage', '-date_performed'), 0),
+        NullIf(_latest(
+            Inspection.objects.filter(vehicle_id=vehicle), 'inspections_form__mileage_at_inspection', '-inspection_date'
+        ), 0),
+        NullIf(_latest(
+            InitialInspection.objects.filter(vehicle_id=vehicle), 'mileage_at_inspection', '-inspection_date'
+        ), 0),
+        output_field=IntegerField(),
+    )
+
+
+def report_queryset(id_range: Optional[IdRange] = None):
+    """
+    One query for every report column of every insured vehicle.
+
+    Args:
+        id_range: Inclusive (first, last) vehicle id range to report on
+
+    Returns:
+        values() queryset ordered by vehicle id, with pk, the
+        REPORT_COLUMNS and last_inspection still None for vehicles never
+        inspected
+    """
+    now = timezone.now()
+    vehicles = Vehicle.objects.all()
+    if id_range is not None:
+        vehicles = vehicles.filter(pk__range=id_range)
+    return vehicles.annotate(
+        overdue_maintenance=_count(
+            MaintenanceSchedule.objects.filter(is_completed=False, scheduled_date__lt=now.date())
+        ),
+        recent_accidents=_count(
+            Accident.objects.filter(accident_date__gte=now - timedelta(days=RECENT_ACCIDENT_DAYS))
+        ),
+        active_alerts=_count(RiskAlert.objects.filter(is_resolved=False)),
+        condition_score=Coalesce(
+            _latest(
+                VehicleConditionScore.objects.filter(vehicle_id=OuterRef('pk')),
+                'overall_score', '-assessment_date', '-pk',
+            ),
+            Value(0.0),
+            output_field=FloatField(),
+        ),
+        mileage=current_mileage(),
+    ).values(
+        'pk', 'overdue_maintenance', 'recent_accidents', 'active_alerts', 'condition_score', 'mileage', 'risk_score',
+        policy_number=F('policy__policy_number'),
+        vin=F('vehicle__vin'),
+        make=F('vehicle__make'),
+        model=F('vehicle__model'),
+        year=F('vehicle__manufacture_year'),
+        health_index=F('vehicle_health_index'),
+        compliance_rate=Coalesce(F('compliance__overall_compliance_rate'), Value(0.0), output_field=FloatField()),
+        critical_compliance=Coalesce(
+            F('compliance__critical_maintenance_compliance'), Value(0.0), output_field=FloatField()
+        ),
+        last_inspection=F('last_inspection_date'),
+    ).order_by('pk')
+
+
+def iter_report_rows(id_range: Optional[IdRange] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield report rows in REPORT_COLUMNS order, chunk_size rows fetched at a time"""
+    for row in keyset_iterator(report_queryset(id_range), chunk_size):
+        row = {column: row[column] for column in REPORT_COLUMNS}
+        if row['last_inspection'] is None:
+            row['last_inspection'] = 'Never'
+        yield row
+
+
+def write_csv_rows(rows: Iterable[dict], output: IO[str]) -> int:
+    """Write rows as CSV lines without a header; returns the number written"""
+    writer = csv.DictWriter(output, fieldnames=REPORT_COLUMNS)
+    written = 0
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+    return written
+
+
+def write_json_rows(rows: Iterable[dict], output: IO[str]) -> int:
+    """Write rows as comma-separated JSON array elements; returns the number written"""
+    written = 0
+    for row in rows:
+        if written:
+            output.write(',\n')
+        output.write('    ' + json.dumps(row, default=str))
+        written += 1
+    return written
+
+
+ROW_WRITERS = {'csv': write_csv_rows, 'json': write_json_rows}
+
+
+def vehicle_id_ranges(parts: int) -> List[IdRange]:
+    """
+    Split the vehicle ids into up to parts contiguous, inclusive ranges of
+    equal width.
+    """
+    bounds = Vehicle.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return []
+    first, last = bounds['first'], bounds['last']
+    width = max(1, -(-(last - first + 1) // max(1, parts)))
+    return [(start, min(start + width - 1, last)) for start in range(first, last + 1, width)]
+
+
+def write_report(filename: str, output_format: str = 'csv', workers: int = 1,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Write the risk report for every insured vehicle.
+
+    Args:
+        filename: Report file to write
+        output_format: 'csv' or 'json'
+        workers: Processes writing id ranges of the fleet in parallel
+        chunk_size: Rows fetched from the database at a time
+
+    Returns:
+        Number of vehicles reported
+    """
+    if output_format not in REPORT_FORMATS:
+        raise ValueError(f"Unsupported report format: {output_format}")
+
+    with open(filename, 'w', newline='') as output:
+        if output_format == 'csv':
+            csv.writer(output).writerow(REPORT_COLUMNS)
+        else:
+            output.write('{\n  "generated_at": %s,\n  "vehicles": [\n' % json.dumps(datetime.now().isoformat()))
+
+        if workers > 1:
+            total = _write_parts(filename, output, output_format, workers, chunk_size)
+        else:
+            total = ROW_WRITERS[output_format](iter_report_rows(chunk_size=chunk_size), output)
+
+        if output_format == 'json':
+            # The total is only known once the rows are written, so it
+            # follows them
+            output.write('\n  ],\n  "total_vehicles": %d\n}\n' % total)
+    return total
+
+
+def _write_parts(filename: str, output: IO[str], output_format: str, workers: int, chunk_size: int) -> int:
+    ranges = vehicle_id_ranges(workers)
+    part_names = [f'{filename}.part{number}' for number in range(len(ranges))]
+    # Forked workers must open their own database connections
+    connections.close_all()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            counts = list(pool.map(
+                _write_part, ranges, part_names, [output_format] * len(ranges), [chunk_size] * len(ranges)
+            ))
+
+        written = 0
+        for part_name, count in zip(part_names, counts):
+            if not count:
+                continue
+            if written and output_format == 'json':
+                output.write(',\n')
+            with open(part_name, newline='') as part:
+                shutil.copyfileobj(part, output)
+            written += count
+        return written
+    finally:
+        for part_name in part_names:
+            if os.path.exists(part_name):
+                os.remove(part_name)
+
+
+def _write_part(id_range: IdRange, part_name: str, output_format: str, chunk_size: int) -> int:
+    try:
+        with open(part_name, 'w', newline='') as part:
+            written = ROW_WRITERS[output_format](iter_report_rows(id_range, chunk_size), part)
+        logger.debug(f"Wrote {written} vehicles with ids {id_range[0]}-{id_range[1]} to {part_name}")
+        return written
+    finally:
+        connections.close_all()
+        # Pool workers leave through os._exit, which skips the atexit stop
+        pipeline = get_logging_pipeline()
+        if pipeline is not None:
+            pipeline.flush()
@@ -0,0 +1,282 @@
+"""
+Set-based synchronisation of maintenance app schedules into insurance
+maintenance schedules.
+
+MaintenanceSyncManager synced a vehicle by looking up the insurance
+schedule of every ScheduledMaintenance in turn and mapping task names and
+priorities in Python for each one it created. Here the mappings are
+compiled once into Case/When expressions, so the database computes every
+field of the new schedules:
+
+1. Scheduled maintenance without an insurance schedule is found with one
+   anti-join on the insurance_schedules relation and read together with
+   its mapped fields and the insured vehicle it belongs to. The schedules
+   are inserted with bulk_create, a batch at a time. Scheduled maintenance
+   of vehicles without insurance is skipped.
+2. Linked insurance schedules whose completion no longer agrees with the
+   maintenance app are corrected with two UPDATE statements.
+
+bulk_create and update() do not send post_save, so the vehicles whose
+schedules changed are marked for the next incremental compliance run
+explicitly.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+from django.db import transaction
+from django.db.models import (
+    Case, CharField, Count, F, IntegerField, OuterRef, Q, Subquery, TextField, Value, When,
+)
+from django.db.models.functions import Coalesce, Lower, NullIf
+from django.db.models.lookups import Contains
+
+from maintenance.models import ScheduledMaintenance
+from .compliance import mark_compliance_dirty
+from .models import MaintenanceSchedule, Vehicle
+from .utils import MaintenanceSyncManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+
+# Scheduled maintenance fields read for each new insurance schedule
+SCHEDULE_FIELDS = (
+    'pk', 'insured_vehicle_id', 'mapped_type', 'mapped_priority', 'due_date', 'mapped_due_mileage',
+    'mapped_description', 'status', 'completed_date',
+)
+
+
+@dataclass
+class ScheduleSyncResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+
+def maintenance_type_case() -> Case:
+    """
+    Case expression for MaintenanceSyncManager's task name to maintenance
+    type mapping: an exact name match first, then the first mapping whose
+    name contains the task name or is contained in it, ignoring case, else
+    'other'.
+    """
+    mapping = MaintenanceSyncManager.get_maintenance_type_mapping()
+    whens = [When(task__name=name, then=Value(maintenance_type)) for name, maintenance_type in mapping.items()]
+    for name, maintenance_type in mapping.items():
+        whens.append(When(task__name__icontains=name, then=Value(maintenance_type)))
+        whens.append(When(Contains(Value(name.lower()), Lower('task__name')), then=Value(maintenance_type)))
+    return Case(*whens, default=Value('other'), output_field=CharField())
+
+
+def priority_case() -> Case:
+    """
+    Case expression for MaintenanceSyncManager.determine_insurance_priority:
+    overdue maintenance is raised one level, safety-critical tasks of low
+    or medium priority become high.
+    """
+    mapping = MaintenanceSyncManager.get_priority_mapping()
+    escalated = MaintenanceSyncManager.OVERDUE_PRIORITY_ESCALATION
+    default = 'medium'
+
+    whens = [
+        When(status='OVERDUE', task__priority=task_priority, then=Value(escalated[priority]))
+        for task_priority, priority in mapping.items()
+    ]
+    whens.append(When(status='OVERDUE', then=Value(escalated[default])))
+    whens.append(When(
+        Q(task__name__in=MaintenanceSyncManager.SAFETY_CRITICAL_TASKS)
+        & ~Q(task__priority__in=[
+            task_priority for task_priority, priority in mapping.items() if priority not in ('low', 'medium')
+        ]),
+        then=Value('high'),
+    ))
+    whens.extend(When(task__priority=task_priority, then=Value(priority)) for task_priority, priority in mapping.items())
+    return Case(*whens, default=Value(default), output_field=CharField())
+
+
+MAINTENANCE_TYPE = maintenance_type_case()
+PRIORITY = priority_case()
+
+
+def unsynced_scheduled_maintenance(scheduled=None):
+    """
+    Scheduled maintenance without an insurance schedule, annotated with the
+    fields of the schedule to create for it.
+
+    Args:
+        scheduled: ScheduledMaintenance queryset to look in, all by default
+    """
+    if scheduled is None:
+        scheduled = ScheduledMaintenance.objects.all()
+    insured_vehicle = Vehicle.objects.filter(
+        vehicle_id=OuterRef('assigned_plan__vehicle_id')
+    ).order_by('-pk').values('pk')[:1]
+    return scheduled.filter(insurance_schedules__isnull=True).annotate(
+        insured_vehicle_id=Subquery(insured_vehicle),
+        mapped_type=MAINTENANCE_TYPE,
+        mapped_priority=PRIORITY,
+        mapped_due_mileage=Coalesce(
+            F('due_mileage'), F('assigned_plan__current_mileage') + F('task__interval_miles'),
+            output_field=IntegerField(),
+        ),
+        mapped_description=Coalesce(
+            NullIf(F('task__description'), Value('')), F('task__name'), output_field=TextField(),
+        ),
+    ).order_by('pk')
+
+
+def create_missing_schedules(scheduled=None, batch_size: int = DEFAULT_BATCH_SIZE,
+                             result: ScheduleSyncResult = None) -> ScheduleSyncResult:
+    """
+    Create an insurance schedule for every scheduled maintenance that has
+    none.
+
+    Args:
+        scheduled: ScheduledMaintenance queryset to sync, all by default
+        batch_size: Schedules inserted per bulk_create
+        result: ScheduleSyncResult to add the counts to
+
+    Returns:
+        ScheduleSyncResult with the created and skipped counts
+    """
+    if result is None:
+        result = ScheduleSyncResult()
+    unsynced = unsynced_scheduled_maintenance(scheduled)
+    batch_size = max(1, batch_size)
+    last_id = 0
+    while True:
+        rows = list(unsynced.filter(pk__gt=last_id).values(*SCHEDULE_FIELDS)[:batch_size])
+        if not rows:
+            break
+        last_id = rows[-1]['pk']
+        schedules = [_schedule_from_row(row) for row in rows if row['insured_vehicle_id'] is not None]
+        result.skipped += len(rows) - len(schedules)
+        if schedules:
+            with transaction.atomic():
+                MaintenanceSchedule.objects.bulk_create(schedules)
+                mark_compliance_dirty(schedule.vehicle_id for schedule in schedules)
+            result.created += len(schedules)
+    return result
+
+
+def update_linked_schedules(scheduled=None, result: ScheduleSyncResult = None) -> ScheduleSyncResult:
+    """
+    Bring the completion of linked insurance schedules in line with their
+    scheduled maintenance, as MaintenanceSchedule.sync_with_maintenance_app
+    does for one schedule.
+
+    Args:
+        scheduled: ScheduledMaintenance queryset to sync, all by default
+        result: ScheduleSyncResult to add the count to
+
+    Returns:
+        ScheduleSyncResult with the updated count
+    """
+    if result is None:
+        result = ScheduleSyncResult()
+    linked = MaintenanceSchedule.objects.filter(scheduled_maintenance__isnull=False)
+    if scheduled is not None:
+        linked = linked.filter(scheduled_maintenance__in=scheduled.values('pk'))
+
+    completed = linked.filter(is_completed=False, scheduled_maintenance__status='COMPLETED')
+    reopened = linked.filter(is_completed=True).exclude(scheduled_maintenance__status='COMPLETED')
+    completed_date = ScheduledMaintenance.objects.filter(
+        pk=OuterRef('scheduled_maintenance_id')
+    ).values('completed_date')[:1]
+
+    with transaction.atomic():
+        vehicle_ids = set(completed.values_list('vehicle_id', flat=True))
+        vehicle_ids.update(reopened.values_list('vehicle_id', flat=True))
+        updated = completed.update(is_completed=True, completed_date=Subquery(completed_date))
+        updated += reopened.update(is_completed=False, completed_date=None)
+        if vehicle_ids:
+            mark_compliance_dirty(vehicle_ids)
+    result.updated += updated
+    return result
+
+
+def sync_maintenance_schedules(scheduled=None, create_missing: bool = True, update_existing: bool = True,
+                               batch_size: int = DEFAULT_BATCH_SIZE) -> ScheduleSyncResult:
+    """
+    Sync insurance schedules with the maintenance app.
+
+    Args:
+        scheduled: ScheduledMaintenance queryset to sync, all by default
+        create_missing: Create schedules for unlinked scheduled maintenance
+        update_existing: Update the completion of linked schedules
+        batch_size: Schedules inserted per bulk_create
+
+    Returns:
+        ScheduleSyncResult of the sync
+    """
+    result = ScheduleSyncResult()
+    if update_existing:
+        update_linked_schedules(scheduled, result)
+    if create_missing:
+        create_missing_schedules(scheduled, batch_size, result)
+    logger.info(
+        f"Maintenance schedule sync: {result.created} created, {result.updated} updated, "
+        f"{result.skipped} skipped"
+    )
+    return result
+
+
+def sync_statuses(vehicle_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Sync status of many vehicles, in the form of
+    MaintenanceSyncManager.get_sync_status.
+
+    The scheduled maintenance and the insurance schedules are each counted
+    with one grouped aggregate, whatever the number of vehicles.
+
+    Args:
+        vehicle_ids: vehicles.Vehicle ids
+
+    Returns:
+        Dict of vehicle id to its sync status
+    """
+    vehicle_ids = list(vehicle_ids)
+    maintenance_counts = dict(
+        ScheduledMaintenance.objects.filter(assigned_plan__vehicle_id__in=vehicle_ids).order_by().values_list(
+            'assigned_plan__vehicle_id'
+        ).annotate(count=Count('pk'))
+    )
+    schedule_counts = {
+        row['vehicle__vehicle_id']: row
+        for row in MaintenanceSchedule.objects.filter(vehicle__vehicle_id__in=vehicle_ids).order_by().values(
+            'vehicle__vehicle_id'
+        ).annotate(
+            linked=Count('pk', filter=Q(scheduled_maintenance__isnull=False)),
+            unlinked=Count('pk', filter=Q(scheduled_maintenance__isnull=True)),
+        )
+    }
+
+    statuses = {}
+    for vehicle_id in vehicle_ids:
+        maintenance_count = maintenance_counts.get(vehicle_id, 0)
+        counts = schedule_counts.get(vehicle_id, {})
+        linked = counts.get('linked', 0)
+        statuses[vehicle_id] = {
+            'maintenance_schedules': maintenance_count,
+            'linked_insurance_schedules': linked,
+            'unlinked_insurance_schedules': counts.get('unlinked', 0),
+            'sync_percentage': (linked / maintenance_count * 100) if maintenance_count > 0 else 100,
+        }
+    return statuses
+
+
+def _schedule_from_row(row: dict) -> MaintenanceSchedule:
+    return MaintenanceSchedule(
+        vehicle_id=row['insured_vehicle_id'],
+        maintenance_type=row['mapped_type'],
+        priority_level=row['mapped_priority'],
+        scheduled_date=row['due_date'],
+        due_mileage=row['mapped_due_mileage'],
+        description=row['mapped_description'],
+        is_completed=row['status'] == 'COMPLETED',
+        completed_date=row['completed_date'],
+        scheduled_maintenance_id=row['pk'],
+    )
+
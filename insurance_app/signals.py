@@ -1,10 +1,17 @@
 # signals.py
+from celery.signals import task_postrun, worker_process_shutdown
+from django.core.signals import request_finished
 from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
+from django.db import transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from assessments.models import VehicleAssessment
 from .models import AssessmentHistory, AssessmentVersion, AssessmentComment, AssessmentWorkflow
+from .models import QuoteSystemConfiguration, MaintenanceSchedule, Vehicle
+from .audit_sink import audit_sink
+from .compliance import mark_compliance_dirty
+from .quote_generators import clear_assessor_estimate_cache
 import json
 from decimal import Decimal
 
@@ -158,6 +165,27 @@ def track_workflow_changes(sender, instance, created, **kwargs):
         )
 
 
+@receiver(post_save, sender=QuoteSystemConfiguration)
+def invalidate_assessor_estimate_cache(sender, instance, **kwargs):
+    """Drop cached assessor pricing when the quote configuration changes"""
+    clear_assessor_estimate_cache()
+
+
+@receiver(post_save, sender=MaintenanceSchedule)
+def mark_compliance_dirty_on_schedule_save(sender, instance, **kwargs):
+    """Queue the schedule's vehicle for the next incremental compliance run"""
+    mark_compliance_dirty([instance.vehicle_id])
+
+
+@receiver(post_delete, sender=MaintenanceSchedule)
+def mark_compliance_dirty_on_schedule_delete(sender, instance, **kwargs):
+    """Queue the schedule's vehicle, unless it was deleted along with the schedule"""
+    vehicle_id = instance.vehicle_id
+    transaction.on_commit(lambda: mark_compliance_dirty(
+        Vehicle.objects.filter(pk=vehicle_id).values_list('pk', flat=True)
+    ))
+
+
 def should_create_version(changes):
     """Determine if changes warrant creating a new version"""
     significant_fields = [
@@ -236,4 +264,22 @@ class AssessmentChangeTracker:
         if hasattr(self.assessment, '_client_ip'):
             delattr(self.assessment, '_client_ip')
         if hasattr(self.assessment, '_user_agent'):
-            delattr(self.assessment, '_user_agent')
\ No newline at end of file
+            delattr(self.assessment, '_user_agent')
+
+
+@receiver(request_finished)
+def flush_audit_log_buffer(sender, **kwargs):
+    """Write buffered audit log entries once they reach the sink's age limit"""
+    audit_sink.flush_if_due()
+
+
+@task_postrun.connect
+def flush_audit_log_after_task(sender=None, **kwargs):
+    """Write the audit log entries a Celery task buffered"""
+    audit_sink.flush()
+
+
+@worker_process_shutdown.connect
+def flush_audit_log_on_worker_shutdown(sender=None, **kwargs):
+    """Write buffered audit log entries before a Celery worker process exits"""
+    audit_sink.flush()
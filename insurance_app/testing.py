@@ -0,0 +1,55 @@
+# testing.py
+"""
+Shared fixtures for the insurance_app tests.
+
+InsuredVehicleTestCase creates a policy holder and policy in setUp, and
+make_vehicle creates numbered vehicles.Vehicle rows insured on that policy.
+Test cases set VIN_PREFIX so each suite's vehicles are easy to tell apart.
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import InsurancePolicy, Vehicle as InsuranceVehicle
+from vehicles.models import Vehicle
+
+VIN_LENGTH = 17
+
+
+class InsuredVehicleTestCase(TestCase):
+    """Base test case with a policy and a factory for insured vehicles."""
+
+    VIN_PREFIX = 'INSUREDVIN'
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.policy_holder = User.objects.create_user(username='policyholder', password='testpass123')
+        self.policy = InsurancePolicy.objects.create(
+            policy_number='POLICY-0001',
+            policy_holder=self.policy_holder,
+            start_date=self.today - timedelta(days=365),
+            end_date=self.today + timedelta(days=365),
+            premium_amount=1000,
+        )
+
+    def make_vehicle(self, number, insured=True, make='Toyota', model='Corolla', manufacture_year=2019,
+                     **fields):
+        """
+        Create vehicle number, insured on the policy unless insured is False.
+
+        Extra fields are set on the InsuranceVehicle.
+
+        Returns:
+            InsuranceVehicle, or the vehicles.Vehicle when not insured
+        """
+        vehicle = Vehicle.objects.create(
+            vin=f'{self.VIN_PREFIX}{number:0{VIN_LENGTH - len(self.VIN_PREFIX)}d}',
+            make=make, model=model, manufacture_year=manufacture_year,
+        )
+        if not insured:
+            return vehicle
+        fields.setdefault('purchase_date', self.today - timedelta(days=700))
+        return InsuranceVehicle.objects.create(policy=self.policy, vehicle=vehicle, **fields)
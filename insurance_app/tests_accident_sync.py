@@ -0,0 +1,145 @@
+# tests_accident_sync.py
+"""
+Tests for the bulk accident history sync.
+
+Tests cover linking matching accidents and histories, creating the
+missing records on either side, resuming from a checkpoint and the query
+count per batch.
+"""
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .accident_sync import ACCIDENT_CHECKPOINT, AccidentHistoryBulkSync
+from .models import Accident, SyncCheckpoint
+from .testing import InsuredVehicleTestCase
+from vehicles.models import VehicleHistory
+
+
+class AccidentHistoryBulkSyncTestCase(InsuredVehicleTestCase):
+    """Test cases for AccidentHistoryBulkSync."""
+
+    VIN_PREFIX = 'ACCIDENTSYNC'
+
+    def setUp(self):
+        super().setUp()
+        self.day = date(2024, 6, 1)
+
+    def accident(self, insured, days=0, **fields):
+        return Accident.objects.create(
+            vehicle=insured,
+            accident_date=datetime.combine(self.day + timedelta(days=days), datetime.min.time(),
+                                           tzinfo=dt_timezone.utc) + timedelta(hours=15),
+            severity=fields.pop('severity', 'moderate'), claim_amount=2500, description='Rear-ended',
+            location='Main Street', weather_conditions='Rain', **fields
+        )
+
+    def history(self, vehicle, days=0, **fields):
+        return VehicleHistory.objects.create(
+            vehicle=vehicle, event_type=fields.pop('event_type', 'ACCIDENT'),
+            event_date=self.day + timedelta(days=days), description='Collision',
+            accident_severity='MINOR', accident_location='Car park', **fields
+        )
+
+    def test_links_and_creates_missing_records(self):
+        """Matching pairs are linked; each side gets the records it is missing."""
+        insured = self.make_vehicle(1)
+        paired_accident, paired_history = self.accident(insured), self.history(insured.vehicle)
+        same_day_accident = self.accident(insured)
+        lone_accident = self.accident(insured, days=5, severity='total_loss')
+        lone_history = self.history(insured.vehicle, days=9)
+        self.history(insured.vehicle, days=12, event_type='REPAIR')
+        uninsured_history = self.history(self.make_vehicle(2, insured=False))
+
+        result = AccidentHistoryBulkSync(batch_size=2).run()
+
+        self.assertEqual(
+            (result.linked, result.histories_created, result.accidents_created, result.skipped), (1, 2, 1, 1)
+        )
+        paired_accident.refresh_from_db()
+        self.assertEqual(paired_accident.vehicle_history, paired_history)
+
+        created = Accident.objects.get(pk=lone_accident.pk).vehicle_history
+        self.assertEqual(created.vehicle, insured.vehicle)
+        self.assertEqual(created.event_date, self.day + timedelta(days=5))
+        self.assertEqual(created.accident_severity, 'TOTAL_LOSS')
+        self.assertIn('Insurance claim amount: $2500', created.notes)
+        self.assertNotEqual(Accident.objects.get(pk=same_day_accident.pk).vehicle_history, paired_history)
+
+        imported = Accident.objects.get(vehicle_history=lone_history)
+        self.assertEqual(imported.vehicle, insured)
+        self.assertEqual(imported.severity, 'minor')
+        self.assertEqual(imported.accident_date.date(), lone_history.event_date)
+        self.assertFalse(Accident.objects.filter(vehicle_history=uninsured_history).exists())
+        self.assertFalse(Accident.objects.filter(vehicle_history__isnull=True).exists())
+        self.assertFalse(SyncCheckpoint.objects.exists())
+
+        # Everything is linked, so a second run changes nothing
+        result = AccidentHistoryBulkSync(batch_size=2).run()
+        self.assertEqual((result.linked, result.histories_created, result.accidents_created), (0, 0, 0))
+
+    def test_only_links_without_create_flags(self):
+        """Without create or import only matching pairs are linked."""
+        insured = self.make_vehicle(1)
+        self.accident(insured)
+        self.history(insured.vehicle)
+        self.accident(insured, days=3)
+        self.history(insured.vehicle, days=7)
+
+        result = AccidentHistoryBulkSync(create_history=False, import_history=False).run()
+
+        self.assertEqual((result.linked, result.skipped), (1, 1))
+        self.assertEqual(VehicleHistory.objects.count(), 2)
+        self.assertEqual(Accident.objects.count(), 2)
+
+    def test_resumes_after_interruption(self):
+        """An interrupted run keeps its committed batches and continues after them."""
+        insured = self.make_vehicle(1)
+        for days in range(5):
+            self.accident(insured, days=days * 2)
+
+        def interrupt(phase, checkpoint):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            AccidentHistoryBulkSync(batch_size=2).run(progress=interrupt)
+        checkpoint = SyncCheckpoint.objects.get(name=ACCIDENT_CHECKPOINT)
+        self.assertEqual(checkpoint.processed, 2)
+        self.assertEqual(Accident.objects.filter(vehicle_history__isnull=False).count(), 2)
+
+        batches = []
+        result = AccidentHistoryBulkSync(batch_size=2).run(
+            progress=lambda phase, checkpoint: batches.append((phase, checkpoint.processed))
+        )
+
+        self.assertEqual(result.histories_created, 3)
+        self.assertEqual(batches, [(ACCIDENT_CHECKPOINT, 4), (ACCIDENT_CHECKPOINT, 5)])
+        self.assertEqual(VehicleHistory.objects.count(), 5)
+
+    def test_queries_per_batch_are_constant(self):
+        """A batch takes the same queries whatever its size."""
+        def sync_queries(count, first):
+            insured = self.make_vehicle(first)
+            for days in range(count):
+                self.accident(insured, days=days)
+                self.history(insured.vehicle, days=days + 100)
+            with CaptureQueriesContext(connection) as queries:
+                AccidentHistoryBulkSync(batch_size=1000).run()
+            return len(queries)
+
+        self.assertEqual(sync_queries(3, 1), sync_queries(40, 2))
+
+    def test_command_bulk_option(self):
+        """sync_accident_history --bulk reports the bulk sync counts."""
+        insured = self.make_vehicle(1)
+        self.accident(insured)
+        self.history(insured.vehicle, days=1)
+        stdout = StringIO()
+
+        call_command('sync_accident_history', bulk=True, create_history=True, import_history=True, stdout=stdout)
+
+        self.assertIn('Bulk sync completed: 0 linked, 1 imported, 1 created, 0 skipped', stdout.getvalue())
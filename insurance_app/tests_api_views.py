@@ -12,6 +12,7 @@ from .models import (
     InsurancePolicy, Vehicle, DamagedPart, PartQuoteRequest, 
     PartQuote, PartMarketAverage, AssessmentQuoteSummary
 )
+from .recommendation_engine import QuoteRecommendationEngine
 from assessments.models import VehicleAssessment
 from vehicles.models import Vehicle as VehicleModel
 from organizations.models import Organization
@@ -321,7 +322,29 @@ class APIViewsTestCase(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('recommendation', response.data)
-    
+
+    def test_unknown_assessment_strategy_rejected(self):
+        """Test that an unknown recommendation strategy returns 400"""
+        url = reverse('insurance:recommendation-generate-for-assessment')
+        data = {
+            'assessment_id': self.assessment.assessment_id,
+            'strategy': 'lowest_cost'
+        }
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('lowest_price', response.data['valid_strategies'])
+
+    def test_assessment_strategy_generates_recommendations(self):
+        """Test that every engine strategy is accepted for an assessment"""
+        url = reverse('insurance:recommendation-generate-for-assessment')
+        for strategy in QuoteRecommendationEngine.STRATEGIES:
+            data = {'assessment_id': self.assessment.assessment_id, 'strategy': strategy}
+            response = self.client.post(url, data, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['strategy'], strategy)
+
     def test_available_strategies(self):
         """Test getting available recommendation strategies"""
         url = reverse('insurance:recommendation-available-strategies')
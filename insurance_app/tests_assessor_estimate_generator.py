@@ -6,18 +6,23 @@ Tests cover all methods including estimate generation, cost calculations,
 validation, and confidence scoring.
 """
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
+import time
 
 from assessments.models import VehicleAssessment
 from vehicles.models import Vehicle
-from .models import DamagedPart, PartQuoteRequest, PartQuote
-from .quote_generators import AssessorEstimateGenerator
+from .models import DamagedPart, PartQuoteRequest, PartQuote, QuoteSystemConfiguration
+from .quote_generators import (
+    ASSESSOR_PRICING_TTL, AssessorEstimateGenerator, clear_assessor_estimate_cache, get_assessor_pricing,
+)
 
 
 class AssessorEstimateGeneratorTestCase(TestCase):
@@ -621,4 +626,157 @@ class AssessorEstimateGeneratorTestCase(TestCase):
         # Should log error
         mock_logger.error.assert_called_once()
         log_message = mock_logger.error.call_args[0][0]
-        self.assertIn("Error generating assessor estimate", log_message)
\ No newline at end of file
+        self.assertIn("Error generating assessor estimate", log_message)
+
+class AssessorEstimateBatchTestCase(TestCase):
+    """Test cases for batch assessor estimates and the pricing cache"""
+    
+    def setUp(self):
+        """Set up test data"""
+        clear_assessor_estimate_cache()
+        self.addCleanup(clear_assessor_estimate_cache)
+        
+        self.user = User.objects.create_user(username='batchuser', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            make='Toyota', model='Camry', manufacture_year=2020, vin='BATCHTESTVIN00001'
+        )
+        self.assessment = VehicleAssessment.objects.create(
+            assessment_id='TEST-BATCH-001',
+            assessment_type='insurance_claim',
+            status='completed',
+            user=self.user,
+            vehicle=self.vehicle,
+            assessor_name='Test Assessor',
+            overall_severity='moderate'
+        )
+        specs = [
+            ('Front Bumper', 'body', 'moderate', False, Decimal('0.0'), ''),
+            ('Rear Bumper', 'body', 'moderate', False, Decimal('2.5'), 'RB-1'),
+            ('Headlight', 'electrical', 'severe', True, Decimal('0.0'), ''),
+            ('Door Trim', 'trim', 'minor', False, Decimal('0.0'), ''),
+            ('Bonnet', 'body', 'replace', True, Decimal('4.0'), ''),
+        ]
+        self.parts = [
+            DamagedPart.objects.create(
+                assessment=self.assessment,
+                section_type='exterior',
+                part_name=name,
+                part_category=category,
+                damage_severity=severity,
+                damage_description='Damaged',
+                requires_replacement=replace,
+                estimated_labor_hours=hours,
+                part_number=part_number
+            )
+            for name, category, severity, replace, hours, part_number in specs
+        ]
+        self.quote_requests = {
+            part.id: PartQuoteRequest.objects.create(
+                damaged_part=part,
+                assessment=self.assessment,
+                expiry_date=timezone.now() + timedelta(days=7),
+                vehicle_make='Toyota',
+                vehicle_model='Camry',
+                vehicle_year=2020,
+                dispatched_by=self.user
+            )
+            for part in self.parts
+        }
+    
+    def test_batch_matches_single_estimates(self):
+        """Batch estimates carry the same figures as single-part estimates"""
+        generator = AssessorEstimateGenerator()
+        batch = generator.generate_assessment_estimates(self.assessment)
+        # Reload so labor hours carry their stored precision in the notes
+        parts = DamagedPart.objects.filter(assessment=self.assessment).order_by('id')
+        singles = [
+            generator.generate_assessor_estimate(part, self.quote_requests[part.id])
+            for part in parts
+        ]
+        
+        self.assertEqual(len(batch), len(self.parts))
+        for batch_quote, single_quote in zip(batch, singles):
+            self.assertEqual(batch_quote.damaged_part_id, single_quote.damaged_part_id)
+            self.assertEqual(batch_quote.quote_request_id, single_quote.quote_request_id)
+            for field in ('part_cost', 'labor_cost', 'paint_cost', 'additional_costs',
+                          'total_cost', 'confidence_score', 'estimated_delivery_days',
+                          'estimated_completion_days', 'notes'):
+                self.assertEqual(getattr(batch_quote, field), getattr(single_quote, field), field)
+    
+    def test_batch_loads_configuration_once(self):
+        """Parts and pricing load once and quotes are inserted in bulk"""
+        QuoteSystemConfiguration.get_config()
+        generator = AssessorEstimateGenerator()
+        
+        with CaptureQueriesContext(connection) as context:
+            quotes = generator.generate_assessment_estimates(self.assessment)
+        
+        statements = [query['sql'] for query in context.captured_queries]
+        config_table = QuoteSystemConfiguration._meta.db_table
+        self.assertEqual(len([sql for sql in statements if config_table in sql]), 1)
+        self.assertEqual(len([sql for sql in statements if sql.startswith('INSERT')]), 1)
+        self.assertEqual(PartQuote.objects.filter(provider_type='assessor').count(), len(quotes))
+        
+        # The second batch reuses the cached pricing snapshot
+        with CaptureQueriesContext(connection) as context:
+            generator.generate_assessor_estimates(self.parts, self.quote_requests)
+        self.assertFalse(any(config_table in query['sql'] for query in context.captured_queries))
+    
+    def test_configuration_save_invalidates_cache(self):
+        """Saving the configuration applies the new rates to later estimates"""
+        config = QuoteSystemConfiguration.get_config()
+        generator = AssessorEstimateGenerator()
+        before = generator.generate_assessor_estimates([self.parts[0]], self.quote_requests)[0]
+        
+        config.default_labor_rate = Decimal('60.00')
+        config.paint_cost_percentage = Decimal('20.00')
+        config.save()
+        
+        after = AssessorEstimateGenerator().generate_assessor_estimates([self.parts[0]], self.quote_requests)[0]
+        self.assertEqual(before.labor_cost, Decimal('135.00'))
+        self.assertEqual(after.labor_cost, Decimal('180.00'))
+        self.assertEqual(after.paint_cost, Decimal('60.00'))
+    
+    def test_other_processes_reload_pricing_after_ttl(self):
+        """A configuration change made elsewhere applies once the snapshot expires"""
+        config = QuoteSystemConfiguration.get_config()
+        self.assertEqual(get_assessor_pricing().labor_rate, Decimal('45.00'))
+        # Another process saves: this one gets no signal
+        QuoteSystemConfiguration.objects.filter(pk=config.pk).update(default_labor_rate=Decimal('60.00'))
+        
+        self.assertEqual(get_assessor_pricing().labor_rate, Decimal('45.00'))
+        later = time.monotonic() + ASSESSOR_PRICING_TTL
+        with patch('insurance_app.quote_generators.time.monotonic', return_value=later):
+            self.assertEqual(get_assessor_pricing().labor_rate, Decimal('60.00'))
+    
+    def test_disabled_estimates(self):
+        """No quotes are created when assessor estimates are disabled"""
+        config = QuoteSystemConfiguration.get_config()
+        config.enable_assessor_estimates = False
+        config.save()
+        
+        self.assertEqual(AssessorEstimateGenerator().generate_assessment_estimates(self.assessment), [])
+        self.assertIsNone(
+            AssessorEstimateGenerator().generate_assessor_estimate(self.parts[0], self.quote_requests[self.parts[0].id])
+        )
+        self.assertFalse(PartQuote.objects.exists())
+    
+    def test_invalid_part_rejects_batch(self):
+        """An invalid part fails the batch before anything is inserted"""
+        DamagedPart.objects.filter(pk=self.parts[3].pk).update(damage_severity='unknown')
+        
+        with self.assertRaises(ValidationError):
+            AssessorEstimateGenerator().generate_assessment_estimates(self.assessment)
+        self.assertFalse(PartQuote.objects.exists())
+    
+    def test_parts_without_quote_request_are_skipped(self):
+        """Assessment estimates only cover parts with a quote request"""
+        PartQuoteRequest.objects.filter(damaged_part=self.parts[0]).delete()
+        
+        quotes = AssessorEstimateGenerator().generate_assessment_estimates(self.assessment)
+        
+        self.assertEqual(len(quotes), len(self.parts) - 1)
+        self.assertNotIn(self.parts[0].id, [quote.damaged_part_id for quote in quotes])
+        
+        with self.assertRaises(ValidationError):
+            AssessorEstimateGenerator().generate_assessor_estimates([self.parts[0]], {})
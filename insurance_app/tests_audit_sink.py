@@ -0,0 +1,200 @@
+# tests_audit_sink.py
+"""
+Tests for the buffered audit log sink.
+
+Tests cover the size and age flush thresholds, entries logged inside
+transactions, the spool file fallback, the dead-letter file for rejected
+entries, the Celery flush hooks, forked children and chunked pruning.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from celery.signals import task_postrun, worker_process_shutdown
+
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .audit_sink import AuditLogSink, audit_sink, prune_audit_logs
+from .models import QuoteSystemAuditLog
+
+
+class AuditLogSinkTestCase(TestCase):
+    """Test cases for buffering and flushing audit log entries."""
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.sink = AuditLogSink(
+            max_entries=3, max_age_seconds=60, spool_path=os.path.join(self.spool_dir, 'spool.jsonl'),
+            dead_letter_path=os.path.join(self.spool_dir, 'dead_letter.jsonl'),
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    def entry(self, message='Quote received'):
+        return QuoteSystemAuditLog(action_type='quote_received', message=message, details={'provider': 'dealer'})
+
+    def buffer(self, *entries):
+        """Add entries the way they arrive outside a transaction"""
+        for entry in entries:
+            self.sink._buffer(entry)
+
+    def test_flushes_in_one_insert_at_size_limit(self):
+        """Entries are held until the size limit and then written together."""
+        self.buffer(self.entry(), self.entry())
+        self.assertFalse(QuoteSystemAuditLog.objects.exists())
+        self.assertEqual(self.sink.pending(), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.buffer(self.entry())
+
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(QuoteSystemAuditLog.objects.count(), 3)
+        self.assertEqual(self.sink.pending(), 0)
+
+    def test_flushes_at_age_limit(self):
+        """An entry older than the age limit is written by the next check."""
+        self.sink.max_age_seconds = 0
+        self.assertEqual(self.sink.flush_if_due(), 0)
+        self.sink.max_age_seconds = 60
+        self.buffer(self.entry())
+        self.assertEqual(self.sink.flush_if_due(), 0)
+
+        self.sink.max_age_seconds = 0
+        self.assertEqual(self.sink.flush_if_due(), 1)
+        self.assertEqual(QuoteSystemAuditLog.objects.count(), 1)
+
+    def test_entries_wait_for_commit(self):
+        """Entries logged in a transaction are buffered when it commits and dropped on rollback."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sink.add(self.entry())
+            self.assertEqual(self.sink.pending(), 0)
+        self.assertEqual(self.sink.pending(), 1)
+
+        try:
+            with transaction.atomic():
+                self.sink.add(self.entry())
+                raise ValueError('rolled back')
+        except ValueError:
+            pass
+        self.assertEqual(self.sink.pending(), 1)
+
+    def test_log_action_keeps_logged_time(self):
+        """Buffered entries keep the time they were logged."""
+        with self.captureOnCommitCallbacks(execute=True):
+            logged = QuoteSystemAuditLog.log_action('quote_received', 'Quote received', severity='warning').timestamp
+        self.assertIsNone(QuoteSystemAuditLog.objects.first())
+        audit_sink.flush()
+
+        entry = QuoteSystemAuditLog.objects.get()
+        self.assertEqual(entry.timestamp, logged)
+        self.assertEqual(entry.severity, 'warning')
+
+    def test_spools_when_database_unavailable(self):
+        """Entries go to the spool file when the write fails and are replayed later."""
+        self.buffer(self.entry('first'), self.entry('second'))
+        with mock.patch.object(
+            QuoteSystemAuditLog.objects, 'bulk_create', side_effect=OperationalError('database is down')
+        ), self.assertLogs('quote_system', 'ERROR'):
+            self.assertEqual(self.sink.flush(), 0)
+
+        self.assertFalse(QuoteSystemAuditLog.objects.exists())
+        with open(self.sink.spool_path) as spool:
+            self.assertEqual(len(spool.readlines()), 2)
+
+        self.buffer(self.entry('third'))
+        self.assertEqual(self.sink.flush(), 3)
+        self.assertEqual(
+            sorted(QuoteSystemAuditLog.objects.values_list('message', flat=True)), ['first', 'second', 'third']
+        )
+        self.assertEqual(QuoteSystemAuditLog.objects.get(message='first').details, {'provider': 'dealer'})
+        self.assertFalse(os.path.exists(self.sink.spool_path))
+
+    def dead_letters(self):
+        with open(self.sink.dead_letter_path) as dead_letter:
+            return [json.loads(line) for line in dead_letter]
+
+    def test_rejected_entries_go_to_dead_letter(self):
+        """An entry the database rejects is set aside; the rest of its batch is written."""
+        rejected = self.entry('rejected')
+        rejected.action_type = None
+        self.sink.max_entries = 10
+        self.buffer(self.entry('first'), rejected, self.entry('second'))
+
+        with self.assertLogs('quote_system', 'ERROR'):
+            self.assertEqual(self.sink.flush(), 2)
+
+        self.assertEqual(sorted(QuoteSystemAuditLog.objects.values_list('message', flat=True)), ['first', 'second'])
+        self.assertEqual([entry['message'] for entry in self.dead_letters()], ['rejected'])
+        self.assertFalse(os.path.exists(self.sink.spool_path))
+
+    def test_replay_sets_aside_unreadable_and_rejected_entries(self):
+        """Bad spooled entries go to the dead-letter file instead of blocking the spool."""
+        rejected = self.entry('rejected')
+        rejected.action_type = None
+        self.sink.spool([self.entry('spooled'), rejected])
+        with open(self.sink.spool_path, 'a') as spool:
+            spool.write('{"message": "truncated\n')
+            spool.write(json.dumps({'message': 'bad time', 'timestamp': 'yesterday'}) + '\n')
+        self.buffer(self.entry('new'))
+
+        with self.assertLogs('quote_system', 'ERROR'):
+            self.assertEqual(self.sink.flush(), 2)
+
+        self.assertEqual(sorted(QuoteSystemAuditLog.objects.values_list('message', flat=True)), ['new', 'spooled'])
+        with open(self.sink.dead_letter_path) as dead_letter:
+            self.assertEqual(len(dead_letter.readlines()), 3)
+        self.assertEqual(sorted(os.listdir(self.spool_dir)), ['dead_letter.jsonl'])
+
+    def test_flushes_after_celery_tasks_and_worker_shutdown(self):
+        """Celery task and worker process ends flush the process's buffer."""
+        with mock.patch.object(audit_sink, 'flush') as flush:
+            task_postrun.send(sender=None, task_id='task', task=None, args=(), kwargs={}, retval=None)
+            worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+        self.assertEqual(flush.call_count, 2)
+
+    @skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_forked_child_starts_with_empty_buffer(self):
+        """A forked child does not inherit, and so cannot rewrite, its parent's entries."""
+        self.addCleanup(audit_sink._reset_after_fork)
+        audit_sink._buffer(self.entry())
+
+        pid = os.fork()
+        if pid == 0:
+            os._exit(audit_sink.pending())
+        _, status = os.waitpid(pid, 0)
+
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(audit_sink.pending(), 1)
+
+
+class PruneAuditLogsTestCase(TestCase):
+    """Test cases for chunked pruning."""
+
+    def test_prunes_in_bounded_chunks(self):
+        """Old entries are deleted in chunks within time windows; recent ones stay."""
+        now = timezone.now()
+        QuoteSystemAuditLog.objects.bulk_create([
+            QuoteSystemAuditLog(action_type='quote_received', message='old', timestamp=now - timedelta(days=days, minutes=i))
+            for days in (400, 40, 39) for i in range(5)
+        ] + [QuoteSystemAuditLog(action_type='quote_received', message='recent', timestamp=now - timedelta(days=1))])
+
+        with CaptureQueriesContext(connection) as queries:
+            deleted = prune_audit_logs(now - timedelta(days=30), chunk_size=2)
+
+        self.assertEqual(deleted, 15)
+        self.assertEqual(list(QuoteSystemAuditLog.objects.values_list('message', flat=True)), ['recent'])
+        deletes = [query['sql'] for query in queries if query['sql'].startswith('DELETE')]
+        # Three windows of five entries, two per DELETE
+        self.assertEqual(len(deletes), 9)
+        self.assertTrue(all('"timestamp" >=' in sql for sql in deletes))
+        # Empty days between the windows are skipped, not scanned
+        self.assertLess(len(queries), 30)
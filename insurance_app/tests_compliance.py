@@ -0,0 +1,144 @@
+# tests_compliance.py
+"""
+Tests for the bulk ComplianceEngine.
+
+Tests cover agreement with the per-vehicle calculation, the upsert of
+existing compliance rows, dirty marking by the schedule signals and the
+incremental run.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+
+from .compliance import ComplianceEngine, compliance_counts, mark_compliance_dirty
+from .models import ComplianceDirtyVehicle, MaintenanceCompliance, MaintenanceSchedule
+from .testing import InsuredVehicleTestCase
+
+
+class ComplianceEngineTestCase(InsuredVehicleTestCase):
+    """Test cases for the bulk compliance calculation."""
+
+    VIN_PREFIX = 'COMPLIANCEVIN'
+
+    def setUp(self):
+        super().setUp()
+        self.vehicles = [self.make_vehicle(i) for i in range(3)]
+
+        first, second, _ = self.vehicles
+        # On time, late, overdue, critical on time, critical overdue
+        self.schedule(first, -30, completed=-31)
+        self.schedule(first, -30, completed=-20)
+        self.schedule(first, -5)
+        self.schedule(first, -10, completed=-10, priority='critical')
+        self.schedule(first, -2, priority='critical')
+        # Only future work
+        self.schedule(second, 20)
+        ComplianceDirtyVehicle.objects.all().delete()
+
+    def schedule(self, vehicle, days, completed=None, priority='medium'):
+        return MaintenanceSchedule.objects.create(
+            vehicle=vehicle,
+            maintenance_type='oil_change',
+            priority_level=priority,
+            scheduled_date=self.today + timedelta(days=days),
+            is_completed=completed is not None,
+            completed_date=self.today + timedelta(days=completed) if completed is not None else None,
+        )
+
+    def legacy_values(self, vehicle):
+        compliance, _ = MaintenanceCompliance.objects.get_or_create(vehicle=vehicle)
+        compliance.calculate_compliance()
+        compliance.refresh_from_db()
+        return self.values(compliance)
+
+    def values(self, compliance):
+        return (
+            compliance.total_scheduled_count, compliance.completed_on_time_count, compliance.overdue_count,
+            compliance.overall_compliance_rate, compliance.critical_maintenance_compliance,
+        )
+
+    def test_counts_in_one_grouped_query(self):
+        """Every vehicle's counts come from one query."""
+        with CaptureQueriesContext(connection) as queries:
+            counts = compliance_counts(MaintenanceSchedule.objects.all())
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(counts[self.vehicles[0].pk], {
+            'total': 5, 'on_time': 2, 'critical_total': 2, 'critical_on_time': 1, 'overdue': 2,
+        })
+        self.assertNotIn(self.vehicles[2].pk, counts)
+
+    def test_matches_per_vehicle_calculation(self):
+        """The bulk run stores the values calculate_compliance produces."""
+        expected = {vehicle.pk: self.legacy_values(vehicle) for vehicle in self.vehicles}
+        MaintenanceCompliance.objects.all().delete()
+
+        result = ComplianceEngine(batch_size=2).recalculate_all()
+
+        self.assertEqual(result.vehicles, 3)
+        self.assertEqual(result.batches, 2)
+        for compliance in MaintenanceCompliance.objects.all():
+            self.assertEqual(self.values(compliance), expected[compliance.vehicle_id])
+        self.assertEqual(expected[self.vehicles[0].pk], (5, 2, 2, 40.0, 50.0))
+        self.assertEqual(expected[self.vehicles[2].pk], (0, 0, 0, 100, 100))
+
+    def test_existing_rows_are_updated(self):
+        """Existing compliance rows are upserted rather than duplicated."""
+        MaintenanceCompliance.objects.create(vehicle=self.vehicles[0], overdue_count=99)
+
+        ComplianceEngine().recalculate_all()
+
+        self.assertEqual(MaintenanceCompliance.objects.count(), 3)
+        self.assertEqual(MaintenanceCompliance.objects.get(vehicle=self.vehicles[0]).overdue_count, 2)
+
+    def test_schedule_changes_mark_vehicles_dirty(self):
+        """Saving or deleting a schedule queues its vehicle."""
+        schedule = self.schedule(self.vehicles[1], 10)
+        self.assertTrue(ComplianceDirtyVehicle.objects.filter(vehicle=self.vehicles[1]).exists())
+
+        ComplianceDirtyVehicle.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.delete()
+        self.assertTrue(ComplianceDirtyVehicle.objects.filter(vehicle=self.vehicles[1]).exists())
+
+        mark_compliance_dirty([self.vehicles[1].pk, self.vehicles[1].pk])
+        self.assertEqual(ComplianceDirtyVehicle.objects.count(), 1)
+
+    def test_incremental_run_only_touches_dirty_vehicles(self):
+        """An incremental run recalculates dirty vehicles and clears their marks."""
+        ComplianceEngine().recalculate_all()
+        MaintenanceCompliance.objects.update(overdue_count=99)
+
+        self.schedule(self.vehicles[1], -3)
+        result = ComplianceEngine().recalculate_dirty()
+
+        self.assertEqual(result.vehicles, 1)
+        self.assertEqual(MaintenanceCompliance.objects.get(vehicle=self.vehicles[1]).overdue_count, 1)
+        self.assertEqual(MaintenanceCompliance.objects.get(vehicle=self.vehicles[0]).overdue_count, 99)
+        self.assertFalse(ComplianceDirtyVehicle.objects.exists())
+
+    def test_incremental_run_picks_up_newly_overdue_schedules(self):
+        """Schedules that fell overdue since the last run are recalculated without a mark."""
+        ComplianceEngine().recalculate_all()
+        # Calculated yesterday, when yesterday's schedule was not yet overdue
+        MaintenanceCompliance.objects.update(last_calculated=timezone.now() - timedelta(days=1))
+        MaintenanceSchedule.objects.filter(vehicle=self.vehicles[1]).update(scheduled_date=self.today - timedelta(days=1))
+
+        result = ComplianceEngine().recalculate_dirty()
+
+        self.assertEqual(result.vehicles, 1)
+        self.assertEqual(MaintenanceCompliance.objects.get(vehicle=self.vehicles[1]).overdue_count, 1)
+
+    def test_command(self):
+        """The management command runs full and incremental updates."""
+        call_command('update_compliance_scores', stdout=StringIO())
+        self.assertEqual(MaintenanceCompliance.objects.count(), 3)
+
+        self.schedule(self.vehicles[2], -1)
+        call_command('update_compliance_scores', incremental=True, stdout=StringIO())
+        self.assertEqual(MaintenanceCompliance.objects.get(vehicle=self.vehicles[2]).overdue_count, 1)
@@ -0,0 +1,190 @@
+# tests_latency.py
+"""
+Tests for the quote stage latency histograms.
+
+Tests cover the bucket layout, percentiles, the timing decorator, flushing
+to the hourly rollup and the stage metrics reported by the health collector.
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .latency import (
+    BUCKET_COUNT, LatencyRecorder, MAX_MICROSECONDS, bucket_index, bucket_upper_bound,
+    percentiles, recorder, timed,
+)
+from .market_analysis import MarketAverageCalculator
+from .models import QuoteStageLatencyRollup
+from .parts_identification import PartsIdentificationEngine
+from .quote_health import QuoteHealthCollector
+from .recommendation_engine import QuoteRecommendationEngine
+
+
+class LatencyHistogramTestCase(TestCase):
+    """Test cases for the histogram buckets and percentiles."""
+
+    def test_buckets_hold_their_values(self):
+        """Every duration falls in a bucket at most about 3% wide."""
+        previous = -1
+        for value in list(range(0, 5000)) + [random.Random(5).randrange(MAX_MICROSECONDS) for _ in range(5000)]:
+            index = bucket_index(value)
+            self.assertLess(index, BUCKET_COUNT)
+            upper = bucket_upper_bound(index)
+            lower = bucket_upper_bound(index - 1) + 1 if index else 0
+            self.assertTrue(lower <= value <= upper)
+            self.assertLessEqual(upper - lower, max(0, value / 32))
+            if value < 5000:
+                self.assertIn(index, (previous, previous + 1))
+                previous = index
+        self.assertEqual(bucket_index(MAX_MICROSECONDS * 10), bucket_index(MAX_MICROSECONDS))
+
+    def test_record_matches_bucket_index(self):
+        """The inlined bucket calculation in record() agrees with bucket_index()."""
+        latency = LatencyRecorder(flush_seconds=0)
+        values = [0, 63, 64, 65, 1000, 123456, MAX_MICROSECONDS, MAX_MICROSECONDS + 1]
+        for value in values:
+            latency.record('recommendation', value * 1000)
+
+        histogram = latency.snapshot()['recommendation']
+        self.assertEqual(histogram.count, len(values))
+        self.assertEqual(
+            {int(index): count for index, count in histogram.sparse_counts().items()},
+            {index: values_in for index, values_in in
+             ((i, [bucket_index(v) for v in values].count(i)) for i in set(map(bucket_index, values)))}
+        )
+        self.assertEqual(histogram.maximum, MAX_MICROSECONDS + 1)
+
+    def test_percentiles(self):
+        """Percentiles are within a bucket of the exact values."""
+        rng = random.Random(7)
+        values = sorted(int(rng.lognormvariate(10, 1)) for _ in range(10000))
+        counts = {}
+        for value in values:
+            counts[bucket_index(value)] = counts.get(bucket_index(value), 0) + 1
+
+        p50, p95, p99 = percentiles(counts, [0.5, 0.95, 0.99], max(values))
+
+        for estimate, quantile in ((p50, 0.5), (p95, 0.95), (p99, 0.99)):
+            exact = values[int(len(values) * quantile) - 1]
+            self.assertAlmostEqual(estimate, exact, delta=exact / 16)
+        self.assertEqual(percentiles({}, [0.5]), [0])
+
+
+class LatencyRecordingTestCase(TestCase):
+    """Test cases for timing calls and flushing them."""
+
+    def setUp(self):
+        recorder.snapshot()
+
+    def tearDown(self):
+        recorder.snapshot()
+
+    def test_timed_records_successful_calls(self):
+        """Successful calls are recorded, calls that raise are not."""
+        @timed('market_calculation')
+        def calculate(fail=False):
+            if fail:
+                raise ValueError('No quotes')
+            return 'done'
+
+        self.assertEqual(calculate(), 'done')
+        with self.assertRaises(ValueError):
+            calculate(fail=True)
+
+        histograms = recorder.snapshot()
+        self.assertEqual(list(histograms), ['market_calculation'])
+        self.assertEqual(histograms['market_calculation'].count, 1)
+
+        with self.assertRaises(ValueError):
+            timed('unknown_stage')
+
+    def test_one_entry_point_per_stage(self):
+        """Only the canonical entry point of each stage is timed, not its bulk variants."""
+        self.assertTrue(hasattr(PartsIdentificationEngine.identify_damaged_parts, '__wrapped__'))
+        self.assertFalse(hasattr(PartsIdentificationEngine.identify_damaged_parts_bulk, '__wrapped__'))
+        self.assertTrue(hasattr(MarketAverageCalculator.calculate_market_average, '__wrapped__'))
+        self.assertTrue(hasattr(QuoteRecommendationEngine.generate_recommendation, '__wrapped__'))
+        self.assertFalse(hasattr(QuoteRecommendationEngine.generate_assessment_recommendations, '__wrapped__'))
+
+    def test_flush_merges_into_hourly_rows(self):
+        """Flushes add to the current hour's row instead of writing per call."""
+        latency = LatencyRecorder(flush_seconds=0)
+        for microseconds in (100, 200, 300):
+            latency.record('parts_identification', microseconds * 1000)
+        self.assertFalse(QuoteStageLatencyRollup.objects.exists())
+
+        self.assertEqual(latency.flush(), 1)
+        latency.record('parts_identification', 5000 * 1000)
+        latency.record('recommendation', 50 * 1000)
+        self.assertEqual(latency.flush(), 2)
+        self.assertEqual(latency.flush(), 0)
+
+        row = QuoteStageLatencyRollup.objects.get(stage='parts_identification')
+        self.assertEqual(row.call_count, 4)
+        self.assertEqual(row.total_microseconds, 5600)
+        self.assertEqual(row.max_microseconds, 5000)
+        self.assertEqual(sum(row.bucket_counts.values()), 4)
+        self.assertEqual(QuoteStageLatencyRollup.objects.count(), 2)
+
+    def test_flush_runs_after_commit_when_due(self):
+        """A timed call that finds the flush due schedules it for after the commit."""
+        latency = LatencyRecorder(flush_seconds=1)
+        latency._next_flush = 0
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            latency.record('recommendation', 1000)
+            latency.record('recommendation', 1000)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(QuoteStageLatencyRollup.objects.get().call_count, 2)
+
+    def test_collector_reports_percentiles(self):
+        """The health collector merges the hourly rows of the window."""
+        latency = LatencyRecorder(flush_seconds=0)
+        for milliseconds in range(1, 101):
+            latency.record('market_calculation', milliseconds * 1_000_000)
+        latency.flush()
+        latency.record('market_calculation', 400 * 1_000_000)
+        latency.flush()
+        QuoteStageLatencyRollup.objects.create(
+            stage='market_calculation',
+            bucket_start=timezone.now() - timedelta(days=3),
+            call_count=1,
+            total_microseconds=10_000_000,
+            max_microseconds=10_000_000,
+            bucket_counts={str(bucket_index(10_000_000)): 1},
+        )
+
+        metrics = QuoteHealthCollector().collect()
+
+        self.assertAlmostEqual(metrics['market_calculation_p50_seconds'], 0.050, delta=0.050 / 32)
+        self.assertAlmostEqual(metrics['market_calculation_p95_seconds'], 0.095, delta=0.095 / 32)
+        self.assertAlmostEqual(metrics['market_calculation_p99_seconds'], 0.099, delta=0.099 / 32)
+        self.assertAlmostEqual(metrics['average_market_calculation_time_seconds'], 5.450 / 101)
+        self.assertEqual(metrics['recommendation_p99_seconds'], 0)
+
+    def test_overhead(self):
+        """Timing a call costs a few microseconds at most."""
+        def stage_call():
+            return None
+        timed_call = timed('recommendation')(stage_call)
+        recorder.flush_interval_ns, flush_interval = 0, recorder.flush_interval_ns
+        try:
+            overhead = []
+            for _ in range(5):
+                started = time.perf_counter()
+                for _ in range(20000):
+                    timed_call()
+                instrumented = time.perf_counter() - started
+                started = time.perf_counter()
+                for _ in range(20000):
+                    stage_call()
+                overhead.append((instrumented - (time.perf_counter() - started)) / 20000)
+        finally:
+            recorder.flush_interval_ns = flush_interval
+
+        self.assertLess(min(overhead), 5e-6)
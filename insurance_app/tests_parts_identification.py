@@ -7,12 +7,14 @@ consolidation of duplicate parts, labor hour estimation, and image linking.
 """
 
 from decimal import Decimal
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.utils import timezone
 from unittest.mock import Mock, patch
 
-from .parts_identification import PartsIdentificationEngine
+from .parts_identification import PartsIdentificationEngine, DamagePhotoIndex
 from .models import DamagedPart
 from assessments.models import (
     VehicleAssessment, ExteriorBodyDamage, WheelsAndTires, InteriorDamage,
@@ -576,4 +578,203 @@ class PartsIdentificationEngineTestCase(TestCase):
         
         # All parts should be from exterior section
         for part in parts:
-            self.assertEqual(part.section_type, 'exterior')
\ No newline at end of file
+            self.assertEqual(part.section_type, 'exterior')
+
+class DamagePhotoIndexTestCase(TestCase):
+    """Test cases for indexed photo-to-part matching."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.engine = PartsIdentificationEngine()
+        
+        self.user = User.objects.create_user(
+            username='photouser',
+            email='photo@example.com',
+            password='testpass123'
+        )
+        
+        self.vehicle = Vehicle.objects.create(
+            make='Toyota',
+            model='Corolla',
+            manufacture_year=2019,
+            vin='1HGBH41JXMN109187'
+        )
+        
+        self.assessment = VehicleAssessment.objects.create(
+            assessment_id='TEST-PHOTO-001',
+            assessment_type='crash',
+            status='completed',
+            user=self.user,
+            vehicle=self.vehicle,
+            assessor_name='Test Assessor',
+            overall_severity='moderate'
+        )
+        
+        self.pinned_photo = AssessmentPhoto.objects.create(
+            assessment=self.assessment,
+            description='Close up',
+            section_reference='exterior_damage',
+            damage_point_id='front_bumper'
+        )
+        self.keyword_photo = AssessmentPhoto.objects.create(
+            assessment=self.assessment,
+            description='Hood dents from hail',
+            section_reference='exterior_damage'
+        )
+        self.other_section_photo = AssessmentPhoto.objects.create(
+            assessment=self.assessment,
+            description='Hood release lever',
+            section_reference='interior_damage'
+        )
+        self.unsectioned_photo = AssessmentPhoto.objects.create(
+            assessment=self.assessment,
+            description='Exterior walkaround'
+        )
+    
+    def test_match_uses_damage_point_and_section_reference(self):
+        """Pinned photos match their damage point; keywords stay within the section."""
+        index = DamagePhotoIndex.for_assessment(self.assessment)
+        
+        bumper = index.match(['front_bumper'], ['exterior'], self.engine.get_part_keywords('Front Bumper'))
+        self.assertIn(self.pinned_photo.pk, bumper)
+        self.assertNotIn(self.keyword_photo.pk, bumper)
+        
+        hood = index.match(['hood'], ['exterior'], self.engine.get_part_keywords('Hood'))
+        self.assertIn(self.keyword_photo.pk, hood)
+        self.assertNotIn(self.other_section_photo.pk, hood)
+        self.assertNotIn(self.pinned_photo.pk, hood)
+        self.assertIn(self.unsectioned_photo.pk, hood)
+
+    def test_match_keywords_on_photos_outside_part_sections(self):
+        """Documentation and overall photos are matched on keywords like unsectioned ones."""
+        documentation_photo = AssessmentPhoto.objects.create(
+            assessment=self.assessment,
+            description='Hood damage for the claim file',
+            section_reference='documentation'
+        )
+        overall_photo = AssessmentPhoto.objects.create(
+            assessment=self.assessment,
+            description='Overall view showing the hood',
+            section_reference='overall'
+        )
+        index = DamagePhotoIndex.for_assessment(self.assessment)
+
+        hood = index.match(['hood'], ['exterior'], self.engine.get_part_keywords('Hood'))
+        self.assertIn(documentation_photo.pk, hood)
+        self.assertIn(overall_photo.pk, hood)
+
+        bumper = index.match(['front_bumper'], ['exterior'], self.engine.get_part_keywords('Front Bumper'))
+        self.assertNotIn(documentation_photo.pk, bumper)
+        self.assertNotIn(overall_photo.pk, bumper)
+
+    def test_identify_damaged_parts_links_images_in_bulk(self):
+        """All photo links are written with one index query and one insert."""
+        ExteriorBodyDamage.objects.filter(assessment=self.assessment).update(
+            front_bumper='moderate',
+            hood='severe'
+        )
+        assessment = VehicleAssessment.objects.get(pk=self.assessment.pk)
+        
+        with self.assertNumQueries(1):
+            DamagePhotoIndex.for_assessment(assessment).match([], [], [])
+        
+        parts = {part.part_name: part for part in self.engine.identify_damaged_parts(assessment)}
+        
+        self.assertEqual(
+            set(parts['Front Bumper'].damage_images.values_list('pk', flat=True)),
+            {self.pinned_photo.pk, self.unsectioned_photo.pk}
+        )
+        self.assertEqual(
+            set(parts['Hood'].damage_images.values_list('pk', flat=True)),
+            {self.keyword_photo.pk, self.unsectioned_photo.pk}
+        )
+
+
+class BulkPartsIdentificationTestCase(TestCase):
+    """Test cases for bulk parts identification."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.engine = PartsIdentificationEngine()
+        
+        self.user = User.objects.create_user(
+            username='bulkuser',
+            email='bulk@example.com',
+            password='testpass123'
+        )
+        
+        self.vehicle = Vehicle.objects.create(
+            make='Toyota',
+            model='Hilux',
+            manufacture_year=2018,
+            vin='1HGBH41JXMN109188'
+        )
+        
+        self.assessment = VehicleAssessment.objects.create(
+            assessment_id='TEST-BULK-001',
+            assessment_type='crash',
+            status='completed',
+            user=self.user,
+            vehicle=self.vehicle,
+            assessor_name='Test Assessor',
+            overall_severity='moderate'
+        )
+        
+        ExteriorBodyDamage.objects.filter(assessment=self.assessment).update(
+            front_bumper='moderate',
+            front_bumper_notes='Cracked',
+            hood='severe',
+            side_mirrors='destroyed'
+        )
+        WheelsAndTires.objects.filter(assessment=self.assessment).update(
+            front_left_tire='severe'
+        )
+    
+    def test_compiled_part_mappings(self):
+        """Compiled mappings mirror PART_MAPPINGS."""
+        compiled = PartsIdentificationEngine.COMPILED_PART_MAPPINGS
+        self.assertEqual(set(compiled), set(PartsIdentificationEngine.PART_MAPPINGS))
+        self.assertIn(
+            ('front_bumper', 'front_bumper_notes', 'Front Bumper', 'body'),
+            compiled['exterior']
+        )
+    
+    def test_bulk_matches_standard_identification(self):
+        """Bulk mode creates the same parts as the per-part path."""
+        bulk_parts = self.engine.identify_damaged_parts_bulk(self.assessment.pk)
+        bulk_summary = sorted(
+            (p.part_name, p.damage_severity, p.requires_replacement, p.notes)
+            for p in bulk_parts
+        )
+        
+        DamagedPart.objects.all().delete()
+        assessment = VehicleAssessment.objects.get(pk=self.assessment.pk)
+        standard_summary = sorted(
+            (p.part_name, p.damage_severity, p.requires_replacement, p.notes)
+            for p in self.engine.identify_damaged_parts(assessment)
+        )
+        
+        self.assertEqual(bulk_summary, standard_summary)
+        self.assertEqual(len(bulk_summary), 4)
+    
+    def test_bulk_query_count_is_independent_of_part_count(self):
+        """Sections load in one query and parts insert in one statement."""
+        assessment = self.engine.assessments_with_sections().get(pk=self.assessment.pk)
+        
+        with CaptureQueriesContext(connection) as ctx:
+            parts = self.engine.identify_damaged_parts_bulk(assessment)
+        
+        statements = [query['sql'] for query in ctx.captured_queries]
+        self.assertEqual(
+            len([sql for sql in statements if sql.startswith('INSERT INTO "insurance_app_damagedpart"')]), 1
+        )
+        self.assertFalse([sql for sql in statements if 'FROM "assessments_exteriorbodydamage"' in sql])
+        self.assertEqual(len([sql for sql in statements if 'FROM "assessments_assessmentphoto"' in sql]), 1)
+        self.assertEqual(DamagedPart.objects.filter(assessment=self.assessment).count(), len(parts))
+    
+    def test_bulk_replace(self):
+        """Replace mode removes previously identified parts."""
+        self.engine.identify_damaged_parts_bulk(self.assessment.pk)
+        self.engine.identify_damaged_parts_bulk(self.assessment.pk, replace=True)
+        
+        self.assertEqual(DamagedPart.objects.filter(assessment=self.assessment).count(), 4)
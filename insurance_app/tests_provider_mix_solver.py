@@ -0,0 +1,222 @@
+# tests_provider_mix_solver.py
+"""
+Tests for the ProviderMixSolver.
+
+Tests cover the per-quote constraints, the provider limit search (checked
+against exhaustive search on random claims), infeasible claims and loading
+quotes for an assessment.
+"""
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+from itertools import combinations
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import DamagedPart, PartQuote, PartQuoteRequest, PartMarketAverage
+from .provider_mix_solver import ProviderMixConstraints, ProviderMixSolver
+from assessments.models import VehicleAssessment
+from vehicles.models import Vehicle
+
+
+def make_quote(quote_id, part_id, provider, cost, category='body', completion_days=5,
+               warranty=12, part_type='oem'):
+    """Build a quote dictionary in the shape loaded by the solver"""
+    return {
+        'id': quote_id,
+        'damaged_part_id': part_id,
+        'damaged_part__part_category': category,
+        'provider_name': provider,
+        'provider_type': 'independent',
+        'total_cost': Decimal(str(cost)),
+        'estimated_completion_days': completion_days,
+        'part_warranty_months': warranty,
+        'part_type': part_type,
+    }
+
+
+class ProviderMixSolverTestCase(TestCase):
+    """Test cases for the provider mix search."""
+
+    def test_unconstrained_picks_cheapest_per_part(self):
+        """Without constraints every part takes its cheapest quote."""
+        quotes = [
+            make_quote(1, 1, 'A', 100), make_quote(2, 1, 'B', 90),
+            make_quote(3, 2, 'A', 50), make_quote(4, 2, 'B', 70),
+        ]
+
+        result = ProviderMixSolver().solve(quotes)
+
+        self.assertTrue(result.feasible)
+        self.assertEqual(result.total_cost, Decimal('140'))
+        self.assertEqual(sorted(s['quote_id'] for s in result.selections), [2, 3])
+        # Market average falls back to the mean of each part's quotes
+        self.assertEqual(result.market_average_total, Decimal('155.00'))
+        self.assertEqual(result.savings, Decimal('15.00'))
+
+    def test_provider_limit(self):
+        """A single-provider limit forces the cheapest single provider."""
+        quotes = [
+            make_quote(1, 1, 'A', 100), make_quote(2, 1, 'B', 90),
+            make_quote(3, 2, 'A', 50), make_quote(4, 2, 'B', 70),
+        ]
+
+        result = ProviderMixSolver(ProviderMixConstraints(max_providers=1)).solve(quotes)
+
+        self.assertEqual(result.providers, ['A'])
+        self.assertEqual(result.total_cost, Decimal('150'))
+
+    def test_per_quote_constraints(self):
+        """Deadline, warranty and OEM-only rules exclude quotes."""
+        quotes = [
+            make_quote(1, 1, 'A', 100, completion_days=20),
+            make_quote(2, 1, 'B', 120),
+            make_quote(3, 2, 'A', 50, warranty=6),
+            make_quote(4, 2, 'B', 60),
+            make_quote(5, 3, 'A', 30, category='safety', part_type='aftermarket_standard'),
+            make_quote(6, 3, 'B', 80, category='safety'),
+        ]
+        constraints = ProviderMixConstraints(
+            deadline_days=10, min_warranty_months=12, oem_only_categories=('safety',)
+        )
+
+        result = ProviderMixSolver(constraints).solve(quotes)
+
+        self.assertEqual(sorted(s['quote_id'] for s in result.selections), [2, 4, 6])
+
+    def test_infeasible_parts_reported(self):
+        """Parts with no allowed quote make the mix infeasible."""
+        quotes = [make_quote(1, 1, 'A', 100, completion_days=30), make_quote(2, 2, 'A', 50)]
+
+        result = ProviderMixSolver(ProviderMixConstraints(deadline_days=10)).solve(quotes)
+
+        self.assertFalse(result.feasible)
+        self.assertEqual(result.infeasible_parts, [1])
+
+    def test_matches_exhaustive_search(self):
+        """Branch and bound agrees with trying every provider subset."""
+        rng = random.Random(7)
+        providers = ['A', 'B', 'C', 'D', 'E']
+
+        for _ in range(25):
+            quotes = []
+            for part_id in range(1, 13):
+                for provider in rng.sample(providers, rng.randint(1, len(providers))):
+                    quotes.append(make_quote(len(quotes) + 1, part_id, provider, rng.randint(50, 500)))
+            limit = rng.randint(1, 3)
+
+            result = ProviderMixSolver(ProviderMixConstraints(max_providers=limit)).solve(quotes)
+
+            best = None
+            for size in range(1, limit + 1):
+                for subset in combinations(providers, size):
+                    cheapest = {}
+                    for quote in quotes:
+                        if quote['provider_name'] in subset:
+                            part_id = quote['damaged_part_id']
+                            cheapest[part_id] = min(cheapest.get(part_id, quote['total_cost']), quote['total_cost'])
+                    if len(cheapest) == 12 and (best is None or sum(cheapest.values()) < best):
+                        best = sum(cheapest.values())
+
+            self.assertEqual(result.feasible, best is not None)
+            if best is not None:
+                self.assertEqual(result.total_cost, best)
+                self.assertLessEqual(len(result.providers), limit)
+
+    def test_constraints_from_request_data(self):
+        """Constraints parse from POST data with blanks meaning no limit."""
+        constraints = ProviderMixConstraints.from_request_data({
+            'max_providers': '2', 'deadline_days': '', 'oem_only_safety': 'on'
+        })
+
+        self.assertEqual(constraints.max_providers, 2)
+        self.assertIsNone(constraints.deadline_days)
+        self.assertEqual(constraints.oem_only_categories, ('safety',))
+
+        with self.assertRaises(ValueError):
+            ProviderMixConstraints.from_request_data({'max_providers': 'two'})
+
+
+class ProviderMixAssessmentTestCase(TestCase):
+    """Test solving for a stored assessment."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='mixuser', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            make='Toyota', model='Camry', manufacture_year=2020, vin='MIXTESTVIN0000001'
+        )
+        self.assessment = VehicleAssessment.objects.create(
+            assessment_id='TEST-MIX-001',
+            assessment_type='insurance_claim',
+            status='completed',
+            user=self.user,
+            vehicle=self.vehicle,
+            assessor_name='Test Assessor',
+            overall_severity='moderate'
+        )
+        self.parts = [
+            DamagedPart.objects.create(
+                assessment=self.assessment,
+                section_type='exterior',
+                part_name=name,
+                part_category='body',
+                damage_severity='moderate',
+                damage_description='Damaged'
+            )
+            for name in ('Front Bumper', 'Hood')
+        ]
+
+        for part, costs in zip(self.parts, ((300, 350), (500, 420))):
+            request = PartQuoteRequest.objects.create(
+                damaged_part=part,
+                assessment=self.assessment,
+                expiry_date=timezone.now() + timedelta(days=7),
+                vehicle_make='Toyota',
+                vehicle_model='Camry',
+                vehicle_year=2020,
+                dispatched_by=self.user
+            )
+            for provider, cost in zip(('Dealer A', 'Shop B'), costs):
+                PartQuote.objects.create(
+                    quote_request=request,
+                    damaged_part=part,
+                    provider_name=provider,
+                    provider_type='dealer' if provider == 'Dealer A' else 'independent',
+                    part_cost=Decimal(cost),
+                    labor_cost=Decimal('0'),
+                    total_cost=Decimal(cost),
+                    estimated_delivery_days=3,
+                    estimated_completion_days=5,
+                    valid_until=timezone.now() + timedelta(days=30),
+                    status='validated'
+                )
+
+        PartMarketAverage.objects.create(
+            damaged_part=self.parts[0],
+            average_total_cost=Decimal('400'),
+            average_part_cost=Decimal('400'),
+            average_labor_cost=Decimal('0'),
+            min_total_cost=Decimal('300'),
+            max_total_cost=Decimal('500'),
+            standard_deviation=Decimal('25'),
+            variance_percentage=Decimal('12.50'),
+            quote_count=2,
+            confidence_level=70
+        )
+
+    def test_solve_for_assessment(self):
+        """Quotes and market averages load in two queries."""
+        with self.assertNumQueries(2):
+            result = ProviderMixSolver(ProviderMixConstraints(max_providers=1)).solve_for_assessment(
+                self.assessment
+            )
+
+        self.assertTrue(result.feasible)
+        self.assertEqual(result.providers, ['Shop B'])
+        self.assertEqual(result.total_cost, Decimal('770'))
+        # 400 stored average + 460 mean of the hood quotes
+        self.assertEqual(result.savings, Decimal('90.00'))
@@ -0,0 +1,204 @@
+# tests_quote_health.py
+"""
+Tests for the QuoteHealthCollector.
+
+Tests cover the collected metrics, the query count, the incremental
+hourly rollup, outlier counting in the database and the monitoring command.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import (
+    DamagedPart, PartMarketAverage, PartQuote, PartQuoteRequest, QuoteHealthRollup,
+    QuoteSystemAuditLog, QuoteSystemHealthMetrics,
+)
+from .audit_sink import audit_sink
+from .quote_health import QuoteHealthCollector
+from assessments.models import VehicleAssessment
+from vehicles.models import Vehicle
+
+
+class QuoteHealthCollectorTestCase(TestCase):
+    """Test cases for the database-side health metrics."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.now = timezone.now()
+        self.user = User.objects.create_user(username='healthuser', password='testpass123')
+        vehicle = Vehicle.objects.create(
+            make='Toyota', model='Camry', manufacture_year=2020, vin='HEALTHTESTVIN0001'
+        )
+        self.assessment = VehicleAssessment.objects.create(
+            assessment_id='TEST-HEALTH-001',
+            assessment_type='insurance_claim',
+            status='completed',
+            user=self.user,
+            vehicle=vehicle,
+            assessor_name='Test Assessor',
+            overall_severity='moderate'
+        )
+        self.parts = [
+            DamagedPart.objects.create(
+                assessment=self.assessment,
+                section_type='exterior',
+                part_name=name,
+                part_category='body',
+                damage_severity='moderate',
+                damage_description='Damaged'
+            )
+            for name in ('Front Bumper', 'Hood', 'Door')
+        ]
+
+        # Requests spread over the day, one outside the 24 hour window
+        first = self.quote_request(5, status='received', dealer=True, independent=True, dispatched=5)
+        second = self.quote_request(3, status='sent', dealer=True, network=True, dispatched=3)
+        self.quote_request(2, status='expired', assessor=True)
+        self.quote_request(30, status='cancelled', dealer=True)
+
+        self.quote(first, 'dealer', hours_ago=4)
+        self.quote(first, 'independent', hours_ago=2)
+        self.quote(second, 'dealer', hours_ago=1)
+        self.quote(second, 'network', hours_ago=27)
+
+        self.audit_log('quote_received', 'error', 'Provider API timed out', hours_ago=3)
+        self.audit_log('quote_rejected', 'error', 'Database write failed', hours_ago=2)
+        self.audit_log('quote_rejected', 'warning', 'Database slow', hours_ago=2)
+        self.audit_log('system_error', 'error', 'Database unavailable', hours_ago=40)
+
+        for part, confidence, outliers in zip(self.parts, (90, 60, 75), ([1, 2], [], {'quote': 3})):
+            self.market_average(part, confidence, outliers)
+
+    def quote_request(self, hours_ago, status, dispatched=None, assessor=False, dealer=False,
+                      independent=False, network=False):
+        request = PartQuoteRequest.objects.create(
+            damaged_part=self.parts[0],
+            assessment=self.assessment,
+            expiry_date=self.now + timedelta(days=7),
+            status=status,
+            include_assessor=assessor,
+            include_dealer=dealer,
+            include_independent=independent,
+            include_network=network,
+            vehicle_make='Toyota',
+            vehicle_model='Camry',
+            vehicle_year=2020,
+            dispatched_by=self.user,
+            dispatched_at=self.now - timedelta(hours=dispatched) if dispatched else None,
+        )
+        PartQuoteRequest.objects.filter(pk=request.pk).update(request_date=self.now - timedelta(hours=hours_ago))
+        return request
+
+    def quote(self, request, provider_type, hours_ago):
+        quote = PartQuote.objects.create(
+            quote_request=request,
+            damaged_part=request.damaged_part,
+            provider_name=f'{provider_type.title()} Provider',
+            provider_type=provider_type,
+            part_cost=Decimal('100'),
+            labor_cost=Decimal('0'),
+            total_cost=Decimal('100'),
+            estimated_delivery_days=3,
+            estimated_completion_days=5,
+            valid_until=self.now + timedelta(days=30),
+            status='validated'
+        )
+        PartQuote.objects.filter(pk=quote.pk).update(quote_date=self.now - timedelta(hours=hours_ago))
+        return quote
+
+    def audit_log(self, action_type, severity, message, hours_ago):
+        QuoteSystemAuditLog.objects.create(
+            action_type=action_type,
+            severity=severity,
+            message=message,
+            timestamp=self.now - timedelta(hours=hours_ago),
+        )
+
+    def market_average(self, part, confidence, outliers):
+        PartMarketAverage.objects.create(
+            damaged_part=part,
+            average_total_cost=Decimal('100'),
+            average_part_cost=Decimal('100'),
+            average_labor_cost=Decimal('0'),
+            min_total_cost=Decimal('90'),
+            max_total_cost=Decimal('110'),
+            standard_deviation=Decimal('5'),
+            variance_percentage=Decimal('5.00'),
+            quote_count=3,
+            confidence_level=confidence,
+            outlier_quotes=outliers,
+        )
+
+    def test_collect(self):
+        """Collected metrics match the counts of the rows in the window."""
+        metrics = QuoteHealthCollector().collect(self.now)
+
+        self.assertEqual(metrics['total_quote_requests_24h'], 3)
+        self.assertEqual(metrics['successful_quote_requests_24h'], 2)
+        self.assertEqual(metrics['failed_quote_requests_24h'], 1)
+        self.assertEqual(metrics['total_quotes_received_24h'], 3)
+        # Dispatched 5h and 3h ago, answered after 1h, 3h and 2h
+        self.assertAlmostEqual(metrics['average_response_time_hours'], 2.0)
+        self.assertAlmostEqual(metrics['dealer_success_rate'], 100.0)
+        self.assertAlmostEqual(metrics['independent_success_rate'], 100.0)
+        self.assertAlmostEqual(metrics['network_success_rate'], 0.0)
+        self.assertAlmostEqual(metrics['assessor_success_rate'], 0.0)
+        self.assertEqual(metrics['api_errors_24h'], 1)
+        self.assertEqual(metrics['database_errors_24h'], 1)
+        self.assertEqual(metrics['validation_errors_24h'], 1)
+        self.assertEqual(metrics['high_confidence_market_averages'], 2)
+        self.assertEqual(metrics['low_confidence_market_averages'], 1)
+        # Only JSON arrays hold outliers
+        self.assertEqual(metrics['outlier_quotes_detected'], 2)
+
+    def test_collect_query_count(self):
+        """A collection is a fixed number of queries however much data there is."""
+        QuoteHealthCollector().collect(self.now)
+        for hours_ago in range(10):
+            self.quote(PartQuoteRequest.objects.first(), 'dealer', hours_ago=hours_ago)
+
+        with self.assertNumQueries(10):
+            QuoteHealthCollector().collect(self.now)
+
+    def test_incremental_rollup(self):
+        """Later runs only rescan from the last rolled up hour."""
+        collector = QuoteHealthCollector()
+        collector.collect(self.now)
+        request = PartQuoteRequest.objects.first()
+
+        # New activity is counted by the next run
+        later = self.now + timedelta(hours=1)
+        self.quote(request, 'dealer', hours_ago=-1)
+        self.assertEqual(collector.collect(later)['total_quotes_received_24h'], 4)
+
+        # Rows backdated into an already rolled up hour wait for a rebuild
+        self.quote(request, 'dealer', hours_ago=6)
+        self.assertEqual(collector.collect(later)['total_quotes_received_24h'], 4)
+        collector.update_rollup(later, rebuild=True)
+        self.assertEqual(collector.collect(later)['total_quotes_received_24h'], 5)
+        self.assertEqual(
+            QuoteHealthRollup.objects.values('bucket_start').distinct().count(),
+            QuoteHealthRollup.objects.count()
+        )
+
+    def test_command(self):
+        """The monitoring command records metrics and logs its alerts."""
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('monitor_quote_system_health', rebuild_rollup=True, generate_report=True, stdout=out)
+        audit_sink.flush()
+
+        record = QuoteSystemHealthMetrics.objects.get()
+        self.assertEqual(record.total_quotes_received_24h, 3)
+        self.assertEqual(record.outlier_quotes_detected, 2)
+        self.assertIn('QUOTE SYSTEM HEALTH REPORT', out.getvalue())
+        # Assessor and network providers are below 50%
+        self.assertEqual(
+            QuoteSystemAuditLog.objects.filter(action_type='provider_disabled', severity='warning').count(), 2
+        )
@@ -76,11 +76,12 @@ class QuoteRecommendationEngineTest(TestCase):
     
     def create_test_quote(self, provider_name, provider_type, total_cost,
                          part_type='oem', delivery_days=5, completion_days=7,
-                         part_warranty=12, labor_warranty=12, confidence=80):
+                         part_warranty=12, labor_warranty=12, confidence=80,
+                         damaged_part=None):
         """Helper method to create test quotes"""
         return PartQuote.objects.create(
             quote_request=self.quote_request,
-            damaged_part=self.damaged_part,
+            damaged_part=damaged_part or self.damaged_part,
             provider_name=provider_name,
             provider_type=provider_type,
             part_cost=Decimal(str(total_cost * 0.7)),
@@ -380,4 +381,80 @@ class QuoteRecommendationEngineTest(TestCase):
         self.assertIsInstance(reasoning, str)
         self.assertGreater(len(reasoning), 30)
         self.assertIn("Best Provider", reasoning)
-        self.assertIn("Score:", reasoning)
\ No newline at end of file
+        self.assertIn("Score:", reasoning)
+    
+    def create_second_part(self):
+        """Helper method to create another damaged part on the assessment"""
+        return DamagedPart.objects.create(
+            assessment=self.assessment,
+            section_type='exterior',
+            part_name='Hood',
+            part_category='body',
+            damage_severity='severe',
+            damage_description='Dented hood',
+            estimated_labor_hours=Decimal('4.0')
+        )
+    
+    def test_score_quote_matrix_matches_scalar_scores(self):
+        """Vectorised scores agree with the per-quote scoring methods"""
+        hood = self.create_second_part()
+        self.create_test_quote('Dealer A', 'dealer', 1200, 'oem', 3, 5, 24, 12, 95)
+        self.create_test_quote('Shop B', 'independent', 800, 'aftermarket_standard', 7, 10, 12, 6, 75)
+        self.create_test_quote('Network C', 'network', 1000, 'oem_equivalent', 5, 7, 18, 12, 85)
+        self.create_test_quote('Dealer A', 'dealer', 2000, 'oem', 4, 6, 24, 12, 90, damaged_part=hood)
+        self.create_test_quote('Shop B', 'independent', 2000, 'generic', 4, 6, 6, 3, 50, damaged_part=hood)
+        
+        recommendation = self.engine.build_assessment_recommendation(self.assessment)
+        matrix = recommendation.matrix
+        
+        for part in (self.damaged_part, hood):
+            quotes = list(part.quotes.filter(status='validated'))
+            scalar_scores = self.engine.calculate_provider_scores(quotes)
+            for index, quote in enumerate(matrix.quotes):
+                if quote['id'] in scalar_scores:
+                    expected = scalar_scores[quote['id']]
+                    self.assertAlmostEqual(matrix.price[index], expected.price_score)
+                    self.assertAlmostEqual(matrix.quality[index], expected.quality_score)
+                    self.assertAlmostEqual(matrix.timeline[index], expected.timeline_score)
+                    self.assertAlmostEqual(matrix.warranty[index], expected.warranty_score)
+                    self.assertAlmostEqual(matrix.reliability[index], expected.reliability_score)
+                    self.assertAlmostEqual(matrix.total[index], expected.total_score)
+            
+            best = self.engine.generate_recommendation(part).recommended_quotes[0]
+            self.assertIn(best.id, recommendation.strategy_summary('best_value')['quote_ids'])
+    
+    def test_generate_assessment_recommendations(self):
+        """Assessment recommendations pick one quote per part with alternatives"""
+        hood = self.create_second_part()
+        self.create_second_part()  # no quotes
+        self.create_test_quote('Dealer A', 'dealer', 1500, 'oem', 3, 5, 24, 12, 95)
+        self.create_test_quote('Shop B', 'independent', 700, 'aftermarket_standard', 10, 14, 12, 6, 60)
+        self.create_test_quote('Network C', 'network', 900, 'oem', 2, 3, 24, 12, 90, damaged_part=hood)
+        
+        with self.assertNumQueries(2):
+            result = self.engine.generate_assessment_recommendations(
+                self.assessment, 'lowest_price', include_reasoning=False
+            )
+        
+        self.assertEqual(len(result['parts']), 2)
+        self.assertEqual(len(result['parts_without_quotes']), 1)
+        self.assertEqual(result['total_cost'], 1600.0)
+        self.assertEqual(result['potential_savings'], 800.0)
+        self.assertEqual(result['provider_mix']['independent']['parts'], 1)
+        self.assertEqual(result['provider_mix']['network']['parts'], 1)
+        self.assertIn('best_value', result['alternative_strategies'])
+        self.assertNotIn('lowest_price', result['alternative_strategies'])
+        self.assertNotIn('reasoning', result['parts'][0])
+        
+        with_reasoning = self.engine.generate_assessment_recommendations(self.assessment)
+        self.assertIn('Score:', with_reasoning['parts'][0]['reasoning'])
+    
+    def test_generate_assessment_recommendations_no_quotes(self):
+        """Assessments without validated quotes return an empty recommendation"""
+        result = self.engine.generate_assessment_recommendations(self.assessment)
+        
+        self.assertEqual(result['parts'], [])
+        self.assertEqual(result['parts_without_quotes'], [self.damaged_part.id])
+        
+        with self.assertRaises(ValueError):
+            self.engine.generate_assessment_recommendations(self.assessment, 'unknown')
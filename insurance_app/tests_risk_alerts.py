@@ -0,0 +1,253 @@
+# tests_risk_alerts.py
+"""
+Tests for the set-based risk alert tasks.
+
+Tests cover agreement of the condition deterioration alerts with the
+per-vehicle loop, overdue maintenance severities and the open alert key
+guard, open and resolved alerts, the generic date difference, keyset
+batches and the query counts.
+"""
+
+import random
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import DateField, F, Value
+
+from .models import MaintenanceSchedule, RiskAlert, VehicleConditionScore, Vehicle as InsuranceVehicle
+from .risk_alerts import (
+    DaysBetween, bulk_create_alerts, create_deterioration_alerts, create_overdue_maintenance_alerts,
+    overdue_maintenance, overdue_maintenance_alert,
+)
+from .tasks import check_condition_deterioration, generate_maintenance_alerts
+from .testing import InsuredVehicleTestCase
+
+
+class RiskAlertTestCase(InsuredVehicleTestCase):
+    """Shared fixtures for the risk alert tests."""
+
+    VIN_PREFIX = 'RISKALERTVIN'
+
+    def make_vehicle(self, number, scores=()):
+        insured = super().make_vehicle(number, make='Ford', model='Focus', manufacture_year=2015 + number % 8)
+        for days_ago, score in scores:
+            self.score(insured, days_ago, score)
+        return insured
+
+
+class ConditionDeteriorationTestCase(RiskAlertTestCase):
+    """Test cases for condition deterioration alerts."""
+
+    def score(self, vehicle, days_ago, score):
+        return VehicleConditionScore.objects.create(
+            vehicle=vehicle,
+            assessment_date=self.today - timedelta(days=days_ago),
+            engine_score=score, transmission_score=score, brake_score=score, tire_score=score,
+            suspension_score=score, electrical_score=score, overall_score=score,
+            assessment_type='inspection',
+        )
+
+    def legacy_alerts(self):
+        """The alerts the per-vehicle loop created, as (vehicle, title, description, impact)"""
+        alerts = set()
+        for vehicle in InsuranceVehicle.objects.all():
+            recent_scores = vehicle.condition_scores.all()[:2]
+            if len(recent_scores) >= 2:
+                latest_score = recent_scores[0].overall_score
+                previous_score = recent_scores[1].overall_score
+                if previous_score - latest_score > 10:
+                    open_alert = RiskAlert.objects.filter(
+                        vehicle=vehicle, alert_type='condition_deterioration', is_resolved=False
+                    ).exists()
+                    if not open_alert:
+                        details = vehicle.vehicle
+                        alerts.add((
+                            vehicle.pk,
+                            f'Condition Deterioration: {details.manufacture_year} {details.make} {details.model}',
+                            f'Vehicle health index dropped from {previous_score} to {latest_score}',
+                            round(abs(previous_score - latest_score) * 0.05, 6),
+                        ))
+        return alerts
+
+    def created_alerts(self):
+        return {
+            (alert.vehicle_id, alert.title, alert.description, round(alert.risk_score_impact, 6))
+            for alert in RiskAlert.objects.filter(alert_type='condition_deterioration', is_resolved=False)
+        }
+
+    def test_matches_per_vehicle_loop(self):
+        """Random score histories produce the alerts the loop produced."""
+        rng = random.Random(17)
+        for number in range(60):
+            days = rng.sample(range(1, 400), rng.randint(0, 5))
+            self.make_vehicle(number, [(day, round(rng.uniform(40, 100), 1)) for day in days])
+        # Open alerts block a new one, resolved alerts do not
+        for vehicle in InsuranceVehicle.objects.all()[:20]:
+            RiskAlert.objects.create(
+                vehicle=vehicle, alert_type='condition_deterioration', severity='medium',
+                title='Earlier', description='Earlier', risk_score_impact=1,
+                is_resolved=vehicle.pk % 2 == 0,
+            )
+        expected = self.legacy_alerts()
+        self.assertTrue(expected)
+
+        result = check_condition_deterioration()
+
+        self.assertEqual(result, f'Created {len(expected)} condition deterioration alerts')
+        new_alerts = self.created_alerts() - {
+            (vehicle_id, 'Earlier', 'Earlier', 1.0) for vehicle_id in InsuranceVehicle.objects.values_list('pk', flat=True)
+        }
+        self.assertEqual(new_alerts, expected)
+
+        # A second run finds every deteriorated vehicle already alerted
+        self.assertEqual(create_deterioration_alerts(), 0)
+
+    def test_threshold_and_latest_scores(self):
+        """Only a drop of more than the threshold between the latest two scores alerts."""
+        dropped = self.make_vehicle(1, [(30, 90.0), (20, 95.0), (10, 80.0)])
+        self.make_vehicle(2, [(20, 90.0), (10, 80.0)])  # exactly 10
+        self.make_vehicle(3, [(30, 95.0), (20, 70.0), (10, 72.0)])  # old drop, now improving
+        self.make_vehicle(4, [(10, 50.0)])
+
+        self.assertEqual(create_deterioration_alerts(), 1)
+
+        alert = RiskAlert.objects.get()
+        self.assertEqual(alert.vehicle, dropped)
+        self.assertEqual(alert.description, 'Vehicle health index dropped from 95.0 to 80.0')
+        self.assertEqual(alert.title, 'Condition Deterioration: 2016 Ford Focus')
+
+    def test_queries_per_batch(self):
+        """The alerts come from one query and one insert per batch, and a final empty query."""
+        for number in range(10):
+            self.make_vehicle(number, [(20, 90.0), (10, 60.0)])
+
+        with self.assertNumQueries(5):
+            self.assertEqual(create_deterioration_alerts(batch_size=5), 10)
+
+
+class OverdueMaintenanceTestCase(RiskAlertTestCase):
+    """Test cases for overdue maintenance alerts."""
+
+    def schedule(self, vehicle, days_ago, maintenance_type='oil_change', priority_level='medium', **fields):
+        return MaintenanceSchedule.objects.create(
+            vehicle=vehicle,
+            maintenance_type=maintenance_type,
+            priority_level=priority_level,
+            scheduled_date=self.today - timedelta(days=days_ago),
+            **fields
+        )
+
+    def alert(self, vehicle, maintenance_type='oil_change', **fields):
+        fields.setdefault('alert_key', f'maintenance_overdue:{maintenance_type}')
+        return RiskAlert.objects.create(
+            vehicle=vehicle, alert_type='maintenance_overdue', severity='high',
+            title='Earlier', description='Earlier', risk_score_impact=1, **fields
+        )
+
+    def test_severity_and_impact(self):
+        """Severity follows days overdue and priority; completed and future schedules are ignored."""
+        recent = self.make_vehicle(1)
+        self.schedule(recent, 5, 'brake_service')
+        late = self.make_vehicle(2)
+        self.schedule(late, 31, 'inspection', priority_level='low')
+        urgent = self.make_vehicle(3)
+        self.schedule(urgent, 2, priority_level='critical')
+        idle = self.make_vehicle(4)
+        self.schedule(idle, 40, is_completed=True, completed_date=self.today)
+        self.schedule(idle, -5)
+
+        self.assertEqual(generate_maintenance_alerts(), 'Created 3 maintenance alerts')
+
+        alerts = {alert.vehicle_id: alert for alert in RiskAlert.objects.all()}
+        self.assertEqual(set(alerts), {recent.pk, late.pk, urgent.pk})
+        self.assertEqual(alerts[recent.pk].severity, 'high')
+        self.assertEqual(alerts[recent.pk].title, 'Overdue Maintenance: Brake Service')
+        self.assertEqual(alerts[recent.pk].description, 'Brake Service overdue by 5 days')
+        self.assertAlmostEqual(alerts[recent.pk].risk_score_impact, 0.5)
+        self.assertEqual(alerts[late.pk].severity, 'critical')
+        self.assertEqual(alerts[late.pk].description, 'Safety Inspection overdue by 31 days')
+        self.assertAlmostEqual(alerts[late.pk].risk_score_impact, 3.1)
+        self.assertEqual(alerts[urgent.pk].severity, 'critical')
+        self.assertEqual(alerts[urgent.pk].alert_key, 'maintenance_overdue:oil_change')
+
+    def test_days_between_generic_fallback(self):
+        """Backends without their own date difference get the same days overdue."""
+        class GenericDaysBetween(DaysBetween):
+            as_sqlite = as_postgresql = as_mysql = None
+
+        vehicle = self.make_vehicle(1)
+        for days_ago in (1, 31, 400):
+            self.schedule(vehicle, days_ago)
+        today = Value(self.today, output_field=DateField())
+
+        rows = MaintenanceSchedule.objects.annotate(
+            native=DaysBetween(today, F('scheduled_date')),
+            generic=GenericDaysBetween(today, F('scheduled_date')),
+        ).order_by('scheduled_date').values_list('native', 'generic')
+
+        self.assertEqual(list(rows), [(400, 400), (31, 31), (1, 1)])
+
+    def test_one_open_alert_per_vehicle_and_type(self):
+        """Open alerts block a new one, resolved alerts and other types do not."""
+        vehicle = self.make_vehicle(1)
+        self.schedule(vehicle, 10)
+        self.schedule(vehicle, 20)
+        self.schedule(vehicle, 3, 'tire_rotation')
+        self.schedule(vehicle, 3, 'coolant_flush')
+        self.alert(vehicle, 'tire_rotation')
+        self.alert(vehicle, 'coolant_flush', is_resolved=True)
+
+        self.assertEqual(create_overdue_maintenance_alerts(), 2)
+        self.assertEqual(create_overdue_maintenance_alerts(), 0)
+
+        oil_change = RiskAlert.objects.get(alert_key='maintenance_overdue:oil_change')
+        self.assertEqual(oil_change.description, 'Oil Change overdue by 20 days')
+        self.assertEqual(
+            RiskAlert.objects.filter(alert_key='maintenance_overdue:coolant_flush', is_resolved=False).count(), 1
+        )
+
+    def test_unique_open_alert_key(self):
+        """The database rejects a second open alert with the same key."""
+        vehicle = self.make_vehicle(1)
+        self.alert(vehicle)
+        self.alert(vehicle, is_resolved=True)
+        self.alert(vehicle, alert_key='')
+        self.alert(vehicle, alert_key='')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.alert(vehicle)
+
+    def test_overlapping_runs_do_not_duplicate(self):
+        """Alerts inserted by another run after the select are skipped, not duplicated."""
+        for number in range(4):
+            self.schedule(self.make_vehicle(number), 10)
+        rows = list(overdue_maintenance())
+        # Another run alerts the first vehicle in the meantime
+        self.alert(InsuranceVehicle.objects.get(pk=rows[0]['vehicle_id']))
+
+        created = bulk_create_alerts([overdue_maintenance_alert(row) for row in rows], ignore_conflicts=True)
+
+        self.assertEqual(created, 3)
+        self.assertEqual(RiskAlert.objects.count(), 4)
+
+    def test_queries_per_batch(self):
+        """Each batch takes a query, an insert and a count, and the last batch one empty query."""
+        for number in range(10):
+            self.schedule(self.make_vehicle(number), 10)
+
+        with self.assertNumQueries(7):
+            self.assertEqual(create_overdue_maintenance_alerts(batch_size=5), 10)
+
+    def test_batches_split_within_a_vehicle(self):
+        """Batches keyed on vehicle and type cover every type of a vehicle once."""
+        vehicle = self.make_vehicle(1)
+        for maintenance_type in ('oil_change', 'tire_rotation', 'brake_service'):
+            self.schedule(vehicle, 5, maintenance_type)
+            self.schedule(vehicle, 15, maintenance_type)
+        self.schedule(self.make_vehicle(2), 5)
+
+        self.assertEqual(create_overdue_maintenance_alerts(batch_size=2), 4)
+
+        alerts = RiskAlert.objects.filter(vehicle=vehicle)
+        self.assertEqual(alerts.count(), 3)
+        self.assertEqual({alert.description.split(' by ')[1] for alert in alerts}, {'15 days'})
@@ -0,0 +1,210 @@
+# tests_risk_report.py
+"""
+Tests for the streaming risk report.
+
+Tests cover agreement of the annotated columns with the per-vehicle
+queries they replace, the CSV and JSON output, the query count, keyset
+chunking and id range partitioning across workers.
+"""
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from maintenance_history.models import MaintenanceRecord
+from .models import (
+    Accident, MaintenanceCompliance, MaintenanceSchedule, RiskAlert, VehicleConditionScore,
+)
+from .risk_report import REPORT_COLUMNS, iter_report_rows, vehicle_id_ranges, write_report
+from .testing import InsuredVehicleTestCase
+
+
+class RiskReportTestCase(InsuredVehicleTestCase):
+    """Test cases for the risk report rows and files."""
+
+    VIN_PREFIX = 'RISKREPORTVIN'
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def path(self, name):
+        return os.path.join(self.output_dir, name)
+
+    def make_vehicle(self, number):
+        return super().make_vehicle(
+            number, manufacture_year=2010 + number % 10,
+            risk_score=1 + number % 9, vehicle_health_index=50 + number,
+            last_inspection_date=self.today - timedelta(days=number) if number % 2 else None,
+        )
+
+    def make_fleet(self, size, first=0):
+        vehicles = [self.make_vehicle(number) for number in range(first, first + size)]
+        for number, vehicle in enumerate(vehicles):
+            for days in range(number % 4):
+                MaintenanceSchedule.objects.create(
+                    vehicle=vehicle, maintenance_type='oil_change',
+                    scheduled_date=self.today + timedelta(days=10 - days * 10),
+                    is_completed=days == 2,
+                )
+            for days in range(number % 3):
+                Accident.objects.create(
+                    vehicle=vehicle, accident_date=self.now - timedelta(days=200 + days * 200),
+                    severity='minor', claim_amount=100, description='Scrape', location='Car park',
+                )
+            for resolved in [False, True][:number % 3]:
+                RiskAlert.objects.create(
+                    vehicle=vehicle, alert_type='high_risk_vehicle', severity='high', title='Risk',
+                    description='Risk', risk_score_impact=1, is_resolved=resolved,
+                )
+            for days in range(number % 3):
+                VehicleConditionScore.objects.create(
+                    vehicle=vehicle, assessment_date=self.today - timedelta(days=days * 30),
+                    engine_score=80, transmission_score=80, brake_score=80, tire_score=80,
+                    suspension_score=80, electrical_score=80, overall_score=90 - days * 10 - number,
+                    assessment_type='inspection',
+                )
+            if number % 2:
+                MaintenanceCompliance.objects.create(
+                    vehicle=vehicle, overall_compliance_rate=70 + number, critical_maintenance_compliance=60
+                )
+            if number % 5:
+                for days, mileage in ((90, 10000), (10, 12000 + number)):
+                    MaintenanceRecord.objects.create(
+                        vehicle=vehicle.vehicle, work_done='Service', mileage=mileage,
+                        date_performed=self.now - timedelta(days=days),
+                    )
+        return vehicles
+
+    def legacy_row(self, vehicle):
+        """The row the per-vehicle queries produced"""
+        compliance = getattr(vehicle, 'compliance', None)
+        latest_condition = vehicle.condition_scores.first()
+        return {
+            'policy_number': vehicle.policy.policy_number,
+            'vin': vehicle.vehicle.vin,
+            'make': vehicle.vehicle.make,
+            'model': vehicle.vehicle.model,
+            'year': vehicle.vehicle.manufacture_year,
+            'mileage': vehicle.vehicle.current_mileage,
+            'risk_score': vehicle.risk_score,
+            'health_index': vehicle.vehicle_health_index,
+            'compliance_rate': compliance.overall_compliance_rate if compliance else 0,
+            'critical_compliance': compliance.critical_maintenance_compliance if compliance else 0,
+            'overdue_maintenance': vehicle.maintenance_schedules.filter(
+                is_completed=False, scheduled_date__lt=self.today
+            ).count(),
+            'recent_accidents': vehicle.accidents.filter(accident_date__gte=self.now - timedelta(days=365)).count(),
+            'condition_score': latest_condition.overall_score if latest_condition else 0,
+            'active_alerts': vehicle.risk_alerts.filter(is_resolved=False).count(),
+            'last_inspection': vehicle.last_inspection_date or 'Never',
+        }
+
+    def test_rows_match_per_vehicle_queries(self):
+        """Every annotated column agrees with the query it replaces."""
+        vehicles = self.make_fleet(12)
+
+        rows = list(iter_report_rows(chunk_size=5))
+
+        self.assertEqual(rows, [self.legacy_row(vehicle) for vehicle in vehicles])
+        self.assertEqual(list(rows[0]), list(REPORT_COLUMNS))
+        self.assertEqual(rows[3]['mileage'], 12003)
+        self.assertIsNone(rows[0]['mileage'])
+
+    def test_one_query_for_the_fleet(self):
+        """The report is one SELECT however many vehicles there are."""
+        self.make_fleet(3)
+        with self.assertNumQueries(1):
+            self.assertEqual(write_report(self.path('small.csv'), chunk_size=100), 3)
+        self.make_fleet(30, first=3)
+        with self.assertNumQueries(1):
+            self.assertEqual(write_report(self.path('large.csv'), chunk_size=100), 33)
+
+    def test_reads_a_chunk_per_query(self):
+        """Each chunk is its own query starting after the last vehicle read."""
+        self.make_fleet(12)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(write_report(self.path('chunked.csv'), chunk_size=5), 12)
+
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn('"id" > ', queries[0]['sql'])
+        self.assertIn('"id" > ', queries[2]['sql'])
+
+    def test_csv_and_json_output(self):
+        """The command writes the same rows as CSV and as JSON."""
+        vehicles = self.make_fleet(6)
+        expected = [self.legacy_row(vehicle) for vehicle in vehicles]
+
+        call_command('generate_risk_report', output=self.path('report.csv'), stdout=StringIO())
+        call_command(
+            'generate_risk_report', output=self.path('report.json'), format='json', stdout=StringIO()
+        )
+
+        with open(self.path('report.csv'), newline='') as report:
+            csv_rows = list(csv.DictReader(report))
+        self.assertEqual(len(csv_rows), 6)
+        self.assertEqual(csv_rows[1]['vin'], expected[1]['vin'])
+        self.assertEqual(csv_rows[1]['last_inspection'], str(expected[1]['last_inspection']))
+        self.assertEqual(csv_rows[2]['last_inspection'], 'Never')
+
+        with open(self.path('report.json')) as report:
+            data = json.load(report)
+        self.assertEqual(data['total_vehicles'], 6)
+        self.assertEqual(data['vehicles'][1]['overdue_maintenance'], expected[1]['overdue_maintenance'])
+        self.assertEqual(data['vehicles'][1]['last_inspection'], str(expected[1]['last_inspection']))
+        self.assertIn('generated_at', data)
+
+    def test_empty_fleet(self):
+        """A fleet without vehicles gives a header-only CSV and an empty JSON list."""
+        self.assertEqual(write_report(self.path('empty.csv')), 0)
+        with open(self.path('empty.csv')) as report:
+            self.assertEqual(report.read().strip(), ','.join(REPORT_COLUMNS))
+        self.assertEqual(write_report(self.path('empty.json'), 'json', workers=3), 0)
+        with open(self.path('empty.json')) as report:
+            self.assertEqual(json.load(report)['vehicles'], [])
+
+    def test_id_ranges_cover_fleet(self):
+        """Worker id ranges are contiguous, disjoint and cover every vehicle."""
+        vehicles = self.make_fleet(10)
+        ids = [vehicle.pk for vehicle in vehicles]
+
+        ranges = vehicle_id_ranges(3)
+
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], min(ids))
+        self.assertEqual(ranges[-1][1], max(ids))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(start, end + 1)
+        self.assertEqual(len(vehicle_id_ranges(50)), 10)
+
+    def test_workers_write_the_same_report(self):
+        """Partitioned output joins into the single-process report."""
+        self.make_fleet(10)
+        for output_format in ('csv', 'json'):
+            single = self.path(f'single.{output_format}')
+            parallel = self.path(f'parallel.{output_format}')
+            self.assertEqual(write_report(single, output_format), 10)
+            self.assertEqual(write_report(parallel, output_format, workers=3), 10)
+
+            with open(single) as first, open(parallel) as second:
+                if output_format == 'csv':
+                    self.assertEqual(first.read(), second.read())
+                else:
+                    self.assertEqual(json.load(first)['vehicles'], json.load(second)['vehicles'])
+        self.assertEqual(sorted(os.listdir(self.output_dir)), [
+            'parallel.csv', 'parallel.json', 'single.csv', 'single.json',
+        ])
@@ -0,0 +1,186 @@
+# tests_schedule_sync.py
+"""
+Tests for the set-based maintenance schedule sync.
+
+Tests cover agreement of the compiled type and priority mappings with
+MaintenanceSyncManager, skipping uninsured vehicles, completion updates of
+linked schedules, the query count and the grouped sync status.
+"""
+
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from maintenance.models import (
+    AssignedVehiclePlan, MaintenancePlan, MaintenanceTask, ScheduledMaintenance, ServiceType,
+)
+from .models import ComplianceDirtyVehicle, MaintenanceSchedule
+from .schedule_sync import create_missing_schedules, sync_maintenance_schedules, sync_statuses
+from .testing import InsuredVehicleTestCase
+from .utils import MaintenanceSyncManager
+
+TASKS = [
+    ('Oil Change', 'LOW'),
+    ('Brake Inspection', 'MEDIUM'),
+    ('Safety Inspection', 'LOW'),
+    ('Transmission Fluid Change', 'HIGH'),
+    ('Engine Service', 'LOW'),
+    ('Front Tire Rotation', 'HIGH'),
+    ('oil', 'MEDIUM'),
+    ('Wiper Blades', 'HIGH'),
+]
+STATUSES = ['PENDING', 'OVERDUE', 'COMPLETED', 'SKIPPED']
+
+
+class ScheduleSyncTestCase(InsuredVehicleTestCase):
+    """Test cases for the set-based schedule sync."""
+
+    VIN_PREFIX = 'SCHEDULESYNC'
+
+    def setUp(self):
+        super().setUp()
+        self.plan = MaintenancePlan.objects.create(name='Standard', vehicle_model='Toyota Corolla')
+        service_type = ServiceType.objects.create(name='Service')
+        self.tasks = [
+            MaintenanceTask.objects.create(
+                plan=self.plan, name=name, description='' if number % 2 else f'{name} per schedule',
+                service_type=service_type, interval_miles=5000, interval_months=6,
+                estimated_time=timedelta(hours=1), priority=priority,
+            )
+            for number, (name, priority) in enumerate(TASKS)
+        ]
+
+    def make_vehicle(self, number, insured=True):
+        """The vehicles.Vehicle, which the maintenance plans are assigned to"""
+        vehicle = super().make_vehicle(number, insured)
+        return vehicle.vehicle if insured else vehicle
+
+    def schedule(self, vehicle, count):
+        """count scheduled maintenances cycling through the tasks and statuses"""
+        assigned_plan = AssignedVehiclePlan.objects.create(
+            vehicle=vehicle, plan=self.plan, owner=self.policy_holder, start_date=date(2024, 1, 1), current_mileage=30000
+        )
+        return [
+            ScheduledMaintenance.objects.create(
+                assigned_plan=assigned_plan, task=self.tasks[number % len(self.tasks)],
+                due_date=date(2024, 2, 1) + timedelta(days=number), due_mileage=35000 + number,
+                status=STATUSES[number % len(STATUSES)],
+                completed_date=date(2024, 2, 2) if STATUSES[number % len(STATUSES)] == 'COMPLETED' else None,
+            )
+            for number in range(count)
+        ]
+
+    @staticmethod
+    def schedule_fields(schedule):
+        return (
+            schedule.maintenance_type, schedule.priority_level, schedule.scheduled_date, schedule.due_mileage,
+            schedule.description, schedule.is_completed, schedule.completed_date,
+        )
+
+    def test_schedules_match_per_row_mapping(self):
+        """Created schedules agree with create_insurance_schedule_from_maintenance."""
+        legacy_vehicle, bulk_vehicle = self.make_vehicle(1), self.make_vehicle(2)
+        legacy = [
+            MaintenanceSyncManager.create_insurance_schedule_from_maintenance(
+                scheduled, legacy_vehicle.vehicles.get()
+            )
+            for scheduled in self.schedule(legacy_vehicle, 32)
+        ]
+        scheduled = self.schedule(bulk_vehicle, 32)
+
+        result = create_missing_schedules(batch_size=5)
+
+        self.assertEqual((result.created, result.skipped), (32, 0))
+        created = [MaintenanceSchedule.objects.get(scheduled_maintenance=item) for item in scheduled]
+        self.assertEqual(
+            [self.schedule_fields(schedule) for schedule in created],
+            [self.schedule_fields(schedule) for schedule in legacy],
+        )
+        self.assertEqual({schedule.vehicle for schedule in created}, {bulk_vehicle.vehicles.get()})
+        by_task = {schedule.scheduled_maintenance.task.name: schedule.maintenance_type for schedule in created}
+        self.assertEqual(by_task['Transmission Fluid Change'], 'transmission_service')
+        self.assertEqual(by_task['Front Tire Rotation'], 'tire_rotation')
+        self.assertEqual(by_task['oil'], 'oil_change')
+        self.assertEqual(by_task['Wiper Blades'], 'other')
+        self.assertIn('critical', {schedule.priority_level for schedule in created})
+
+    def test_skips_uninsured_vehicles_and_synced_schedules(self):
+        """Only unlinked scheduled maintenance of insured vehicles gets a schedule."""
+        insured = self.make_vehicle(1)
+        self.schedule(insured, 3)
+        self.schedule(self.make_vehicle(2, insured=False), 2)
+
+        result = sync_maintenance_schedules()
+
+        self.assertEqual((result.created, result.updated, result.skipped), (3, 0, 2))
+        self.assertEqual(
+            set(ComplianceDirtyVehicle.objects.values_list('vehicle_id', flat=True)),
+            {insured.vehicles.get().pk},
+        )
+        result = sync_maintenance_schedules()
+        self.assertEqual((result.created, result.skipped), (0, 2))
+        self.assertEqual(MaintenanceSchedule.objects.count(), 3)
+
+    def test_updates_completion_of_linked_schedules(self):
+        """Linked schedules follow completion and reopening in the maintenance app."""
+        vehicle = self.make_vehicle(1)
+        pending, _, completed = self.schedule(vehicle, 3)
+        sync_maintenance_schedules()
+
+        ScheduledMaintenance.objects.filter(pk=pending.pk).update(status='COMPLETED', completed_date=date(2024, 3, 1))
+        ScheduledMaintenance.objects.filter(pk=completed.pk).update(status='PENDING', completed_date=None)
+
+        result = sync_maintenance_schedules(create_missing=False)
+
+        self.assertEqual(result.updated, 2)
+        completed_schedule = MaintenanceSchedule.objects.get(scheduled_maintenance=pending)
+        self.assertEqual((completed_schedule.is_completed, completed_schedule.completed_date), (True, date(2024, 3, 1)))
+        reopened = MaintenanceSchedule.objects.get(scheduled_maintenance=completed)
+        self.assertEqual((reopened.is_completed, reopened.completed_date), (False, None))
+        self.assertEqual(sync_maintenance_schedules(create_missing=False).updated, 0)
+
+    def test_queries_are_constant(self):
+        """A sync takes the same queries whatever the number of schedules."""
+        def sync_queries(number, count):
+            self.schedule(self.make_vehicle(number), count)
+            with CaptureQueriesContext(connection) as queries:
+                sync_maintenance_schedules(batch_size=1000)
+            return len(queries)
+
+        self.assertEqual(sync_queries(1, 3), sync_queries(2, 40))
+
+    def test_sync_statuses(self):
+        """Statuses for many vehicles come from two grouped aggregates."""
+        partial, empty = self.make_vehicle(1), self.make_vehicle(2)
+        scheduled = self.schedule(partial, 4)
+        create_missing_schedules(ScheduledMaintenance.objects.filter(pk__in=[item.pk for item in scheduled[:3]]))
+        MaintenanceSchedule.objects.create(
+            vehicle=partial.vehicles.get(), maintenance_type='other', scheduled_date=date(2024, 5, 1)
+        )
+
+        with self.assertNumQueries(2):
+            statuses = sync_statuses([partial.pk, empty.pk])
+
+        self.assertEqual(statuses[partial.pk], {
+            'maintenance_schedules': 4,
+            'linked_insurance_schedules': 3,
+            'unlinked_insurance_schedules': 1,
+            'sync_percentage': 75.0,
+        })
+        self.assertEqual(statuses[empty.pk]['sync_percentage'], 100)
+        self.assertEqual(MaintenanceSyncManager.get_sync_status(partial), statuses[partial.pk])
+
+    def test_command(self):
+        """sync_maintenance_schedules reports the counts of the sync."""
+        vehicle = self.make_vehicle(1)
+        self.schedule(vehicle, 2)
+        self.schedule(self.make_vehicle(2), 3)
+        stdout = StringIO()
+
+        call_command('sync_maintenance_schedules', vehicle_id=vehicle.pk, create_missing=True, stdout=stdout)
+
+        self.assertIn('Sync completed: 2 created, 0 updated, 0 skipped without insurance', stdout.getvalue())
+        self.assertEqual(MaintenanceSchedule.objects.count(), 2)
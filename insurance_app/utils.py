@@ -1,5 +1,4 @@
 # utils.py
-from django.db import transaction
 from .models import MaintenanceSchedule
 from maintenance.models import ScheduledMaintenance
 
@@ -143,6 +142,9 @@ class MaintenanceSyncManager:
     Utility class to manage synchronization between maintenance app and insurance app
     """
     
+    SAFETY_CRITICAL_TASKS = ['Brake Service', 'Brake Inspection', 'Safety Inspection']
+    OVERDUE_PRIORITY_ESCALATION = {'low': 'medium', 'medium': 'high', 'high': 'critical'}
+    
     @staticmethod
     def get_maintenance_type_mapping():
         """Map maintenance task names to insurance maintenance types"""
@@ -152,10 +154,10 @@ class MaintenanceSyncManager:
             'Brake Inspection': 'brake_service',
             'Tire Rotation': 'tire_rotation',
             'Tire Replacement': 'tire_rotation',
-            'Transmission Service': 'transmission',
-            'Transmission Fluid Change': 'transmission',
-            'Engine Tune-up': 'engine_tune',
-            'Engine Service': 'engine_tune',
+            'Transmission Service': 'transmission_service',
+            'Transmission Fluid Change': 'transmission_service',
+            'Engine Tune-up': 'engine_tune_up',
+            'Engine Service': 'engine_tune_up',
             'Safety Inspection': 'inspection',
             'Annual Inspection': 'inspection',
             'Emissions Test': 'inspection',
@@ -180,77 +182,38 @@ class MaintenanceSyncManager:
         
         # Upgrade priority if overdue
         if scheduled_maintenance.status == 'OVERDUE':
-            if base_priority == 'low':
-                return 'medium'
-            elif base_priority == 'medium':
-                return 'high'
-            elif base_priority == 'high':
-                return 'critical'
+            return MaintenanceSyncManager.OVERDUE_PRIORITY_ESCALATION[base_priority]
         
         # Upgrade priority for safety-critical tasks
-        safety_critical_tasks = ['Brake Service', 'Brake Inspection', 'Safety Inspection']
-        if scheduled_maintenance.task.name in safety_critical_tasks:
+        if scheduled_maintenance.task.name in MaintenanceSyncManager.SAFETY_CRITICAL_TASKS:
             if base_priority in ['low', 'medium']:
                 return 'high'
         
         return base_priority
     
     @staticmethod
-    @transaction.atomic
     def sync_vehicle_schedules(vehicle):
         """
         Sync all maintenance schedules for a specific vehicle
+
+        Returns:
+            Tuple of (updated, created) insurance schedule counts
         """
-        # Get all scheduled maintenance for this vehicle
-        scheduled_maintenances = ScheduledMaintenance.objects.filter(
-            assigned_plan__vehicle=vehicle
-        ).select_related('task', 'assigned_plan')
-        
-        synced_count = 0
-        created_count = 0
+        from .schedule_sync import sync_maintenance_schedules
         
-        for scheduled_maintenance in scheduled_maintenances:
-            insurance_schedule = MaintenanceSchedule.objects.filter(
-                scheduled_maintenance=scheduled_maintenance
-            ).first()
-            
-            if insurance_schedule:
-                insurance_schedule.sync_with_maintenance_app()
-                synced_count += 1
-            else:
-                MaintenanceSchedule.create_from_scheduled_maintenance(
-                    scheduled_maintenance, vehicle
-                )
-                created_count += 1
-        
-        return synced_count, created_count
+        result = sync_maintenance_schedules(
+            ScheduledMaintenance.objects.filter(assigned_plan__vehicle=vehicle)
+        )
+        return result.updated, result.created
     
     @staticmethod
     def get_sync_status(vehicle):
         """
         Get synchronization status for a vehicle
         """
-        maintenance_schedules_count = ScheduledMaintenance.objects.filter(
-            assigned_plan__vehicle=vehicle
-        ).count()
+        from .schedule_sync import sync_statuses
         
-        insurance_schedules_count = MaintenanceSchedule.objects.filter(
-            vehicle=vehicle,
-            scheduled_maintenance__isnull=False
-        ).count()
-        
-        unlinked_insurance_schedules = MaintenanceSchedule.objects.filter(
-            vehicle=vehicle,
-            scheduled_maintenance__isnull=True
-        ).count()
-        
-        return {
-            'maintenance_schedules': maintenance_schedules_count,
-            'linked_insurance_schedules': insurance_schedules_count,
-            'unlinked_insurance_schedules': unlinked_insurance_schedules,
-            'sync_percentage': (insurance_schedules_count / maintenance_schedules_count * 100) 
-                             if maintenance_schedules_count > 0 else 100
-        }
+        return sync_statuses([vehicle.pk])[vehicle.pk]
     
     @staticmethod
     def create_insurance_schedule_from_maintenance(scheduled_maintenance, vehicle=None):
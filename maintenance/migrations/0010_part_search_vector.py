@@ -0,0 +1,72 @@
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# The trigger, backfill and GIN indexes only exist on PostgreSQL; other
+# databases are searched through the in-process index in maintenance.part_search
+CREATE_SEARCH_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION maintenance_part_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.part_number, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.manufacturer, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER maintenance_part_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON maintenance_part
+    FOR EACH ROW EXECUTE FUNCTION maintenance_part_search_vector_update()
+    """,
+    # Fires the trigger for existing rows
+    "UPDATE maintenance_part SET name = name",
+    "CREATE INDEX maintenance_part_search_vector_gin ON maintenance_part USING gin (search_vector)",
+    "CREATE INDEX maintenance_part_name_trgm ON maintenance_part USING gin (name gin_trgm_ops)",
+    "CREATE INDEX maintenance_part_number_trgm ON maintenance_part USING gin (part_number gin_trgm_ops)",
+    "CREATE INDEX maintenance_part_manufacturer_trgm ON maintenance_part USING gin (manufacturer gin_trgm_ops)",
+    "CREATE INDEX maintenance_part_description_trgm ON maintenance_part USING gin (description gin_trgm_ops)",
+]
+
+DROP_SEARCH_SQL = [
+    "DROP INDEX IF EXISTS maintenance_part_description_trgm",
+    "DROP INDEX IF EXISTS maintenance_part_manufacturer_trgm",
+    "DROP INDEX IF EXISTS maintenance_part_number_trgm",
+    "DROP INDEX IF EXISTS maintenance_part_name_trgm",
+    "DROP INDEX IF EXISTS maintenance_part_search_vector_gin",
+    "DROP TRIGGER IF EXISTS maintenance_part_search_vector_trigger ON maintenance_part",
+    "DROP FUNCTION IF EXISTS maintenance_part_search_vector_update()",
+]
+
+
+def run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("maintenance", "0009_part_category_part_minimum_stock_level_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="part",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="part",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(run_on_postgres(CREATE_SEARCH_SQL), run_on_postgres(DROP_SEARCH_SQL)),
+    ]
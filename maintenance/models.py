@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from vehicles.models import Vehicle
 from django.contrib.auth.models import User
 
@@ -25,7 +26,9 @@ class Part(models.Model):
     minimum_stock_level = models.PositiveIntegerField(default=5)
     category = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Filled by a database trigger on PostgreSQL, see maintenance.part_search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     @property
     def is_low_stock(self):
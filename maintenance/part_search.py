@@ -0,0 +1,313 @@
+"""
+Search backends for the parts catalogue.
+
+PostgresPartSearchBackend matches the stored, trigger-maintained
+search_vector column, with pg_trgm indexes for substring and fuzzy
+matches. Ranking, the total count and the page are all computed by one
+query.
+
+NGramPartSearchBackend keeps an in-process trigram inverted index of the
+catalogue. It is used for SQLite and tests. Before each search it checks
+the table with a count and the latest updated_at and re-indexes the parts that changed.
+
+get_part_search_backend() picks the backend for the default database, or
+the class named by the PART_SEARCH_BACKEND setting.
+"""
+
+import bisect
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, FloatField, Max, Q, Value, Window
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.module_loading import import_string
+
+from .models import Part
+
+NGRAM_SIZE = 3
+AUTOCOMPLETE_LIMIT = 10
+TEXT_FIELDS = ('name', 'part_number', 'manufacturer', 'description')
+
+_word_pattern = re.compile(r'[\w-]+')
+
+
+@dataclass
+class PartSearchResult:
+    """One page of search results and the number of matching parts"""
+    parts: List[Part]
+    total_count: int
+
+
+class PartSearchBackend:
+    """Interface shared by the part search backends"""
+
+    def search(self, query: str = '', category: str = '', offset: int = 0, limit: int = 20) -> PartSearchResult:
+        """
+        Find parts whose text fields contain the query.
+
+        Args:
+            query: Text to find in name, part number, manufacturer or description
+            category: Text the category must contain
+            offset: Matches to skip
+            limit: Matches to return
+
+        Returns:
+            PartSearchResult with the page, best matches first
+        """
+        raise NotImplementedError
+
+    def autocomplete(self, prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[Dict]:
+        """
+        Suggest parts whose name or part number has a word starting with prefix.
+
+        At most limit suggestions are returned and no total is computed.
+
+        Args:
+            prefix: Start of a word
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of dicts with id, name and part_number
+        """
+        raise NotImplementedError
+
+
+class PostgresPartSearchBackend(PartSearchBackend):
+    """
+    Full-text and trigram search kept in PostgreSQL.
+
+    Relies on the search_vector trigger and the GIN indexes created by the
+    maintenance migrations.
+    """
+
+    def search(self, query='', category='', offset=0, limit=20):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+        parts = Part.objects.all()
+        if category:
+            parts = parts.filter(category__icontains=category)
+
+        if query:
+            search_query = SearchQuery(query, search_type='websearch', config='english')
+            # Substring matches keep the behaviour of the old icontains
+            # search; the trigram indexes serve them and the similarity match
+            parts = parts.filter(
+                Q(search_vector=search_query) |
+                Q(name__trigram_similar=query) |
+                Q(name__icontains=query) |
+                Q(part_number__icontains=query) |
+                Q(manufacturer__icontains=query) |
+                Q(description__icontains=query)
+            ).annotate(
+                rank=SearchRank(F('search_vector'), search_query) + Greatest(
+                    TrigramSimilarity('name', query),
+                    Coalesce(TrigramSimilarity('part_number', query), Value(0.0), output_field=FloatField())
+                )
+            ).order_by('-rank', 'name', 'id')
+        else:
+            parts = parts.order_by('name', 'id')
+
+        # The window count is computed before LIMIT, so the page carries the total
+        page = list(parts.annotate(total_count=Window(Count('id')))[offset:offset + limit])
+        if page:
+            total_count = page[0].total_count
+        elif offset:
+            total_count = parts.count()
+        else:
+            total_count = 0
+        return PartSearchResult(parts=page, total_count=total_count)
+
+    def autocomplete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+
+        word_start = r'(^|[^[:alnum:]])' + re.escape(prefix)
+        return list(
+            Part.objects.filter(
+                Q(name__icontains=prefix) | Q(part_number__icontains=prefix)
+            ).filter(
+                Q(name__iregex=word_start) | Q(part_number__iregex=word_start)
+            ).order_by('name', 'id').values('id', 'name', 'part_number')[:limit]
+        )
+
+
+def ngrams(text: str) -> Set[str]:
+    """Return the character n-grams of a normalised string"""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class NGramPartIndex:
+    """
+    Trigram inverted index and sorted word list over the parts catalogue.
+
+    Documents hold the lower-cased text fields of each part. A query of at
+    least NGRAM_SIZE characters is answered by intersecting the posting sets
+    of its trigrams and confirming the substring, shorter queries by a scan
+    of the documents.
+    """
+
+    def __init__(self):
+        self.documents: Dict[int, Tuple[str, str, str]] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.words: List[Tuple[str, str, int]] = []
+        self.max_updated_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Bring the index up to date with the parts table"""
+        # Two queries, so the maximum is read from the updated_at index
+        count = Part.objects.count()
+        max_updated_at = Part.objects.aggregate(max_updated_at=Max('updated_at'))['max_updated_at']
+        with self._lock:
+            if max_updated_at != self.max_updated_at:
+                changed = Part.objects.all()
+                if self.max_updated_at is not None:
+                    # Parts saved in the same instant as the last indexed one are read again
+                    changed = changed.filter(updated_at__gte=self.max_updated_at)
+                self._index(changed.values_list('id', 'category', 'updated_at', *TEXT_FIELDS))
+
+            if len(self.documents) != count:
+                # Rows were deleted; start over
+                self._clear()
+                self._index(Part.objects.values_list('id', 'category', 'updated_at', *TEXT_FIELDS))
+
+    def _clear(self):
+        self.documents = {}
+        self.postings = {}
+        self.words = []
+        self.max_updated_at = None
+
+    def _index(self, rows):
+        rows = list(rows)
+        self._remove({row[0] for row in rows if row[0] in self.documents})
+
+        new_words = []
+        for part_id, category, updated_at, name, *other_fields in rows:
+            fields = [(value or '').lower() for value in [name] + other_fields]
+            name = fields[0]
+            text = '\n'.join(fields)
+            self.documents[part_id] = (name, text, (category or '').lower())
+            for gram in ngrams(text):
+                self.postings.setdefault(gram, set()).add(part_id)
+
+            part_number = fields[1]
+            for word in set(_word_pattern.findall(name) + _word_pattern.findall(part_number)):
+                new_words.append((word, name, part_id))
+
+            if self.max_updated_at is None or updated_at > self.max_updated_at:
+                self.max_updated_at = updated_at
+
+        if new_words:
+            self.words = sorted(self.words + new_words)
+
+    def _remove(self, part_ids):
+        if not part_ids:
+            return
+        for part_id in part_ids:
+            name, text, _ = self.documents.pop(part_id)
+            for gram in ngrams(text):
+                posting = self.postings.get(gram)
+                if posting is not None:
+                    posting.discard(part_id)
+        self.words = [entry for entry in self.words if entry[2] not in part_ids]
+
+    def match(self, query: str, category: str) -> List[int]:
+        """Return ids of matching parts, best first"""
+        query = query.lower()
+        category = category.lower()
+
+        with self._lock:
+            if len(query) >= NGRAM_SIZE:
+                postings = sorted((self.postings.get(gram, set()) for gram in ngrams(query)), key=len)
+                candidates = set.intersection(*postings) if postings else set()
+            else:
+                candidates = self.documents.keys()
+
+            matches = []
+            for part_id in candidates:
+                name, text, part_category = self.documents[part_id]
+                if query not in text or category not in part_category:
+                    continue
+                if not query:
+                    rank = 0
+                elif name.startswith(query):
+                    rank = 0
+                elif query in name:
+                    rank = 1
+                else:
+                    rank = 2
+                matches.append((rank, name, part_id))
+
+        matches.sort()
+        return [part_id for _, _, part_id in matches]
+
+    def complete(self, prefix: str, limit: int) -> List[int]:
+        """Return ids of up to limit parts with a name or part number word starting with prefix"""
+        prefix = prefix.lower()
+        found = []
+        with self._lock:
+            position = bisect.bisect_left(self.words, (prefix,))
+            while position < len(self.words) and len(found) < limit:
+                word, _, part_id = self.words[position]
+                if not word.startswith(prefix):
+                    break
+                if part_id not in found:
+                    found.append(part_id)
+                position += 1
+        return found
+
+
+class NGramPartSearchBackend(PartSearchBackend):
+    """In-process n-gram index search, for SQLite and tests"""
+
+    _index = None
+    _index_lock = threading.Lock()
+
+    @classmethod
+    def get_index(cls) -> NGramPartIndex:
+        """Return the process-wide index, refreshed against the parts table"""
+        with cls._index_lock:
+            if cls._index is None:
+                cls._index = NGramPartIndex()
+        cls._index.refresh()
+        return cls._index
+
+    def search(self, query='', category='', offset=0, limit=20):
+        part_ids = self.get_index().match(query.strip(), category.strip())
+        page_ids = part_ids[offset:offset + limit]
+        parts = Part.objects.in_bulk(page_ids)
+        return PartSearchResult(
+            parts=[parts[part_id] for part_id in page_ids if part_id in parts],
+            total_count=len(part_ids)
+        )
+
+    def autocomplete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+
+        part_ids = self.get_index().complete(prefix, limit)
+        parts = Part.objects.only('id', 'name', 'part_number').in_bulk(part_ids)
+        return [
+            {'id': part.id, 'name': part.name, 'part_number': part.part_number}
+            for part in (parts[part_id] for part_id in part_ids if part_id in parts)
+        ]
+
+
+def get_part_search_backend() -> PartSearchBackend:
+    """
+    Return the part search backend for the default database.
+
+    The PART_SEARCH_BACKEND setting may name a backend class to use instead.
+    """
+    backend_path = getattr(settings, 'PART_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'postgresql':
+        return PostgresPartSearchBackend()
+    return NGramPartSearchBackend()
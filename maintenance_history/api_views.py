@@ -1,11 +1,11 @@
 from django.http import JsonResponse
 from django.views import View
-from django.core.paginator import Paginator
-from django.db.models import Q
 from maintenance.models import Part, ScheduledMaintenance
+from maintenance.part_search import AUTOCOMPLETE_LIMIT, get_part_search_backend
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 import json
+import math
 
 
 class PartSearchAPIView(View):
@@ -17,32 +17,24 @@ class PartSearchAPIView(View):
         # Get search parameters
         query = request.GET.get('q', '')
         category = request.GET.get('category', '')
-        page = request.GET.get('page', 1)
         page_size = min(int(request.GET.get('page_size', 20)), 100)  # Max 100 items per page
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except (TypeError, ValueError):
+            page = 1
         
-        # Build queryset with filters
-        parts = Part.objects.all()
-        
-        if query:
-            parts = parts.filter(
-                Q(name__icontains=query) |
-                Q(part_number__icontains=query) |
-                Q(description__icontains=query)
-            )
-        
-        if category:
-            parts = parts.filter(category__icontains=category)
-        
-        # Order by name for consistent results
-        parts = parts.order_by('name')
-        
-        # Paginate results
-        paginator = Paginator(parts, page_size)
-        page_obj = paginator.get_page(page)
+        # Ranking, filtering and counting are done by the search backend
+        backend = get_part_search_backend()
+        result = backend.search(query, category, offset=(page - 1) * page_size, limit=page_size)
+        total_pages = max(math.ceil(result.total_count / page_size), 1)
+        if page > total_pages:
+            # Out of range pages show the last page, as Paginator.get_page does
+            page = total_pages
+            result = backend.search(query, category, offset=(page - 1) * page_size, limit=page_size)
         
         # Serialize data
         parts_data = []
-        for part in page_obj:
+        for part in result.parts:
             parts_data.append({
                 'id': part.id,
                 'name': part.name,
@@ -59,15 +51,35 @@ class PartSearchAPIView(View):
         return JsonResponse({
             'results': parts_data,
             'pagination': {
-                'page': page_obj.number,
-                'total_pages': paginator.num_pages,
-                'total_count': paginator.count,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
+                'page': page,
+                'total_pages': total_pages,
+                'total_count': result.total_count,
+                'has_next': page < total_pages,
+                'has_previous': page > 1,
             }
         })
 
 
+class PartAutocompleteAPIView(View):
+    """
+    API endpoint for part name and part number suggestions.
+    
+    Returns at most `limit` suggestions and no total count, so it stays
+    cheap enough to call on every keystroke.
+    """
+    
+    def get(self, request):
+        prefix = request.GET.get('q', '')
+        try:
+            limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_LIMIT)
+        except (TypeError, ValueError):
+            limit = AUTOCOMPLETE_LIMIT
+        
+        return JsonResponse({
+            'results': get_part_search_backend().autocomplete(prefix, limit=limit),
+        })
+
+
 class PartDetailsAPIView(View):
     """
     API endpoint for retrieving individual part details
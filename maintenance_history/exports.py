@@ -0,0 +1,363 @@
+"""
+Streaming bulk exports of inspections and maintenance history.
+
+export_initial_inspection_data builds the export of one inspection in
+memory. The exports here cover any number of rows and are meant to be
+served as streaming responses, where the rows are read lazily outside any
+transaction. Each chunk is therefore its own keyset query on the primary
+key (pk__gt the last exported row) rather than a server-side cursor, which
+a transaction-mode connection pooler such as PgBouncer cannot keep open
+between reads. Only one chunk of rows and output is held at a time.
+
+CSV and NDJSON are written with the standard library. Parquet is written
+with pyarrow and is only available when it is installed.
+"""
+
+import csv
+import json
+from dataclasses import dataclass
+from decimal import Decimal
+from io import StringIO
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from django.db import models
+from django.db.models import QuerySet
+
+from .models import InitialInspection, Inspections, MaintenanceRecord
+from .projections import status_fields
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+DEFAULT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    """
+    A model and the columns exported from it.
+
+    Args:
+        name: Dataset name used in URLs and on the command line
+        model: Model the rows come from
+        columns: values_list lookups in output order
+        date_field: Field the date range filters apply to
+        vehicle_lookup: Lookup of the vehicle VIN filter
+    """
+    name: str
+    model: type
+    columns: Tuple[str, ...]
+    date_field: str
+    vehicle_lookup: str
+
+    def queryset(self) -> QuerySet:
+        """Return the export query ordered by primary key"""
+        return self.model._default_manager.order_by('pk')
+
+    def field(self, column: str) -> models.Field:
+        """Return the model field a column lookup ends on"""
+        model = self.model
+        *relations, name = column.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+
+def _inspection_columns(model, leading: Sequence[str], trailing: Sequence[str]) -> Tuple[str, ...]:
+    # Computed once at import so every export shares one column order
+    return tuple(leading) + tuple(status_fields(model)) + tuple(trailing)
+
+
+EXPORT_DATASETS: Dict[str, ExportDataset] = {
+    dataset.name: dataset for dataset in (
+        ExportDataset(
+            name='initial_inspections',
+            model=InitialInspection,
+            columns=_inspection_columns(
+                InitialInspection,
+                leading=(
+                    'id', 'inspection_number', 'vehicle__vin', 'technician__username',
+                    'inspection_date', 'mileage_at_inspection',
+                ),
+                trailing=(
+                    'overall_condition_rating', 'estimated_repair_cost', 'overall_notes',
+                    'recommendations', 'is_completed', 'completed_at',
+                ),
+            ),
+            date_field='inspection_date',
+            vehicle_lookup='vehicle__vin',
+        ),
+        ExportDataset(
+            name='inspection_forms',
+            model=Inspections,
+            columns=_inspection_columns(
+                Inspections,
+                leading=(
+                    'id', 'inspection__inspection_number', 'inspection__vehicle__vin',
+                    'technician__username', 'inspection_date', 'mileage_at_inspection',
+                ),
+                trailing=('overall_notes', 'recommendations', 'is_completed', 'completed_at'),
+            ),
+            date_field='inspection_date',
+            vehicle_lookup='inspection__vehicle__vin',
+        ),
+        ExportDataset(
+            name='maintenance_records',
+            model=MaintenanceRecord,
+            columns=(
+                'id', 'vehicle__vin', 'technician__username', 'date_performed', 'mileage',
+                'service_provider', 'cost', 'work_done', 'parts_replaced', 'notes', 'created_at',
+            ),
+            date_field='date_performed',
+            vehicle_lookup='vehicle__vin',
+        ),
+    )
+}
+
+
+def get_export_dataset(name: str) -> ExportDataset:
+    """
+    Return an export dataset by name.
+
+    Raises:
+        ValueError: If there is no dataset with that name
+    """
+    try:
+        return EXPORT_DATASETS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported export dataset: {name}")
+
+
+def check_export_format(format_type: str):
+    """
+    Raise ValueError if format_type cannot be written here.
+
+    Parquet needs pyarrow; CSV and NDJSON are always available.
+    """
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format type: {format_type}")
+    if format_type == 'parquet' and pyarrow is None:
+        raise ValueError("Parquet export requires pyarrow; use csv or ndjson instead")
+
+
+def filter_export_queryset(dataset: ExportDataset, vehicle_vin: str = None, date_from=None,
+                           date_to=None, completed: Optional[bool] = None, technician=None) -> QuerySet:
+    """
+    Return the dataset's rows matching the given filters.
+
+    Args:
+        dataset: Dataset to export
+        vehicle_vin: Only rows of this vehicle
+        date_from: Only rows dated on or after this date
+        date_to: Only rows dated on or before this date
+        completed: Only completed (True) or open (False) inspections;
+            ignored for datasets without is_completed
+        technician: Only rows recorded by this user
+
+    Returns:
+        Filtered queryset ordered by primary key
+    """
+    queryset = dataset.queryset()
+    if vehicle_vin:
+        queryset = queryset.filter(**{dataset.vehicle_lookup: vehicle_vin})
+    if date_from:
+        queryset = queryset.filter(**{f'{dataset.date_field}__date__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{dataset.date_field}__date__lte': date_to})
+    if completed is not None and 'is_completed' in dataset.columns:
+        queryset = queryset.filter(is_completed=completed)
+    if technician is not None:
+        queryset = queryset.filter(technician=technician)
+    return queryset
+
+
+def iter_export_rows(dataset: ExportDataset, queryset: QuerySet = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    Yield the dataset's rows as tuples in column order.
+
+    Rows are read a chunk at a time in primary key order, each chunk
+    starting after the last primary key of the one before.
+
+    Args:
+        dataset: Dataset to export
+        queryset: Rows to export, defaults to all of the dataset's rows
+        chunk_size: Rows fetched from the database at a time
+
+    Returns:
+        Iterator of value tuples
+    """
+    if queryset is None:
+        queryset = dataset.queryset()
+    rows = queryset.order_by('pk').values_list('pk', *dataset.columns)
+    chunk_size = max(1, chunk_size)
+    last_pk = None
+    while True:
+        page = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        for row in chunk:
+            yield row[1:]
+        if len(chunk) < chunk_size:
+            break
+        last_pk = chunk[-1][0]
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value)} is not JSON serializable")
+
+
+def stream_csv(columns: Sequence[str], rows: Iterable[tuple], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yield CSV text for rows, a header line first and then chunk_size rows at a time.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def stream_ndjson(columns: Sequence[str], rows: Iterable[tuple], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yield one JSON object per row and line, chunk_size rows at a time.
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_type(field: models.Field):
+    if isinstance(field, models.BooleanField):
+        return pyarrow.bool_()
+    if isinstance(field, (models.AutoField, models.IntegerField)):
+        return pyarrow.int64()
+    if isinstance(field, models.DecimalField):
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    if isinstance(field, models.FloatField):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def stream_parquet(dataset: ExportDataset, rows: Iterable[tuple], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield a Parquet file for rows, one row group of chunk_size rows at a time.
+
+    The schema comes from the dataset's model fields, so every row group
+    has the same column types.
+
+    Raises:
+        ValueError: If pyarrow is not installed
+    """
+    check_export_format('parquet')
+    schema = pyarrow.schema([
+        (column, _arrow_type(dataset.field(column))) for column in dataset.columns
+    ])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+
+    def write_batch(batch):
+        arrays = [
+            pyarrow.array([row[i] for row in batch], type=schema.field(i).type)
+            for i in range(len(schema))
+        ]
+        writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == chunk_size:
+            write_batch(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(dataset: ExportDataset, format_type: str, queryset: QuerySet = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Union[str, bytes]]:
+    """
+    Stream a dataset in the given format.
+
+    Args:
+        dataset: Dataset to export
+        format_type: 'csv', 'ndjson' or 'parquet'
+        queryset: Rows to export, defaults to all of the dataset's rows
+        chunk_size: Rows fetched and written at a time
+
+    Returns:
+        Iterator of str chunks (csv, ndjson) or bytes chunks (parquet)
+
+    Raises:
+        ValueError: If the format is unsupported or unavailable
+    """
+    check_export_format(format_type)
+    rows = iter_export_rows(dataset, queryset, chunk_size)
+    if format_type == 'csv':
+        return stream_csv(dataset.columns, rows, chunk_size)
+    if format_type == 'ndjson':
+        return stream_ndjson(dataset.columns, rows, chunk_size)
+    return stream_parquet(dataset, rows, chunk_size)
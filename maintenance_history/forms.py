@@ -3,6 +3,7 @@ from django.db import transaction
 from django.core.exceptions import ValidationError
 from .models import MaintenanceRecord, PartUsage, Inspection, Inspections, InitialInspection
 from maintenance.models import Part, ScheduledMaintenance
+from .services import InventoryReservationService
 import json
 
 class MaintenanceRecordForm(forms.ModelForm):
@@ -69,48 +70,8 @@ class MaintenanceRecordForm(forms.ModelForm):
         if not isinstance(parts_list, list):
             raise ValidationError("Parts data must be a list.")
             
-        validated_parts = []
-        for part_data in parts_list:
-            if not isinstance(part_data, dict):
-                raise ValidationError("Each part entry must be an object.")
-                
-            # Validate required fields
-            required_fields = ['id', 'quantity']
-            for field in required_fields:
-                if field not in part_data:
-                    raise ValidationError(f"Missing required field: {field}")
-                    
-            part_id = part_data.get('id')
-            quantity = part_data.get('quantity')
-            
-            # Validate part exists
-            try:
-                part = Part.objects.get(id=part_id)
-            except Part.DoesNotExist:
-                raise ValidationError(f"Part with ID {part_id} does not exist.")
-                
-            # Validate quantity
-            try:
-                quantity = int(quantity)
-                if quantity <= 0:
-                    raise ValidationError(f"Quantity for {part.name} must be greater than 0.")
-            except (ValueError, TypeError):
-                raise ValidationError(f"Invalid quantity for {part.name}.")
-                
-            # Validate stock availability
-            if part.stock_quantity < quantity:
-                raise ValidationError(
-                    f"Insufficient stock for {part.name}. "
-                    f"Available: {part.stock_quantity}, Requested: {quantity}"
-                )
-                
-            validated_parts.append({
-                'part': part,
-                'quantity': quantity,
-                'unit_cost': part.cost
-            })
-            
-        return validated_parts
+        # Validate all parts and stock levels with a single query
+        return InventoryReservationService().validate_selection(parts_list)
     
     def clean_service_image(self):
         """Validate service image upload"""
@@ -151,26 +112,8 @@ class MaintenanceRecordForm(forms.ModelForm):
         maintenance_record = super().save(commit=commit)
         
         if commit and self.selected_parts:
-            # Create PartUsage records and update inventory
-            for part_data in self.selected_parts:
-                part = part_data['part']
-                quantity = part_data['quantity']
-                unit_cost = part_data['unit_cost']
-                
-                # Create PartUsage record
-                PartUsage.objects.create(
-                    maintenance_record=maintenance_record,
-                    part=part,
-                    quantity=quantity,
-                    unit_cost=unit_cost
-                )
-                
-                # Update part inventory
-                if not part.reduce_stock(quantity):
-                    raise ValidationError(
-                        f"Failed to update stock for {part.name}. "
-                        f"This may be due to concurrent modifications."
-                    )
+            # Draw parts from stock and create PartUsage records
+            InventoryReservationService().reserve(maintenance_record, self.selected_parts)
                     
         return maintenance_record
         
@@ -0,0 +1,107 @@
+# management/commands/benchmark_inspection_lists.py
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from maintenance_history.models import InitialInspection
+from maintenance_history.projections import initial_inspection_list_queryset, status_fields
+from maintenance_history.views import InitialInspectionListView
+from vehicles.models import Vehicle
+
+STATUSES = ['pass', 'pass', 'pass', 'pass', 'minor', 'needs_attention', 'fail', 'major', 'na', '']
+
+
+class Command(BaseCommand):
+    help = 'Compare full-row and projected initial inspection list pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle-vin', type=str, required=True, help='VIN of a vehicle to inspect')
+        parser.add_argument('--username', type=str, required=True, help='User to render the list page as')
+        parser.add_argument('--rows', type=int, default=100, help='Inspections on the page (default: 100)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        try:
+            vehicle = Vehicle.objects.get(vin=options['vehicle_vin'])
+            user = User.objects.get(username=options['username'])
+        except (Vehicle.DoesNotExist, User.DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        rng = random.Random(7)
+        fields = status_fields(InitialInspection)
+        inspections = InitialInspection.objects.bulk_create([
+            InitialInspection(
+                vehicle=vehicle,
+                inspection_number=f'BENCH-LIST-{i:04d}',
+                technician=user,
+                mileage_at_inspection=40000 + i,
+                road_test_notes='Road test notes ' * 20,
+                overall_notes='Overall notes ' * 20,
+                **{name: rng.choice(STATUSES) for name in fields}
+            )
+            for i in range(options['rows'])
+        ])
+
+        try:
+            self.report(user, options)
+        finally:
+            InitialInspection.objects.filter(pk__in=[inspection.pk for inspection in inspections]).delete()
+
+    def report(self, user, options):
+        rows = options['rows']
+        legacy = InitialInspection.objects.select_related('vehicle', 'technician').order_by('-inspection_date')[:rows]
+        projected = initial_inspection_list_queryset()[:rows]
+
+        def load_legacy():
+            # What the list template used to read from each row
+            for inspection in legacy.all():
+                inspection.completion_percentage
+                inspection.total_points_checked
+                if inspection.has_major_issues:
+                    len(inspection.failed_points)
+
+        def load_projected():
+            for inspection in projected.all():
+                inspection.points.completion
+                inspection.points.checked
+                inspection.points.failed
+
+        self.stdout.write(f'{rows} rows')
+        for label, queryset, load in (('full rows', legacy, load_legacy), ('projection', projected, load_projected)):
+            self.stdout.write(
+                f'  {label}: {self.result_bytes(queryset) / 1024:.1f} KiB transferred, '
+                f'{self.median_ms(load, options):.2f} ms to load and evaluate'
+            )
+
+        class PageView(InitialInspectionListView):
+            paginate_by = rows
+
+        request = RequestFactory().get('/initial-inspections/')
+        request.user = user
+
+        def render_page():
+            PageView.as_view()(request).render()
+
+        self.stdout.write(f'  list page render: {self.median_ms(render_page, options):.2f} ms')
+
+    def result_bytes(self, queryset):
+        """Size of the values the database returns for a queryset"""
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return sum(
+                len(str(value).encode()) for row in cursor.fetchall() for value in row if value is not None
+            )
+
+    def median_ms(self, run, options):
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,113 @@
+# management/commands/benchmark_part_reservations.py
+import threading
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from maintenance.models import Part
+from maintenance_history.models import MaintenanceRecord, PartUsage
+from maintenance_history.services import InventoryReservationService
+from vehicles.models import Vehicle
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent part reservations through the legacy and reservation service paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent technicians (default: 8)')
+        parser.add_argument('--records', type=int, default=50, help='Records saved per thread (default: 50)')
+        parser.add_argument('--parts', type=int, default=5, help='Parts drawn per record (default: 5)')
+        parser.add_argument('--stock', type=int, default=200, help='Starting stock per part (default: 200)')
+        parser.add_argument(
+            '--vehicle-vin',
+            type=str,
+            required=True,
+            help='VIN of an existing vehicle to attach benchmark records to',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            vehicle = Vehicle.objects.get(vin=options['vehicle_vin'])
+        except Vehicle.DoesNotExist:
+            raise CommandError(f"Vehicle {options['vehicle_vin']} does not exist")
+
+        for label, path in (('legacy', self.legacy_reserve), ('service', self.service_reserve)):
+            parts = [
+                Part.objects.create(name=f'Benchmark {label} part {i}', stock_quantity=options['stock'])
+                for i in range(options['parts'])
+            ]
+            try:
+                elapsed, saved, failed = self.run(path, vehicle, parts, options)
+
+                stock = dict(Part.objects.filter(pk__in=[p.pk for p in parts]).values_list('pk', 'stock_quantity'))
+                drawn = {
+                    part.pk: sum(PartUsage.objects.filter(part=part).values_list('quantity', flat=True))
+                    for part in parts
+                }
+                oversold = sum(
+                    max(0, drawn[part.pk] - (options['stock'] - stock[part.pk])) for part in parts
+                )
+
+                style = self.style.SUCCESS if oversold == 0 else self.style.ERROR
+                self.stdout.write(
+                    f'{label}: {saved} records saved, {failed} rejected in {elapsed:.2f}s '
+                    f'({saved / elapsed:.1f} records/s)'
+                )
+                self.stdout.write(style(f'  {oversold} units drawn beyond recorded stock decrements'))
+            finally:
+                MaintenanceRecord.objects.filter(work_done=f'Benchmark {label}').delete()
+                Part.objects.filter(pk__in=[p.pk for p in parts]).delete()
+
+    def run(self, path, vehicle, parts, options):
+        """Run one reservation path on several threads"""
+        barrier = threading.Barrier(options['threads'])
+        counts = {'saved': 0, 'failed': 0}
+        lock = threading.Lock()
+        label = 'legacy' if path == self.legacy_reserve else 'service'
+
+        def worker():
+            saved = failed = 0
+            try:
+                barrier.wait()
+                for _ in range(options['records']):
+                    try:
+                        with transaction.atomic():
+                            record = MaintenanceRecord.objects.create(
+                                vehicle=vehicle, work_done=f'Benchmark {label}', mileage=0
+                            )
+                            path(record, [{'id': part.pk, 'quantity': 1} for part in parts])
+                        saved += 1
+                    except (ValidationError, DatabaseError):
+                        failed += 1
+            finally:
+                connection.close()
+            with lock:
+                counts['saved'] += saved
+                counts['failed'] += failed
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, counts['saved'], counts['failed']
+
+    def legacy_reserve(self, record, parts_list):
+        """The per-part get, create and read-modify-write used before the service"""
+        for part_data in parts_list:
+            part = Part.objects.get(id=part_data['id'])
+            if part.stock_quantity < part_data['quantity']:
+                raise ValidationError(f'Insufficient stock for {part.name}')
+            PartUsage.objects.create(
+                maintenance_record=record, part=part, quantity=part_data['quantity'], unit_cost=part.cost
+            )
+            if not part.reduce_stock(part_data['quantity']):
+                raise ValidationError(f'Failed to update stock for {part.name}')
+
+    def service_reserve(self, record, parts_list):
+        """Validate with one query and draw stock with conditional updates"""
+        service = InventoryReservationService()
+        service.reserve(record, service.validate_selection(parts_list))
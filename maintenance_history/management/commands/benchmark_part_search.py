@@ -0,0 +1,109 @@
+# management/commands/benchmark_part_search.py
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+
+from maintenance.models import Part
+from maintenance.part_search import NGramPartSearchBackend, PostgresPartSearchBackend
+
+BENCHMARK_CATEGORY = 'Benchmark part search'
+
+COMPONENTS = ['Filter', 'Pad', 'Rotor', 'Belt', 'Hose', 'Pump', 'Sensor', 'Gasket', 'Bearing', 'Spark Plug']
+QUALIFIERS = ['Oil', 'Air', 'Cabin', 'Brake', 'Timing', 'Water', 'Fuel', 'Oxygen', 'Wheel', 'Head']
+MANUFACTURERS = ['Bosch', 'Denso', 'Mahle', 'Brembo', 'Gates', 'NGK', 'Valeo', 'Aisin']
+
+
+class Command(BaseCommand):
+    help = 'Compare the legacy icontains part search with the search backends on a large catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parts', type=int, default=100000, help='Parts to create (default: 100000)')
+        parser.add_argument('--page-size', type=int, default=20, help='Results per page (default: 20)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query (default: 5)')
+        parser.add_argument(
+            '--queries',
+            nargs='+',
+            default=['filter', 'brake pad', 'bos', 'ox-12', 'gasket'],
+            help='Search queries to time',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        Part.objects.bulk_create(
+            [self.make_part(rng, i) for i in range(options['parts'])],
+            batch_size=2000,
+        )
+
+        try:
+            self.report(options)
+        finally:
+            Part.objects.filter(category=BENCHMARK_CATEGORY).delete()
+
+    def make_part(self, rng, number):
+        qualifier = rng.choice(QUALIFIERS)
+        component = rng.choice(COMPONENTS)
+        manufacturer = rng.choice(MANUFACTURERS)
+        return Part(
+            name=f'{qualifier} {component} {number}',
+            part_number=f'{qualifier[:2].upper()}-{number}',
+            manufacturer=manufacturer,
+            description=f'{manufacturer} {qualifier.lower()} {component.lower()} for passenger vehicles',
+            category=BENCHMARK_CATEGORY,
+        )
+
+    def report(self, options):
+        page_size = options['page_size']
+        backends = [('ngram', NGramPartSearchBackend())]
+        if connection.vendor == 'postgresql':
+            backends.append(('postgres', PostgresPartSearchBackend()))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Skipping the postgres backend on {connection.vendor}'
+            ))
+
+        # The first n-gram search builds the index for the whole table
+        NGramPartSearchBackend._index = None
+        started = time.perf_counter()
+        NGramPartSearchBackend().search('warm up', limit=page_size)
+        self.stdout.write(f'ngram index build: {(time.perf_counter() - started) * 1000:.0f} ms')
+
+        total = Part.objects.count()
+        self.stdout.write(f'{total} parts, {page_size} per page')
+        for query in options['queries']:
+            self.stdout.write(f"'{query}'")
+            self.measure('legacy icontains', lambda: self.legacy_search(query, page_size), options)
+            for label, backend in backends:
+                self.measure(
+                    f'{label} search',
+                    lambda: backend.search(query, limit=page_size).total_count,
+                    options,
+                )
+                self.measure(
+                    f'{label} autocomplete',
+                    lambda: len(backend.autocomplete(query.split()[0])),
+                    options,
+                )
+
+    def legacy_search(self, query, page_size):
+        """The search the parts API ran before the backends"""
+        parts = Part.objects.filter(
+            Q(name__icontains=query) |
+            Q(part_number__icontains=query) |
+            Q(description__icontains=query)
+        ).order_by('name')
+        page = Paginator(parts, page_size).get_page(1)
+        list(page)
+        return page.paginator.count
+
+    def measure(self, label, run, options):
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            found = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(f'  {label}: {statistics.median(timings):.2f} ms, {found} found')
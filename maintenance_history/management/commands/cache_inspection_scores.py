@@ -0,0 +1,18 @@
+# management/commands/cache_inspection_scores.py
+from django.core.management.base import BaseCommand
+
+from maintenance_history.models import InitialInspection
+from maintenance_history.utils import refresh_initial_inspection_scores
+
+
+class Command(BaseCommand):
+    help = 'Cache the scores of completed initial inspections that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Inspections updated at a time (default: 500)')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_initial_inspection_scores(
+            InitialInspection.objects.all(), batch_size=max(1, options['batch_size'])
+        )
+        self.stdout.write(self.style.SUCCESS(f'Cached the scores of {refreshed} initial inspections'))
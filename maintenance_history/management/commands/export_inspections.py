@@ -0,0 +1,66 @@
+# management/commands/export_inspections.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from maintenance_history.exports import (
+    DEFAULT_CHUNK_SIZE,
+    EXPORT_DATASETS,
+    EXPORT_FORMATS,
+    filter_export_queryset,
+    get_export_dataset,
+    stream_export,
+)
+
+
+class Command(BaseCommand):
+    help = 'Stream inspections or maintenance history to a CSV, NDJSON or Parquet file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORT_DATASETS), help='Rows to export')
+        parser.add_argument('--output', type=str, required=True, help='File to write')
+        parser.add_argument('--format', type=str, default='csv', choices=sorted(EXPORT_FORMATS), help='Export format (default: csv)')
+        parser.add_argument('--vehicle-vin', type=str, help='Only export rows of this vehicle')
+        parser.add_argument('--date-from', type=str, help='Only export rows dated on or after YYYY-MM-DD')
+        parser.add_argument('--date-to', type=str, help='Only export rows dated on or before YYYY-MM-DD')
+        parser.add_argument('--completed', action='store_true', help='Only export completed inspections')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help=f'Rows fetched and written at a time (default: {DEFAULT_CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        dataset = get_export_dataset(options['dataset'])
+
+        dates = {}
+        for name in ('date_from', 'date_to'):
+            if options[name]:
+                try:
+                    dates[name] = parse_date(options[name])
+                except ValueError:
+                    dates[name] = None
+                if dates[name] is None:
+                    raise CommandError(f"Invalid --{name.replace('_', '-')}: {options[name]}")
+
+        queryset = filter_export_queryset(
+            dataset,
+            vehicle_vin=options['vehicle_vin'],
+            completed=True if options['completed'] else None,
+            **dates
+        )
+        try:
+            chunks = stream_export(dataset, options['format'], queryset, max(1, options['chunk_size']))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        written = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                output.write(chunk)
+                written += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {dataset.name} to {options['output']} "
+            f"({written / 1024:.1f} KiB in {time.perf_counter() - started:.1f}s)"
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance_history', '0011_add_service_provider_cost_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['vehicle', '-date_performed', '-id'], name='maint_record_vehicle_keyset'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance_history', '0012_maintenancerecord_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10)),
+                ('period', models.CharField(max_length=10)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Inspection Number Sequence',
+                'verbose_name_plural': 'Inspection Number Sequences',
+                'unique_together': {('prefix', 'period')},
+            },
+        ),
+    ]
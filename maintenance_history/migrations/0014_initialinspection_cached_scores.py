@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance_history', '0013_inspectionnumbersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='initialinspection',
+            name='cached_critical_count',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='initialinspection',
+            name='cached_failed_count',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='initialinspection',
+            name='cached_health_index',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='initialinspection',
+            name='cached_inspection_result',
+            field=models.CharField(blank=True, editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='initialinspection',
+            name='scores_cached_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='initialinspection',
+            index=models.Index(fields=['vehicle', '-inspection_date'], name='initial_insp_vehicle_date_idx'),
+        ),
+    ]
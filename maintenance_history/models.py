@@ -90,6 +90,10 @@ class MaintenanceRecord(models.Model):
         ordering = ['-date_performed']
         verbose_name = "Maintenance Record"
         verbose_name_plural = "Maintenance Records"
+        indexes = [
+            # Backs keyset pagination of a vehicle's service history
+            models.Index(fields=['vehicle', '-date_performed', '-id'], name='maint_record_vehicle_keyset'),
+        ]
 
     def __str__(self):
         return f"{self.vehicle.vin} - {self.date_performed.strftime('%Y-%m-%d')} - {self.work_done[:50]}"
@@ -386,6 +390,12 @@ class Inspections(models.Model):
         """Calculate completion percentage of the inspection form"""
         return round((self.total_points_checked / 50) * 100, 1)
     
+    @property
+    def points(self):
+        """PointCounts of an inspection loaded through projections.with_point_counts"""
+        from .projections import POINT_COUNT_ANNOTATIONS, PointCounts
+        return PointCounts(*(getattr(self, name) for name in POINT_COUNT_ANNOTATIONS))
+    
     @property
     def failed_points(self):
         """Get list of failed inspection points"""
@@ -494,6 +504,62 @@ class InitialInspection(models.Model):
         ('needs_attention', 'Needs Attention'),
     ]
     
+    # The 160 points counted towards completion; the advanced safety and
+    # hybrid items are recorded but not counted
+    INSPECTION_POINT_FIELDS = [
+        # Road Test (33 points)
+        'cold_engine_operation', 'throttle_operation', 'warmup_operation', 'operating_temp_performance',
+        'normal_operating_temp', 'brake_vibrations', 'engine_fan_operation', 'brake_pedal_specs',
+        'abs_operation', 'parking_brake_operation', 'seat_belt_condition', 'seat_belt_operation',
+        'transmission_operation', 'auto_trans_cold', 'auto_trans_operating', 'steering_feel',
+        'steering_centered', 'vehicle_tracking', 'tilt_telescopic_steering', 'washer_fluid_spray',
+        'front_wipers', 'rear_wipers', 'wiper_rest_position', 'wiper_blade_replacement',
+        'speedometer_function', 'odometer_function', 'cruise_control', 'heater_operation',
+        'ac_operation', 'engine_noise', 'interior_noise', 'wind_road_noise', 'tire_vibration',
+        
+        # Frame, Structure & Underbody (21 points)
+        'frame_unibody_condition', 'panel_alignment', 'underbody_condition', 'suspension_leaks_wear',
+        'struts_shocks_condition', 'power_steering_leaks', 'wheel_covers', 'tire_condition',
+        'tread_depth', 'tire_specifications', 'brake_calipers_lines', 'brake_system_equipment',
+        'brake_pad_life', 'brake_rotors_drums', 'exhaust_system', 'engine_trans_mounts',
+        'drive_axle_shafts', 'cv_joints_boots', 'engine_fluid_leaks', 'transmission_leaks',
+        'differential_fluid',
+        
+        # Under Hood (14 points)
+        'drive_belts_hoses', 'underhood_labels', 'air_filter_condition', 'battery_damage',
+        'battery_test', 'battery_posts_cables', 'battery_secured', 'charging_system',
+        'coolant_level', 'coolant_protection', 'oil_filter_change', 'oil_sludge_check',
+        'fluid_levels', 'fluid_contamination',
+        
+        # Functional & Walkaround (14 points)
+        'owners_manual', 'fuel_gauge', 'battery_voltage_gauge', 'temp_gauge', 'horn_function',
+        'airbags_present', 'headlight_alignment', 'emissions_test', 'tail_lights', 'brake_lights',
+        'side_marker_lights', 'backup_lights', 'license_plate_lights', 'exterior_lights_condition',
+        
+        # Interior Functions (46 points)
+        'instrument_panel', 'hvac_panel', 'instrument_dimmer', 'turn_signals', 'hazard_flashers',
+        'rearview_mirror', 'exterior_mirrors', 'remote_mirror_control', 'glass_condition',
+        'window_tint', 'dome_courtesy_lights', 'power_windows', 'window_locks', 'audio_system',
+        'audio_speakers', 'antenna', 'clock_operation', 'power_outlet', 'ashtrays',
+        'headliner_trim', 'floor_mats', 'doors_operation', 'door_locks', 'keyless_entry',
+        'master_keys', 'theft_deterrent', 'seat_adjustments', 'seat_heaters', 'memory_seat',
+        'headrests', 'rear_defogger', 'defogger_indicator', 'luggage_light', 'luggage_cleanliness',
+        'hood_trunk_latches', 'emergency_trunk_release', 'fuel_door_release', 'spare_tire_cover',
+        'spare_tire_present', 'spare_tire_tread', 'spare_tire_pressure', 'spare_tire_damage',
+        'spare_tire_secured', 'jack_tools', 'acceptable_aftermarket', 'unacceptable_removal',
+        
+        # Exterior Appearance (24 points)
+        'body_surface', 'exterior_cleanliness', 'paint_finish', 'paint_scratches', 'wheels_cleanliness',
+        'wheel_wells', 'tires_dressed', 'engine_compartment_clean', 'insulation_pad', 'engine_dressed',
+        'door_jambs', 'glove_console', 'cabin_air_filter', 'seats_carpets', 'vehicle_odors',
+        'glass_cleanliness', 'interior_debris', 'dash_vents', 'crevices_clean', 'upholstery_panels',
+        'paint_repairs', 'glass_repairs', 'bumpers_condition', 'interior_surfaces',
+        
+        # Optional/Additional Systems (8 points)
+        'sunroof_convertible', 'seat_heaters_optional', 'navigation_system', 'head_unit_software',
+        'transfer_case', 'truck_bed_condition', 'truck_bed_liner', 'backup_camera',
+    ]
+    
     # Basic inspection information
     vehicle = models.ForeignKey(
         Vehicle, 
@@ -767,6 +833,14 @@ class InitialInspection(models.Model):
         null=True
     )
     
+    # Scoring cached when a completed inspection is saved, so reports can
+    # read it in SQL; scores_cached_at is empty until the first calculation
+    cached_health_index = models.CharField(max_length=50, blank=True, editable=False)
+    cached_inspection_result = models.CharField(max_length=10, blank=True, editable=False)
+    cached_failed_count = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    cached_critical_count = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    scores_cached_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -775,6 +849,10 @@ class InitialInspection(models.Model):
         ordering = ['-inspection_date']
         verbose_name = "Initial Inspection (160-Point)"
         verbose_name_plural = "Initial Inspections (160-Point)"
+        indexes = [
+            # Latest inspection of each vehicle
+            models.Index(fields=['vehicle', '-inspection_date'], name='initial_insp_vehicle_date_idx'),
+        ]
     
     def __str__(self):
         return f"Initial Inspection {self.inspection_number} - {self.vehicle.vin}"
@@ -808,9 +886,20 @@ class InitialInspection(models.Model):
             else:
                 self.overall_condition_rating = 'needs_major_work'
             
+            self.cached_health_index = health_index
+            self.cached_inspection_result = inspection_result
+            self.cached_failed_count = len(self.failed_points)
+            self.cached_critical_count = len(self.safety_critical_issues)
+            self.scores_cached_at = timezone.now()
+            
             # Save without triggering recursion
             InitialInspection.objects.filter(pk=self.pk).update(
-                overall_condition_rating=self.overall_condition_rating
+                overall_condition_rating=self.overall_condition_rating,
+                cached_health_index=self.cached_health_index,
+                cached_inspection_result=self.cached_inspection_result,
+                cached_failed_count=self.cached_failed_count,
+                cached_critical_count=self.cached_critical_count,
+                scores_cached_at=self.scores_cached_at,
             )
             
         except Exception as e:
@@ -879,62 +968,8 @@ class InitialInspection(models.Model):
     @property
     def total_points_inspected(self):
         """Count how many inspection points have been checked (not empty)"""
-        inspection_fields = [
-            # Road Test (33 points)
-            'cold_engine_operation', 'throttle_operation', 'warmup_operation', 'operating_temp_performance',
-            'normal_operating_temp', 'brake_vibrations', 'engine_fan_operation', 'brake_pedal_specs',
-            'abs_operation', 'parking_brake_operation', 'seat_belt_condition', 'seat_belt_operation',
-            'transmission_operation', 'auto_trans_cold', 'auto_trans_operating', 'steering_feel',
-            'steering_centered', 'vehicle_tracking', 'tilt_telescopic_steering', 'washer_fluid_spray',
-            'front_wipers', 'rear_wipers', 'wiper_rest_position', 'wiper_blade_replacement',
-            'speedometer_function', 'odometer_function', 'cruise_control', 'heater_operation',
-            'ac_operation', 'engine_noise', 'interior_noise', 'wind_road_noise', 'tire_vibration',
-            
-            # Frame, Structure & Underbody (21 points)
-            'frame_unibody_condition', 'panel_alignment', 'underbody_condition', 'suspension_leaks_wear',
-            'struts_shocks_condition', 'power_steering_leaks', 'wheel_covers', 'tire_condition',
-            'tread_depth', 'tire_specifications', 'brake_calipers_lines', 'brake_system_equipment',
-            'brake_pad_life', 'brake_rotors_drums', 'exhaust_system', 'engine_trans_mounts',
-            'drive_axle_shafts', 'cv_joints_boots', 'engine_fluid_leaks', 'transmission_leaks',
-            'differential_fluid',
-            
-            # Under Hood (14 points)
-            'drive_belts_hoses', 'underhood_labels', 'air_filter_condition', 'battery_damage',
-            'battery_test', 'battery_posts_cables', 'battery_secured', 'charging_system',
-            'coolant_level', 'coolant_protection', 'oil_filter_change', 'oil_sludge_check',
-            'fluid_levels', 'fluid_contamination',
-            
-            # Functional & Walkaround (14 points)
-            'owners_manual', 'fuel_gauge', 'battery_voltage_gauge', 'temp_gauge', 'horn_function',
-            'airbags_present', 'headlight_alignment', 'emissions_test', 'tail_lights', 'brake_lights',
-            'side_marker_lights', 'backup_lights', 'license_plate_lights', 'exterior_lights_condition',
-            
-            # Interior Functions (46 points)
-            'instrument_panel', 'hvac_panel', 'instrument_dimmer', 'turn_signals', 'hazard_flashers',
-            'rearview_mirror', 'exterior_mirrors', 'remote_mirror_control', 'glass_condition',
-            'window_tint', 'dome_courtesy_lights', 'power_windows', 'window_locks', 'audio_system',
-            'audio_speakers', 'antenna', 'clock_operation', 'power_outlet', 'ashtrays',
-            'headliner_trim', 'floor_mats', 'doors_operation', 'door_locks', 'keyless_entry',
-            'master_keys', 'theft_deterrent', 'seat_adjustments', 'seat_heaters', 'memory_seat',
-            'headrests', 'rear_defogger', 'defogger_indicator', 'luggage_light', 'luggage_cleanliness',
-            'hood_trunk_latches', 'emergency_trunk_release', 'fuel_door_release', 'spare_tire_cover',
-            'spare_tire_present', 'spare_tire_tread', 'spare_tire_pressure', 'spare_tire_damage',
-            'spare_tire_secured', 'jack_tools', 'acceptable_aftermarket', 'unacceptable_removal',
-            
-            # Exterior Appearance (24 points)
-            'body_surface', 'exterior_cleanliness', 'paint_finish', 'paint_scratches', 'wheels_cleanliness',
-            'wheel_wells', 'tires_dressed', 'engine_compartment_clean', 'insulation_pad', 'engine_dressed',
-            'door_jambs', 'glove_console', 'cabin_air_filter', 'seats_carpets', 'vehicle_odors',
-            'glass_cleanliness', 'interior_debris', 'dash_vents', 'crevices_clean', 'upholstery_panels',
-            'paint_repairs', 'glass_repairs', 'bumpers_condition', 'interior_surfaces',
-            
-            # Optional/Additional Systems (8 points)
-            'sunroof_convertible', 'seat_heaters_optional', 'navigation_system', 'head_unit_software',
-            'transfer_case', 'truck_bed_condition', 'truck_bed_liner', 'backup_camera',
-        ]
-        
         checked_count = 0
-        for field in inspection_fields:
+        for field in self.INSPECTION_POINT_FIELDS:
             if getattr(self, field):
                 checked_count += 1
         return checked_count
@@ -944,6 +979,12 @@ class InitialInspection(models.Model):
         """Calculate completion percentage of the inspection (160 points total)"""
         return round((self.total_points_inspected / 160) * 100, 1)
     
+    @property
+    def points(self):
+        """PointCounts of an inspection loaded through projections.with_point_counts"""
+        from .projections import POINT_COUNT_ANNOTATIONS, PointCounts
+        return PointCounts(*(getattr(self, name) for name in POINT_COUNT_ANNOTATIONS))
+    
     @property
     def failed_points(self):
         """Get list of failed inspection points"""
@@ -1027,3 +1068,25 @@ class InitialInspection(models.Model):
             return inspection_result
         except:
             return "Pending"
+
+
+class InspectionNumberSequence(models.Model):
+    """
+    Counter row for one inspection number prefix and period.
+
+    last_value is the highest number handed out, including numbers held in
+    blocks by worker processes. Rows are locked with select_for_update while
+    they are advanced, see InspectionNumberAllocator.
+    """
+    prefix = models.CharField(max_length=10)
+    period = models.CharField(max_length=10)
+    last_value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('prefix', 'period')
+        verbose_name = "Inspection Number Sequence"
+        verbose_name_plural = "Inspection Number Sequences"
+
+    def __str__(self):
+        return f"{self.prefix}-{self.period}: {self.last_value}"
@@ -0,0 +1,180 @@
+"""
+Slim list projections for inspection listings.
+
+List pages only show a few columns of each inspection, but the inspection
+models carry one column per checklist point. The projections below load
+just the listed columns with .only() and compute the point counts in the
+database, each as its own annotation summing one CASE/WHEN term per
+checklist field. The fields are found from the model's field metadata, so
+new checklist points are picked up without changes here.
+"""
+
+from typing import List, Mapping, NamedTuple, Sequence
+
+from django.db.models import Expression, F, IntegerField, QuerySet, Value
+
+from .models import InitialInspection, Inspections
+
+FAILED_STATUSES = ('fail', 'major')
+FAIR_STATUSES = ('minor', 'needs_attention')
+GOOD_STATUSES = ('pass',)
+
+# Annotations added by with_point_counts, in PointCounts order
+POINT_COUNT_ANNOTATIONS = ('points_failed', 'points_fair', 'points_good', 'points_checked', 'points_total')
+
+INITIAL_INSPECTION_LIST_FIELDS = (
+    'id',
+    'inspection_number',
+    'inspection_date',
+    'mileage_at_inspection',
+    'is_completed',
+    'vehicle__id',
+    'vehicle__vin',
+    'vehicle__make',
+    'vehicle__model',
+    'technician__id',
+    'technician__username',
+    'technician__first_name',
+    'technician__last_name',
+)
+
+INSPECTION_FORM_LIST_FIELDS = (
+    'id',
+    'inspection_date',
+    'mileage_at_inspection',
+    'is_completed',
+    'inspection__id',
+    'inspection__inspection_number',
+    'inspection__vehicle__id',
+    'inspection__vehicle__vin',
+    'technician__id',
+    'technician__username',
+    'technician__first_name',
+    'technician__last_name',
+)
+
+
+class PointCounts(NamedTuple):
+    """Checklist point counts of one inspection"""
+    failed: int
+    fair: int
+    good: int
+    checked: int
+    total: int
+
+    @property
+    def completion(self) -> float:
+        """Checked share of the counted points as a percentage, like completion_percentage"""
+        return round((self.checked / self.total) * 100, 1) if self.total else 0
+
+    @classmethod
+    def from_values(cls, values: Mapping) -> 'PointCounts':
+        """PointCounts of a values() row that includes the POINT_COUNT_ANNOTATIONS"""
+        return cls(*(values[name] for name in POINT_COUNT_ANNOTATIONS))
+
+
+class PointCount(Expression):
+    """
+    Number of checklist fields of each row holding one of the statuses.
+
+    Renders as a flat sum of ``CASE WHEN field IN (...) THEN 1 ELSE 0 END``
+    terms, one per field, so the value is at most the number of fields. The
+    SQL is written out here rather than built from Case/When objects, which
+    cost hundreds of expression nodes to resolve and compile on every
+    request.
+
+    Args:
+        fields: Checklist field names
+        statuses: Status values to count
+    """
+
+    def __init__(self, fields: Sequence[str], statuses: Sequence[str]):
+        super().__init__(output_field=IntegerField())
+        self.fields = list(fields)
+        self.statuses = list(statuses)
+        self.columns = []
+
+    def resolve_expression(self, query=None, allow_joins=True, reuse=None, summarize=False, for_save=False):
+        resolved = self.copy()
+        resolved.columns = [
+            F(name).resolve_expression(query, allow_joins, reuse, summarize, for_save)
+            for name in self.fields
+        ]
+        return resolved
+
+    def get_source_expressions(self):
+        return self.columns
+
+    def set_source_expressions(self, exprs):
+        self.columns = list(exprs)
+
+    def as_sql(self, compiler, connection):
+        if not self.columns or not self.statuses:
+            return '0', []
+        placeholders = ', '.join(['%s'] * len(self.statuses))
+        terms = []
+        params = []
+        for column in self.columns:
+            column_sql, column_params = compiler.compile(column)
+            terms.append(f"CASE WHEN {column_sql} IN ({placeholders}) THEN 1 ELSE 0 END")
+            params.extend(column_params)
+            params.extend(self.statuses)
+        return f"({' + '.join(terms)})", params
+
+
+def status_fields(model) -> List[str]:
+    """
+    Return the names of a model's checklist fields.
+
+    These are the fields whose choices are the model's STATUS_CHOICES, the
+    same fields failed_points looks at.
+    """
+    return [
+        field.name for field in model._meta.fields
+        if getattr(field, 'choices', None) == model.STATUS_CHOICES
+    ]
+
+
+def with_point_counts(queryset: QuerySet, checked_fields: Sequence[str] = None) -> QuerySet:
+    """
+    Annotate inspections with their point counts.
+
+    points_failed, points_fair and points_good count over all checklist
+    fields; points_checked and points_total over checked_fields (all
+    checklist fields by default). The inspection models' points property
+    combines them into a PointCounts.
+
+    Args:
+        queryset: Inspections or InitialInspection queryset
+        checked_fields: Fields counted towards completion
+
+    Returns:
+        Annotated queryset
+    """
+    model = queryset.model
+    fields = status_fields(model)
+    checked_fields = list(checked_fields or fields)
+    statuses = [value for value, _ in model.STATUS_CHOICES]
+    return queryset.annotate(
+        points_failed=PointCount(fields, [status for status in statuses if status in FAILED_STATUSES]),
+        points_fair=PointCount(fields, [status for status in statuses if status in FAIR_STATUSES]),
+        points_good=PointCount(fields, [status for status in statuses if status in GOOD_STATUSES]),
+        points_checked=PointCount(checked_fields, statuses),
+        points_total=Value(len(checked_fields), output_field=IntegerField()),
+    )
+
+
+def initial_inspection_list_queryset() -> QuerySet:
+    """Initial inspections for list pages: listed columns and point counts only"""
+    queryset = InitialInspection.objects.select_related('vehicle', 'technician').only(
+        *INITIAL_INSPECTION_LIST_FIELDS
+    ).order_by('-inspection_date')
+    return with_point_counts(queryset, InitialInspection.INSPECTION_POINT_FIELDS)
+
+
+def inspection_form_list_queryset() -> QuerySet:
+    """Inspection forms for list pages: listed columns and point counts only"""
+    queryset = Inspections.objects.select_related('inspection__vehicle', 'technician').only(
+        *INSPECTION_FORM_LIST_FIELDS
+    ).order_by('-inspection_date')
+    return with_point_counts(queryset)
@@ -0,0 +1,286 @@
+"""
+Service functions for maintenance history operations
+"""
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from maintenance.models import Part
+from .models import InspectionNumberSequence, PartUsage
+
+
+class InventoryReservationService:
+    """
+    Validates part selections and draws them from stock.
+
+    Stock is decremented with one conditional UPDATE per part
+    (``stock_quantity = stock_quantity - n WHERE stock_quantity >= n``), so
+    a concurrent draw can never push stock below zero. Parts are updated in
+    ascending id order, which means every transaction takes its row locks in
+    the same order and two reservations cannot deadlock.
+    """
+
+    def validate_selection(self, parts_list: List[Dict]) -> List[Dict]:
+        """
+        Validate submitted part entries against current stock in one query.
+
+        Args:
+            parts_list: Entries with ``id`` and ``quantity`` keys; repeated
+                ids are combined
+
+        Returns:
+            List of dicts with part, quantity and unit_cost, in submission order
+
+        Raises:
+            ValidationError: If an entry is malformed, a part does not exist,
+                a quantity is invalid or stock is insufficient
+        """
+        quantities = {}
+        for part_data in parts_list:
+            if not isinstance(part_data, dict):
+                raise ValidationError("Each part entry must be an object.")
+
+            for field in ('id', 'quantity'):
+                if field not in part_data:
+                    raise ValidationError(f"Missing required field: {field}")
+
+            part_id = part_data['id']
+            try:
+                part_id = int(part_id)
+            except (ValueError, TypeError):
+                raise ValidationError(f"Part with ID {part_id} does not exist.")
+
+            quantities.setdefault(part_id, []).append(part_data['quantity'])
+
+        parts = Part.objects.in_bulk(list(quantities))
+
+        validated_parts = []
+        for part_id, requested in quantities.items():
+            part = parts.get(part_id)
+            if part is None:
+                raise ValidationError(f"Part with ID {part_id} does not exist.")
+
+            quantity = 0
+            for value in requested:
+                try:
+                    value = int(value)
+                except (ValueError, TypeError):
+                    raise ValidationError(f"Invalid quantity for {part.name}.")
+                if value <= 0:
+                    raise ValidationError(f"Quantity for {part.name} must be greater than 0.")
+                quantity += value
+
+            if part.stock_quantity < quantity:
+                raise ValidationError(
+                    f"Insufficient stock for {part.name}. "
+                    f"Available: {part.stock_quantity}, Requested: {quantity}"
+                )
+
+            validated_parts.append({
+                'part': part,
+                'quantity': quantity,
+                'unit_cost': part.cost
+            })
+
+        return validated_parts
+
+    def decrement_stock(self, part: Part, quantity: int) -> bool:
+        """
+        Atomically draw quantity from a part's stock.
+
+        Args:
+            part: Part to draw from
+            quantity: Units to remove
+
+        Returns:
+            True if the stock was decremented, False if it was insufficient
+        """
+        updated = Part.objects.filter(
+            pk=part.pk, stock_quantity__gte=quantity
+        ).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            updated_at=timezone.now()
+        )
+        return updated == 1
+
+    @transaction.atomic
+    def reserve(self, maintenance_record, selected_parts: List[Dict]) -> List[PartUsage]:
+        """
+        Draw the selected parts from stock and record their usage.
+
+        Args:
+            maintenance_record: MaintenanceRecord the parts were used on
+            selected_parts: Output of validate_selection
+
+        Returns:
+            Created PartUsage records
+
+        Raises:
+            ValidationError: If stock ran out after validation; the whole
+                reservation is rolled back
+        """
+        for part_data in sorted(selected_parts, key=lambda data: data['part'].pk):
+            part = part_data['part']
+            if not self.decrement_stock(part, part_data['quantity']):
+                raise ValidationError(
+                    f"Failed to update stock for {part.name}. "
+                    f"This may be due to concurrent modifications."
+                )
+            part.stock_quantity -= part_data['quantity']
+
+        return PartUsage.objects.bulk_create([
+            PartUsage(
+                maintenance_record=maintenance_record,
+                part=part_data['part'],
+                quantity=part_data['quantity'],
+                unit_cost=part_data['unit_cost']
+            )
+            for part_data in selected_parts
+        ])
+
+
+class InspectionNumberAllocator:
+    """
+    Hands out inspection numbers of the form PREFIX-YYYY-NNNN.
+
+    Each prefix and year has an InspectionNumberSequence counter row that is
+    locked with select_for_update and advanced by block_size numbers at a
+    time. On PostgreSQL a native sequence per prefix and year is used
+    instead, which never blocks and is never rolled back.
+
+    With a block_size above one, the numbers of a block not used by the
+    call that reserved it are kept for later calls in this process. Numbers
+    reserved from a counter row are only kept once the reserving
+    transaction commits, so a rolled back reservation is not handed out.
+    Unused numbers are lost when the process exits, leaving gaps.
+
+    Args:
+        block_size: Numbers reserved per database round-trip, defaults to
+            the INSPECTION_NUMBER_BLOCK_SIZE setting or 1
+        use_sequence: Use a native sequence, defaults to True on PostgreSQL
+    """
+
+    def __init__(self, block_size: int = None, use_sequence: bool = None):
+        if block_size is None:
+            block_size = getattr(settings, 'INSPECTION_NUMBER_BLOCK_SIZE', 1)
+        self.block_size = max(1, int(block_size))
+        self.use_sequence = use_sequence
+        self._blocks: Dict[Tuple[str, str], Deque[int]] = {}
+        self._sequences = set()
+        self._lock = threading.Lock()
+
+    def next_number(self, prefix: str, model, start: int = 1) -> str:
+        """
+        Return the next inspection number for prefix in the current year.
+
+        Args:
+            prefix: Number prefix, e.g. 'INS'
+            model: Model whose inspection_number values use the prefix; read
+                once per year to continue after numbers issued before the
+                counter existed
+            start: First number of a year
+
+        Returns:
+            Inspection number string
+        """
+        period = str(timezone.localdate().year)
+        key = (prefix, period)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block:
+                return self.format_number(prefix, period, block.popleft())
+
+        if self._uses_sequence():
+            numbers = self._reserve_from_sequence(prefix, period, model, start, self.block_size)
+            number = numbers.popleft()
+            self._keep(key, numbers)
+        else:
+            numbers = self._reserve_from_counter(prefix, period, model, start, self.block_size)
+            number = numbers.popleft()
+            if numbers:
+                transaction.on_commit(lambda: self._keep(key, numbers))
+        return self.format_number(prefix, period, number)
+
+    @staticmethod
+    def format_number(prefix: str, period: str, number: int) -> str:
+        """Return the inspection number string for a counter value"""
+        return f"{prefix}-{period}-{number:04d}"
+
+    def _uses_sequence(self) -> bool:
+        if self.use_sequence is None:
+            return connection.vendor == 'postgresql'
+        return self.use_sequence
+
+    def _keep(self, key: Tuple[str, str], numbers: Deque[int]):
+        if numbers:
+            with self._lock:
+                self._blocks.setdefault(key, deque()).extend(numbers)
+
+    def _highest_issued(self, prefix: str, period: str, model) -> int:
+        """Return the highest number already used by model for prefix and period"""
+        highest = 0
+        issued = model.objects.filter(
+            inspection_number__startswith=f"{prefix}-{period}-"
+        ).values_list('inspection_number', flat=True)
+        # Compared as integers: '...-10000' sorts before '...-9999' as text
+        for inspection_number in issued.iterator():
+            try:
+                highest = max(highest, int(inspection_number.rsplit('-', 1)[-1]))
+            except ValueError:
+                continue
+        return highest
+
+    def _reserve_from_counter(self, prefix: str, period: str, model, start: int, count: int) -> Deque[int]:
+        with transaction.atomic():
+            counter = InspectionNumberSequence.objects.select_for_update().filter(
+                prefix=prefix, period=period
+            ).first()
+            if counter is None:
+                counter = self._create_counter(prefix, period, model, start)
+
+            first = counter.last_value + 1
+            counter.last_value += count
+            counter.save(update_fields=['last_value', 'updated_at'])
+        return deque(range(first, first + count))
+
+    def _create_counter(self, prefix: str, period: str, model, start: int) -> InspectionNumberSequence:
+        last_value = max(start - 1, self._highest_issued(prefix, period, model))
+        try:
+            with transaction.atomic():
+                return InspectionNumberSequence.objects.create(
+                    prefix=prefix, period=period, last_value=last_value
+                )
+        except IntegrityError:
+            # Another process created the row first
+            return InspectionNumberSequence.objects.select_for_update().get(prefix=prefix, period=period)
+
+    def _reserve_from_sequence(self, prefix: str, period: str, model, start: int, count: int) -> Deque[int]:
+        name = f"inspection_number_{prefix}_{period}".lower()
+        with connection.cursor() as cursor:
+            if name not in self._sequences:
+                cursor.execute("SELECT to_regclass(%s)", [name])
+                if cursor.fetchone()[0] is None:
+                    counter = InspectionNumberSequence.objects.filter(prefix=prefix, period=period).first()
+                    last_value = max(
+                        start - 1,
+                        self._highest_issued(prefix, period, model),
+                        counter.last_value if counter else 0,
+                    )
+                    cursor.execute(
+                        f"CREATE SEQUENCE IF NOT EXISTS {connection.ops.quote_name(name)} "
+                        f"START WITH {last_value + 1}"
+                    )
+                # The sequence disappears again if the creating transaction rolls back
+                transaction.on_commit(lambda: self._sequences.add(name))
+
+            cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [name, count])
+            return deque(sorted(row[0] for row in cursor.fetchall()))
+
+
+inspection_number_allocator = InspectionNumberAllocator()
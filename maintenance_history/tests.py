@@ -1,14 +1,29 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, skipUnlessDBFeature, tag
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import IntegerField
 from maintenance.models import Part, ScheduledMaintenance
+from maintenance.part_search import NGramPartSearchBackend, get_part_search_backend
 from vehicles.models import Vehicle
-from .models import MaintenanceRecord, PartUsage
+from .models import InitialInspection, Inspection, InspectionNumberSequence, MaintenanceRecord, PartUsage
 from .forms import MaintenanceRecordForm
+from .exports import EXPORT_DATASETS, filter_export_queryset, iter_export_rows, stream_export
+from .projections import initial_inspection_list_queryset, status_fields
+from .services import InspectionNumberAllocator, InventoryReservationService
+from .utils import generate_inspection_number, generate_inspection_workflow_report, get_inspection_workflow_status
+import csv
+import io
 import json
+import os
+import re
+import threading
 from decimal import Decimal
+from unittest import skipUnless
 
 
 class PartSearchAPIViewTests(TestCase):
@@ -236,6 +251,92 @@ class PartSearchAPIViewTests(TestCase):
         self.assertEqual(data['pagination']['total_count'], 0)
 
 
+class PartSearchBackendTests(TestCase):
+    """Test cases for the in-process part search backend"""
+    
+    def setUp(self):
+        self.backend = NGramPartSearchBackend()
+        self.brake_fluid = Part.objects.create(
+            name="Brake Fluid", part_number="BF-200", manufacturer="FluidCorp",
+            description="DOT 4 fluid", category="Fluids"
+        )
+        self.pads = Part.objects.create(
+            name="Front Pads", part_number="FP-300", manufacturer="BrakeCorp",
+            description="Front brake pads", category="Brakes"
+        )
+        self.disc = Part.objects.create(
+            name="Disc Brake Rotor", part_number="DB-400", manufacturer="RotorCorp",
+            description="Vented rotor", category="Brakes"
+        )
+    
+    def test_default_backend_for_sqlite(self):
+        """Test that SQLite uses the n-gram backend"""
+        self.assertIsInstance(get_part_search_backend(), NGramPartSearchBackend)
+    
+    def test_name_matches_rank_first(self):
+        """Test that name prefix and name matches come before other fields"""
+        result = self.backend.search('brake')
+        
+        self.assertEqual(result.total_count, 3)
+        self.assertEqual(result.parts, [self.brake_fluid, self.disc, self.pads])
+    
+    def test_short_query_matches_substrings(self):
+        """Test that queries shorter than an n-gram still match substrings"""
+        result = self.backend.search('db')
+        
+        self.assertEqual(result.parts, [self.disc])
+    
+    def test_offset_and_limit(self):
+        """Test that a page is cut from the ranked matches"""
+        result = self.backend.search('brake', offset=1, limit=1)
+        
+        self.assertEqual(result.total_count, 3)
+        self.assertEqual(result.parts, [self.disc])
+    
+    def test_index_follows_updates_and_deletes(self):
+        """Test that changed and deleted parts are picked up by the next search"""
+        self.backend.search('brake')
+        
+        self.pads.name = "Front Shoes"
+        self.pads.description = "Drum shoes"
+        self.pads.manufacturer = "ShoeCorp"
+        self.pads.save()
+        self.disc.delete()
+        
+        self.assertEqual(self.backend.search('brake').parts, [self.brake_fluid])
+        self.assertEqual(self.backend.search('shoes').parts, [self.pads])
+    
+    def test_search_runs_constant_queries(self):
+        """Test that a warm index needs only the freshness checks and the page load"""
+        self.backend.search('brake')
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.backend.search('brake')
+        
+        self.assertEqual(len(queries), 3)
+    
+    def test_autocomplete(self):
+        """Test word prefix suggestions on name and part number"""
+        suggestions = self.backend.autocomplete('bra')
+        
+        self.assertEqual([item['id'] for item in suggestions], [self.brake_fluid.id, self.disc.id])
+        self.assertEqual(set(suggestions[0]), {'id', 'name', 'part_number'})
+        self.assertEqual([item['id'] for item in self.backend.autocomplete('fp-')], [self.pads.id])
+        self.assertEqual(len(self.backend.autocomplete('bra', limit=1)), 1)
+        self.assertEqual(self.backend.autocomplete(''), [])
+    
+    def test_autocomplete_api(self):
+        """Test the autocomplete endpoint"""
+        response = self.client.get(reverse('maintenance_history:part_autocomplete_api'), {'q': 'rot', 'limit': '500'})
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['results'], [
+            {'id': self.disc.id, 'name': 'Disc Brake Rotor', 'part_number': 'DB-400'}
+        ])
+        self.assertNotIn('count', data)
+
+
 class PartDetailsAPIViewTests(TestCase):
     """Test cases for PartDetailsAPIView"""
     
@@ -596,17 +697,18 @@ class MaintenanceRecordFormTests(TestCase):
     
     def test_form_save_transaction_rollback_on_error(self):
         """Test that form save rolls back on error"""
-        # Mock the reduce_stock method to fail
-        original_reduce_stock = Part.reduce_stock
+        # Make the stock decrement fail for the first part
+        original_decrement_stock = InventoryReservationService.decrement_stock
+        part1_id = self.part1.id
         
-        def failing_reduce_stock(self, quantity):
-            if self.id == self.part1.id:
+        def failing_decrement_stock(service, part, quantity):
+            if part.id == part1_id:
                 return False  # Simulate failure
-            return original_reduce_stock(self, quantity)
-        
-        Part.reduce_stock = failing_reduce_stock
+            return original_decrement_stock(service, part, quantity)
         
         try:
+            InventoryReservationService.decrement_stock = failing_decrement_stock
+            
             parts_data = [
                 {'id': self.part1.id, 'quantity': 1},
                 {'id': self.part3.id, 'quantity': 1}
@@ -632,7 +734,7 @@ class MaintenanceRecordFormTests(TestCase):
             
         finally:
             # Restore original method
-            Part.reduce_stock = original_reduce_stock
+            InventoryReservationService.decrement_stock = original_decrement_stock
     
     def test_form_save_without_commit(self):
         """Test form save with commit=False"""
@@ -791,3 +893,745 @@ class MaintenanceRecordFormTests(TestCase):
         
         self.assertIn('Failed to update stock', str(context.exception))
         self.assertIn('concurrent modifications', str(context.exception))
+
+
+class InventoryReservationServiceTests(TestCase):
+    """Test cases for InventoryReservationService"""
+    
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(
+            vin='RESERVETESTVIN001',
+            make='Toyota',
+            model='Camry',
+            manufacture_year=2020
+        )
+        self.parts = [
+            Part.objects.create(name=f"Part {i}", cost=Decimal('10.00'), stock_quantity=10)
+            for i in range(5)
+        ]
+        self.record = MaintenanceRecord.objects.create(
+            vehicle=self.vehicle, work_done='Service', mileage=1000
+        )
+        self.service = InventoryReservationService()
+    
+    def test_validate_selection_uses_one_query(self):
+        """All parts are validated with a single query"""
+        parts_list = [{'id': part.id, 'quantity': 2} for part in self.parts]
+        
+        with self.assertNumQueries(1):
+            selected = self.service.validate_selection(parts_list)
+        
+        self.assertEqual([data['part'] for data in selected], self.parts)
+        self.assertTrue(all(data['quantity'] == 2 for data in selected))
+    
+    def test_validate_selection_combines_repeated_parts(self):
+        """Repeated entries for one part are checked against stock together"""
+        selected = self.service.validate_selection([
+            {'id': self.parts[0].id, 'quantity': 4},
+            {'id': self.parts[0].id, 'quantity': '3'},
+        ])
+        self.assertEqual(len(selected), 1)
+        self.assertEqual(selected[0]['quantity'], 7)
+        
+        with self.assertRaises(ValidationError) as context:
+            self.service.validate_selection([
+                {'id': self.parts[0].id, 'quantity': 6},
+                {'id': self.parts[0].id, 'quantity': 6},
+            ])
+        self.assertIn('Available: 10, Requested: 12', str(context.exception))
+    
+    def test_validate_selection_errors(self):
+        """Unknown parts and bad quantities are rejected"""
+        with self.assertRaises(ValidationError) as context:
+            self.service.validate_selection([{'id': 999999, 'quantity': 1}])
+        self.assertIn('Part with ID 999999 does not exist', str(context.exception))
+        
+        with self.assertRaises(ValidationError) as context:
+            self.service.validate_selection([{'id': self.parts[0].id, 'quantity': 0}])
+        self.assertIn('must be greater than 0', str(context.exception))
+        
+        with self.assertRaises(ValidationError) as context:
+            self.service.validate_selection([{'id': self.parts[0].id, 'quantity': 'two'}])
+        self.assertIn('Invalid quantity for Part 0', str(context.exception))
+    
+    def test_reserve_decrements_stock_and_bulk_creates_usage(self):
+        """Reservation runs one conditional update per part and one insert"""
+        selected = self.service.validate_selection(
+            [{'id': part.id, 'quantity': 3} for part in reversed(self.parts)]
+        )
+        
+        with CaptureQueriesContext(connection) as context:
+            usages = self.service.reserve(self.record, selected)
+        
+        statements = [query['sql'] for query in context.captured_queries]
+        updates = [sql for sql in statements if sql.startswith('UPDATE')]
+        inserts = [sql for sql in statements if sql.startswith('INSERT')]
+        self.assertEqual(len(updates), len(self.parts))
+        self.assertEqual(len(inserts), 1)
+        # Rows are updated in ascending id order whatever the submission order
+        for part, sql in zip(self.parts, updates):
+            self.assertIn(f'"id" = {part.id} ', sql)
+        
+        self.assertEqual(len(usages), len(self.parts))
+        self.assertEqual(self.record.parts_used.count(), len(self.parts))
+        for part in Part.objects.filter(pk__in=[p.pk for p in self.parts]):
+            self.assertEqual(part.stock_quantity, 7)
+    
+    def test_reserve_refuses_oversell_after_validation(self):
+        """Stock drawn after validation makes the reservation roll back"""
+        selected = self.service.validate_selection([
+            {'id': self.parts[0].id, 'quantity': 2},
+            {'id': self.parts[1].id, 'quantity': 8},
+        ])
+        
+        # Another technician draws the second part in the meantime
+        self.assertTrue(self.service.decrement_stock(self.parts[1], 5))
+        
+        with self.assertRaises(ValidationError) as context:
+            with transaction.atomic():
+                self.service.reserve(self.record, selected)
+        
+        self.assertIn('Failed to update stock for Part 1', str(context.exception))
+        self.parts[0].refresh_from_db()
+        self.parts[1].refresh_from_db()
+        self.assertEqual(self.parts[0].stock_quantity, 10)
+        self.assertEqual(self.parts[1].stock_quantity, 5)
+        self.assertFalse(PartUsage.objects.exists())
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class InventoryReservationConcurrencyTests(TransactionTestCase):
+    """Stress test concurrent reservations against a database with row locks"""
+    
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 25
+    
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(
+            vin='STRESSTESTVIN0001',
+            make='Toyota',
+            model='Camry',
+            manufacture_year=2020
+        )
+        self.parts = [
+            Part.objects.create(name=f"Stress Part {i}", cost=Decimal('5.00'), stock_quantity=60)
+            for i in range(3)
+        ]
+    
+    def test_concurrent_reservations_never_oversell(self):
+        """Parallel reservations of overlapping parts never drive stock negative"""
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        results_lock = threading.Lock()
+        
+        def worker(seed):
+            service = InventoryReservationService()
+            succeeded = 0
+            try:
+                barrier.wait()
+                for attempt in range(self.ATTEMPTS_PER_THREAD):
+                    # Reverse the submission order on alternate attempts
+                    parts = self.parts if (seed + attempt) % 2 else list(reversed(self.parts))
+                    try:
+                        with transaction.atomic():
+                            record = MaintenanceRecord.objects.create(
+                                vehicle=self.vehicle, work_done='Stress', mileage=1000
+                            )
+                            selected = service.validate_selection(
+                                [{'id': part.id, 'quantity': 1} for part in parts]
+                            )
+                            service.reserve(record, selected)
+                        succeeded += 1
+                    except ValidationError:
+                        pass
+            finally:
+                connection.close()
+            with results_lock:
+                results.append(succeeded)
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        succeeded = sum(results)
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(succeeded, 60)
+        for part in Part.objects.filter(pk__in=[p.pk for p in self.parts]):
+            self.assertEqual(part.stock_quantity, 0)
+            self.assertEqual(part.usage_records.count(), 60)
+
+
+class InspectionNumberAllocatorTests(TestCase):
+    """Test cases for InspectionNumberAllocator"""
+    
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(
+            vin='NUMBERTESTVIN0001',
+            make='Toyota',
+            model='Camry',
+            manufacture_year=2020
+        )
+        self.prefix = f"INS-{timezone.localdate().year}-"
+    
+    def create_inspection(self, inspection_number):
+        return Inspection.objects.create(
+            vehicle=self.vehicle,
+            inspection_number=inspection_number,
+            year=2020,
+            inspection_result='PAS',
+            inspection_date=timezone.localdate()
+        )
+    
+    def test_numbers_are_sequential(self):
+        """Test that the first numbers of a year count up from one"""
+        allocator = InspectionNumberAllocator(use_sequence=False)
+        
+        numbers = [allocator.next_number('INS', Inspection) for _ in range(3)]
+        
+        self.assertEqual(numbers, [f"{self.prefix}0001", f"{self.prefix}0002", f"{self.prefix}0003"])
+    
+    def test_continues_after_existing_numbers(self):
+        """Test that the counter starts after the highest number already issued"""
+        self.create_inspection(f"{self.prefix}9999")
+        self.create_inspection(f"{self.prefix}10000")
+        self.create_inspection(f"{self.prefix}0042")
+        
+        number = InspectionNumberAllocator(use_sequence=False).next_number('INS', Inspection)
+        
+        self.assertEqual(number, f"{self.prefix}10001")
+    
+    def test_start_value(self):
+        """Test that a prefix can start counting at a later number"""
+        number = InspectionNumberAllocator(use_sequence=False).next_number('INIT', Inspection, start=1000)
+        
+        self.assertEqual(number, f"INIT-{timezone.localdate().year}-1000")
+    
+    def test_block_is_reserved_in_one_round_trip(self):
+        """Test that a block serves later numbers without touching the counter"""
+        allocator = InspectionNumberAllocator(block_size=5, use_sequence=False)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first = allocator.next_number('INS', Inspection)
+        with self.assertNumQueries(0):
+            rest = [allocator.next_number('INS', Inspection) for _ in range(4)]
+        
+        self.assertEqual([first] + rest, [f"{self.prefix}{n:04d}" for n in range(1, 6)])
+        counter = InspectionNumberSequence.objects.get(prefix='INS', period=str(timezone.localdate().year))
+        self.assertEqual(counter.last_value, 5)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocator.next_number('INS', Inspection), f"{self.prefix}0006")
+    
+    def test_rolled_back_block_is_not_kept(self):
+        """Test that numbers from a rolled back reservation are not handed out"""
+        allocator = InspectionNumberAllocator(block_size=5, use_sequence=False)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    allocator.next_number('INS', Inspection)
+                    raise ValidationError("rolled back")
+            except ValidationError:
+                pass
+        
+        self.assertEqual(allocator._blocks, {})
+        self.assertEqual(allocator.next_number('INS', Inspection), f"{self.prefix}0001")
+    
+    def test_generate_inspection_number(self):
+        """Test the utility used by the inspection workflow"""
+        self.create_inspection(f"{self.prefix}0007")
+        
+        self.assertEqual(generate_inspection_number(), f"{self.prefix}0008")
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class InspectionNumberConcurrencyTests(TransactionTestCase):
+    """Stress test parallel inspection creation against a database with row locks"""
+    
+    THREADS = 16
+    INSPECTIONS = 1000
+    
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(
+            vin='NUMBERSTRESSVIN01',
+            make='Toyota',
+            model='Camry',
+            manufacture_year=2020
+        )
+    
+    def test_parallel_creation_has_no_duplicates(self):
+        """1,000 inspections created from 16 threads get distinct numbers"""
+        allocator = InspectionNumberAllocator(block_size=8, use_sequence=False)
+        barrier = threading.Barrier(self.THREADS)
+        created = []
+        errors = []
+        results_lock = threading.Lock()
+        
+        def worker(count):
+            numbers = []
+            try:
+                barrier.wait()
+                for _ in range(count):
+                    with transaction.atomic():
+                        inspection = Inspection.objects.create(
+                            vehicle=self.vehicle,
+                            inspection_number=allocator.next_number('INS', Inspection),
+                            year=2020,
+                            inspection_result='PAS',
+                            inspection_date=timezone.localdate()
+                        )
+                    numbers.append(inspection.inspection_number)
+            except Exception as e:
+                with results_lock:
+                    errors.append(e)
+            finally:
+                connection.close()
+            with results_lock:
+                created.extend(numbers)
+        
+        per_thread, extra = divmod(self.INSPECTIONS, self.THREADS)
+        threads = [
+            threading.Thread(target=worker, args=(per_thread + (1 if i < extra else 0),))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(len(created), self.INSPECTIONS)
+        self.assertEqual(len(set(created)), self.INSPECTIONS)
+        self.assertEqual(Inspection.objects.count(), self.INSPECTIONS)
+        counter = InspectionNumberSequence.objects.get(prefix='INS')
+        self.assertLessEqual(counter.last_value, self.INSPECTIONS + self.THREADS * 8)
+
+
+class InspectionListProjectionTests(TestCase):
+    """Test cases for the inspection list projections"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='listtech', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            vin='LISTTESTVIN000001',
+            make='Toyota',
+            model='Camry',
+            manufacture_year=2020
+        )
+        self.inspection = InitialInspection.objects.create(
+            vehicle=self.vehicle,
+            inspection_number='INIT-2026-1000',
+            technician=self.user,
+            mileage_at_inspection=50000,
+            cold_engine_operation='pass',
+            throttle_operation='pass',
+            brake_vibrations='fail',
+            abs_operation='major',
+            steering_feel='minor',
+            tire_condition='needs_attention',
+            # Recorded, but not one of the 160 counted points
+            hybrid_battery='fail',
+        )
+    
+    def test_status_fields_come_from_metadata(self):
+        """Test that every checklist field is found and nothing else"""
+        fields = status_fields(InitialInspection)
+        
+        self.assertIn('hybrid_battery', fields)
+        self.assertNotIn('overall_condition_rating', fields)
+        self.assertTrue(set(InitialInspection.INSPECTION_POINT_FIELDS) <= set(fields))
+    
+    def test_counts_match_model_properties(self):
+        """Test that the database counts agree with the Python properties"""
+        projected = initial_inspection_list_queryset().get(pk=self.inspection.pk)
+        
+        self.assertEqual(projected.points.failed, len(self.inspection.failed_points))
+        self.assertEqual(projected.points.failed, 3)
+        self.assertEqual(projected.points.fair, 2)
+        self.assertEqual(projected.points.good, 2)
+        self.assertEqual(projected.points.checked, self.inspection.total_points_inspected)
+        self.assertEqual(projected.points.total, 160)
+        self.assertEqual(projected.points.completion, self.inspection.completion_percentage)
+    
+    def test_counts_are_separate_bounded_integers(self):
+        """Test that each count is its own integer annotation of 0/1 terms"""
+        fields = status_fields(InitialInspection)
+        InitialInspection.objects.filter(pk=self.inspection.pk).update(**{name: 'fail' for name in fields})
+        queryset = initial_inspection_list_queryset()
+
+        projected = queryset.get(pk=self.inspection.pk)
+        self.assertEqual(projected.points.failed, len(fields))
+        self.assertEqual(projected.points.checked, 160)
+        self.assertEqual((projected.points.fair, projected.points.good), (0, 0))
+
+        for name in ('points_failed', 'points_fair', 'points_good', 'points_checked'):
+            self.assertIsInstance(queryset.query.annotations[name].output_field, IntegerField)
+        sql, _ = queryset.query.sql_with_params()
+        # No term adds more than 1, so no sum can exceed the field count
+        self.assertEqual(set(re.findall(r'THEN (\d+)', sql)), {'1'})
+
+    def test_checklist_columns_are_not_loaded(self):
+        """Test that list rows leave the checklist and notes columns deferred"""
+        projected = initial_inspection_list_queryset().get(pk=self.inspection.pk)
+        
+        deferred = projected.get_deferred_fields()
+        self.assertIn('brake_vibrations', deferred)
+        self.assertIn('road_test_notes', deferred)
+        self.assertNotIn('inspection_number', deferred)
+    
+    def test_list_page_queries_do_not_grow_with_rows(self):
+        """Test that the list page renders without loading rows one by one"""
+        self.client.force_login(self.user)
+        url = reverse('maintenance_history:initial_inspection_list')
+        
+        with CaptureQueriesContext(connection) as single:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '3 Issue(s)')
+        
+        for i in range(5):
+            InitialInspection.objects.create(
+                vehicle=self.vehicle,
+                inspection_number=f'INIT-2026-{1001 + i}',
+                technician=self.user,
+                mileage_at_inspection=50000,
+                brake_vibrations='fail',
+            )
+        with CaptureQueriesContext(connection) as several:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        
+        self.assertEqual(len(several), len(single))
+
+
+class BulkExportTests(TestCase):
+    """Test cases for the streaming bulk exports"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporttech', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            vin='EXPORTTESTVIN0001',
+            make='Toyota',
+            model='Camry',
+            manufacture_year=2020
+        )
+        self.other_vehicle = Vehicle.objects.create(
+            vin='EXPORTTESTVIN0002',
+            make='Honda',
+            model='Civic',
+            manufacture_year=2019
+        )
+        self.inspection = InitialInspection.objects.create(
+            vehicle=self.vehicle,
+            inspection_number='INIT-2026-2000',
+            technician=self.user,
+            mileage_at_inspection=50000,
+            brake_vibrations='fail',
+            overall_notes='Needs brakes, "soon"',
+            is_completed=True,
+        )
+        InitialInspection.objects.create(
+            vehicle=self.other_vehicle,
+            inspection_number='INIT-2026-2001',
+            technician=self.user,
+            mileage_at_inspection=30000,
+        )
+        self.record = MaintenanceRecord.objects.create(
+            vehicle=self.vehicle,
+            technician=self.user,
+            work_done='Oil change',
+            mileage=50000,
+            cost=Decimal('89.90'),
+        )
+    
+    def read(self, dataset, format_type, **filters):
+        export_dataset = EXPORT_DATASETS[dataset]
+        queryset = filter_export_queryset(export_dataset, **filters)
+        return ''.join(stream_export(export_dataset, format_type, queryset, chunk_size=1))
+    
+    def test_csv_uses_the_dataset_column_order(self):
+        """Test that CSV exports have a header and one row per inspection"""
+        rows = list(csv.reader(io.StringIO(self.read('initial_inspections', 'csv'))))
+        
+        self.assertEqual(tuple(rows[0]), EXPORT_DATASETS['initial_inspections'].columns)
+        self.assertEqual(len(rows), 3)
+        exported = dict(zip(rows[0], rows[1]))
+        self.assertEqual(exported['inspection_number'], 'INIT-2026-2000')
+        self.assertEqual(exported['vehicle__vin'], 'EXPORTTESTVIN0001')
+        self.assertEqual(exported['brake_vibrations'], 'fail')
+        self.assertEqual(exported['overall_notes'], 'Needs brakes, "soon"')
+    
+    def test_ndjson_writes_one_object_per_line(self):
+        """Test that NDJSON exports serialize dates and decimals"""
+        lines = self.read('maintenance_records', 'ndjson').splitlines()
+        
+        self.assertEqual(len(lines), 1)
+        exported = json.loads(lines[0])
+        self.assertEqual(exported['cost'], '89.90')
+        self.assertEqual(exported['work_done'], 'Oil change')
+        self.assertEqual(exported['date_performed'], self.record.date_performed.isoformat())
+    
+    def test_rows_are_paged_by_primary_key(self):
+        """Test that each chunk is a separate query starting after the last row"""
+        dataset = EXPORT_DATASETS['initial_inspections']
+        expected = list(dataset.queryset().values_list('id', flat=True))
+        
+        with CaptureQueriesContext(connection) as queries:
+            exported = [row[0] for row in iter_export_rows(dataset, chunk_size=1)]
+        
+        self.assertEqual(exported, expected)
+        self.assertEqual(len(queries), len(expected) + 1)
+        self.assertIn('"id" > ', queries[-1]['sql'])
+    
+    def test_command_rejects_impossible_dates(self):
+        """Test that a well formed but impossible date is a command error"""
+        with self.assertRaisesMessage(CommandError, 'Invalid --date-from: 2026-02-30'):
+            call_command(
+                'export_inspections', 'maintenance_records', output=os.devnull, date_from='2026-02-30'
+            )
+    
+    def test_filters(self):
+        """Test vehicle and completion filters"""
+        by_vehicle = self.read('initial_inspections', 'ndjson', vehicle_vin='EXPORTTESTVIN0002').splitlines()
+        open_only = self.read('initial_inspections', 'ndjson', completed=False).splitlines()
+        
+        self.assertEqual([json.loads(line)['inspection_number'] for line in by_vehicle], ['INIT-2026-2001'])
+        self.assertEqual([json.loads(line)['inspection_number'] for line in open_only], ['INIT-2026-2001'])
+    
+    def test_view_streams_attachment(self):
+        """Test that the export view streams a CSV attachment"""
+        self.client.force_login(self.user)
+        url = reverse('maintenance_history:bulk_export', args=['initial_inspections'])
+        
+        response = self.client.get(url, {'format': 'csv', 'vin': 'EXPORTTESTVIN0001'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('INIT-2026-2000', body)
+        self.assertNotIn('INIT-2026-2001', body)
+    
+    def test_view_limits_other_users_to_their_own_rows(self):
+        """Test that non-staff users cannot export rows recorded by others"""
+        customer = User.objects.create_user(username='exportcustomer', password='testpass123')
+        MaintenanceRecord.objects.create(
+            vehicle=self.other_vehicle,
+            technician=customer,
+            work_done='Tyre change',
+            mileage=30000,
+        )
+        url = reverse('maintenance_history:bulk_export', args=['maintenance_records'])
+
+        self.client.force_login(customer)
+        body = b''.join(self.client.get(url, {'format': 'csv'}).streaming_content).decode()
+        self.assertIn('Tyre change', body)
+        self.assertNotIn('Oil change', body)
+        self.assertNotIn('exporttech', body)
+
+        staff = User.objects.create_user(username='exportstaff', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        body = b''.join(self.client.get(url, {'format': 'csv'}).streaming_content).decode()
+        self.assertIn('Tyre change', body)
+        self.assertIn('Oil change', body)
+
+    def test_view_rejects_bad_parameters(self):
+        """Test unknown datasets, formats and dates"""
+        self.client.force_login(self.user)
+        url = reverse('maintenance_history:bulk_export', args=['initial_inspections'])
+        
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date_from': '18/10/2026'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date_to': '2026-02-30'}).status_code, 400)
+        self.assertEqual(
+            self.client.get(reverse('maintenance_history:bulk_export', args=['parts'])).status_code,
+            404
+        )
+
+
+@tag('slow')
+@skipUnless(os.environ.get('RUN_SLOW_TESTS'), 'Inserts 500k rows; set RUN_SLOW_TESTS=1 to run')
+@skipUnless(os.path.exists('/proc/self/clear_refs'), 'Needs Linux peak RSS accounting')
+class BulkExportMemoryTests(TestCase):
+    """Test that bulk export memory stays flat as the row count grows"""
+    
+    ROWS = 500000
+    
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='exportmemtech', password='testpass123')
+        vehicle = Vehicle.objects.create(
+            vin='EXPORTMEMVIN00001',
+            make='Toyota',
+            model='Camry',
+            manufacture_year=2020
+        )
+        # Generated in the database; creating 500k model instances would
+        # dwarf the export being measured
+        table = MaintenanceRecord._meta.db_table
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+                INSERT INTO {table} (
+                    vehicle_id, technician_id, work_done, date_performed, mileage, notes,
+                    service_provider, cost, parts_replaced, image_type, image_description,
+                    created_at, updated_at
+                )
+                SELECT %s, %s, %s, %s, n, %s, %s, 120.50, %s, '', '', %s, %s FROM seq
+                """,
+                [
+                    cls.ROWS, vehicle.pk, user.pk, 'Scheduled service ' * 4, now,
+                    'Customer notes ' * 4, 'Main Street Garage', 'Oil filter, air filter', now, now,
+                ]
+            )
+    
+    def peak_rss_growth_kib(self, run):
+        """Run a function and return how far it raised peak RSS"""
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        before = self.rss_kib('VmRSS')
+        run()
+        return self.rss_kib('VmHWM') - before
+    
+    def rss_kib(self, key):
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(key + ':'):
+                    return int(line.split()[1])
+    
+    def export(self, rows, format_type):
+        dataset = EXPORT_DATASETS['maintenance_records']
+        first = dataset.queryset().values_list('pk', flat=True).first()
+        queryset = dataset.queryset().filter(pk__lt=first + rows)
+        exported = 0
+        for chunk in stream_export(dataset, format_type, queryset):
+            exported += chunk.count('\n')
+        return exported
+    
+    def test_peak_rss_is_flat(self):
+        """Test that exporting 500k rows peaks no higher than exporting 10k"""
+        for format_type in ('csv', 'ndjson'):
+            small = self.peak_rss_growth_kib(lambda: self.export(10000, format_type))
+            large = self.peak_rss_growth_kib(
+                lambda: self.assertGreaterEqual(self.export(self.ROWS, format_type), self.ROWS)
+            )
+            
+            # Materializing the rows would take several hundred MiB
+            self.assertLess(large, small + 16 * 1024, format_type)
+
+
+class InspectionWorkflowReportTests(TestCase):
+    """Test cases for the set-based inspection workflow report"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='workflowtech', password='testpass123')
+        self.other_user = User.objects.create_user(username='workflowtech2', password='testpass123')
+        self.vehicles = Vehicle.objects.bulk_create([
+            Vehicle(vin=f'WORKFLOWVIN{i:06d}', make='Toyota', model='Camry', manufacture_year=2020)
+            for i in range(4)
+        ])
+        # No inspection for vehicles[0]
+        self.create_inspection(self.vehicles[1], 'INIT-2026-3001', cold_engine_operation='pass')
+        self.create_inspection(
+            self.vehicles[2], 'INIT-2026-3002', is_completed=True, brake_vibrations='fail',
+            **{name: 'pass' for name in InitialInspection.INSPECTION_POINT_FIELDS[20:140]}
+        )
+        self.create_inspection(
+            self.vehicles[3], 'INIT-2026-3003', is_completed=True, technician=self.other_user,
+            **{name: 'pass' for name in InitialInspection.INSPECTION_POINT_FIELDS}
+        )
+    
+    def create_inspection(self, vehicle, inspection_number, technician=None, **fields):
+        return InitialInspection.objects.create(
+            vehicle=vehicle,
+            inspection_number=inspection_number,
+            technician=technician or self.user,
+            mileage_at_inspection=50000,
+            **fields
+        )
+    
+    def report(self, **kwargs):
+        return generate_inspection_workflow_report(
+            Vehicle.objects.filter(vin__startswith='WORKFLOWVIN').order_by('vin'), **kwargs
+        )
+    
+    def test_matches_per_vehicle_status(self):
+        """Test that the report agrees with get_inspection_workflow_status"""
+        report = self.report()
+        
+        self.assertEqual(report['total_vehicles'], 4)
+        for vehicle, status in zip(self.vehicles, report['vehicle_details']):
+            expected = get_inspection_workflow_status(vehicle)
+            self.assertEqual(status, expected)
+        self.assertEqual(report['workflow_summary'], {
+            'needs_initial_inspection': 1,
+            'initial_inspection_in_progress': 1,
+            'scores_pending': 0,
+            'requires_repairs': 1,
+            'requires_maintenance': 0,
+            'ready_for_service': 1,
+        })
+    
+    def test_stale_scores_are_not_written(self):
+        """Test that the report leaves inspections without cached scores untouched"""
+        InitialInspection.objects.update(scores_cached_at=None, cached_critical_count=None)
+        
+        with CaptureQueriesContext(connection) as queries, \
+                self.assertLogs('maintenance_history.utils', level='WARNING') as logs:
+            report = self.report()
+        
+        self.assertEqual(report['workflow_summary']['scores_pending'], 2)
+        self.assertEqual(report['workflow_summary']['ready_for_service'], 0)
+        self.assertEqual(report['vehicle_details'][2]['workflow_stage'], 'scores_pending')
+        self.assertIn('2 inspections', logs.output[0])
+        self.assertFalse([query for query in queries if not query['sql'].lstrip().upper().startswith('SELECT')])
+        self.assertEqual(InitialInspection.objects.filter(is_completed=True, scores_cached_at=None).count(), 2)
+    
+    def test_command_caches_stale_scores(self):
+        """Test that cache_inspection_scores scores inspections without cached scores once"""
+        InitialInspection.objects.update(scores_cached_at=None, cached_critical_count=None)
+        stdout = io.StringIO()
+        
+        call_command('cache_inspection_scores', batch_size=1, stdout=stdout)
+        
+        self.assertIn('Cached the scores of 2 initial inspections', stdout.getvalue())
+        self.assertFalse(InitialInspection.objects.filter(is_completed=True, scores_cached_at=None).exists())
+        summary = self.report()['workflow_summary']
+        self.assertEqual((summary['scores_pending'], summary['requires_repairs']), (0, 1))
+    
+    def test_filters_apply_to_inspections(self):
+        """Test technician and date filters"""
+        by_technician = self.report(technician=self.other_user, include_details=False)
+        self.assertEqual(by_technician['workflow_summary']['ready_for_service'], 1)
+        self.assertEqual(by_technician['workflow_summary']['needs_initial_inspection'], 3)
+        
+        tomorrow = timezone.localdate() + timezone.timedelta(days=1)
+        future = self.report(date_from=tomorrow, include_details=False)
+        self.assertEqual(future['workflow_summary']['needs_initial_inspection'], 4)
+    
+    def test_query_count_is_constant(self):
+        """Test that the report takes as many queries for 10,000 vehicles as for 10"""
+        def add_vehicles(start, stop):
+            Vehicle.objects.bulk_create([
+                Vehicle(vin=f'WORKFLOWVIN{i:06d}', make='Toyota', model='Camry', manufacture_year=2020)
+                for i in range(start, stop)
+            ])
+        
+        InitialInspection.objects.update(scores_cached_at=None)
+        add_vehicles(4, 10)
+        with CaptureQueriesContext(connection) as small:
+            report = self.report()
+        self.assertEqual(report['total_vehicles'], 10)
+        
+        add_vehicles(10, 10000)
+        with CaptureQueriesContext(connection) as large:
+            report = self.report()
+        self.assertEqual(report['total_vehicles'], 10000)
+        self.assertEqual(len(report['vehicle_details']), 10000)
+        
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(InitialInspection.objects.filter(is_completed=True, scores_cached_at=None).count(), 2)
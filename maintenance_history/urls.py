@@ -70,6 +70,9 @@ urlpatterns = [
     path('api/parts/search/', 
          api_views.PartSearchAPIView.as_view(), 
          name='part_search_api'),
+    path('api/parts/autocomplete/', 
+         api_views.PartAutocompleteAPIView.as_view(), 
+         name='part_autocomplete_api'),
     path('api/parts/<int:part_id>/', 
          api_views.PartDetailsAPIView.as_view(), 
          name='part_details_api'),
@@ -95,4 +98,9 @@ urlpatterns = [
     path('api/scheduled-maintenance/', 
          api_views.ScheduledMaintenanceAPIView.as_view(), 
          name='scheduled_maintenance_api'),
+    
+    # Streaming bulk exports (initial_inspections, inspection_forms, maintenance_records)
+    path('exports/<str:dataset>/', 
+         views.BulkExportView.as_view(), 
+         name='bulk_export'),
 ]
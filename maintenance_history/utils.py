@@ -208,29 +208,10 @@ def generate_inspection_number() -> str:
     """
     Generate a unique inspection number in format: INS-YYYY-NNNN
     """
-    from datetime import datetime
     from .models import Inspection
+    from .services import inspection_number_allocator
     
-    current_year = datetime.now().year
-    prefix = f"INS-{current_year}-"
-    
-    # Find the highest number for this year
-    existing_inspections = Inspection.objects.filter(
-        inspection_number__startswith=prefix
-    ).order_by('-inspection_number')
-    
-    if existing_inspections.exists():
-        last_number = existing_inspections.first().inspection_number
-        try:
-            # Extract the number part and increment
-            number_part = int(last_number.split('-')[-1])
-            next_number = number_part + 1
-        except (ValueError, IndexError):
-            next_number = 1
-    else:
-        next_number = 1
-    
-    return f"{prefix}{next_number:04d}"
+    return inspection_number_allocator.next_number('INS', Inspection)
 
 
 def generate_inspection_summary(inspection_form: Inspections) -> Dict[str, any]:
@@ -1109,29 +1090,10 @@ def generate_initial_inspection_number() -> str:
     """
     Generate a unique initial inspection number in format: INIT-YYYY-NNNN
     """
-    from datetime import datetime
     from .models import InitialInspection
+    from .services import inspection_number_allocator
     
-    current_year = datetime.now().year
-    prefix = f"INIT-{current_year}-"
-    
-    # Find the highest number for this year
-    existing_inspections = InitialInspection.objects.filter(
-        inspection_number__startswith=prefix
-    ).order_by('-inspection_number')
-    
-    if existing_inspections.exists():
-        last_number = existing_inspections.first().inspection_number
-        try:
-            # Extract the number part and increment
-            number_part = int(last_number.split('-')[-1])
-            next_number = number_part + 1
-        except (ValueError, IndexError):
-            next_number = 1000
-    else:
-        next_number = 1000
-    
-    return f"{prefix}{next_number:04d}"
+    return inspection_number_allocator.next_number('INIT', InitialInspection, start=1000)
 
 
 def generate_initial_inspection_summary(inspection) -> Dict:
@@ -1583,40 +1545,212 @@ def get_inspection_workflow_status(vehicle):
     return status
 
 
-def generate_inspection_workflow_report(vehicles=None):
+WORKFLOW_STAGES = (
+    'needs_initial_inspection',
+    'initial_inspection_in_progress',
+    'scores_pending',
+    'requires_repairs',
+    'requires_maintenance',
+    'ready_for_service',
+)
+
+
+def refresh_initial_inspection_scores(queryset, batch_size=500) -> int:
+    """
+    Cache the scoring of completed initial inspections that have none yet.
+    
+    Inspections completed before the cached score fields existed, or
+    written without save(), have no cached scores; reports read the cache
+    in SQL and need it filled first. Run it through the
+    cache_inspection_scores command, reports never write.
+    
+    Args:
+        queryset: InitialInspection queryset to look for stale scores in
+        batch_size: Inspections loaded and updated at a time
+        
+    Returns:
+        Number of inspections whose scores were cached
+    """
+    import logging
+    from django.utils import timezone
+    from .models import InitialInspection
+    
+    logger = logging.getLogger(__name__)
+    fields = [
+        'cached_health_index', 'cached_inspection_result', 'cached_failed_count',
+        'cached_critical_count', 'scores_cached_at',
+    ]
+    stale = queryset.filter(
+        is_completed=True, scores_cached_at__isnull=True
+    ).select_related('vehicle').order_by('pk')
+    
+    refreshed = 0
+    last_pk = 0
+    while True:
+        # Keyset batches rather than iterator(): no server-side cursor has
+        # to outlive the updates through a transaction-mode pooler
+        inspections = list(stale.filter(pk__gt=last_pk)[:batch_size])
+        if not inspections:
+            break
+        last_pk = inspections[-1].pk
+        batch = []
+        for inspection in inspections:
+            try:
+                health_index, inspection_result = calculate_initial_inspection_health_index(inspection)
+            except Exception as e:
+                logger.error(f"Error caching scores for initial inspection {inspection.pk}: {str(e)}")
+                continue
+            inspection.cached_health_index = health_index
+            inspection.cached_inspection_result = inspection_result
+            inspection.cached_failed_count = len(inspection.failed_points)
+            inspection.cached_critical_count = len(inspection.safety_critical_issues)
+            inspection.scores_cached_at = timezone.now()
+            batch.append(inspection)
+        if batch:
+            refreshed += InitialInspection.objects.bulk_update(batch, fields)
+    return refreshed
+
+
+def _workflow_recommendation(stage, completion=None, critical_count=None, failed_count=None) -> str:
+    """Return the recommendation shown for a workflow stage"""
+    if stage == 'needs_initial_inspection':
+        return 'Schedule initial 160-point inspection'
+    if stage == 'initial_inspection_in_progress':
+        return f'Complete initial inspection ({completion}% done)'
+    if stage == 'scores_pending':
+        return 'Inspection scores not calculated yet; review the inspection before regular use'
+    if stage == 'requires_repairs':
+        return f'Address {critical_count} critical safety issue(s) before regular use'
+    if stage == 'requires_maintenance':
+        return f'Address {failed_count} maintenance issues'
+    return 'Vehicle ready for regular maintenance schedule'
+
+
+def generate_inspection_workflow_report(vehicles=None, date_from=None, date_to=None, technician=None,
+                                        include_details=True):
     """
     Generate a workflow status report for vehicles.
     
+    The report takes the same number of queries for any number of
+    vehicles. Each vehicle's latest initial inspection is found with a
+    correlated subquery, its workflow stage is derived in SQL from the
+    inspection's cached scores, and the stage counts are one conditional
+    aggregate. Stages follow get_inspection_workflow_status, except that
+    a completed inspection without cached scores is reported as
+    'scores_pending' rather than judged on missing counts. The report
+    does not write: the cache_inspection_scores command fills those
+    scores in.
+    
     Args:
         vehicles: QuerySet of vehicles (if None, includes all vehicles)
+        date_from: Only consider inspections on or after this date
+        date_to: Only consider inspections on or before this date
+        technician: Only consider initial inspections by this user (or user id)
+        include_details: Include the per-vehicle statuses
         
     Returns:
         Dictionary with workflow report data
     """
+    import logging
+    from django.db.models import BooleanField, Case, CharField, Count, Exists, OuterRef, Q, Subquery, Value, When
     from vehicles.models import Vehicle
+    from .models import InitialInspection, Inspection
+    from .projections import POINT_COUNT_ANNOTATIONS, PointCounts, with_point_counts
     
     if vehicles is None:
         vehicles = Vehicle.objects.all()
     
+    initial_inspections = InitialInspection.objects.all()
+    regular_inspections = Inspection.objects.all()
+    if date_from:
+        initial_inspections = initial_inspections.filter(inspection_date__date__gte=date_from)
+        regular_inspections = regular_inspections.filter(inspection_date__gte=date_from)
+    if date_to:
+        initial_inspections = initial_inspections.filter(inspection_date__date__lte=date_to)
+        regular_inspections = regular_inspections.filter(inspection_date__lte=date_to)
+    if technician:
+        initial_inspections = initial_inspections.filter(technician=technician)
+    
+    latest_initial = initial_inspections.filter(vehicle=OuterRef('pk')).order_by('-inspection_date', '-pk')
+    
+    def latest(field):
+        return Subquery(latest_initial.values(field)[:1])
+    
+    vehicles = vehicles.annotate(
+        latest_initial_id=latest('pk'),
+        latest_initial_completed=latest('is_completed'),
+        latest_critical_count=latest('cached_critical_count'),
+        latest_failed_count=latest('cached_failed_count'),
+        latest_scores_cached_at=latest('scores_cached_at'),
+    ).annotate(
+        workflow_stage=Case(
+            When(latest_initial_id__isnull=True, then=Value('needs_initial_inspection')),
+            When(latest_initial_completed=False, then=Value('initial_inspection_in_progress')),
+            # Never scored, or scoring failed on save: the counts are empty
+            When(latest_scores_cached_at__isnull=True, then=Value('scores_pending')),
+            When(latest_critical_count__gt=0, then=Value('requires_repairs')),
+            When(latest_failed_count__gt=10, then=Value('requires_maintenance')),
+            default=Value('ready_for_service'),
+            output_field=CharField(),
+        )
+    )
+    
+    latest_inspections = InitialInspection.objects.filter(pk__in=vehicles.values('latest_initial_id'))
+    # The report only reads the cached scores; the cache_inspection_scores
+    # command fills in those of inspections saved before the cache existed
+    stale = latest_inspections.filter(is_completed=True, scores_cached_at__isnull=True).count()
+    if stale:
+        logging.getLogger(__name__).warning(
+            f"{stale} inspections in the workflow report have no cached scores; "
+            f"run the cache_inspection_scores command"
+        )
+    
+    summary = vehicles.aggregate(
+        total_vehicles=Count('pk'),
+        **{stage: Count('pk', filter=Q(workflow_stage=stage)) for stage in WORKFLOW_STAGES}
+    )
     report_data = {
-        'total_vehicles': vehicles.count(),
-        'workflow_summary': {
-            'needs_initial_inspection': 0,
-            'initial_inspection_in_progress': 0,
-            'requires_repairs': 0,
-            'requires_maintenance': 0,
-            'ready_for_service': 0,
-        },
+        'total_vehicles': summary.pop('total_vehicles'),
+        'workflow_summary': summary,
         'vehicle_details': []
     }
-    
-    for vehicle in vehicles:
-        status = get_inspection_workflow_status(vehicle)
+    if not include_details:
+        return report_data
+    
+    inspections = {
+        inspection['pk']: inspection
+        for inspection in with_point_counts(
+            latest_inspections.order_by(), InitialInspection.INSPECTION_POINT_FIELDS
+        ).values(
+            'pk', 'inspection_date', 'cached_health_index', 'cached_inspection_result', *POINT_COUNT_ANNOTATIONS
+        )
+    }
+    rows = vehicles.annotate(
+        has_regular_inspection=Exists(regular_inspections.filter(vehicle=OuterRef('pk')), output_field=BooleanField())
+    ).values(
+        'vin', 'latest_initial_id', 'latest_initial_completed', 'latest_critical_count',
+        'latest_failed_count', 'workflow_stage', 'has_regular_inspection'
+    )
+    for row in rows:
+        inspection = inspections.get(row['latest_initial_id'])
+        stage = row['workflow_stage']
+        status = {
+            'vehicle_vin': row['vin'],
+            'has_initial_inspection': inspection is not None,
+            'has_regular_inspection': row['has_regular_inspection'],
+            'initial_inspection_completed': bool(row['latest_initial_completed']),
+            'workflow_stage': stage,
+            'recommendations': [_workflow_recommendation(
+                stage,
+                completion=PointCounts.from_values(inspection).completion if inspection else None,
+                critical_count=row['latest_critical_count'],
+                failed_count=row['latest_failed_count'],
+            )]
+        }
+        if inspection and row['latest_initial_completed']:
+            status['health_index'] = inspection['cached_health_index']
+            status['inspection_result'] = inspection['cached_inspection_result']
+            status['last_inspection_date'] = inspection['inspection_date']
         report_data['vehicle_details'].append(status)
-        
-        # Update summary counts
-        workflow_stage = status['workflow_stage']
-        if workflow_stage in report_data['workflow_summary']:
-            report_data['workflow_summary'][workflow_stage] += 1
     
-    return report_data
\ No newline at end of file
+    return report_data
@@ -3,7 +3,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.views import View
 from django.contrib.auth.decorators import login_required
@@ -11,8 +11,11 @@ from django.utils.decorators import method_decorator
 import logging
 import json
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import MaintenanceRecord, PartUsage, Inspection, Inspections, InitialInspection
 from .forms import MaintenanceRecordForm, InspectionForm, InspectionRecordForm, InitialInspectionForm
+from .projections import initial_inspection_list_queryset, inspection_form_list_queryset
+from .exports import EXPORT_FORMATS, filter_export_queryset, get_export_dataset, stream_export
 from maintenance.models import Part
 
 # Set up logging
@@ -297,7 +300,7 @@ class InspectionFormListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        return Inspections.objects.select_related('inspection__vehicle', 'technician').order_by('-inspection_date')
+        return inspection_form_list_queryset()
 
 class InspectionFormDetailView(LoginRequiredMixin, DetailView):
     model = Inspections
@@ -974,7 +977,7 @@ class InitialInspectionListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         """Filter initial inspections by technician and apply search/filter parameters"""
-        queryset = InitialInspection.objects.select_related('vehicle', 'technician').order_by('-inspection_date')
+        queryset = initial_inspection_list_queryset()
         
         # Apply filters from GET parameters
         status = self.request.GET.get('status')
@@ -1491,4 +1494,56 @@ class InitialInspectionAjaxView(LoginRequiredMixin, View):
         elif last_name:
             return last_name
         else:
-            return technician.username or f"User {technician.id}"
\ No newline at end of file
+            return technician.username or f"User {technician.id}"
+
+
+@method_decorator(login_required, name='dispatch')
+class BulkExportView(View):
+    """
+    Stream many inspections or maintenance records as CSV, NDJSON or Parquet.
+
+    Query parameters: format (csv, ndjson or parquet), vin, date_from,
+    date_to (YYYY-MM-DD) and status (completed or in_progress).
+
+    Staff export every row; other users only the rows they recorded as
+    technician, like the inspection list views show them.
+    """
+
+    def get(self, request, dataset):
+        try:
+            export_dataset = get_export_dataset(dataset)
+        except ValueError:
+            raise Http404("Unknown export")
+
+        format_type = request.GET.get('format', 'csv')
+        dates = {}
+        for name in ('date_from', 'date_to'):
+            value = request.GET.get(name)
+            if value:
+                try:
+                    dates[name] = parse_date(value)
+                except ValueError:
+                    # Well formed but not a real date, e.g. 2026-02-30
+                    dates[name] = None
+                if dates[name] is None:
+                    return HttpResponseBadRequest(f"Invalid {name}: {value}")
+
+        completed = {'completed': True, 'in_progress': False}.get(request.GET.get('status'))
+        queryset = filter_export_queryset(
+            export_dataset,
+            vehicle_vin=request.GET.get('vin'),
+            completed=completed,
+            technician=None if request.user.is_staff else request.user,
+            **dates
+        )
+        try:
+            chunks = stream_export(export_dataset, format_type, queryset)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        content_type, extension = EXPORT_FORMATS[format_type]
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        filename = f"{dataset}_{timezone.now():%Y%m%d_%H%M%S}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        logger.info(f"User {request.user.username} started a {format_type} export of {dataset}")
+        return response
@@ -16,6 +16,7 @@ VEHICLE_VALUATION_TTL = 24 * 60 * 60  # 24 hours
 INSPECTION_RESULTS_TTL = 12 * 60 * 60  # 12 hours
 HEALTH_SCORE_TTL = 6 * 60 * 60  # 6 hours
 DASHBOARD_DATA_TTL = 30 * 60  # 30 minutes
+SERVICE_HISTORY_COUNT_TTL = 60  # 1 minute, bounds staleness the signals miss
 
 
 class CacheManager:
@@ -147,6 +148,63 @@ class CacheManager:
             return False
 
 
+    @staticmethod
+    def get_service_history_version(vehicle_id: int) -> int:
+        """
+        Get the version of a vehicle's cached service history count.
+        
+        Counts are cached under their version and invalidation bumps it, so
+        a count read before an invalidation and cached after it is never
+        served. The cache is per process unless a shared backend is
+        configured, and QuerySet.update(), bulk_create and cascade deletes
+        send no signals; SERVICE_HISTORY_COUNT_TTL bounds how long a count
+        can be stale in those cases.
+        """
+        version_key = CacheManager._get_cache_key("service_history", vehicle_id, "version")
+        try:
+            return cache.get(version_key, 0)
+        except Exception as e:
+            logger.error(f"Error retrieving service history version for vehicle {vehicle_id}: {e}")
+            return 0
+    
+    @staticmethod
+    def get_service_history_count(vehicle_id: int, version: int) -> Optional[int]:
+        """Get the cached number of maintenance records for a vehicle."""
+        cache_key = CacheManager._get_cache_key("service_history", vehicle_id, f"count:{version}")
+        try:
+            return cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"Error retrieving service history count for vehicle {vehicle_id}: {e}")
+            return None
+    
+    @staticmethod
+    def set_service_history_count(vehicle_id: int, count: int, version: int) -> bool:
+        """Cache the number of maintenance records for a vehicle."""
+        cache_key = CacheManager._get_cache_key("service_history", vehicle_id, f"count:{version}")
+        try:
+            cache.set(cache_key, count, SERVICE_HISTORY_COUNT_TTL)
+            return True
+        except Exception as e:
+            logger.error(f"Error caching service history count for vehicle {vehicle_id}: {e}")
+            return False
+    
+    @staticmethod
+    def invalidate_service_history_count(vehicle_id: int) -> bool:
+        """Bump the version of a vehicle's service history count."""
+        version_key = CacheManager._get_cache_key("service_history", vehicle_id, "version")
+        try:
+            try:
+                cache.incr(version_key)
+            except ValueError:
+                # No version yet: counts were cached under version 0
+                if not cache.add(version_key, 1, None):
+                    cache.incr(version_key)
+            return True
+        except Exception as e:
+            logger.error(f"Error invalidating service history count for vehicle {vehicle_id}: {e}")
+            return False
+
+
 def cache_vehicle_data(func):
     """
     Decorator to cache expensive vehicle data operations.
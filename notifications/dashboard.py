@@ -0,0 +1,388 @@
+"""
+Single-pass assembly of the AutoCare dashboard.
+
+The vehicle and its ownership are resolved once per request into a
+DashboardContext. Every section builder then reads from the rows that
+context has already loaded, so a full dashboard render runs a fixed number
+of queries however much history the vehicle has.
+"""
+
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+import logging
+
+from django.db import models
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from maintenance.models import ScheduledMaintenance
+from maintenance_history.models import MaintenanceRecord, Inspection, InitialInspection
+from .models import VehicleAlert, VehicleCostAnalytics
+from .exceptions import ErrorHandler
+
+logger = logging.getLogger(__name__)
+
+
+# Priority ordering shared with DashboardService.get_vehicle_alerts
+ALERT_PRIORITY_ORDER = models.Case(
+    models.When(priority='HIGH', then=models.Value(1)),
+    models.When(priority='MEDIUM', then=models.Value(2)),
+    models.When(priority='LOW', then=models.Value(3)),
+    default=models.Value(4),
+    output_field=models.IntegerField()
+)
+
+
+@dataclass
+class DashboardContext:
+    """
+    Request-scoped data shared by the dashboard section builders.
+
+    ``vehicle`` is one of ``user_vehicles``, so ownership has already been
+    checked. The remaining attributes hold the vehicle's recent rows, newest
+    first, loaded by ``load``.
+    """
+    user: Any
+    vehicle: Optional[Vehicle]
+    user_vehicles: List[Vehicle] = field(default_factory=list)
+    maintenance_records: List[MaintenanceRecord] = field(default_factory=list)
+    inspections: List[Inspection] = field(default_factory=list)
+    initial_inspections: List[InitialInspection] = field(default_factory=list)
+    schedules: List[ScheduledMaintenance] = field(default_factory=list)
+    alerts: List[VehicleAlert] = field(default_factory=list)
+    cost_analytics: List[VehicleCostAnalytics] = field(default_factory=list)
+    lifetime_costs: Dict[str, Any] = field(default_factory=dict)
+
+    # Rows kept per vehicle for the history-backed sections
+    MAINTENANCE_LIMIT = 10
+    INSPECTION_LIMIT = 5
+
+    @classmethod
+    def load(cls, user, vehicle_id=None) -> 'DashboardContext':
+        """
+        Resolve the user's vehicles and load the selected vehicle's data.
+
+        Falls back to the user's first vehicle in make, model and year order
+        when vehicle_id is missing or not one of theirs, the same vehicle
+        the dashboard showed before.
+
+        Args:
+            user: Requesting user
+            vehicle_id: Optional ID of the vehicle to show
+
+        Returns:
+            DashboardContext; ``vehicle`` is None if the user owns no vehicles
+        """
+        user_vehicles = list(
+            Vehicle.objects.select_related('valuation').filter(
+                ownerships__user=user,
+                ownerships__is_current_owner=True
+            ).order_by('make', 'model', 'manufacture_year')
+        )
+
+        vehicle = None
+        if user_vehicles:
+            by_id = {v.id: v for v in user_vehicles}
+            try:
+                vehicle = by_id.get(int(vehicle_id)) if vehicle_id else None
+            except (TypeError, ValueError):
+                vehicle = None
+            if vehicle is None:
+                vehicle = user_vehicles[0]
+
+        context = cls(user=user, vehicle=vehicle, user_vehicles=user_vehicles)
+        if vehicle is not None:
+            context._load_vehicle_data()
+        return context
+
+    def _load_vehicle_data(self):
+        """Load every row the sections need with one query per relation"""
+        vehicle = self.vehicle
+        today = timezone.now().date()
+
+        prefetch_related_objects(
+            [vehicle],
+            Prefetch(
+                'maintenance_history',
+                queryset=MaintenanceRecord.objects.order_by('-date_performed', '-id')[:self.MAINTENANCE_LIMIT],
+                to_attr='dashboard_maintenance'
+            ),
+            Prefetch(
+                'inspections',
+                queryset=Inspection.objects.select_related('inspections_form')
+                    .order_by('-inspection_date', '-id')[:self.INSPECTION_LIMIT],
+                to_attr='dashboard_inspections'
+            ),
+            Prefetch(
+                'initial_inspections',
+                queryset=InitialInspection.objects.order_by('-inspection_date', '-id')[:1],
+                to_attr='dashboard_initial_inspections'
+            ),
+            Prefetch(
+                'alerts',
+                queryset=VehicleAlert.objects.filter(is_active=True).order_by(ALERT_PRIORITY_ORDER, '-created_at'),
+                to_attr='dashboard_alerts'
+            ),
+            Prefetch(
+                'cost_analytics',
+                queryset=VehicleCostAnalytics.objects.filter(
+                    month__gte=today.replace(day=1) - timedelta(days=365)
+                ).order_by('-month'),
+                to_attr='dashboard_cost_analytics'
+            ),
+            'images',
+        )
+
+        self.maintenance_records = vehicle.dashboard_maintenance
+        self.inspections = vehicle.dashboard_inspections
+        self.initial_inspections = vehicle.dashboard_initial_inspections
+        self.alerts = vehicle.dashboard_alerts
+        self.cost_analytics = vehicle.dashboard_cost_analytics
+
+        self.schedules = list(
+            ScheduledMaintenance.objects.filter(
+                assigned_plan__vehicle=vehicle,
+                status__in=['PENDING', 'OVERDUE']
+            ).select_related('task').order_by('due_date')
+        )
+
+        self.lifetime_costs = MaintenanceRecord.objects.filter(
+            vehicle=vehicle,
+            cost__isnull=False
+        ).aggregate(
+            total_cost=models.Sum('cost'),
+            avg_cost=models.Avg('cost'),
+            record_count=models.Count('id'),
+            latest_service_date=models.Max('date_performed')
+        )
+
+    # Equivalents of the Vehicle properties, computed from the loaded rows
+
+    @property
+    def latest_inspection(self) -> Optional[Inspection]:
+        return self.inspections[0] if self.inspections else None
+
+    def _latest_mileage(self):
+        """Return (mileage, recorded_at) following Vehicle.current_mileage"""
+        if self.maintenance_records and self.maintenance_records[0].mileage:
+            record = self.maintenance_records[0]
+            return record.mileage, record.date_performed
+
+        inspection = self.latest_inspection
+        if inspection and hasattr(inspection, 'inspections_form'):
+            inspections_form = inspection.inspections_form
+            if inspections_form and inspections_form.mileage_at_inspection:
+                return inspections_form.mileage_at_inspection, inspection.inspection_date
+
+        if self.initial_inspections and self.initial_inspections[0].mileage_at_inspection:
+            initial = self.initial_inspections[0]
+            return initial.mileage_at_inspection, initial.inspection_date
+
+        return None, None
+
+    @property
+    def current_mileage(self):
+        return self._latest_mileage()[0]
+
+    @property
+    def mileage_last_updated(self):
+        return self._latest_mileage()[1]
+
+    @property
+    def health_score(self):
+        inspection = self.latest_inspection
+        if inspection and inspection.vehicle_health_index:
+            try:
+                return int(inspection.vehicle_health_index.split('/')[0])
+            except (ValueError, AttributeError):
+                pass
+        return None
+
+    @property
+    def health_status(self):
+        inspection = self.latest_inspection
+        if inspection and inspection.inspection_result:
+            result = inspection.inspection_result
+            if result in ['PAS', 'PMD']:
+                return 'Healthy'
+            elif result in ['PJD']:
+                return 'Needs Attention'
+            elif result in ['FMD', 'FJD', 'FAI']:
+                return 'Critical'
+        return 'Unknown'
+
+    @property
+    def last_inspection_date(self):
+        inspection = self.latest_inspection
+        return inspection.inspection_date if inspection else None
+
+    @property
+    def valuation(self):
+        return getattr(self.vehicle, 'valuation', None)
+
+
+class DashboardAssembler:
+    """
+    Builds the dashboard sections from a shared DashboardContext.
+
+    Each section is built independently and falls back to an empty value on
+    error, so one failing section does not take down the page.
+    """
+
+    # Section name -> (builder method, fallback value, error message)
+    SECTIONS = {
+        'vehicle_overview': ('build_vehicle_overview', {}, "Failed to load vehicle overview"),
+        'upcoming_maintenance': ('build_upcoming_maintenance', [], "Failed to load upcoming maintenance"),
+        'alerts': ('build_alerts', [], "Failed to load vehicle alerts"),
+        'service_history': ('build_service_history', [], "Failed to load service history"),
+        'cost_analytics': ('build_cost_analytics', {}, "Failed to load cost analytics"),
+        'valuation': ('build_valuation', {}, "Failed to load vehicle valuation"),
+    }
+
+    SERVICE_HISTORY_LIMIT = 5
+
+    def __init__(self, context: DashboardContext):
+        self.context = context
+
+    def build(self) -> Dict[str, Any]:
+        """Build every section, degrading gracefully on errors"""
+        data = {}
+        for name, (method, fallback, error_message) in self.SECTIONS.items():
+            data[name] = ErrorHandler.handle_data_retrieval(
+                getattr(self, method),
+                fallback_value=fallback,
+                error_message=error_message
+            )
+        return data
+
+    def build_vehicle_overview(self) -> Dict[str, Any]:
+        ctx = self.context
+        vehicle = ctx.vehicle
+        next_schedule = ctx.schedules[0] if ctx.schedules else None
+
+        overview = {
+            'id': vehicle.id,
+            'make': vehicle.make or 'Unknown',
+            'model': vehicle.model or 'Unknown',
+            'year': vehicle.manufacture_year,
+            'vin': vehicle.vin or 'Unknown',
+            'mileage': ErrorHandler.safe_int_conversion(ctx.current_mileage),
+            'mileage_last_updated': ctx.mileage_last_updated,
+            'health_status': ctx.health_status or 'Unknown',
+            'health_score': ErrorHandler.safe_int_conversion(ctx.health_score),
+            'last_inspection_date': ctx.last_inspection_date,
+            'next_service_date': next_schedule.due_date if next_schedule else None,
+            'next_service_mileage': next_schedule.due_mileage if next_schedule else None,
+            'next_service_type': (next_schedule.task.name if next_schedule.task else 'Unknown') if next_schedule else None,
+            'estimated_value': None,
+            'active_alerts_count': len(ctx.alerts)
+        }
+
+        if ctx.valuation:
+            overview['estimated_value'] = ErrorHandler.safe_float_conversion(ctx.valuation.estimated_value)
+            overview['condition_rating'] = ctx.valuation.condition_rating
+            overview['valuation_last_updated'] = ctx.valuation.last_updated
+
+        return overview
+
+    def build_upcoming_maintenance(self) -> List[Dict[str, Any]]:
+        current_date = timezone.now().date()
+        upcoming_maintenance = []
+
+        for item in self.context.schedules:
+            days_until = (item.due_date - current_date).days if item.due_date else None
+            upcoming_maintenance.append({
+                'id': item.id,
+                'service_type': item.task.name,
+                'scheduled_date': item.due_date,
+                'scheduled_mileage': item.due_mileage,
+                'days_until': abs(days_until) if days_until is not None else None,
+                'is_overdue': days_until is not None and days_until < 0,
+                'estimated_cost': None,
+                'service_provider': None,
+                'description': item.task.description,
+                'priority': item.task.priority,
+                'status': item.status
+            })
+
+        return upcoming_maintenance
+
+    def build_alerts(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                'id': alert.id,
+                'alert_type': alert.alert_type,
+                'priority': alert.priority,
+                'title': alert.title,
+                'description': alert.description,
+                'created_at': alert.created_at,
+                'priority_display': alert.get_priority_display(),
+                'alert_type_display': alert.get_alert_type_display()
+            }
+            for alert in self.context.alerts
+        ]
+
+    def build_service_history(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                'id': record.id,
+                'date_performed': record.date_performed,
+                'work_done': record.work_done,
+                'mileage': record.mileage,
+                'cost': float(record.cost) if record.cost else None,
+                'service_provider': record.service_provider,
+                'notes': record.notes,
+                'parts_replaced': record.parts_replaced
+            }
+            for record in self.context.maintenance_records[:self.SERVICE_HISTORY_LIMIT]
+        ]
+
+    def build_cost_analytics(self) -> Dict[str, Any]:
+        ctx = self.context
+        lifetime = ctx.lifetime_costs
+
+        monthly_data = [
+            {
+                'month': analytics.month,
+                'total_cost': float(analytics.total_cost),
+                'maintenance_cost': float(analytics.maintenance_cost),
+                'parts_cost': float(analytics.parts_cost),
+                'labor_cost': float(analytics.labor_cost)
+            }
+            for analytics in ctx.cost_analytics
+        ]
+        total_monthly_cost = sum(item['total_cost'] for item in monthly_data)
+
+        today = timezone.now().date()
+        next_service_days = None
+        for schedule in ctx.schedules:
+            if schedule.due_date and schedule.due_date >= today:
+                days_until = (schedule.due_date - today).days
+                next_service_days = days_until if days_until > 0 else 0
+                break
+
+        return {
+            'monthly_data': monthly_data,
+            'lifetime_total': float(lifetime['total_cost']) if lifetime.get('total_cost') else 0,
+            'lifetime_average': float(lifetime['avg_cost']) if lifetime.get('avg_cost') else 0,
+            'monthly_average': total_monthly_cost / len(monthly_data) if monthly_data else 0,
+            'total_records': lifetime.get('record_count') or 0,
+            'health_score': ctx.health_score,
+            'last_service_date': lifetime.get('latest_service_date'),
+            'next_service_days': next_service_days
+        }
+
+    def build_valuation(self) -> Dict[str, Any]:
+        ctx = self.context
+        valuation = ctx.valuation
+
+        return {
+            'estimated_value': float(valuation.estimated_value) if valuation else None,
+            'condition_rating': valuation.condition_rating if valuation else None,
+            'last_updated': valuation.last_updated if valuation else None,
+            'valuation_source': valuation.valuation_source if valuation else None,
+            'vehicle_age_years': timezone.now().year - ctx.vehicle.manufacture_year,
+            'current_mileage': ctx.current_mileage
+        }
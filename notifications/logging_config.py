@@ -3,12 +3,15 @@ Logging configuration for AutoCare Dashboard Backend
 Provides structured logging with performance metrics and security monitoring
 """
 import logging
+import os
 import time
+from datetime import datetime, timezone as dt_timezone
 from functools import wraps
 from django.conf import settings
-from django.utils import timezone
 import json
 
+from .logging_pipeline import configure_logging_pipeline
+
 
 class StructuredFormatter(logging.Formatter):
     """
@@ -18,7 +21,8 @@ class StructuredFormatter(logging.Formatter):
     def format(self, record):
         """Format log record as structured JSON"""
         log_entry = {
-            'timestamp': timezone.now().isoformat(),
+            # Records may be formatted later on the logging pipeline's thread
+            'timestamp': datetime.fromtimestamp(record.created, tz=dt_timezone.utc).isoformat(),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -46,10 +50,14 @@ class StructuredFormatter(logging.Formatter):
             log_entry['cache_hit'] = record.cache_hit
         if hasattr(record, 'database_queries'):
             log_entry['database_queries'] = record.database_queries
+        if hasattr(record, 'sample_interval'):
+            log_entry['sample_interval'] = record.sample_interval
         
-        # Add exception info if present
+        # Add exception info if present; queued records carry it as text
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_entry['exception'] = record.exc_text
         
         return json.dumps(log_entry)
 
@@ -388,6 +396,21 @@ LOGGING_CONFIG = {
 }
 
 
+# Queued delivery for the loggers above, see logging_pipeline. The overflow
+# policy is 'drop_oldest' or 'block'; sampling keeps one in every N INFO
+# records of the named loggers and their children.
+LOG_QUEUE_CONFIG = {
+    'enabled': os.environ.get('LOG_QUEUE_ENABLED', 'true').lower() != 'false',
+    'maxsize': int(os.environ.get('LOG_QUEUE_MAXSIZE', 10000)),
+    'overflow': os.environ.get('LOG_QUEUE_OVERFLOW', 'drop_oldest'),
+    'block_timeout': float(os.environ.get('LOG_QUEUE_BLOCK_TIMEOUT', 0.5)),
+    'sampling': {
+        'notifications.api': int(os.environ.get('LOG_SAMPLE_API', 10)),
+        'notifications.performance': int(os.environ.get('LOG_SAMPLE_PERFORMANCE', 10)),
+    },
+}
+
+
 def setup_logging():
     """
     Setup logging configuration for the dashboard
@@ -403,6 +426,11 @@ def setup_logging():
     # Apply logging configuration
     logging.config.dictConfig(LOGGING_CONFIG)
     
+    # Move file writes off the request thread
+    if LOG_QUEUE_CONFIG['enabled']:
+        options = {key: value for key, value in LOG_QUEUE_CONFIG.items() if key != 'enabled'}
+        configure_logging_pipeline(**options).install(LOGGING_CONFIG['loggers'])
+    
     # Log startup message
     logger = DashboardLogger('startup')
     logger.logger.info("Dashboard logging system initialized")
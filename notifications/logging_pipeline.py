@@ -0,0 +1,288 @@
+"""
+Queue-based logging pipeline for request hot paths.
+
+Loggers installed on the pipeline hand their records to a bounded in-memory
+queue instead of writing to their file handlers directly. One listener
+thread drains the queue and passes each record to the handlers the logger
+had before installation, so file writes, JSON formatting of the structured
+extra fields and rotation all happen off the request thread.
+
+When the queue is full the overflow policy decides what happens:
+'drop_oldest' discards the oldest queued record to make room, 'block' waits
+up to block_timeout seconds for space and then drops the new record. The
+number of dropped records is kept on the pipeline.
+
+A process forked from one with a running pipeline (gunicorn --preload,
+Celery prefork, multiprocessing pools) inherits the queue but not the
+listener thread. Running pipelines are restarted in the child with an empty
+queue of their own; records the parent had queued are left to the parent.
+"""
+
+import atexit
+import copy
+import logging
+import os
+import queue
+import threading
+import weakref
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, Optional
+
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK)
+
+_exception_formatter = logging.Formatter()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one in every N records at INFO and below, per logger name.
+
+    Intervals are looked up by the longest configured prefix of the record's
+    logger name, so {'notifications.api': 10} samples 'notifications.api'
+    and its children. Records above INFO are always kept.
+    """
+
+    def __init__(self, intervals: Optional[Dict[str, int]] = None):
+        super().__init__()
+        self.intervals = {name: int(interval) for name, interval in (intervals or {}).items() if int(interval) > 1}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def interval_for(self, logger_name: str) -> int:
+        """Return the sampling interval for a logger, 1 when not sampled"""
+        name = logger_name
+        while name:
+            if name in self.intervals:
+                return self.intervals[name]
+            name = name.rpartition('.')[0]
+        return 1
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+
+        interval = self.interval_for(record.name)
+        if interval == 1:
+            return True
+
+        with self._lock:
+            count = self._counters.get(record.name, 0)
+            self._counters[record.name] = count + 1
+
+        if count % interval:
+            return False
+        # Lets readers scale sampled counts back up
+        record.sample_interval = interval
+        return True
+
+
+class PipelineQueueHandler(QueueHandler):
+    """
+    QueueHandler that tags records with the logger they were installed on
+    and applies the pipeline's overflow policy.
+    """
+
+    def __init__(self, pipeline: 'LoggingPipeline', route: str):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.route = route
+
+    def prepare(self, record):
+        """
+        Copy the record with its message merged and traceback rendered.
+
+        Unlike the base class this does not run a formatter: the structured
+        extra fields stay on the record as they are and are only formatted
+        by the target handlers in the listener thread.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return (self.route, record)
+
+    def enqueue(self, item):
+        self.pipeline.put(item)
+
+
+class RoutingQueueListener(QueueListener):
+    """QueueListener that passes each record to the handlers of its route"""
+
+    def __init__(self, log_queue, routes: Dict[str, list]):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.routes = routes
+
+    def handle(self, item):
+        route, record = item
+        for handler in self.routes.get(route, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def enqueue_sentinel(self):
+        # A full queue must not stop the sentinel from being delivered
+        self.queue.put(self._sentinel)
+
+
+class LoggingPipeline:
+    """
+    Bounded queue and listener thread shared by the installed loggers.
+
+    Args:
+        maxsize: Maximum number of queued records
+        overflow: 'drop_oldest' or 'block'
+        block_timeout: Seconds to wait for space under the 'block' policy
+        sampling: Logger name to sampling interval for INFO records
+    """
+
+    def __init__(self, maxsize: int = 10000, overflow: str = OVERFLOW_DROP_OLDEST,
+                 block_timeout: float = 0.5, sampling: Optional[Dict[str, int]] = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+
+        self.queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.sampling_filter = SamplingFilter(sampling)
+        self.routes: Dict[str, list] = {}
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = RoutingQueueListener(self.queue, self.routes)
+        self._started = False
+
+    def install(self, logger_names: Iterable[str]):
+        """
+        Move each logger's handlers behind the queue.
+
+        Installing a logger again replaces its route with the handlers it
+        has now, so loggers that are reconfigured can be installed again.
+        The listener thread is started if it is not running.
+
+        Args:
+            logger_names: Names of loggers to install
+        """
+        for name in logger_names:
+            logger = logging.getLogger(name)
+            targets = []
+            for handler in logger.handlers:
+                if isinstance(handler, PipelineQueueHandler):
+                    # Installed on an earlier pipeline: take over its targets
+                    targets.extend(handler.pipeline.routes.get(handler.route, ()))
+                else:
+                    targets.append(handler)
+            if not targets:
+                continue
+
+            queue_handler = PipelineQueueHandler(self, name)
+            queue_handler.addFilter(self.sampling_filter)
+            self.routes[name] = targets
+            logger.handlers = [queue_handler]
+
+        self.start()
+
+    def put(self, item):
+        """Queue a record, applying the overflow policy when the queue is full"""
+        if self.overflow == OVERFLOW_BLOCK:
+            try:
+                self.queue.put(item, timeout=self.block_timeout)
+            except queue.Full:
+                self._count_drop()
+            return
+
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                    self._count_drop()
+                except queue.Empty:
+                    pass
+
+    def _count_drop(self):
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def start(self):
+        """Start the listener thread if it is not running"""
+        if not self._started:
+            self.listener.start()
+            self._started = True
+            _running_pipelines.add(self)
+
+    def _restart_after_fork(self):
+        """Give a forked child its own queue and listener thread"""
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.sampling_filter._lock = threading.Lock()
+        self.listener = RoutingQueueListener(self.queue, self.routes)
+        self._started = False
+        self.start()
+
+    def flush(self):
+        """Wait until every queued record has been handled"""
+        if self._started:
+            self.queue.join()
+
+    def stop(self):
+        """Handle the remaining records and stop the listener thread"""
+        if self._started:
+            self.listener.stop()
+            self._started = False
+            _running_pipelines.discard(self)
+            for handlers in self.routes.values():
+                for handler in handlers:
+                    handler.flush()
+
+
+_pipeline: Optional[LoggingPipeline] = None
+_pipeline_lock = threading.Lock()
+_running_pipelines = weakref.WeakSet()
+
+
+def configure_logging_pipeline(**options) -> LoggingPipeline:
+    """
+    Create the process-wide pipeline, replacing any earlier one.
+
+    Args:
+        **options: LoggingPipeline arguments
+
+    Returns:
+        The new pipeline
+    """
+    global _pipeline
+    with _pipeline_lock:
+        previous = _pipeline
+        _pipeline = LoggingPipeline(**options)
+    if previous is not None:
+        previous.stop()
+    return _pipeline
+
+
+def get_logging_pipeline() -> Optional[LoggingPipeline]:
+    """Return the process-wide pipeline, or None if queued logging is off"""
+    return _pipeline
+
+
+def _stop_pipeline():
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+def _restart_pipelines_after_fork():
+    global _pipeline_lock
+    _pipeline_lock = threading.Lock()
+    for pipeline in list(_running_pipelines):
+        pipeline._restart_after_fork()
+
+
+atexit.register(_stop_pipeline)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_pipelines_after_fork)
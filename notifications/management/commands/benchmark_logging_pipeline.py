@@ -0,0 +1,153 @@
+"""
+Management command to compare request latency with direct and queued logging.
+
+Concurrent threads each play a number of requests that log through
+DashboardLogger, as the dashboard views do. The file handlers are rotating
+file handlers in a temporary directory whose writes are slowed by a fixed
+delay, standing in for a congested disk. The same workload runs once with
+the handlers attached to the logger and once behind a LoggingPipeline, and
+the per-request latency percentiles are reported for both.
+"""
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from django.core.management.base import BaseCommand
+
+from notifications.logging_config import DashboardLogger, StructuredFormatter
+from notifications.logging_pipeline import OVERFLOW_POLICIES, LoggingPipeline
+
+
+class SlowRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler whose writes take at least io_delay seconds"""
+
+    def __init__(self, *args, io_delay=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.io_delay = io_delay
+
+    def emit(self, record):
+        time.sleep(self.io_delay)
+        super().emit(record)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark request latency with direct and queued logging on a slowed file system'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent requests (default: 16)')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per thread (default: 50)')
+        parser.add_argument('--logs-per-request', type=int, default=4, help='Log calls per request (default: 4)')
+        parser.add_argument('--io-delay-ms', type=float, default=2.0, help='Added delay per file write (default: 2.0)')
+        parser.add_argument('--queue-size', type=int, default=10000, help='Pipeline queue size (default: 10000)')
+        parser.add_argument(
+            '--overflow',
+            choices=OVERFLOW_POLICIES,
+            default='drop_oldest',
+            help='Pipeline overflow policy (default: drop_oldest)',
+        )
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=1,
+            help='Keep one in N INFO records on the queued run (default: 1, no sampling)',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as log_dir:
+            direct = self.run_workload('direct', log_dir, options)
+            queued = self.run_workload('queued', log_dir, options)
+
+        for label, result in (('direct', direct), ('queued', queued)):
+            self.stdout.write(
+                f"{label}: p50 {result['p50']:.2f} ms, p99 {result['p99']:.2f} ms, "
+                f"max {result['max']:.2f} ms over {result['count']} requests, "
+                f"{result['written']} records written, {result['dropped']} dropped"
+            )
+
+        if queued['p99']:
+            self.stdout.write(self.style.SUCCESS(f"p99 speedup: {direct['p99'] / queued['p99']:.1f}x"))
+
+    def run_workload(self, label, log_dir, options):
+        """Run the request workload against one logging setup"""
+        dashboard_logger = DashboardLogger(f'benchmark.{label}')
+        logger = dashboard_logger.logger
+        logger.handlers = []
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+
+        handler = SlowRotatingFileHandler(
+            os.path.join(log_dir, f'{label}.log'),
+            maxBytes=256 * 1024,
+            backupCount=2,
+            io_delay=options['io_delay_ms'] / 1000,
+        )
+        handler.setFormatter(StructuredFormatter())
+        written = CountingFilter()
+        handler.addFilter(written)
+        logger.addHandler(handler)
+
+        pipeline = None
+        if label == 'queued':
+            pipeline = LoggingPipeline(
+                maxsize=options['queue_size'],
+                overflow=options['overflow'],
+                sampling={logger.name: options['sample']},
+            )
+            pipeline.install([logger.name])
+
+        latencies = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['threads'])
+
+        def worker(worker_id):
+            timings = []
+            barrier.wait()
+            for request_number in range(options['requests']):
+                started = time.perf_counter()
+                for _ in range(options['logs_per_request']):
+                    dashboard_logger.log_data_retrieval(
+                        'vehicle_overview', worker_id, vehicle_id=request_number,
+                        response_time=1.5, cache_hit=True
+                    )
+                timings.append((time.perf_counter() - started) * 1000)
+            with lock:
+                latencies.extend(timings)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        dropped = 0
+        if pipeline is not None:
+            pipeline.stop()
+            dropped = pipeline.dropped
+        logger.handlers = []
+        handler.close()
+
+        latencies.sort()
+        return {
+            'count': len(latencies),
+            'p50': statistics.median(latencies),
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            'max': latencies[-1],
+            'written': written.count,
+            'dropped': dropped,
+        }
+
+
+class CountingFilter(logging.Filter):
+    """Filter that counts the records reaching a handler"""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def filter(self, record):
+        self.count += 1
+        return True
@@ -0,0 +1,99 @@
+"""
+Management command to compare offset and keyset pagination of service history.
+
+Adds maintenance records to an owned vehicle, then times the first and a
+deep page through DashboardService with offset pagination and with keyset
+pagination, along with the record count with and without the cached value.
+The added records are removed afterwards.
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from maintenance_history.models import MaintenanceRecord
+from notifications.cache_utils import CacheManager
+from notifications.services import DashboardService, encode_service_history_cursor
+from vehicles.models import Vehicle, VehicleOwnership
+
+
+class Command(BaseCommand):
+    help = 'Benchmark offset and keyset pagination of a vehicle service history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle-vin', type=str, required=True, help='VIN of a vehicle owned by the user')
+        parser.add_argument('--username', type=str, required=True, help='Current owner of the vehicle')
+        parser.add_argument('--records', type=int, default=50000, help='Records to add (default: 50000)')
+        parser.add_argument('--page-size', type=int, default=10, help='Records per page (default: 10)')
+        parser.add_argument('--page', type=int, default=500, help='Deep page to time (default: 500)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        try:
+            vehicle = Vehicle.objects.get(vin=options['vehicle_vin'])
+            user = User.objects.get(username=options['username'])
+        except (Vehicle.DoesNotExist, User.DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        if not VehicleOwnership.objects.filter(vehicle=vehicle, user=user, is_current_owner=True).exists():
+            raise CommandError(f'{user.username} is not the current owner of {vehicle.vin}')
+
+        marker = 'Benchmark service history'
+        started = timezone.now()
+        MaintenanceRecord.objects.bulk_create(
+            [
+                MaintenanceRecord(
+                    vehicle=vehicle,
+                    work_done=marker,
+                    date_performed=started - timedelta(hours=i),
+                    mileage=i,
+                )
+                for i in range(options['records'])
+            ],
+            batch_size=2000,
+        )
+        # bulk_create sends no signals
+        CacheManager.invalidate_service_history_count(vehicle.id)
+
+        try:
+            self.report(vehicle, user, options)
+        finally:
+            MaintenanceRecord.objects.filter(vehicle=vehicle, work_done=marker).delete()
+            CacheManager.invalidate_service_history_count(vehicle.id)
+
+    def report(self, vehicle, user, options):
+        service = DashboardService()
+        page_size = options['page_size']
+        deep_page = options['page']
+        offset = (deep_page - 1) * page_size
+
+        # The cursor a client holds after walking to the deep page
+        previous = service._service_history_queryset(vehicle.id, user)[offset - 1]
+        deep_cursor = encode_service_history_cursor(previous)
+
+        measurements = [
+            ('offset page 1', lambda: service.get_service_history(vehicle.id, user, limit=page_size, offset=0)),
+            (f'offset page {deep_page}', lambda: service.get_service_history(
+                vehicle.id, user, limit=page_size, offset=offset)),
+            ('keyset page 1', lambda: service.get_service_history_page(vehicle.id, user, limit=page_size)),
+            (f'keyset page {deep_page}', lambda: service.get_service_history_page(
+                vehicle.id, user, limit=page_size, cursor=deep_cursor)),
+            ('count uncached', lambda: (
+                CacheManager.invalidate_service_history_count(vehicle.id),
+                service.get_service_history_count(vehicle.id, user),
+            )),
+            ('count cached', lambda: service.get_service_history_count(vehicle.id, user)),
+        ]
+
+        total = MaintenanceRecord.objects.filter(vehicle=vehicle).count()
+        self.stdout.write(f'{vehicle.vin}: {total} records, {page_size} per page')
+        for label, run in measurements:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f'  {label}: {statistics.median(timings):.2f} ms (median of {len(timings)})')
@@ -1,16 +1,17 @@
-from django.db.models import Q, Prefetch, Sum, Avg, Count
+from django.db.models import Q, F, OuterRef, Prefetch, Subquery, Sum, Avg, Count
 from django.db import models
 from django.utils import timezone
 from datetime import datetime, timedelta
-from vehicles.models import Vehicle
+import base64
+from vehicles.models import Vehicle, VehicleOwnership
 from maintenance.models import ScheduledMaintenance
-from maintenance_history.models import MaintenanceRecord, Inspection
+from maintenance_history.models import MaintenanceRecord, Inspection, PartUsage
 from insurance_app.models import InsurancePolicy
 from .models import VehicleAlert, VehicleCostAnalytics
-# from .cache_utils import CacheManager  # Temporarily disabled
+from .cache_utils import CacheManager
 from .exceptions import (
     VehicleNotFoundError, VehicleAccessDeniedError, DataRetrievalError,
-    ExternalServiceError, ErrorHandler
+    ExternalServiceError, ValidationError, ErrorHandler
 )
 from .logging_config import DashboardLogger, log_performance
 import logging
@@ -19,6 +20,30 @@ logger = logging.getLogger(__name__)
 dashboard_logger = DashboardLogger('services')
 
 
+def encode_service_history_cursor(record):
+    """Encode the keyset position after a maintenance record"""
+    position = f"{record.date_performed.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_service_history_cursor(cursor):
+    """
+    Decode a cursor made by encode_service_history_cursor.
+    
+    Returns:
+        Tuple of (date_performed, record id)
+        
+    Raises:
+        ValidationError: If the cursor is malformed
+    """
+    try:
+        position = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_performed, record_id = position.rsplit('|', 1)
+        return datetime.fromisoformat(date_performed), int(record_id)
+    except (ValueError, UnicodeError):
+        raise ValidationError('cursor', cursor, 'malformed cursor')
+
+
 class DashboardService:
     """
     Service class for handling dashboard-related business logic
@@ -584,53 +609,132 @@ class DashboardService:
     
 
     
+    def _service_history_queryset(self, vehicle_id, user):
+        """
+        Owned maintenance records in newest-first keyset order, with parts
+        prefetched and the per-record parts cost summed in the same query
+        """
+        parts_cost = PartUsage.objects.filter(
+            maintenance_record=OuterRef('pk'),
+            unit_cost__isnull=False
+        ).values('maintenance_record').annotate(
+            total=Sum(F('unit_cost') * F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+        ).values('total')
+        
+        return MaintenanceRecord.objects.filter(
+            vehicle_id=vehicle_id,
+            vehicle__ownerships__user=user,
+            vehicle__ownerships__is_current_owner=True
+        ).annotate(
+            parts_cost=Subquery(parts_cost)
+        ).prefetch_related(
+            Prefetch('parts_used', queryset=PartUsage.objects.select_related('part').order_by('id'))
+        ).order_by('-date_performed', '-id')
+    
+    def _build_history_item(self, record):
+        """Serialize a record loaded by _service_history_queryset"""
+        return {
+            'id': record.id,
+            'date_performed': record.date_performed,
+            'work_done': record.work_done,
+            'mileage': record.mileage,
+            'cost': float(record.cost) if record.cost else None,
+            'parts_cost': float(record.parts_cost) if record.parts_cost else None,
+            'service_provider': record.service_provider,
+            'notes': record.notes,
+            'parts_replaced': record.parts_replaced,
+            'parts_used': [
+                {
+                    'part': usage.part.name,
+                    'quantity': usage.quantity,
+                    'unit_cost': float(usage.unit_cost) if usage.unit_cost else None
+                }
+                for usage in record.parts_used.all()
+            ]
+        }
+    
     def get_service_history(self, vehicle_id, user, limit=None, offset=None):
         """
         Get paginated service history for the vehicle
+        
+        Offset pagination is kept for existing clients; deep pages get
+        slower with the offset, use get_service_history_page instead.
         """
         try:
-            # Optimized single query with proper slicing
-            history_query = MaintenanceRecord.objects.filter(
-                vehicle_id=vehicle_id,
-                vehicle__ownerships__user=user,
-                vehicle__ownerships__is_current_owner=True
-            ).select_related('vehicle').order_by('-date_performed')
+            history_query = self._service_history_queryset(vehicle_id, user)
             
             # Apply pagination using database-level slicing
             start = offset or 0
             end = start + limit if limit else None
             history_query = history_query[start:end]
             
-            service_history = []
-            for record in history_query:
-                history_item = {
-                    'id': record.id,
-                    'date_performed': record.date_performed,
-                    'work_done': record.work_done,
-                    'mileage': record.mileage,
-                    'cost': float(record.cost) if record.cost else None,
-                    'service_provider': record.service_provider,
-                    'notes': record.notes,
-                    'parts_replaced': record.parts_replaced
-                }
-                service_history.append(history_item)
-            
-            return service_history
+            return [self._build_history_item(record) for record in history_query]
             
         except Vehicle.DoesNotExist:
             return []
     
+    def get_service_history_page(self, vehicle_id, user, limit=10, cursor=None):
+        """
+        Get one page of service history using keyset pagination.
+        
+        Pages are ordered by (date_performed, id) descending and each page
+        starts after the last record of the previous one, so the cost of a
+        page does not grow with its depth.
+        
+        Args:
+            vehicle_id: ID of the vehicle
+            user: Owner of the vehicle
+            limit: Records per page
+            cursor: next_cursor of the previous page, or None for the first page
+            
+        Returns:
+            Dictionary with results, next_cursor and has_next
+            
+        Raises:
+            ValidationError: If the cursor is malformed
+        """
+        history_query = self._service_history_queryset(vehicle_id, user)
+        
+        if cursor:
+            date_performed, record_id = decode_service_history_cursor(cursor)
+            # (date_performed, id) < cursor, with a plain range on
+            # date_performed so the index seek starts at the cursor
+            history_query = history_query.filter(
+                date_performed__lte=date_performed
+            ).filter(
+                Q(date_performed__lt=date_performed) | Q(id__lt=record_id)
+            )
+        
+        # One extra row tells whether another page follows
+        records = list(history_query[:limit + 1])
+        has_next = len(records) > limit
+        records = records[:limit]
+        
+        return {
+            'results': [self._build_history_item(record) for record in records],
+            'next_cursor': encode_service_history_cursor(records[-1]) if has_next else None,
+            'has_next': has_next
+        }
+    
     def get_service_history_count(self, vehicle_id, user):
         """
         Get total count of service history records for pagination
+        
+        The count per vehicle is cached for SERVICE_HISTORY_COUNT_TTL
+        and invalidated by the MaintenanceRecord save and delete signals.
         """
         try:
-            # Optimized count query without fetching the vehicle object
-            return MaintenanceRecord.objects.filter(
-                vehicle_id=vehicle_id,
-                vehicle__ownerships__user=user,
-                vehicle__ownerships__is_current_owner=True
-            ).count()
+            if not VehicleOwnership.objects.filter(
+                vehicle_id=vehicle_id, user=user, is_current_owner=True
+            ).exists():
+                return 0
+            
+            version = CacheManager.get_service_history_version(vehicle_id)
+            count = CacheManager.get_service_history_count(vehicle_id, version)
+            if count is None:
+                count = MaintenanceRecord.objects.filter(vehicle_id=vehicle_id).count()
+                CacheManager.set_service_history_count(vehicle_id, count, version)
+            return count
             
         except Exception:
             return 0
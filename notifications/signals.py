@@ -0,0 +1,40 @@
+"""
+Signal handlers keeping cached dashboard figures current.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from maintenance_history.models import MaintenanceRecord
+from .cache_utils import CacheManager
+
+
+@receiver(post_init, sender=MaintenanceRecord)
+def remember_maintenance_record_vehicle(sender, instance, **kwargs):
+    """Remember the vehicle a record was loaded with, to spot moves on save"""
+    # Read from __dict__ so records loaded with vehicle deferred stay deferred
+    instance._loaded_vehicle_id = instance.__dict__.get('vehicle_id')
+
+
+@receiver(post_save, sender=MaintenanceRecord)
+def update_service_history_count_on_save(sender, instance, created, **kwargs):
+    """Invalidate the counts a new or moved record changes once its transaction commits"""
+    vehicle_id = instance.vehicle_id
+    previous_vehicle_id = instance._loaded_vehicle_id
+    instance._loaded_vehicle_id = vehicle_id
+    
+    if created or previous_vehicle_id is None:
+        # A record loaded without its vehicle may have moved too
+        transaction.on_commit(lambda: CacheManager.invalidate_service_history_count(vehicle_id))
+    elif previous_vehicle_id != vehicle_id:
+        def move():
+            CacheManager.invalidate_service_history_count(previous_vehicle_id)
+            CacheManager.invalidate_service_history_count(vehicle_id)
+        transaction.on_commit(move)
+
+
+@receiver(post_delete, sender=MaintenanceRecord)
+def update_service_history_count_on_delete(sender, instance, **kwargs):
+    """Invalidate the count of a deleted record's vehicle once its transaction commits"""
+    vehicle_id = instance.vehicle_id
+    transaction.on_commit(lambda: CacheManager.invalidate_service_history_count(vehicle_id))
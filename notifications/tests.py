@@ -1,8 +1,29 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import connection
 from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
 from unittest.mock import Mock, patch
-from vehicles.models import Vehicle
+from vehicles.models import Vehicle, VehicleOwnership
+from django.core.cache import cache
+from maintenance.models import (
+    AssignedVehiclePlan, MaintenancePlan, MaintenanceTask, Part, ScheduledMaintenance, ServiceType
+)
+from maintenance_history.models import Inspection, MaintenanceRecord, PartUsage
+from .cache_utils import SERVICE_HISTORY_COUNT_TTL, CacheManager
+from .logging_config import DashboardLogger, StructuredFormatter
+from .logging_pipeline import LoggingPipeline, PipelineQueueHandler, SamplingFilter
+from .models import VehicleAlert, VehicleCostAnalytics
 from .permissions import VehicleOwnerPermission
+from .services import DashboardService
+import json
+import logging
+import os
+import tempfile
+from unittest import skipUnless
 
 
 class VehicleOwnerPermissionTest(TestCase):
@@ -131,3 +152,368 @@ class VehicleOwnerPermissionTest(TestCase):
             self.permission.validate_vehicle_access(self.user, 999)  # Non-existent vehicle
         
         self.assertEqual(str(context.exception), "Vehicle not found or access denied")
+
+
+class AutoCareDashboardQueryCountTest(TestCase):
+    """
+    Regression test pinning the dashboard render to a fixed number of queries
+    """
+    
+    # Authenticated user, vehicles, six prefetches, schedules and lifetime costs
+    EXPECTED_QUERIES = 10
+    
+    def setUp(self):
+        """Set up a vehicle with a small amount of history"""
+        self.user = User.objects.create_user(username='dashuser', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            vin='DASHTESTVIN000001', make='Toyota', model='Corolla', manufacture_year=2019
+        )
+        VehicleOwnership.objects.create(
+            vehicle=self.vehicle, user=self.user, start_date=date(2020, 1, 1)
+        )
+        service_type = ServiceType.objects.create(name='Service')
+        plan = MaintenancePlan.objects.create(name='Standard', vehicle_model='Toyota Corolla')
+        self.task = MaintenanceTask.objects.create(
+            plan=plan, name='Oil Change', service_type=service_type,
+            interval_miles=5000, interval_months=6, estimated_time=timedelta(hours=1)
+        )
+        self.assigned_plan = AssignedVehiclePlan.objects.create(
+            vehicle=self.vehicle, plan=plan, owner=self.user,
+            start_date=date(2020, 1, 1), current_mileage=1000
+        )
+        self.add_history(1)
+        self.client.force_login(self.user)
+    
+    def add_history(self, count, offset=0):
+        """Add maintenance, inspection, alert, schedule and cost rows"""
+        today = timezone.now().date()
+        for i in range(offset, offset + count):
+            MaintenanceRecord.objects.create(
+                vehicle=self.vehicle, work_done=f'Service {i}', mileage=10000 + i * 100,
+                cost=Decimal('100.00'), date_performed=timezone.now() - timedelta(days=i + 1)
+            )
+            Inspection.objects.create(
+                vehicle=self.vehicle, inspection_number=f'DASH-{i}', year=2024,
+                inspection_result='PAS', vehicle_health_index='85/100',
+                inspection_date=today - timedelta(days=i + 1)
+            )
+            VehicleAlert.objects.create(
+                vehicle=self.vehicle, alert_type='MAINTENANCE_OVERDUE', priority='HIGH',
+                title=f'Alert {i}', description='Overdue'
+            )
+            ScheduledMaintenance.objects.create(
+                assigned_plan=self.assigned_plan, task=self.task,
+                due_date=today + timedelta(days=i + 1), due_mileage=20000 + i
+            )
+            VehicleCostAnalytics.objects.create(
+                vehicle=self.vehicle, month=(today - timedelta(days=31 * i)).replace(day=1),
+                total_cost=Decimal('100.00'), maintenance_cost=Decimal('60.00'),
+                parts_cost=Decimal('30.00'), labor_cost=Decimal('10.00')
+            )
+    
+    def get_dashboard(self, url):
+        """Render the dashboard, checking its queries outside session handling"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if 'django_session' not in query['sql'] and 'SAVEPOINT' not in query['sql']
+        ]
+        self.assertEqual(len(queries), self.EXPECTED_QUERIES, '\n'.join(queries))
+        self.assertEqual(response.status_code, 200)
+        return response
+    
+    def test_dashboard_queries_do_not_grow_with_history(self):
+        """The dashboard runs the same queries for short and long histories"""
+        url = reverse('notifications:autocare_dashboard_vehicle', args=[self.vehicle.id])
+        
+        response = self.get_dashboard(url)
+        self.assertEqual(len(response.context['service_history']), 1)
+        
+        self.add_history(11, offset=1)
+        
+        response = self.get_dashboard(url)
+        self.assertEqual(len(response.context['service_history']), 5)
+        self.assertEqual(len(response.context['alerts']), 12)
+        self.assertEqual(len(response.context['upcoming_maintenance']), 12)
+        self.assertEqual(response.context['cost_analytics']['total_records'], 12)
+        self.assertEqual(response.context['vehicle_overview']['health_status'], 'Healthy')
+        self.assertEqual(response.context['vehicle_overview']['mileage'], 10000)
+    
+    def test_other_users_vehicle_falls_back_to_own(self):
+        """Requesting a vehicle the user does not own shows their own vehicle"""
+        other = Vehicle.objects.create(
+            vin='DASHTESTVIN000002', make='Honda', model='Civic', manufacture_year=2018
+        )
+        
+        response = self.client.get(reverse('notifications:autocare_dashboard_vehicle', args=[other.id]))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['vehicle'], self.vehicle)
+    
+    def test_fallback_is_first_vehicle_by_make(self):
+        """Without a valid vehicle the first vehicle in the switcher's order is shown"""
+        audi = Vehicle.objects.create(
+            vin='DASHTESTVIN000003', make='Audi', model='A3', manufacture_year=2021
+        )
+        VehicleOwnership.objects.create(vehicle=audi, user=self.user, start_date=date(2021, 1, 1))
+        
+        for url in (
+            reverse('notifications:autocare_dashboard_vehicle', args=[999999]),
+            reverse('notifications:autocare_dashboard'),
+        ):
+            response = self.client.get(url)
+            
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['vehicle'], audi)
+
+
+class CollectingHandler(logging.Handler):
+    """Handler that keeps formatted records in memory"""
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(StructuredFormatter())
+        self.entries = []
+
+    def emit(self, record):
+        self.entries.append(json.loads(self.format(record)))
+
+
+class LoggingPipelineTest(TestCase):
+    """
+    Test cases for the queued logging pipeline
+    """
+
+    def setUp(self):
+        """Set up an isolated logger"""
+        self.logger = logging.getLogger('notifications.pipeline_test')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = CollectingHandler()
+        self.logger.handlers = [self.handler]
+        self.addCleanup(setattr, self.logger, 'handlers', [])
+
+    def test_records_delivered_with_extra_fields(self):
+        """Queued records keep their extras and exception text"""
+        pipeline = LoggingPipeline()
+        pipeline.install([self.logger.name])
+        self.addCleanup(pipeline.stop)
+
+        DashboardLogger('pipeline_test').log_data_retrieval('overview', 7, vehicle_id=3, cache_hit=True)
+        try:
+            raise ValueError('broken')
+        except ValueError:
+            self.logger.exception('Failed for %s', 'vehicle 3')
+        pipeline.flush()
+
+        first, second = self.handler.entries
+        self.assertEqual(first['message'], 'Data retrieval successful: overview')
+        self.assertEqual((first['user_id'], first['vehicle_id'], first['cache_hit']), (7, 3, True))
+        self.assertEqual(second['message'], 'Failed for vehicle 3')
+        self.assertIn('ValueError: broken', second['exception'])
+
+    def test_drop_oldest_overflow(self):
+        """A full queue discards its oldest records"""
+        pipeline = LoggingPipeline(maxsize=2)
+        pipeline.routes[self.logger.name] = [self.handler]
+        self.logger.handlers = [PipelineQueueHandler(pipeline, self.logger.name)]
+
+        for number in range(5):
+            self.logger.info('record %d', number)
+        pipeline.start()
+        pipeline.flush()
+        pipeline.stop()
+
+        self.assertEqual(pipeline.dropped, 3)
+        self.assertEqual([entry['message'] for entry in self.handler.entries], ['record 3', 'record 4'])
+
+    def test_block_overflow_drops_new_records_after_timeout(self):
+        """Under the block policy new records are dropped once the wait times out"""
+        pipeline = LoggingPipeline(maxsize=2, overflow='block', block_timeout=0.01)
+        pipeline.routes[self.logger.name] = [self.handler]
+        self.logger.handlers = [PipelineQueueHandler(pipeline, self.logger.name)]
+
+        for number in range(3):
+            self.logger.info('record %d', number)
+        pipeline.start()
+        pipeline.flush()
+        pipeline.stop()
+
+        self.assertEqual(pipeline.dropped, 1)
+        self.assertEqual([entry['message'] for entry in self.handler.entries], ['record 0', 'record 1'])
+
+    @skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_forked_child_gets_its_own_listener(self):
+        """A child forked from a running pipeline delivers its own records"""
+        pipeline = LoggingPipeline()
+        with tempfile.NamedTemporaryFile('r', suffix='.log') as log_file:
+            file_handler = logging.FileHandler(log_file.name)
+            self.logger.handlers = [file_handler]
+            self.addCleanup(file_handler.close)
+            pipeline.install([self.logger.name])
+            self.addCleanup(pipeline.stop)
+
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    self.logger.info('child marker')
+                    pipeline.stop()
+                finally:
+                    os._exit(0 if pipeline.queue.empty() else 1)
+            _, status = os.waitpid(pid, 0)
+
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+            self.assertIn('child marker', log_file.read())
+        self.assertTrue(pipeline.listener._thread.is_alive())
+
+    def test_unknown_overflow_policy(self):
+        """Only the known overflow policies are accepted"""
+        with self.assertRaises(ValueError):
+            LoggingPipeline(overflow='drop_newest')
+
+    def test_sampling_filter(self):
+        """INFO records of sampled loggers are thinned, warnings always pass"""
+        sampling = SamplingFilter({'notifications.api': 5})
+        make = lambda name, level: logging.LogRecord(name, level, __file__, 1, 'message', None, None)
+
+        kept = [sampling.filter(make('notifications.api.views', logging.INFO)) for _ in range(12)]
+        self.assertEqual(kept.count(True), 3)
+        self.assertTrue(all(sampling.filter(make('notifications.api', logging.WARNING)) for _ in range(5)))
+        self.assertTrue(all(sampling.filter(make('notifications.dashboard', logging.INFO)) for _ in range(5)))
+
+
+class ServiceHistoryPaginationTest(TestCase):
+    """
+    Test cases for keyset and offset pagination of service history
+    """
+    
+    def setUp(self):
+        """Set up a vehicle with records sharing some service dates"""
+        cache.clear()
+        self.user = User.objects.create_user(username='historyuser', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            vin='HISTTESTVIN000001', make='Toyota', model='Corolla', manufacture_year=2019
+        )
+        VehicleOwnership.objects.create(vehicle=self.vehicle, user=self.user, start_date=date(2020, 1, 1))
+        
+        base = timezone.now()
+        # Pairs of records share a date so the id breaks the tie
+        self.records = [
+            MaintenanceRecord.objects.create(
+                vehicle=self.vehicle, work_done=f'Service {i}', mileage=1000 + i,
+                date_performed=base - timedelta(days=i // 2)
+            )
+            for i in range(7)
+        ]
+        part = Part.objects.create(name='Oil Filter', stock_quantity=10)
+        PartUsage.objects.create(
+            maintenance_record=self.records[0], part=part, quantity=2, unit_cost=Decimal('12.50')
+        )
+        self.service = DashboardService()
+        self.client.force_login(self.user)
+    
+    def expected_order(self):
+        return [
+            record.id for record in
+            sorted(self.records, key=lambda record: (record.date_performed, record.id), reverse=True)
+        ]
+    
+    def test_cursor_walk_visits_every_record_once(self):
+        """Following next_cursor returns all records in (date, id) order"""
+        seen = []
+        cursor = None
+        while True:
+            page = self.service.get_service_history_page(self.vehicle.id, self.user, limit=3, cursor=cursor)
+            seen.extend(item['id'] for item in page['results'])
+            if not page['has_next']:
+                self.assertIsNone(page['next_cursor'])
+                break
+            cursor = page['next_cursor']
+        
+        self.assertEqual(seen, self.expected_order())
+    
+    def test_page_loads_parts_in_fixed_queries(self):
+        """Records, parts cost and parts used load in two queries"""
+        with self.assertNumQueries(2):
+            page = self.service.get_service_history_page(self.vehicle.id, self.user, limit=10)
+        
+        first = next(item for item in page['results'] if item['id'] == self.records[0].id)
+        self.assertEqual(first['parts_cost'], 25.0)
+        self.assertEqual(first['parts_used'], [{'part': 'Oil Filter', 'quantity': 2, 'unit_cost': 12.5}])
+    
+    def test_offset_api_unchanged(self):
+        """Offset pagination returns the same order as the cursor walk"""
+        history = self.service.get_service_history(self.vehicle.id, self.user, limit=3, offset=3)
+        
+        self.assertEqual([item['id'] for item in history], self.expected_order()[3:6])
+    
+    def test_count_cached_and_invalidated_by_signals(self):
+        """The count is cached briefly and recounted after a save or delete"""
+        self.assertEqual(self.service.get_service_history_count(self.vehicle.id, self.user), 7)
+        
+        # Only the ownership check runs once the count is cached
+        with self.assertNumQueries(1):
+            self.assertEqual(self.service.get_service_history_count(self.vehicle.id, self.user), 7)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            MaintenanceRecord.objects.create(vehicle=self.vehicle, work_done='New', mileage=5000)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.records[1].delete()
+            self.records[2].delete()
+        
+        with self.assertNumQueries(2):
+            self.assertEqual(self.service.get_service_history_count(self.vehicle.id, self.user), 6)
+        self.assertLessEqual(SERVICE_HISTORY_COUNT_TTL, 5 * 60)
+    
+    def test_count_read_before_invalidation_is_not_served(self):
+        """A count cached under the version it was read at is dropped by a later invalidation"""
+        version = CacheManager.get_service_history_version(self.vehicle.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            MaintenanceRecord.objects.create(vehicle=self.vehicle, work_done='New', mileage=5000)
+        # A reader that counted before the insert caches its count late
+        CacheManager.set_service_history_count(self.vehicle.id, 7, version)
+        
+        self.assertEqual(self.service.get_service_history_count(self.vehicle.id, self.user), 8)
+    
+    def test_count_follows_moved_record(self):
+        """Moving a record to another vehicle moves it between counts"""
+        other = Vehicle.objects.create(vin='HISTTESTVIN000002', make='Honda', model='Civic', manufacture_year=2018)
+        VehicleOwnership.objects.create(vehicle=other, user=self.user, start_date=date(2020, 1, 1))
+        self.service.get_service_history_count(self.vehicle.id, self.user)
+        self.service.get_service_history_count(other.id, self.user)
+        
+        record = MaintenanceRecord.objects.get(pk=self.records[0].pk)
+        record.vehicle = other
+        with self.captureOnCommitCallbacks(execute=True):
+            record.save()
+        
+        self.assertEqual(self.service.get_service_history_count(self.vehicle.id, self.user), 6)
+        self.assertEqual(self.service.get_service_history_count(other.id, self.user), 1)
+    
+    def test_count_requires_ownership(self):
+        """Users who do not own the vehicle get no count"""
+        stranger = User.objects.create_user(username='stranger', password='testpass123')
+        
+        self.assertEqual(self.service.get_service_history_count(self.vehicle.id, stranger), 0)
+    
+    def test_api_cursor_mode(self):
+        """The API pages by cursor when one is passed and rejects bad cursors"""
+        url = reverse('notifications:service_history_api', args=[self.vehicle.id])
+        
+        response = self.client.get(url, {'cursor': '', 'page_size': 5})
+        self.assertEqual(response.status_code, 200)
+        pagination = response.json()['pagination']
+        self.assertEqual(pagination['total_records'], 7)
+        self.assertTrue(pagination['has_next'])
+        
+        response = self.client.get(url, {'cursor': pagination['next_cursor'], 'page_size': 5})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertFalse(response.json()['pagination']['has_next'])
+        
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.get(url, {'page': 2, 'page_size': 5})
+        self.assertEqual(response.json()['pagination']['total_pages'], 2)
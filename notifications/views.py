@@ -9,10 +9,11 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from vehicles.models import Vehicle
 from .services import DashboardService
+from .dashboard import DashboardContext, DashboardAssembler
 from .permissions import VehicleOwnerPermission
 from .exceptions import (
     VehicleNotFoundError, VehicleAccessDeniedError, DataRetrievalError,
-    ExternalServiceError, ErrorHandler
+    ExternalServiceError, ValidationError, ErrorHandler
 )
 from .logging_config import DashboardLogger, log_api_call
 import logging
@@ -30,78 +31,21 @@ class AutoCareDashboardView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         """
-        Gather all dashboard context data using DashboardService with comprehensive error handling
+        Gather all dashboard context data in a single pass using DashboardAssembler
         """
         context = super().get_context_data(**kwargs)
         vehicle_id = self.kwargs.get('vehicle_id')
         user_name = self.request.user.first_name or self.request.user.username
         
         try:
-            # Get user vehicles first to ensure we have the list
-            user_vehicles = ErrorHandler.handle_data_retrieval(
-                lambda: self.get_user_vehicles(),
-                fallback_value=[],
-                error_message="Failed to load user vehicles list"
-            )
-            
-            # Get user's vehicle or default to first vehicle with error handling
-            vehicle = ErrorHandler.handle_data_retrieval(
-                lambda: self.get_user_vehicle(vehicle_id),
-                fallback_value=None,
-                error_message=f"Failed to get vehicle for user {self.request.user.id}"
-            )
-            
-            # If no specific vehicle found but user has vehicles, use the first one
-            if not vehicle and user_vehicles:
-                vehicle = user_vehicles[0]
+            # Resolve the user's vehicles and the selected vehicle once, then
+            # build every section from the shared request-scoped context
+            dashboard_context = DashboardContext.load(self.request.user, vehicle_id)
+            vehicle = dashboard_context.vehicle
+            user_vehicles = dashboard_context.user_vehicles
             
             if vehicle:
-                dashboard_service = DashboardService()
-                
-                # Gather all dashboard data with individual error handling for graceful degradation
-                dashboard_data = {}
-                
-                # Vehicle overview - critical data
-                dashboard_data['vehicle_overview'] = ErrorHandler.handle_data_retrieval(
-                    lambda: dashboard_service.get_vehicle_overview(vehicle.id, self.request.user),
-                    fallback_value={},
-                    error_message="Failed to load vehicle overview"
-                )
-                
-                # Upcoming maintenance - important but not critical
-                dashboard_data['upcoming_maintenance'] = ErrorHandler.handle_data_retrieval(
-                    lambda: dashboard_service.get_upcoming_maintenance(vehicle.id, self.request.user),
-                    fallback_value=[],
-                    error_message="Failed to load upcoming maintenance"
-                )
-                
-                # Alerts - important for safety
-                dashboard_data['alerts'] = ErrorHandler.handle_data_retrieval(
-                    lambda: dashboard_service.get_vehicle_alerts(vehicle.id, self.request.user),
-                    fallback_value=[],
-                    error_message="Failed to load vehicle alerts"
-                )
-                
-                # Service history - nice to have
-                dashboard_data['service_history'] = ErrorHandler.handle_data_retrieval(
-                    lambda: dashboard_service.get_service_history(vehicle.id, self.request.user, limit=5),
-                    fallback_value=[],
-                    error_message="Failed to load service history"
-                )
-                
-                # Cost analytics - nice to have
-                dashboard_data['cost_analytics'] = ErrorHandler.handle_data_retrieval(
-                    lambda: dashboard_service.get_cost_analytics(vehicle.id, self.request.user),
-                    fallback_value={},
-                    error_message="Failed to load cost analytics"
-                )
-                
-                # Valuation - nice to have, may depend on external service
-                dashboard_data['valuation'] = ErrorHandler.handle_data_retrieval(
-                    lambda: dashboard_service.get_vehicle_valuation(vehicle.id, self.request.user),
-                    fallback_value={},
-                    error_message="Failed to load vehicle valuation"
-                )
+                dashboard_data = DashboardAssembler(dashboard_context).build()
                 
                 context.update({
                     'vehicle': vehicle,
@@ -153,42 +97,6 @@ class AutoCareDashboardView(LoginRequiredMixin, TemplateView):
             })
         
         return context
-    
-    def get_user_vehicle(self, vehicle_id=None):
-        """
-        Get the specified vehicle or user's first vehicle with ownership validation
-        """
-        try:
-            if vehicle_id:
-                # Get specific vehicle with ownership validation
-                vehicle = Vehicle.objects.select_related('valuation').get(
-                    id=vehicle_id,
-                    ownerships__user=self.request.user,
-                    ownerships__is_current_owner=True
-                )
-                return vehicle
-            else:
-                # Get user's first vehicle
-                vehicle = Vehicle.objects.select_related('valuation').filter(
-                    ownerships__user=self.request.user,
-                    ownerships__is_current_owner=True
-                ).first()
-                return vehicle
-                
-        except Vehicle.DoesNotExist:
-            if vehicle_id:
-                # Specific vehicle not found or access denied
-                raise Http404("Vehicle not found or access denied")
-            return None
-    
-    def get_user_vehicles(self):
-        """
-        Get all vehicles owned by the current user for vehicle switching
-        """
-        return Vehicle.objects.filter(
-            ownerships__user=self.request.user,
-            ownerships__is_current_owner=True
-        ).order_by('make', 'model', 'manufacture_year')
 
 
 class ServiceHistoryPagination(PageNumberPagination):
@@ -454,6 +362,9 @@ class ServiceHistoryAPIView(APIView):
         """
         Get paginated service history data
         Vehicle ownership is already verified by VehicleOwnerPermission
+        
+        Passing a cursor parameter (empty for the first page) switches to
+        keyset pagination; page and page_size keep the offset behaviour.
         """
         try:
             # Vehicle ownership already verified by permission class
@@ -463,6 +374,9 @@ class ServiceHistoryAPIView(APIView):
             page = request.GET.get('page', 1)
             page_size = min(int(request.GET.get('page_size', 10)), 50)  # Max 50 items per page
             
+            if 'cursor' in request.GET:
+                return self._get_cursor_page(request, vehicle_id, dashboard_service, page_size)
+            
             # Calculate offset
             try:
                 page = int(page)
@@ -498,12 +412,39 @@ class ServiceHistoryAPIView(APIView):
             logger.info(f"Service history retrieved for user {request.user.id}, vehicle {vehicle_id}, page {page}")
             return Response(paginated_response, status=status.HTTP_200_OK)
             
+        except ValidationError as e:
+            return Response(
+                {'error': {'code': e.code, 'message': 'Invalid pagination cursor'}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             logger.error(f"Error retrieving service history for user {request.user.id}, vehicle {vehicle_id}: {str(e)}")
             return Response(
                 {'error': {'code': 'INTERNAL_ERROR', 'message': 'Unable to retrieve service history'}},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def _get_cursor_page(self, request, vehicle_id, dashboard_service, page_size):
+        """Build a keyset-paginated service history response"""
+        history_page = dashboard_service.get_service_history_page(
+            vehicle_id,
+            request.user,
+            limit=page_size,
+            cursor=request.GET.get('cursor') or None
+        )
+        
+        paginated_response = {
+            'results': history_page['results'],
+            'pagination': {
+                'page_size': page_size,
+                'total_records': dashboard_service.get_service_history_count(vehicle_id, request.user),
+                'next_cursor': history_page['next_cursor'],
+                'has_next': history_page['has_next']
+            }
+        }
+        
+        logger.info(f"Service history retrieved for user {request.user.id}, vehicle {vehicle_id} by cursor")
+        return Response(paginated_response, status=status.HTTP_200_OK)
 
 
 class CostAnalyticsAPIView(APIView):
@@ -30,6 +30,11 @@ function initializeQuoteSummary() {
 function handleSelectionStrategyChange(event) {
     const strategy = event.target.value;
     const customPanel = document.getElementById('customSelectionPanel');
+    const optimalPanel = document.getElementById('optimalConstraintsPanel');
+    
+    if (optimalPanel) {
+        optimalPanel.classList.toggle('d-none', strategy !== 'optimal');
+    }
     
     if (strategy === 'custom') {
         customPanel.classList.remove('d-none');
@@ -53,7 +58,7 @@ function applySelectionStrategy(strategy) {
             case 'recommended':
                 selectedQuote = getRecommendedQuote(partId);
                 break;
-            case 'lowest_cost':
+            case 'lowest_price':
                 selectedQuote = getLowestCostQuote(partId);
                 break;
             case 'fastest_completion':
@@ -15,6 +15,8 @@ from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import user_passes_test
+from .group_membership import add_users_to_group, assign_group_to_ungrouped_users, remove_users_from_group
+from .permission_snapshot import prime_permission_snapshots
 from .services import AuthenticationService
 import csv
 import logging
@@ -70,15 +72,15 @@ class UserPermissionsView(TemplateView):
         page_number = self.request.GET.get('page')
         page_obj = paginator.get_page(page_number)
         
-        # Build user permission data
+        # Build user permission data from the prefetched groups
         user_permissions = []
-        for user in page_obj:
+        for user in prime_permission_snapshots(page_obj):
             permissions = AuthenticationService.get_user_permissions(user)
             
             user_permissions.append({
                 'user': user,
                 'permissions': permissions,
-                'groups': list(user.groups.values_list('name', flat=True)),
+                'groups': permissions.groups,
             })
         
         # Get filter options
@@ -117,7 +119,7 @@ def bulk_user_management(request):
         
         if not user_ids:
             messages.error(request, 'No users selected.')
-            return redirect('admin:users_bulk_management')
+            return redirect('users_admin:bulk_management')
         
         users = User.objects.filter(id__in=user_ids)
         
@@ -126,9 +128,8 @@ def bulk_user_management(request):
             if group_id:
                 try:
                     group = Group.objects.get(id=group_id)
-                    for user in users:
-                        user.groups.add(group)
-                    messages.success(request, f'Added {users.count()} users to group "{group.name}".')
+                    added_count = add_users_to_group(users, group)
+                    messages.success(request, f'Added {added_count} users to group "{group.name}".')
                 except Group.DoesNotExist:
                     messages.error(request, 'Selected group does not exist.')
             else:
@@ -139,9 +140,8 @@ def bulk_user_management(request):
             if group_id:
                 try:
                     group = Group.objects.get(id=group_id)
-                    for user in users:
-                        user.groups.remove(group)
-                    messages.success(request, f'Removed {users.count()} users from group "{group.name}".')
+                    removed_count = remove_users_from_group(users, group)
+                    messages.success(request, f'Removed {removed_count} users from group "{group.name}".')
                 except Group.DoesNotExist:
                     messages.error(request, 'Selected group does not exist.')
             else:
@@ -149,19 +149,16 @@ def bulk_user_management(request):
         
         elif action == 'assign_default_groups':
             # Assign users to AutoCare group by default if they have no groups
-            assigned_count = 0
             try:
                 autocare_group = Group.objects.get(name='AutoCare')
-                for user in users:
-                    if not user.groups.exists():
-                        user.groups.add(autocare_group)
-                        assigned_count += 1
+                assigned_count = assign_group_to_ungrouped_users(users, autocare_group)
                 messages.success(request, f'Assigned {assigned_count} users to AutoCare group.')
             except Group.DoesNotExist:
                 messages.error(request, 'AutoCare group does not exist. Run setup_three_groups command first.')
         
         elif action == 'check_permissions':
             no_access_count = 0
+            users = prime_permission_snapshots(users.prefetch_related('groups'))
             for user in users:
                 permissions = AuthenticationService.get_user_permissions(user)
                 if not permissions.has_access:
@@ -171,9 +168,9 @@ def bulk_user_management(request):
             if no_access_count > 0:
                 messages.warning(request, f'Found {no_access_count} users without dashboard access. Check logs for details.')
             else:
-                messages.success(request, f'All {users.count()} users have dashboard access.')
+                messages.success(request, f'All {len(users)} users have dashboard access.')
         
-        return redirect('admin:users_bulk_management')
+        return redirect('users_admin:bulk_management')
     
     # GET request - show the form
     users = User.objects.select_related('profile').prefetch_related('groups').all()
@@ -194,13 +191,13 @@ def users_without_access_report(request):
     users = User.objects.select_related('profile').prefetch_related('groups').all()
     
     no_access_data = []
-    for user in users:
+    for user in prime_permission_snapshots(users):
         permissions = AuthenticationService.get_user_permissions(user)
         if not permissions.has_access:
             no_access_data.append({
                 'user': user,
                 'permissions': permissions,
-                'groups': list(user.groups.values_list('name', flat=True)),
+                'groups': permissions.groups,
             })
     
     context = {
@@ -226,7 +223,7 @@ def export_user_permissions(request):
     
     users = User.objects.select_related('profile').prefetch_related('groups').all()
     
-    for user in users:
+    for user in prime_permission_snapshots(users):
         permissions = AuthenticationService.get_user_permissions(user)
         
         writer.writerow([
@@ -234,7 +231,7 @@ def export_user_permissions(request):
             user.email,
             user.first_name,
             user.last_name,
-            ', '.join(user.groups.values_list('name', flat=True)),
+            ', '.join(permissions.groups),
             ', '.join(permissions.available_dashboards),
             permissions.default_dashboard or '',
             'Yes' if permissions.has_access else 'No'
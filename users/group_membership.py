@@ -0,0 +1,102 @@
+"""
+Set-based group membership changes for many users at once.
+
+Adding or removing users one at a time through user.groups costs at least
+one query per user. The functions here work on the User.groups through
+table directly: memberships are added with bulk_create, removed with one
+DELETE, and users without any group are found with an anti-join.
+
+Writes to the through table do not send m2m_changed, so the functions send
+the signals the related manager would have sent, with the group as the
+instance. The users.signals receivers then invalidate permission snapshots
+as for any other membership change.
+"""
+
+import logging
+from typing import List
+
+from django.contrib.auth.models import Group, User
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+
+logger = logging.getLogger(__name__)
+
+Membership = User.groups.through
+
+
+def add_users_to_group(users, group: Group) -> int:
+    """
+    Add users to a group.
+
+    Args:
+        users: User queryset
+        group: Group to add them to
+
+    Returns:
+        Number of users that were not already members
+    """
+    user_ids = list(users.exclude(groups=group).values_list('pk', flat=True))
+    return _add_memberships(user_ids, group)
+
+
+def assign_group_to_ungrouped_users(users, group: Group) -> int:
+    """
+    Add the users that belong to no group at all to a group.
+
+    Args:
+        users: User queryset
+        group: Group to add them to
+
+    Returns:
+        Number of users added
+    """
+    user_ids = list(users.filter(groups__isnull=True).values_list('pk', flat=True))
+    return _add_memberships(user_ids, group)
+
+
+def remove_users_from_group(users, group: Group) -> int:
+    """
+    Remove users from a group with a single DELETE.
+
+    Args:
+        users: User queryset
+        group: Group to remove them from
+
+    Returns:
+        Number of users removed
+    """
+    memberships = Membership.objects.filter(group=group, user__in=users.values('pk'))
+    using = router.db_for_write(Membership)
+    with transaction.atomic(using=using):
+        user_ids = set(memberships.values_list('user_id', flat=True))
+        if not user_ids:
+            return 0
+        _send_membership_changed('pre_remove', group, user_ids, using)
+        removed, _ = memberships.delete()
+        _send_membership_changed('post_remove', group, user_ids, using)
+    logger.info(f"Removed {removed} users from group {group.name}")
+    return removed
+
+
+def _add_memberships(user_ids: List[int], group: Group) -> int:
+    if not user_ids:
+        return 0
+    using = router.db_for_write(Membership)
+    with transaction.atomic(using=using):
+        _send_membership_changed('pre_add', group, set(user_ids), using)
+        # ignore_conflicts covers memberships added concurrently since the
+        # user ids were selected
+        Membership.objects.using(using).bulk_create(
+            [Membership(user_id=user_id, group_id=group.pk) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+        _send_membership_changed('post_add', group, set(user_ids), using)
+    logger.info(f"Added {len(user_ids)} users to group {group.name}")
+    return len(user_ids)
+
+
+def _send_membership_changed(action: str, group: Group, user_ids: set, using: str):
+    m2m_changed.send(
+        sender=Membership, action=action, instance=group, reverse=True,
+        model=User, pk_set=user_ids, using=using,
+    )
@@ -0,0 +1,117 @@
+"""
+Management command to measure the permission checks made while rendering a
+dashboard template.
+
+Renders the template for an existing user and reports the queries issued
+and the log records written, per render. By default the permission checks
+made by the navigation and sidebar of dashboard/dashboard.html are rendered.
+"""
+
+import logging
+import time
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+# The dashboard_extras checks made by dashboard/dashboard.html and base/navbar.html
+DASHBOARD_PERMISSION_CHECKS = """
+{% load dashboard_extras %}
+{% get_user_dashboard_url user as dashboard_url %}
+{% get_user_dashboard_access user as dashboard_access %}
+{% get_dashboard_switch_options user request.resolver_match.url_name as switch_options %}
+{% if user|has_group:'AutoCare' or user|has_group:'AutoAssess' %}vehicles{% endif %}
+{% if user|has_group:'Staff' %}staff{% elif user|has_group:'AutoAssess' %}assess{% elif user|has_group:'AutoCare' %}care{% endif %}
+{% if user|has_group:'AutoCare' or user|has_group:'AutoAssess' %}vehicles{% endif %}
+{% if user|has_group:'Staff' %}admin{% endif %}
+{% if user|has_group:'Staff' %}staff{% elif user|has_group:'AutoAssess' %}assess{% elif user|has_group:'AutoCare' %}care{% endif %}
+{% if user|has_group:'AutoCare' or user|has_group:'AutoAssess' %}vehicles{% endif %}
+{% if user|has_group:'Staff' %}admin{% endif %}
+{% if user|has_any_group:'Staff,AutoAssess' %}reports{% endif %}
+{% can_access_dashboard user 'autocare' as can_autocare %}
+{% get_user_default_dashboard user as default_dashboard %}
+"""
+
+
+class CountingHandler(logging.Handler):
+    """Logging handler that only counts the records it receives"""
+
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+class Command(BaseCommand):
+    help = 'Benchmark queries and log writes from permission checks in a dashboard template render'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', type=str, required=True, help='User to render the template for')
+        parser.add_argument(
+            '--template',
+            type=str,
+            default=None,
+            help='Template to render (default: the dashboard permission checks)',
+        )
+        parser.add_argument('--path', type=str, default='/dashboard/', help='Request path (default: /dashboard/)')
+        parser.add_argument('--renders', type=int, default=20, help='Number of renders (default: 20)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        renders = max(1, options['renders'])
+        if options['template']:
+            label = options['template']
+            render = lambda context, request: render_to_string(options['template'], context, request=request)
+        else:
+            label = 'Dashboard permission checks'
+            template = engines['django'].from_string(DASHBOARD_PERMISSION_CHECKS)
+            render = lambda context, request: template.render(context, request)
+
+        handler = CountingHandler()
+        root_logger = logging.getLogger()
+        previous_level = root_logger.level
+        root_logger.addHandler(handler)
+        # Count records at the levels the deployed settings emit
+        root_logger.setLevel(logging.INFO)
+
+        total_queries = 0
+        started = time.perf_counter()
+        try:
+            for _ in range(renders):
+                # A fresh request and user instance per render, as in production
+                request = RequestFactory().get(options['path'])
+                request.user = User.objects.get(pk=user.pk)
+                request.session = SessionBase()
+                try:
+                    request.resolver_match = resolve(options['path'])
+                except Exception:
+                    request.resolver_match = None
+
+                with CaptureQueriesContext(connection) as context:
+                    render({'user': request.user}, request)
+                total_queries += len(context.captured_queries)
+        finally:
+            root_logger.removeHandler(handler)
+            root_logger.setLevel(previous_level)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"{label} rendered {renders} times for {user.username}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'  {total_queries / renders:.1f} queries and {handler.count / renders:.1f} '
+                f'log records per render, {elapsed * 1000 / renders:.1f} ms per render'
+            )
+        )
@@ -0,0 +1,164 @@
+"""
+Request-scoped snapshot of a user's groups and permissions.
+
+A request checks group membership many times: the view decorators, the
+AuthenticationService and every has_group filter in the templates. The
+snapshot loads the user's group names with one query the first time it is
+needed and serves every later check from memory. It lives on the user
+instance, which the authentication middleware loads once per request.
+
+Snapshots are stamped with a process-wide generation number. The
+m2m_changed receivers in users.signals bump the generation whenever group
+or permission membership changes, so a snapshot taken before the change is
+reloaded on its next use.
+"""
+
+import itertools
+import threading
+from typing import FrozenSet, Iterable, Optional
+
+SNAPSHOT_ATTRIBUTE = '_permission_snapshot'
+
+# Django's ModelBackend caches, cleared together with the snapshot
+PERMISSION_CACHE_ATTRIBUTES = ('_perm_cache', '_user_perm_cache', '_group_perm_cache')
+
+_generation_counter = itertools.count(1)
+_generation_lock = threading.Lock()
+_generation = 0
+
+
+def current_generation() -> int:
+    """Return the generation snapshots must match to be used."""
+    return _generation
+
+
+def bump_generation() -> int:
+    """
+    Invalidate every snapshot taken so far.
+
+    Returns:
+        The new generation number
+    """
+    global _generation
+    with _generation_lock:
+        _generation = next(_generation_counter)
+        return _generation
+
+
+class PermissionSnapshot:
+    """
+    Group names and permission codenames of one user.
+
+    Group names are loaded when the snapshot is created; permission
+    codenames are loaded on first use, since most checks only need groups.
+    """
+
+    __slots__ = ('user', 'group_names', 'generation', '_permissions')
+
+    def __init__(self, user, group_names: Iterable[str], generation: int):
+        self.user = user
+        self.group_names: FrozenSet[str] = frozenset(group_names)
+        self.generation = generation
+        self._permissions: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def load(cls, user) -> 'PermissionSnapshot':
+        """
+        Load a snapshot for an authenticated user.
+
+        Args:
+            user: Django User instance
+
+        Returns:
+            PermissionSnapshot with the user's group names
+        """
+        # Read the generation first so a change during the query makes
+        # this snapshot stale rather than current
+        generation = current_generation()
+        return cls(user, user.groups.values_list('name', flat=True), generation)
+
+    @property
+    def is_current(self) -> bool:
+        """Whether no membership change happened since the snapshot was taken."""
+        return self.generation == current_generation()
+
+    @property
+    def permissions(self) -> FrozenSet[str]:
+        """Permission names as ``app_label.codename``, loaded on first use."""
+        if self._permissions is None:
+            self._permissions = frozenset(self.user.get_all_permissions())
+        return self._permissions
+
+    def has_group(self, group_name: str) -> bool:
+        """Check membership of one group."""
+        return group_name in self.group_names
+
+    def has_any_group(self, group_names: Iterable[str]) -> bool:
+        """Check membership of at least one of the groups."""
+        return not self.group_names.isdisjoint(group_names)
+
+    def has_all_groups(self, group_names: Iterable[str]) -> bool:
+        """Check membership of every one of the groups."""
+        return self.group_names.issuperset(group_names)
+
+    def has_perm(self, perm: str) -> bool:
+        """Check a permission given as ``app_label.codename``."""
+        if self.user.is_active and self.user.is_superuser:
+            return True
+        return perm in self.permissions
+
+
+def get_permission_snapshot(user) -> Optional[PermissionSnapshot]:
+    """
+    Return the user's snapshot, loading it if missing or stale.
+
+    Args:
+        user: Django User instance or AnonymousUser
+
+    Returns:
+        PermissionSnapshot, or None for anonymous or missing users
+    """
+    if not user or not getattr(user, 'is_authenticated', False):
+        return None
+
+    snapshot = getattr(user, SNAPSHOT_ATTRIBUTE, None)
+    if snapshot is None or not snapshot.is_current:
+        if snapshot is not None:
+            clear_permission_snapshot(user)
+        snapshot = PermissionSnapshot.load(user)
+        setattr(user, SNAPSHOT_ATTRIBUTE, snapshot)
+    return snapshot
+
+
+def prime_permission_snapshots(users) -> list:
+    """
+    Give users snapshots built from their prefetched groups.
+
+    For lists of users loaded with prefetch_related('groups'), so that
+    permission checks on each of them need no query of their own.
+
+    Args:
+        users: Iterable of User instances with groups prefetched; a
+            queryset or page is evaluated here
+
+    Returns:
+        List of the users
+    """
+    # Read the generation before the users are loaded, as in load()
+    generation = current_generation()
+    users = list(users)
+    for user in users:
+        group_names = [group.name for group in user.groups.all()]
+        setattr(user, SNAPSHOT_ATTRIBUTE, PermissionSnapshot(user, group_names, generation))
+    return users
+
+
+def clear_permission_snapshot(user) -> None:
+    """
+    Drop the snapshot and Django's permission caches from a user instance.
+
+    Args:
+        user: Django User instance
+    """
+    for attribute in (SNAPSHOT_ATTRIBUTE,) + PERMISSION_CACHE_ATTRIBUTES:
+        user.__dict__.pop(attribute, None)
@@ -15,6 +15,7 @@ from django.contrib import messages
 from django.urls import reverse
 from django.contrib.auth.models import User
 from .services import AuthenticationService
+from .permission_snapshot import get_permission_snapshot
 from .error_handlers import AuthenticationErrorHandler, ErrorType, SecurityEventLogger
 import logging
 
@@ -69,8 +70,7 @@ def require_any_group(group_names: List[str]):
         @wraps(view_func)
         @login_required
         def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
-            user_groups = [group.name for group in request.user.groups.all()]
-            if not any(group in user_groups for group in group_names):
+            if not get_permission_snapshot(request.user).has_any_group(group_names):
                 # Log the access denial
                 SecurityEventLogger.log_access_denied(
                     user=request.user,
@@ -104,8 +104,7 @@ def require_all_groups(group_names: List[str]):
         @wraps(view_func)
         @login_required
         def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
-            user_groups = [group.name for group in request.user.groups.all()]
-            if not all(group in user_groups for group in group_names):
+            if not get_permission_snapshot(request.user).has_all_groups(group_names):
                 logger.warning(f"User {request.user.id} denied access to {view_func.__name__} - missing some of groups: {group_names}")
                 messages.error(request, f"Access denied. You need to be in all of these groups: {', '.join(group_names)}")
                 return redirect('access_denied')
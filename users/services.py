@@ -9,6 +9,7 @@ from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from django.contrib.auth.models import User, Group
 from django.contrib.auth import get_user_model
+from .permission_snapshot import get_permission_snapshot
 import logging
 
 logger = logging.getLogger(__name__)
@@ -85,7 +86,7 @@ class AuthenticationService:
         Returns:
             UserPermissions object with permission details
         """
-        logger.info(f"Getting permissions for user: {user.id if user else 'None'} ({user.username if user else 'N/A'})")
+        logger.debug(f"Getting permissions for user: {user.id if user else 'None'} ({user.username if user else 'N/A'})")
         
         if not user or not user.is_authenticated:
             logger.warning(f"User permission check failed - user: {user}, authenticated: {user.is_authenticated if user else 'N/A'}")
@@ -97,10 +98,10 @@ class AuthenticationService:
                 has_access=False
             )
         
-        # Get user groups with detailed logging
+        # Groups come from the request's permission snapshot
         try:
-            user_groups = list(user.groups.values_list('name', flat=True))
-            logger.info(f"User {user.id} groups from database: {user_groups}")
+            user_groups = sorted(get_permission_snapshot(user).group_names)
+            logger.debug(f"User {user.id} groups from snapshot: {user_groups}")
         except Exception as e:
             logger.error(f"Error getting user groups for user {user.id}: {str(e)}")
             user_groups = []
@@ -116,7 +117,7 @@ class AuthenticationService:
             has_access=len(available_dashboards) > 0
         )
         
-        logger.info(f"Final permissions for user {user.id}: {permissions}")
+        logger.debug(f"Final permissions for user {user.id}: {permissions}")
         return permissions
 
     @classmethod
@@ -152,7 +153,7 @@ class AuthenticationService:
         
         # If user has multiple dashboards, redirect to dashboard selector
         if len(permissions.available_dashboards) > 1:
-            logger.info(f"User {user.id} has multiple dashboards, redirecting to selector")
+            logger.debug(f"User {user.id} has multiple dashboards, redirecting to selector")
             return '/dashboard-selector/'
         
         # If user has only one dashboard, redirect directly to it
@@ -183,9 +184,8 @@ class AuthenticationService:
             return False
         
         try:
-            # Add more robust checking with logging
-            result = user.groups.filter(name=required_group).exists()
-            logger.info(f"Group access check - User: {user.id} ({user.username}), Group: {required_group}, Result: {result}")
+            result = get_permission_snapshot(user).has_group(required_group)
+            logger.debug(f"Group access check - User: {user.id} ({user.username}), Group: {required_group}, Result: {result}")
             return result
         except Exception as e:
             logger.error(f"Error checking group access for user {user.id}, group {required_group}: {str(e)}")
@@ -206,46 +206,46 @@ class AuthenticationService:
         default_dashboard = None
         highest_priority = 0
         
-        logger.info(f"Resolving dashboard access for groups: {user_groups}")
+        logger.debug(f"Resolving dashboard access for groups: {user_groups}")
         
         # Check each group for dashboard access with explicit mapping
         for group in user_groups:
-            logger.info(f"Processing group: {group}")
+            logger.debug(f"Processing group: {group}")
             
             if group == 'AutoCare':
                 available_dashboards.append('autocare')
-                logger.info(f"Added 'autocare' dashboard for AutoCare group")
+                logger.debug(f"Added 'autocare' dashboard for AutoCare group")
                 
                 # Set default dashboard based on group priority
                 group_priority = cls.GROUP_PRIORITY.get(group, 0)
-                logger.info(f"AutoCare group priority: {group_priority}, highest so far: {highest_priority}")
+                logger.debug(f"AutoCare group priority: {group_priority}, highest so far: {highest_priority}")
                 
                 if group_priority > highest_priority:
                     highest_priority = group_priority
                     default_dashboard = 'autocare'
-                    logger.info(f"Set default dashboard to 'autocare'")
+                    logger.debug(f"Set default dashboard to 'autocare'")
                     
             elif group == 'AutoAssess':
                 available_dashboards.append('autoassess')
-                logger.info(f"Added 'autoassess' dashboard for AutoAssess group")
+                logger.debug(f"Added 'autoassess' dashboard for AutoAssess group")
                 
                 group_priority = cls.GROUP_PRIORITY.get(group, 0)
                 if group_priority > highest_priority:
                     highest_priority = group_priority
                     default_dashboard = 'autoassess'
-                    logger.info(f"Set default dashboard to 'autoassess'")
+                    logger.debug(f"Set default dashboard to 'autoassess'")
                     
             elif group == 'Staff':
                 available_dashboards.append('staff')
-                logger.info(f"Added 'staff' dashboard for Staff group")
+                logger.debug(f"Added 'staff' dashboard for Staff group")
                 
                 group_priority = cls.GROUP_PRIORITY.get(group, 0)
                 if group_priority > highest_priority:
                     highest_priority = group_priority
                     default_dashboard = 'staff'
-                    logger.info(f"Set default dashboard to 'staff'")
+                    logger.debug(f"Set default dashboard to 'staff'")
         
-        logger.info(f"Final dashboard access - Available: {available_dashboards}, Default: {default_dashboard}")
+        logger.debug(f"Final dashboard access - Available: {available_dashboards}, Default: {default_dashboard}")
         return list(set(available_dashboards)), default_dashboard
 
 
@@ -0,0 +1,33 @@
+"""
+Signal handlers for the users app.
+
+Group and permission membership changes invalidate the permission snapshots
+held by user instances, see users.permission_snapshot.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .permission_snapshot import bump_generation, clear_permission_snapshot
+
+User = get_user_model()
+
+MEMBERSHIP_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_permission_snapshots(sender, instance, action, **kwargs):
+    """Invalidate permission snapshots after group or permission membership changes"""
+    if action not in MEMBERSHIP_ACTIONS:
+        return
+
+    # Every snapshot taken so far goes stale; the user instance the change
+    # was made through also drops Django's own permission caches, which
+    # user.has_perm() reads without going through the snapshot
+    bump_generation()
+    if isinstance(instance, User):
+        clear_permission_snapshot(instance)
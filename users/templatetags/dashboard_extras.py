@@ -7,6 +7,7 @@ authentication system to provide conditional navigation and dashboard functional
 
 from django import template
 from django.contrib.auth.models import User
+from ..permission_snapshot import get_permission_snapshot
 import logging
 
 register = template.Library()
@@ -34,33 +35,28 @@ def get_user_dashboard_access(user):
         }
 
     try:
-        # Get user's groups in priority order (Staff=3, AutoAssess=2, AutoCare=1)
-        user_groups = list(user.groups.values_list('name', flat=True))
+        # All checks are served from the request's permission snapshot
+        snapshot = get_permission_snapshot(user)
+        user_groups = sorted(snapshot.group_names)
         available_dashboards = []
 
-        # Debug logging
-        logger.info(f"User {user.id} ({user.username}) groups: {user_groups}")
+        logger.debug(f"User {user.id} ({user.username}) groups: {user_groups}")
 
         # Determine available dashboards based on group membership
-        if user.groups.filter(name='Staff').exists():
+        if snapshot.has_group('Staff'):
             available_dashboards.append('staff')
-            logger.info(f"User {user.id} has Staff group, added 'staff' dashboard")
-        if user.groups.filter(name='AutoCare').exists():
+        if snapshot.has_group('AutoCare'):
             available_dashboards.append('autocare')
-            logger.info(f"User {user.id} has AutoCare group, added 'autocare' dashboard")
-        if user.groups.filter(name='AutoAssess').exists():
+        if snapshot.has_group('AutoAssess'):
             available_dashboards.append('autoassess')
-            logger.info(f"User {user.id} has AutoAssess group, added 'autoassess' dashboard")
 
-        logger.info(f"User {user.id} available dashboards: {available_dashboards}")
-
-        # Set default dashboard based on highest priority group
+        # Set default dashboard based on highest priority group (Staff=3, AutoAssess=2, AutoCare=1)
         default_dashboard = None
-        if user.groups.filter(name='Staff').exists():
+        if snapshot.has_group('Staff'):
             default_dashboard = 'staff'
-        elif user.groups.filter(name='AutoAssess').exists():
+        elif snapshot.has_group('AutoAssess'):
             default_dashboard = 'autoassess'
-        elif user.groups.filter(name='AutoCare').exists():
+        elif snapshot.has_group('AutoCare'):
             default_dashboard = 'autocare'
 
         result = {
@@ -71,7 +67,7 @@ def get_user_dashboard_access(user):
             'default_dashboard': default_dashboard
         }
 
-        logger.info(f"User {user.id} dashboard access result: {result}")
+        logger.debug(f"User {user.id} dashboard access result: {result}")
         return result
     except Exception as e:
         logger.error(f"Error getting dashboard access for user {user.id}: {str(e)}")
@@ -193,7 +189,7 @@ def get_user_dashboard_url(user):
         
         # If user has multiple dashboards, redirect to dashboard selector
         if len(permissions.available_dashboards) > 1:
-            logger.info(f"User {user.id} has multiple dashboards, redirecting to selector")
+            logger.debug(f"User {user.id} has multiple dashboards, redirecting to selector")
             return '/dashboard-selector/'
         
         # If user has only one dashboard, redirect directly to it
@@ -227,7 +223,7 @@ def has_group(user, group_name):
     if not user or not user.is_authenticated:
         return False
 
-    return user.groups.filter(name=group_name).exists()
+    return get_permission_snapshot(user).has_group(group_name)
 
 
 @register.filter
@@ -246,7 +242,7 @@ def has_any_group(user, group_names):
         return False
 
     group_list = [name.strip() for name in group_names.split(',')]
-    return user.groups.filter(name__in=group_list).exists()
+    return get_permission_snapshot(user).has_any_group(group_list)
 
 
 @register.inclusion_tag('dashboard/navigation_context.html', takes_context=True)
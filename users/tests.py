@@ -1,3 +1,205 @@
+"""
+Tests for the request-scoped permission snapshot.
+
+These tests check that group and permission checks are served from one
+load per user instance, and that m2m_changed on group and permission
+membership invalidates the snapshot. They also check that bulk group
+membership changes and the user permissions page take a constant number
+of queries however many users they cover.
+"""
+
+from django.contrib.auth.models import AnonymousUser, Group, Permission, User
+from django.db import connection
+from django.template import engines
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.group_membership import add_users_to_group, assign_group_to_ungrouped_users, remove_users_from_group
+from users.permission_snapshot import get_permission_snapshot
+from users.services import AuthenticationService
+
+
+class PermissionSnapshotTestCase(TestCase):
+    """Test cases for PermissionSnapshot loading and invalidation"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.staff_group = Group.objects.create(name='Staff')
+        self.autocare_group = Group.objects.create(name='AutoCare')
+        self.user = User.objects.create_user(username='snapshotuser', password='testpass123')
+        self.user.groups.add(self.autocare_group)
+        # A fresh instance, as loaded by the authentication middleware
+        self.user = User.objects.get(pk=self.user.pk)
+
+    def test_checks_served_from_one_query(self):
+        """Repeated group checks only query the database once"""
+        with self.assertNumQueries(1):
+            for _ in range(10):
+                self.assertTrue(AuthenticationService.check_group_access(self.user, 'AutoCare'))
+                self.assertFalse(AuthenticationService.check_group_access(self.user, 'Staff'))
+            permissions = AuthenticationService.get_user_permissions(self.user)
+
+        self.assertEqual(permissions.groups, ['AutoCare'])
+        self.assertEqual(permissions.default_dashboard, 'autocare')
+
+    def test_anonymous_user_has_no_snapshot(self):
+        """Anonymous users get no snapshot and fail every check"""
+        self.assertIsNone(get_permission_snapshot(AnonymousUser()))
+        self.assertIsNone(get_permission_snapshot(None))
+        self.assertFalse(AuthenticationService.check_group_access(AnonymousUser(), 'AutoCare'))
+
+    def test_group_add_invalidates_snapshot(self):
+        """Adding a group through the user is seen on the next check"""
+        self.assertFalse(AuthenticationService.check_group_access(self.user, 'Staff'))
+
+        self.user.groups.add(self.staff_group)
+
+        self.assertTrue(AuthenticationService.check_group_access(self.user, 'Staff'))
+
+    def test_reverse_change_invalidates_other_instances(self):
+        """Changes made through the group reach snapshots on other instances"""
+        other = User.objects.get(pk=self.user.pk)
+        self.assertTrue(get_permission_snapshot(other).has_group('AutoCare'))
+
+        self.autocare_group.user_set.remove(self.user)
+
+        self.assertFalse(get_permission_snapshot(other).has_group('AutoCare'))
+
+        self.user.groups.clear()
+        self.staff_group.user_set.add(self.user)
+
+        self.assertTrue(get_permission_snapshot(other).has_any_group(['Staff', 'AutoAssess']))
+        self.assertFalse(get_permission_snapshot(other).has_all_groups(['Staff', 'AutoCare']))
+
+    def test_permissions_loaded_lazily(self):
+        """Permission codenames load on first use and reload after changes"""
+        permission = Permission.objects.get(codename='change_group')
+        snapshot = get_permission_snapshot(self.user)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(snapshot.has_group('AutoCare'))
+        self.assertFalse(snapshot.has_perm('auth.change_group'))
+
+        self.autocare_group.permissions.add(permission)
+
+        with self.assertNumQueries(3):
+            self.assertTrue(get_permission_snapshot(self.user).has_perm('auth.change_group'))
+
+    def test_template_filters_use_snapshot(self):
+        """A template with many group checks issues one query"""
+        template = engines['django'].from_string(
+            "{% load dashboard_extras %}"
+            "{% if user|has_group:'Staff' %}staff{% endif %}"
+            "{% if user|has_group:'AutoCare' %}care{% endif %}"
+            "{% if user|has_any_group:'Staff,AutoAssess' %}reports{% endif %}"
+            "{% get_user_dashboard_access user as access %}{{ access.default_dashboard }}"
+        )
+
+        with self.assertNumQueries(1):
+            rendered = template.render({'user': self.user})
+
+        self.assertEqual(rendered, 'careautocare')
+
+
+class GroupMembershipTestCase(TestCase):
+    """Test cases for set-based group membership changes and the admin views using them"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.staff_group = Group.objects.create(name='Staff')
+        self.autocare_group = Group.objects.create(name='AutoCare')
+        self.admin = User.objects.create_superuser(username='bulkadmin', password='testpass123')
+        self.client.force_login(self.admin)
+
+    def create_users(self, count, prefix='member'):
+        User.objects.bulk_create([User(username=f'{prefix}{number}') for number in range(count)])
+        return User.objects.filter(username__startswith=prefix)
+
+    def membership_queries(self, action, users, group):
+        """Queries run by a membership action, with INSERTs separated from the rest"""
+        with CaptureQueriesContext(connection) as queries:
+            changed = action(users, group)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        return changed, len(queries) - len(inserts), len(inserts)
+
+    def test_bulk_changes_take_constant_queries(self):
+        """Adding, assigning and removing 10,000 users takes as many queries as 10 users, plus insert batches"""
+        few = self.create_users(10, 'few')
+        many = self.create_users(10000, 'many')
+        grouped = list(many.values_list('pk', flat=True)[:2500])
+        self.staff_group.user_set.add(*grouped)
+        batch_size = connection.ops.bulk_batch_size(['user_id', 'group_id'], [None] * 10000)
+
+        added, add_queries, _ = self.membership_queries(add_users_to_group, few, self.autocare_group)
+        self.assertEqual(added, 10)
+        added, queries, inserts = self.membership_queries(add_users_to_group, many, self.autocare_group)
+        self.assertEqual(added, 10000)
+        self.assertEqual(queries, add_queries)
+        self.assertEqual(inserts, -(-10000 // batch_size))
+        # Members already in the group are skipped
+        self.assertEqual(add_users_to_group(many, self.autocare_group), 0)
+
+        removed, remove_queries, _ = self.membership_queries(remove_users_from_group, few, self.autocare_group)
+        self.assertEqual(removed, 10)
+        removed, queries, _ = self.membership_queries(remove_users_from_group, many, self.autocare_group)
+        self.assertEqual(removed, 10000)
+        self.assertEqual(queries, remove_queries)
+        self.assertFalse(self.autocare_group.user_set.exists())
+
+        assigned, queries, inserts = self.membership_queries(
+            assign_group_to_ungrouped_users, many, self.autocare_group
+        )
+        self.assertEqual(assigned, 7500)
+        self.assertEqual(queries, add_queries)
+        self.assertEqual(inserts, -(-7500 // batch_size))
+        self.assertFalse(self.autocare_group.user_set.filter(pk__in=grouped).exists())
+
+    def test_bulk_changes_invalidate_snapshots(self):
+        """Through table changes still send m2m_changed, so snapshots are reloaded"""
+        user = self.create_users(1).get()
+        self.assertFalse(AuthenticationService.get_user_permissions(user).has_access)
+
+        add_users_to_group(User.objects.filter(pk=user.pk), self.autocare_group)
+        self.assertEqual(AuthenticationService.get_user_permissions(user).groups, ['AutoCare'])
+
+        remove_users_from_group(User.objects.filter(pk=user.pk), self.autocare_group)
+        self.assertEqual(AuthenticationService.get_user_permissions(user).groups, [])
+
+    def test_bulk_management_actions(self):
+        """The bulk management view applies each action to the selected users"""
+        users = self.create_users(5)
+        user_ids = [str(pk) for pk in users.values_list('pk', flat=True)]
+        self.staff_group.user_set.add(users[0])
+        url = reverse('users_admin:bulk_management')
+
+        response = self.client.post(url, {'action': 'assign_default_groups', 'user_ids': user_ids})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(self.autocare_group.user_set.count(), 4)
+
+        self.client.post(url, {'action': 'add_to_group', 'group_id': self.autocare_group.pk, 'user_ids': user_ids})
+        self.assertEqual(self.autocare_group.user_set.count(), 5)
+
+        self.client.post(url, {'action': 'remove_from_group', 'group_id': self.staff_group.pk, 'user_ids': user_ids})
+        self.assertFalse(self.staff_group.user_set.exists())
+
+    def test_permissions_page_takes_constant_queries(self):
+        """A page of 25 users is built from the prefetched groups"""
+        url = reverse('users_admin:user_permissions')
+        self.create_users(3)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(url)
+
+        users = self.create_users(40, 'paged')
+        for user in users[:30]:
+            user.groups.add(self.autocare_group, self.staff_group)
+
+        with CaptureQueriesContext(connection) as full_page:
+            response = self.client.get(url)
 
-# Create your tests here.
+        self.assertEqual(len(response.context['user_permissions']), 25)
+        self.assertEqual(len(full_page), len(small_page))
+        grouped = [item for item in response.context['user_permissions'] if item['groups']]
+        self.assertTrue(grouped)
+        self.assertEqual(grouped[0]['groups'], ['AutoCare', 'Staff'])
+        self.assertEqual(grouped[0]['permissions'].default_dashboard, 'staff')